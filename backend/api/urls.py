@@ -10,6 +10,8 @@ urlpatterns = [
     path('informations/', include(('apps.informations.urls', 'apps.informations'), namespace='informations')),
     path('items-management/', include(('apps.items_management.urls', 'apps.items_management'), namespace='items_management')),
     path('passenger-management/', include(('apps.passenger_management.urls', 'apps.passenger_management'), namespace='passenger_management')),
+    path('realtime/', include(('apps.realtime.urls', 'apps.realtime'), namespace='realtime')),
+    path('broadcasting/', include(('apps.broadcasting.urls', 'apps.broadcasting'), namespace='broadcasting')),
     path('navigation-management/', include(('apps.navigation_management.urls', 'apps.navigation_management'), namespace='navigation_management')),
 ]
 
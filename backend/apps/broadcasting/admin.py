@@ -0,0 +1,24 @@
+from django.contrib import admin
+from .models import BroadcastTask, BroadcastZone, BroadcastZoneState
+
+
+@admin.register(BroadcastTask)
+class BroadcastTaskAdmin(admin.ModelAdmin):
+    list_display = ('zone', 'source', 'priority', 'status', 'coalesced_count', 'enqueued_at', 'started_at')
+    list_filter = ('zone', 'source', 'priority', 'status')
+    search_fields = ('content',)
+    date_hierarchy = 'enqueued_at'
+    readonly_fields = ('content_hash', 'enqueued_at', 'started_at', 'finished_at')
+
+
+@admin.register(BroadcastZoneState)
+class BroadcastZoneStateAdmin(admin.ModelAdmin):
+    list_display = ('zone', 'next_available_at', 'last_pulled_at')
+    search_fields = ('zone',)
+
+
+@admin.register(BroadcastZone)
+class BroadcastZoneAdmin(admin.ModelAdmin):
+    list_display = ('code', 'name', 'floor', 'min_x', 'min_y', 'max_x', 'max_y', 'is_active')
+    list_filter = ('floor', 'is_active')
+    search_fields = ('code', 'name')
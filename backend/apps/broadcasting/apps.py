@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class BroadcastingConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.broadcasting'
+    verbose_name = '数字人播报队列'
+
+    def ready(self):
+        # 注册信号处理器
+        from . import signals
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from apps.broadcasting.tts import get_audio_cache, get_tts_settings, prewarm, scheduled_texts
+
+
+class Command(BaseCommand):
+    help = '预先合成即将生效的公告、近期出发航班及队列中等待播报的语音'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=None, help='预热的时间范围（小时），默认使用 PREWARM_HOURS')
+        parser.add_argument('--voice', default=None, help='音色，默认使用 VOICE')
+        parser.add_argument('--language', default=None, help='语言，默认使用 LANGUAGE')
+
+    def handle(self, *args, **options):
+        hours = options['hours'] or get_tts_settings()['PREWARM_HOURS']
+        self.stdout.write(f'开始预热未来 {hours} 小时的播报语音...')
+        total, synthesized = prewarm(scheduled_texts(hours), options['voice'], options['language'])
+        self.stdout.write(f'播报文本 {total} 条，新合成 {synthesized} 条，缓存大小 {get_audio_cache().size()} 字节')
+        self.stdout.write(self.style.SUCCESS('播报语音预热完成！'))
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.5 on 2026-10-18 20:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BroadcastZoneState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('zone', models.CharField(max_length=50, unique=True, verbose_name='播报区域')),
+                ('next_available_at', models.DateTimeField(blank=True, null=True, verbose_name='下次可播报时间')),
+                ('last_pulled_at', models.DateTimeField(blank=True, null=True, verbose_name='最近拉取时间')),
+            ],
+            options={
+                'verbose_name': '播报区域状态',
+                'verbose_name_plural': '播报区域状态',
+                'ordering': ['zone'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BroadcastTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('zone', models.CharField(max_length=50, verbose_name='播报区域')),
+                ('source', models.CharField(choices=[('flight', '航班播报'), ('announcement', '公告播报'), ('lost_item', '失物招领广播')], max_length=20, verbose_name='来源')),
+                ('source_id', models.IntegerField(blank=True, null=True, verbose_name='来源记录ID')),
+                ('content', models.TextField(verbose_name='播报内容')),
+                ('content_hash', models.CharField(help_text='用于合并重复内容', max_length=40, verbose_name='内容摘要')),
+                ('priority', models.IntegerField(choices=[(1, '低'), (2, '中'), (3, '高'), (9, '紧急')], default=2, verbose_name='优先级')),
+                ('status', models.CharField(choices=[('pending', '等待播报'), ('playing', '正在播报'), ('done', '已播报'), ('expired', '已过期')], default='pending', max_length=20, verbose_name='状态')),
+                ('coalesced_count', models.IntegerField(default=0, verbose_name='合并次数')),
+                ('enqueued_at', models.DateTimeField(auto_now_add=True, verbose_name='入队时间')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='开始播报时间')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='结束时间')),
+                ('expires_at', models.DateTimeField(blank=True, null=True, verbose_name='过期时间')),
+            ],
+            options={
+                'verbose_name': '播报任务',
+                'verbose_name_plural': '播报任务',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['zone', 'status', '-priority', 'id'], name='bctask_zone_queue_idx'), models.Index(fields=['zone', 'content_hash', '-enqueued_at'], name='bctask_zone_hash_idx'), models.Index(fields=['status', 'started_at'], name='bctask_status_started_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.5 on 2026-10-18 20:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('broadcasting', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BroadcastZone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=50, unique=True, verbose_name='区域编码')),
+                ('name', models.CharField(max_length=100, verbose_name='区域名称')),
+                ('floor', models.IntegerField(verbose_name='楼层')),
+                ('min_x', models.FloatField(verbose_name='最小X坐标')),
+                ('min_y', models.FloatField(verbose_name='最小Y坐标')),
+                ('max_x', models.FloatField(verbose_name='最大X坐标')),
+                ('max_y', models.FloatField(verbose_name='最大Y坐标')),
+                ('is_active', models.BooleanField(default=True, verbose_name='是否启用')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '播报区域',
+                'verbose_name_plural': '播报区域',
+                'ordering': ['floor', 'code'],
+                'indexes': [models.Index(fields=['is_active', 'floor', 'min_x', 'max_x'], name='bczone_active_floor_idx')],
+            },
+        ),
+    ]
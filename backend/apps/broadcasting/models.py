@@ -0,0 +1,110 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class BroadcastTask(models.Model):
+    """数字人播报任务，每个播报区域一条，由该区域的播报终端按优先级拉取"""
+    PRIORITY_LOW = 1
+    PRIORITY_NORMAL = 2
+    PRIORITY_HIGH = 3
+    PRIORITY_EMERGENCY = 9
+    # 低、中、高与 Announcement.PRIORITY_CHOICES 一致
+    PRIORITY_CHOICES = (
+        (PRIORITY_LOW, '低'),
+        (PRIORITY_NORMAL, '中'),
+        (PRIORITY_HIGH, '高'),
+        (PRIORITY_EMERGENCY, '紧急'),
+    )
+
+    SOURCE_CHOICES = (
+        ('flight', '航班播报'),
+        ('announcement', '公告播报'),
+        ('lost_item', '失物招领广播'),
+    )
+
+    STATUS_PENDING = 'pending'
+    STATUS_PLAYING = 'playing'
+    STATUS_DONE = 'done'
+    STATUS_EXPIRED = 'expired'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, '等待播报'),
+        (STATUS_PLAYING, '正在播报'),
+        (STATUS_DONE, '已播报'),
+        (STATUS_EXPIRED, '已过期'),
+    )
+
+    zone = models.CharField(_('播报区域'), max_length=50)
+    source = models.CharField(_('来源'), max_length=20, choices=SOURCE_CHOICES)
+    source_id = models.IntegerField(_('来源记录ID'), null=True, blank=True)
+    content = models.TextField(_('播报内容'))
+    content_hash = models.CharField(_('内容摘要'), max_length=40, help_text=_('用于合并重复内容'))
+    priority = models.IntegerField(_('优先级'), choices=PRIORITY_CHOICES, default=PRIORITY_NORMAL)
+    status = models.CharField(_('状态'), max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    coalesced_count = models.IntegerField(_('合并次数'), default=0)
+    enqueued_at = models.DateTimeField(_('入队时间'), auto_now_add=True)
+    started_at = models.DateTimeField(_('开始播报时间'), null=True, blank=True)
+    finished_at = models.DateTimeField(_('结束时间'), null=True, blank=True)
+    expires_at = models.DateTimeField(_('过期时间'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('播报任务')
+        verbose_name_plural = _('播报任务')
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['zone', 'status', '-priority', 'id'], name='bctask_zone_queue_idx'),
+            models.Index(fields=['zone', 'content_hash', '-enqueued_at'], name='bctask_zone_hash_idx'),
+            models.Index(fields=['status', 'started_at'], name='bctask_status_started_idx'),
+        ]
+
+    def __str__(self):
+        return f"[{self.zone}] {self.content[:30]}"
+
+    @property
+    def is_emergency(self):
+        return self.priority >= self.PRIORITY_EMERGENCY
+
+
+class BroadcastZoneState(models.Model):
+    """播报区域的节奏状态，拉取任务时锁定该行，保证同一区域的任务串行分配"""
+    zone = models.CharField(_('播报区域'), max_length=50, unique=True)
+    next_available_at = models.DateTimeField(_('下次可播报时间'), null=True, blank=True)
+    last_pulled_at = models.DateTimeField(_('最近拉取时间'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('播报区域状态')
+        verbose_name_plural = _('播报区域状态')
+        ordering = ['zone']
+
+    def __str__(self):
+        return self.zone
+
+
+class BroadcastZone(models.Model):
+    """
+    播报区域：某一楼层上由导航位置坐标（navigation_management.Location）围成的矩形范围
+    公告与失物广播创建时按相关位置落在哪些区域内确定目标区域，区域编码同时用作播报队列与实时推送的区域
+    """
+    code = models.CharField(_('区域编码'), max_length=50, unique=True)
+    name = models.CharField(_('区域名称'), max_length=100)
+    floor = models.IntegerField(_('楼层'))
+    min_x = models.FloatField(_('最小X坐标'))
+    min_y = models.FloatField(_('最小Y坐标'))
+    max_x = models.FloatField(_('最大X坐标'))
+    max_y = models.FloatField(_('最大Y坐标'))
+    is_active = models.BooleanField(_('是否启用'), default=True)
+    created_at = models.DateTimeField(_('创建时间'), auto_now_add=True)
+    updated_at = models.DateTimeField(_('更新时间'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('播报区域')
+        verbose_name_plural = _('播报区域')
+        ordering = ['floor', 'code']
+        indexes = [
+            models.Index(fields=['is_active', 'floor', 'min_x', 'max_x'], name='bczone_active_floor_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.code} {self.name} (楼层:{self.floor})"
+
+    def contains(self, floor, x, y):
+        return floor == self.floor and self.min_x <= x <= self.max_x and self.min_y <= y <= self.max_y
@@ -0,0 +1,255 @@
+"""
+数字人播报队列
+
+航班播报、公告播报与失物招领广播通过 enqueue 进入队列，每个播报区域（航站楼区域或单个终端）一条任务；
+播报终端调用 pull 拉取本区域的下一条任务，播报结束后调用 complete。
+
+    优先级    按优先级从高到低、同优先级按入队顺序分配；紧急任务不受播报间隔限制，
+              并会打断正在播报的普通任务（被打断的任务回到队列，保持原有顺序）
+    合并      同一区域 COALESCE_WINDOW 秒内入队的相同内容（忽略空白差异），以及仍在等待或正在播报的
+              相同内容只保留一条，合并次数累加，等待中的任务优先级取较高者
+    节奏      同一区域上一条任务结束后至少间隔 MIN_INTERVAL 秒才分配下一条普通任务
+    过期      普通任务入队 TASK_TTL 秒后仍未播报则不再播报；正在播报超过 PLAYING_TIMEOUT 秒未完成的
+              任务视为已结束（终端异常退出）
+
+拉取时锁定区域状态行（BroadcastZoneState），同一区域的多个终端并发拉取时串行分配；
+只能拉取 known_zones 中的区域，终端传入的任意字符串不会成为新的播报区域
+"""
+import hashlib
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min, Q, Sum
+from django.utils import timezone
+
+from .models import BroadcastTask, BroadcastZone, BroadcastZoneState
+
+# 目标区域中表示全部播报区域的标记，入队时展开为当时的全部区域
+ALL_ZONES = '*'
+
+DEFAULT_BROADCAST_QUEUE_SETTINGS = {
+    'ZONES': ('default',),
+    'COALESCE_WINDOW': 120,
+    'MIN_INTERVAL': 5,
+    'TASK_TTL': 900,
+    'PLAYING_TIMEOUT': 120,
+    'METRICS_WINDOW': 3600,
+}
+
+
+def get_queue_settings():
+    """合并默认配置与 settings.BROADCAST_QUEUE"""
+    return {**DEFAULT_BROADCAST_QUEUE_SETTINGS, **getattr(settings, 'BROADCAST_QUEUE', {})}
+
+
+def content_hash(content):
+    return hashlib.sha1(''.join(content.split()).encode()).hexdigest()
+
+
+def known_zones():
+    """配置的播报区域与启用的 BroadcastZone"""
+    zones = set(get_queue_settings()['ZONES'])
+    zones.update(BroadcastZone.objects.filter(is_active=True).values_list('code', flat=True))
+    return zones
+
+
+def lock_zone_state(zone):
+    """
+    锁定区域状态行，不存在时创建
+
+    并发创建同一区域时忽略唯一约束冲突（不抛出 IntegrityError），再加锁读取已存在的行
+    """
+    states = BroadcastZoneState.objects.select_for_update()
+    try:
+        return states.get(zone=zone)
+    except BroadcastZoneState.DoesNotExist:
+        BroadcastZoneState.objects.bulk_create([BroadcastZoneState(zone=zone)], ignore_conflicts=True)
+        return states.get(zone=zone)
+
+
+def enqueue(content, source, source_id=None, priority=BroadcastTask.PRIORITY_NORMAL, zones=None):
+    """
+    播报内容入队
+
+    Args:
+        zones: 目标播报区域，不指定或包含 ALL_ZONES 时发送到全部区域
+
+    Returns:
+        各区域的任务（新建或被合并的已有任务）
+    """
+    options = get_queue_settings()
+    zones = set(zones or ())
+    if not zones or ALL_ZONES in zones:
+        zones = known_zones()
+    digest = content_hash(content)
+    now = timezone.now()
+    with transaction.atomic():
+        existing = {}
+        for task in BroadcastTask.objects.select_for_update().filter(
+            Q(status__in=(BroadcastTask.STATUS_PENDING, BroadcastTask.STATUS_PLAYING))
+            | Q(enqueued_at__gte=now - timezone.timedelta(seconds=options['COALESCE_WINDOW'])),
+            zone__in=zones, content_hash=digest,
+        ).exclude(status=BroadcastTask.STATUS_EXPIRED).order_by('id'):
+            existing[task.zone] = task
+
+        tasks, created = [], []
+        for zone in sorted(zones):
+            task = existing.get(zone)
+            if task is None:
+                task = BroadcastTask(
+                    zone=zone, source=source, source_id=source_id, content=content, content_hash=digest,
+                    priority=priority,
+                    expires_at=None if priority >= BroadcastTask.PRIORITY_EMERGENCY
+                    else now + timezone.timedelta(seconds=options['TASK_TTL']),
+                )
+                created.append(task)
+            else:
+                task.coalesced_count += 1
+                update_fields = ['coalesced_count']
+                if task.status == BroadcastTask.STATUS_PENDING and priority > task.priority:
+                    task.priority = priority
+                    update_fields.append('priority')
+                    if priority >= BroadcastTask.PRIORITY_EMERGENCY:
+                        task.expires_at = None
+                        update_fields.append('expires_at')
+                task.save(update_fields=update_fields)
+            tasks.append(task)
+        BroadcastTask.objects.bulk_create(created)
+    if created:
+        # 入队时合成语音，终端拉取任务时不再等待合成
+        from .tts import synthesize_queued
+        transaction.on_commit(lambda: synthesize_queued([content]))
+    return tasks
+
+
+class PullResult:
+    """
+    拉取结果
+
+    task 为分配的任务；没有可播报的任务时为 None，retry_after 为建议的重试间隔（秒），队列为空时为 None；
+    preempted 为被紧急任务打断的任务
+    """
+
+    def __init__(self, task=None, retry_after=None, preempted=None):
+        self.task = task
+        self.retry_after = retry_after
+        self.preempted = preempted
+
+
+def pull(zone):
+    """为播报区域分配下一条任务"""
+    options = get_queue_settings()
+    now = timezone.now()
+    with transaction.atomic():
+        state = lock_zone_state(zone)
+        state.last_pulled_at = now
+        state.save(update_fields=['last_pulled_at'])
+
+        queue = BroadcastTask.objects.filter(zone=zone)
+        queue.filter(status=BroadcastTask.STATUS_PENDING, expires_at__lt=now).update(
+            status=BroadcastTask.STATUS_EXPIRED, finished_at=now
+        )
+        queue.filter(
+            status=BroadcastTask.STATUS_PLAYING,
+            started_at__lt=now - timezone.timedelta(seconds=options['PLAYING_TIMEOUT']),
+        ).update(status=BroadcastTask.STATUS_DONE, finished_at=now)
+
+        task = queue.filter(status=BroadcastTask.STATUS_PENDING).order_by('-priority', 'id').first()
+        if task is None:
+            return PullResult()
+        playing = queue.filter(status=BroadcastTask.STATUS_PLAYING).first()
+        if not task.is_emergency:
+            if playing is not None:
+                return PullResult(retry_after=options['MIN_INTERVAL'])
+            if state.next_available_at and state.next_available_at > now:
+                return PullResult(retry_after=(state.next_available_at - now).total_seconds())
+        elif playing is not None:
+            if playing.is_emergency:
+                return PullResult(retry_after=options['MIN_INTERVAL'])
+            playing.status = BroadcastTask.STATUS_PENDING
+            playing.started_at = None
+            playing.save(update_fields=['status', 'started_at'])
+
+        task.status = BroadcastTask.STATUS_PLAYING
+        task.started_at = now
+        task.save(update_fields=['status', 'started_at'])
+    return PullResult(task, preempted=playing if task.is_emergency else None)
+
+
+def complete(task):
+    """
+    标记任务播报结束，并按播报间隔设置区域的下次可播报时间
+
+    Returns:
+        任务是否处于播报中（已被打断或已超时结束的任务返回 False）
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        updated = BroadcastTask.objects.filter(pk=task.pk, status=BroadcastTask.STATUS_PLAYING).update(
+            status=BroadcastTask.STATUS_DONE, finished_at=now
+        )
+        if updated:
+            # 区域状态行在拉取时已创建
+            next_available_at = now + timezone.timedelta(seconds=get_queue_settings()['MIN_INTERVAL'])
+            if not BroadcastZoneState.objects.filter(zone=task.zone).update(next_available_at=next_available_at):
+                BroadcastZoneState.objects.bulk_create(
+                    [BroadcastZoneState(zone=task.zone, next_available_at=next_available_at)], ignore_conflicts=True
+                )
+    return bool(updated)
+
+
+def queue_metrics(zones=None):
+    """
+    各区域的队列深度与等待时间
+
+    Returns:
+        [{zone, depth, emergency_depth, playing, oldest_wait_seconds, played, average_wait_seconds,
+          max_wait_seconds, coalesced, expired}]
+        played 与等待时间统计最近 METRICS_WINDOW 秒内开始播报的任务，coalesced、expired 统计该时间内入队的任务
+    """
+    now = timezone.now()
+    since = now - timezone.timedelta(seconds=get_queue_settings()['METRICS_WINDOW'])
+    tasks = BroadcastTask.objects.all()
+    if zones:
+        tasks = tasks.filter(zone__in=zones)
+
+    def empty():
+        return {
+            'depth': 0, 'emergency_depth': 0, 'playing': 0, 'oldest_wait_seconds': None,
+            'played': 0, 'average_wait_seconds': None, 'max_wait_seconds': None, 'coalesced': 0, 'expired': 0,
+        }
+
+    # 没有任务的区域也返回
+    metrics = defaultdict(empty, {zone: empty() for zone in zones or known_zones()})
+    pending = Q(status=BroadcastTask.STATUS_PENDING)
+    for row in tasks.filter(status__in=(BroadcastTask.STATUS_PENDING, BroadcastTask.STATUS_PLAYING)).values(
+        'zone'
+    ).annotate(
+        depth=Count('id', filter=pending),
+        emergency_depth=Count('id', filter=pending & Q(priority__gte=BroadcastTask.PRIORITY_EMERGENCY)),
+        playing=Count('id', filter=Q(status=BroadcastTask.STATUS_PLAYING)),
+        oldest=Min('enqueued_at', filter=pending),
+    ):
+        metrics[row['zone']].update(
+            depth=row['depth'], emergency_depth=row['emergency_depth'], playing=row['playing'],
+            oldest_wait_seconds=round((now - row['oldest']).total_seconds(), 1) if row['oldest'] else None,
+        )
+    for row in tasks.filter(enqueued_at__gte=since).values('zone').annotate(
+        coalesced=Sum('coalesced_count'),
+        expired=Count('id', filter=Q(status=BroadcastTask.STATUS_EXPIRED)),
+    ):
+        metrics[row['zone']].update(coalesced=row['coalesced'], expired=row['expired'])
+
+    waits = defaultdict(list)
+    for zone, enqueued_at, started_at in tasks.filter(started_at__gte=since).values_list(
+        'zone', 'enqueued_at', 'started_at'
+    ):
+        waits[zone].append((started_at - enqueued_at).total_seconds())
+    for zone, values in waits.items():
+        metrics[zone].update(
+            played=len(values),
+            average_wait_seconds=round(sum(values) / len(values), 1),
+            max_wait_seconds=round(max(values), 1),
+        )
+    return [{'zone': zone, **values} for zone, values in sorted(metrics.items())]
@@ -0,0 +1,87 @@
+from rest_framework import serializers
+
+from .models import BroadcastTask, BroadcastZone
+
+
+class BroadcastTaskSerializer(serializers.ModelSerializer):
+    """播报任务序列化器"""
+    source_display = serializers.CharField(source='get_source_display', read_only=True)
+    priority_display = serializers.CharField(source='get_priority_display', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+
+    class Meta:
+        model = BroadcastTask
+        fields = [
+            'id', 'zone', 'source', 'source_display', 'source_id', 'content', 'priority', 'priority_display',
+            'status', 'status_display', 'coalesced_count', 'enqueued_at', 'started_at', 'finished_at', 'expires_at',
+        ]
+        read_only_fields = fields
+
+
+class BroadcastPullSerializer(serializers.Serializer):
+    """拉取任务参数"""
+    zone = serializers.CharField(max_length=50)
+
+    def validate_zone(self, value):
+        from .queue import known_zones
+        if value not in known_zones():
+            raise serializers.ValidationError(f'未知的播报区域: {value}')
+        return value
+
+
+class BroadcastAudioSerializer(serializers.Serializer):
+    """播报语音合成参数，音色与语言默认使用 BROADCAST_TTS 配置，只能使用 VOICES、LANGUAGES 中配置的值"""
+    text = serializers.CharField(max_length=2000)
+    voice = serializers.CharField(max_length=50, required=False)
+    language = serializers.CharField(max_length=20, required=False)
+
+    def validate_voice(self, value):
+        from .tts import get_tts_settings
+        if value not in get_tts_settings()['VOICES']:
+            raise serializers.ValidationError(f'不支持的音色: {value}')
+        return value
+
+    def validate_language(self, value):
+        from .tts import get_tts_settings
+        if value not in get_tts_settings()['LANGUAGES']:
+            raise serializers.ValidationError(f'不支持的语言: {value}')
+        return value
+
+
+class BroadcastZoneSerializer(serializers.ModelSerializer):
+    """播报区域序列化器"""
+
+    class Meta:
+        model = BroadcastZone
+        fields = [
+            'id', 'code', 'name', 'floor', 'min_x', 'min_y', 'max_x', 'max_y', 'is_active', 'created_at', 'updated_at',
+        ]
+        read_only_fields = ['created_at', 'updated_at']
+
+    def validate_code(self, value):
+        from .queue import ALL_ZONES
+        if value == ALL_ZONES:
+            raise serializers.ValidationError(f'{ALL_ZONES} 表示全部播报区域，不能作为区域编码')
+        return value
+
+    def validate(self, attrs):
+        values = {
+            field: attrs.get(field, getattr(self.instance, field, None))
+            for field in ('min_x', 'min_y', 'max_x', 'max_y')
+        }
+        if values['min_x'] > values['max_x'] or values['min_y'] > values['max_y']:
+            raise serializers.ValidationError("区域范围的最小坐标不能大于最大坐标")
+        return attrs
+
+
+class BroadcastZoneLocateSerializer(serializers.Serializer):
+    """按位置查询播报区域的参数，location_id 与 floor/x/y 二选一"""
+    location_id = serializers.IntegerField(required=False)
+    floor = serializers.IntegerField(required=False)
+    x = serializers.FloatField(required=False)
+    y = serializers.FloatField(required=False)
+
+    def validate(self, attrs):
+        if 'location_id' not in attrs and not {'floor', 'x', 'y'} <= set(attrs):
+            raise serializers.ValidationError("请提供 location_id 或 floor、x、y")
+        return attrs
@@ -0,0 +1,38 @@
+from django.db.models.signals import pre_save
+from django.dispatch import receiver
+
+from apps.informations.models import Announcement, AnnouncementBroadcast
+from apps.items_management.models import ItemBroadcast
+
+from .zones import resolve_target_zones
+
+
+def is_emergency(announcement):
+    return announcement.type.name == 'emergency'
+
+
+@receiver(pre_save, sender=Announcement)
+def resolve_announcement_zones(sender, instance, **kwargs):
+    """创建公告或修改相关位置、类型时解析目标播报区域"""
+    if not instance._state.adding and instance.target_zones:
+        previous = Announcement.objects.filter(pk=instance.pk).values_list('location', 'type_id').first()
+        if previous == (instance.location, instance.type_id):
+            return
+    instance.target_zones = resolve_target_zones(instance.location, is_emergency(instance))
+
+
+@receiver(pre_save, sender=AnnouncementBroadcast)
+def resolve_announcement_broadcast_zones(sender, instance, **kwargs):
+    """公告播报沿用公告的目标区域（区域功能上线前创建的公告在此时解析）"""
+    if instance._state.adding and not instance.target_zones:
+        announcement = instance.announcement
+        instance.target_zones = announcement.target_zones or resolve_target_zones(
+            announcement.location, is_emergency(announcement)
+        )
+
+
+@receiver(pre_save, sender=ItemBroadcast)
+def resolve_item_broadcast_zones(sender, instance, **kwargs):
+    """失物广播按丢失地点解析目标区域"""
+    if instance._state.adding and not instance.target_zones:
+        instance.target_zones = resolve_target_zones(instance.lost_item.lost_location)
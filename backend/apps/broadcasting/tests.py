@@ -0,0 +1,368 @@
+import asyncio
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.informations.models import Announcement, AnnouncementType
+from apps.items_management.models import ItemCategory, LostItem
+from apps.navigation_management.models import Location
+from apps.realtime.broker import get_broker, reset_broker
+from apps.users.models import Role
+from .models import BroadcastTask, BroadcastZone, BroadcastZoneState
+from .queue import enqueue, known_zones, lock_zone_state, queue_metrics
+from .tts import ToneSynthesizer, get_audio_cache, reset_audio_cache
+
+User = get_user_model()
+
+QUEUE_SETTINGS = {
+    'ZONES': ('T3-A', 'T3-B'),
+    'COALESCE_WINDOW': 120,
+    'MIN_INTERVAL': 0,
+    'TASK_TTL': 900,
+    'PLAYING_TIMEOUT': 120,
+    'METRICS_WINDOW': 3600,
+}
+
+
+class CountingSynthesizer(ToneSynthesizer):
+    """记录合成次数的离线合成器"""
+    calls = []
+
+    def synthesize(self, text, voice, language):
+        self.calls.append((text, voice, language))
+        return super().synthesize(text, voice, language)
+
+
+class AudioCacheTestMixin:
+    """播报语音写入临时目录"""
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        override = override_settings(BROADCAST_TTS={
+            'SYNTHESIZER': 'apps.broadcasting.tests.CountingSynthesizer',
+            'CACHE_DIR': self.directory,
+            'MAX_CACHE_BYTES': 1024 * 1024,
+            'VOICES': ('default', 'female'),
+        })
+        override.enable()
+        self.addCleanup(override.disable)
+        reset_audio_cache()
+        self.addCleanup(reset_audio_cache)
+        CountingSynthesizer.calls = []
+
+
+@override_settings(BROADCAST_QUEUE=QUEUE_SETTINGS)
+class BroadcastQueueTests(AudioCacheTestMixin, TestCase):
+    """数字人播报队列测试"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        kiosk = User.objects.create_user(username='kiosk', password='testpassword')
+        kiosk.roles.add(Role.objects.get(name='broadcaster'))
+        self.client.force_authenticate(kiosk)
+
+    def pull(self, zone='T3-A'):
+        return self.client.post('/api/broadcasting/tasks/pull/', {'zone': zone})
+
+    def complete(self, task_id):
+        return self.client.post(f'/api/broadcasting/tasks/{task_id}/complete/')
+
+    def test_priority_order_and_coalescing(self):
+        enqueue('失物招领：黑色钱包', 'lost_item', priority=BroadcastTask.PRIORITY_LOW, zones=['T3-A'])
+        enqueue('航班CA1234开始登机', 'flight', zones=['T3-A'])
+        duplicate = enqueue('航班CA1234  开始登机', 'flight', priority=BroadcastTask.PRIORITY_HIGH, zones=['T3-A'])
+        self.assertEqual(BroadcastTask.objects.count(), 2)
+        self.assertEqual((duplicate[0].coalesced_count, duplicate[0].priority), (1, BroadcastTask.PRIORITY_HIGH))
+
+        contents = []
+        for _ in range(2):
+            task = self.pull().data['task']
+            contents.append(task['content'])
+            self.assertEqual(self.complete(task['id']).data['status'], 'done')
+        self.assertEqual(contents, ['航班CA1234开始登机', '失物招领：黑色钱包'])
+        self.assertEqual(self.pull().status_code, 204)
+
+        # 已播报的内容在合并窗口内再次入队时不重复播报
+        enqueue('航班CA1234开始登机', 'flight', zones=['T3-A'])
+        self.assertEqual(self.pull().status_code, 204)
+
+    def test_emergency_preempts_and_pacing(self):
+        enqueue('常规通知', 'announcement', zones=['T3-A'])
+        regular = self.pull().data['task']
+        self.assertEqual(self.pull().status_code, 204)
+
+        enqueue('紧急疏散', 'announcement', priority=BroadcastTask.PRIORITY_EMERGENCY, zones=['T3-A'])
+        data = self.pull().data
+        self.assertEqual(data['task']['content'], '紧急疏散')
+        self.assertEqual(data['preempted']['id'], regular['id'])
+        self.assertEqual(self.complete(regular['id']).status_code, 409)
+        self.complete(data['task']['id'])
+
+        with self.settings(BROADCAST_QUEUE={**QUEUE_SETTINGS, 'MIN_INTERVAL': 60}):
+            self.assertEqual(self.pull().data['task']['id'], regular['id'])
+            self.complete(regular['id'])
+            enqueue('第二条常规通知', 'announcement', zones=['T3-A'])
+            response = self.pull()
+            self.assertEqual(response.status_code, 204)
+            self.assertEqual(int(response['Retry-After']), 60)
+
+            # 其他区域不受影响，紧急任务不受播报间隔限制
+            self.assertEqual(self.pull('T3-B').status_code, 204)
+            enqueue('紧急通知', 'announcement', priority=BroadcastTask.PRIORITY_EMERGENCY, zones=['T3-A'])
+            self.assertEqual(self.pull().data['task']['content'], '紧急通知')
+
+    def test_broadcast_endpoint_enqueues_for_all_zones_and_reports_metrics(self):
+        emergency = AnnouncementType.objects.create(name='emergency', description='紧急通知')
+        announcement = Announcement.objects.create(title='疏散', content='请立即疏散', type=emergency)
+        response = self.client.post('/api/informations/broadcasts/broadcast/', {'announcement_id': announcement.pk})
+        self.assertEqual(len(response.data['queued_tasks']), 2)
+        self.assertEqual(
+            set(BroadcastTask.objects.values_list('zone', 'priority')),
+            {('T3-A', BroadcastTask.PRIORITY_EMERGENCY), ('T3-B', BroadcastTask.PRIORITY_EMERGENCY)},
+        )
+
+        self.pull('T3-B')
+        metrics = {row['zone']: row for row in self.client.get('/api/broadcasting/tasks/metrics/').data['results']}
+        self.assertEqual((metrics['T3-A']['depth'], metrics['T3-A']['emergency_depth']), (1, 1))
+        self.assertIsNotNone(metrics['T3-A']['oldest_wait_seconds'])
+        self.assertEqual((metrics['T3-B']['depth'], metrics['T3-B']['playing'], metrics['T3-B']['played']), (0, 1, 1))
+        self.assertEqual([row['zone'] for row in queue_metrics(['T3-B'])], ['T3-B'])
+
+    def test_only_terminals_pull_and_complete(self):
+        task = enqueue('常规通知', 'announcement', zones=['T3-A'])[0]
+        self.client.force_authenticate(User.objects.create_user(username='passenger', password='testpassword'))
+        self.assertEqual(self.pull().status_code, 403)
+        self.assertEqual(self.complete(task.pk).status_code, 403)
+        self.assertEqual(BroadcastTask.objects.get(pk=task.pk).status, BroadcastTask.STATUS_PENDING)
+
+    def test_pull_rejects_unknown_zone(self):
+        response = self.pull('T9-X')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('zone', response.data)
+        self.assertNotIn('T9-X', known_zones())
+        self.assertFalse(BroadcastZoneState.objects.filter(zone='T9-X').exists())
+
+        # 区域状态行只创建一次，已存在时直接加锁读取
+        with transaction.atomic():
+            state = lock_zone_state('T3-A')
+        with transaction.atomic():
+            self.assertEqual(lock_zone_state('T3-A').pk, state.pk)
+        self.assertEqual(BroadcastZoneState.objects.filter(zone='T3-A').count(), 1)
+
+
+@override_settings(BROADCAST_QUEUE={**QUEUE_SETTINGS, 'ZONES': ('T3-A',)})
+class BroadcastAudioTests(AudioCacheTestMixin, TestCase):
+    """播报语音缓存测试"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='admin', password='testpassword', is_staff=True))
+        kiosk = User.objects.create_user(username='kiosk', password='testpassword')
+        kiosk.roles.add(Role.objects.get(name='broadcaster'))
+        self.kiosk = APIClient()
+        self.kiosk.force_authenticate(kiosk)
+
+    def synthesize(self, text, **params):
+        return self.client.post('/api/broadcasting/audio/', {'text': text, **params}).data
+
+    def pull(self):
+        return self.kiosk.post('/api/broadcasting/tasks/pull/', {'zone': 'T3-A'}).data
+
+    def test_repeat_text_is_served_from_disk(self):
+        first = self.synthesize('航班CA1234开始登机')
+        second = self.synthesize('航班CA1234开始登机')
+        self.assertEqual(first['key'], second['key'])
+        self.assertEqual(CountingSynthesizer.calls, [('航班CA1234开始登机', 'default', 'zh-CN')])
+        self.assertNotEqual(self.synthesize('航班CA1234开始登机', voice='female')['key'], first['key'])
+
+        response = self.client.get(first['url'])
+        self.assertEqual(response['Content-Type'], 'audio/wav')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'RIFF'))
+        response = self.client.get(first['url'], HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get('/api/broadcasting/audio/missing/').status_code, 404)
+
+        enqueue('航班CA1234开始登机', 'flight')
+        self.assertEqual(self.pull()['audio']['key'], first['key'])
+        self.assertEqual(len(CountingSynthesizer.calls), 2)
+
+    def test_audio_synthesized_at_enqueue_not_pull(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue('航班MU5101开始登机', 'flight')
+        self.assertEqual(CountingSynthesizer.calls, [('航班MU5101开始登机', 'default', 'zh-CN')])
+        data = self.pull()
+        self.assertEqual(self.kiosk.get(data['audio']['url']).status_code, 200)
+
+        # 入队时未合成（如合成失败）的任务拉取时不合成，audio 为空
+        self.kiosk.post(f"/api/broadcasting/tasks/{data['task']['id']}/complete/")
+        enqueue('失物招领：黑色钱包', 'lost_item')
+        self.assertIsNone(self.pull()['audio'])
+        self.assertEqual(len(CountingSynthesizer.calls), 1)
+
+    def test_synthesis_requires_admin_and_configured_voice(self):
+        self.assertEqual(self.kiosk.post('/api/broadcasting/audio/', {'text': '测试'}).status_code, 403)
+        response = self.client.post('/api/broadcasting/audio/', {'text': '测试', 'voice': 'robot'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('voice', response.data)
+        response = self.client.post('/api/broadcasting/audio/', {'text': '测试', 'language': 'xx'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(CountingSynthesizer.calls, [])
+
+    def test_file_evicted_after_lookup_returns_404(self):
+        key = self.synthesize('航班CA1234开始登机')['key']
+        cache = get_audio_cache()
+        with mock.patch.object(cache, 'lookup', return_value=cache.path(key) + '.missing'):
+            self.assertEqual(self.kiosk.get(f'/api/broadcasting/audio/{key}/').status_code, 404)
+
+    def test_least_recently_used_files_are_evicted(self):
+        cache = get_audio_cache()
+        first_key, first_path = cache.get('第一条')
+        second_key, second_path = cache.get('第二条')
+        # 文件修改时间作为最近使用时间，第二条较早使用
+        os.utime(second_path, (1, 1))
+        self.assertEqual(cache.lookup(first_key), first_path)
+
+        cache.max_bytes = os.path.getsize(first_path) + os.path.getsize(second_path)
+        _, third_path = cache.get('第三条')
+        self.assertIsNone(cache.lookup(second_key))
+        self.assertTrue(os.path.exists(first_path) and os.path.exists(third_path))
+        self.assertLessEqual(cache.size(), cache.max_bytes)
+
+    def test_prewarm_scheduled_announcements(self):
+        regular = AnnouncementType.objects.create(name='regular', description='常规通知')
+        soon = Announcement.objects.create(
+            title='安检提示', content='请提前安检', type=regular, start_time=timezone.now() + timezone.timedelta(hours=1),
+        )
+        Announcement.objects.create(
+            title='明日通知', content='明日施工', type=regular, start_time=timezone.now() + timezone.timedelta(days=1),
+        )
+        enqueue('失物招领：黑色钱包', 'lost_item')
+
+        output = io.StringIO()
+        call_command('prewarm_tts_cache', stdout=output)
+        self.assertIn('新合成 2 条', output.getvalue())
+        self.assertEqual(
+            {text for text, _, _ in CountingSynthesizer.calls}, {soon.get_voice_content(), '失物招领：黑色钱包'},
+        )
+        call_command('prewarm_tts_cache', stdout=output)
+        self.assertIn('新合成 0 条', output.getvalue())
+
+
+@override_settings(BROADCAST_QUEUE={**QUEUE_SETTINGS, 'ZONES': ()}, REALTIME={'BROKER': 'apps.realtime.broker.InMemoryBroker'})
+class BroadcastZoneTests(AudioCacheTestMixin, TestCase):
+    """按区域定向播报测试"""
+
+    def setUp(self):
+        super().setUp()
+        reset_broker()
+        self.addCleanup(reset_broker)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='admin', password='testpassword', is_staff=True))
+        BroadcastZone.objects.create(code='F1-A', name='一层A区', floor=1, min_x=0, min_y=0, max_x=100, max_y=100)
+        BroadcastZone.objects.create(code='F1-B', name='一层B区', floor=1, min_x=100, min_y=0, max_x=200, max_y=100)
+        BroadcastZone.objects.create(code='F2', name='二层', floor=2, min_x=0, min_y=0, max_x=200, max_y=100)
+        self.gate = Location.objects.create(name='B12登机口', floor=1, x_coordinate=150, y_coordinate=50, type='gate')
+        Location.objects.create(name='B1', floor=2, x_coordinate=10, y_coordinate=10, type='other')
+        self.regular = AnnouncementType.objects.create(name='regular', description='常规通知')
+
+    def replay(self, topics):
+        async def backlog():
+            subscription = await get_broker().subscribe(topics, 0)
+            subscription.close()
+            return subscription.backlog
+        return asyncio.run(backlog())
+
+    def test_announcement_resolves_zones_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            announcement = Announcement.objects.create(
+                title='登机口调整', content='请前往B12登机口', type=self.regular, location='b12登机口附近',
+            )
+            unknown = Announcement.objects.create(title='提示', content='请保管好随身物品', type=self.regular, location='未知')
+        self.assertEqual(announcement.target_zones, ['F1-B'])
+        self.assertEqual(unknown.target_zones, ['*'])
+
+        # 推送只发给目标区域的订阅
+        self.assertEqual([event.data['id'] for event in self.replay({'announcement:F1-B'})], [announcement.pk, unknown.pk])
+        self.assertEqual([event.data['id'] for event in self.replay({'announcement:F1-A'})], [unknown.pk])
+
+        # 之后修改区域范围不影响已解析的公告，修改相关位置时重新解析
+        BroadcastZone.objects.filter(code='F1-A').update(max_x=200)
+        announcement.title = '登机口变更'
+        announcement.save()
+        self.assertEqual(Announcement.objects.get(pk=announcement.pk).target_zones, ['F1-B'])
+        announcement.location = 'B1'
+        announcement.save()
+        self.assertEqual(announcement.target_zones, ['F2'])
+
+        response = self.client.post('/api/informations/broadcasts/broadcast/', {'announcement_id': announcement.pk})
+        self.assertEqual(response.data['target_zones'], ['F2'])
+        self.assertEqual(list(BroadcastTask.objects.values_list('zone', flat=True)), ['F2'])
+
+        feed = self.client.get('/api/informations/announcements/active/', {'zone': 'F2'}).data
+        self.assertCountEqual([row['id'] for row in feed['results']], [announcement.pk, unknown.pk])
+
+    def test_all_zones_include_zones_added_later(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            everywhere = Announcement.objects.create(title='提示', content='请保管好随身物品', type=self.regular)
+            # 区域功能上线前的公告没有目标区域，同样视为全部区域
+            legacy = Announcement.objects.create(title='旧公告', content='旧公告', type=self.regular, location='B12登机口')
+            Announcement.objects.filter(pk=legacy.pk).update(target_zones=[])
+        BroadcastZone.objects.create(code='F3', name='三层', floor=3, min_x=0, min_y=0, max_x=100, max_y=100)
+
+        feed = self.client.get('/api/informations/announcements/active/', {'zone': 'F3'}).data
+        self.assertCountEqual([row['id'] for row in feed['results']], [everywhere.pk, legacy.pk])
+        self.assertEqual([event.data['id'] for event in self.replay({'announcement:F3'})], [everywhere.pk])
+        self.assertEqual(self.replay({'emergency:F3'}), [])
+
+        response = self.client.post('/api/informations/broadcasts/broadcast/', {'announcement_id': everywhere.pk})
+        self.assertEqual(response.data['target_zones'], ['*'])
+        self.assertEqual(sorted(BroadcastTask.objects.values_list('zone', flat=True)), ['F1-A', 'F1-B', 'F2', 'F3'])
+
+        # * 不能作为区域编码
+        response = self.client.post('/api/broadcasting/zones/', {
+            'code': '*', 'name': '全部', 'floor': 1, 'min_x': 0, 'min_y': 0, 'max_x': 10, 'max_y': 10,
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_emergency_and_lost_item_broadcasts(self):
+        emergency = AnnouncementType.objects.create(name='emergency', description='紧急通知')
+        evacuate = Announcement.objects.create(title='疏散', content='请立即疏散', type=emergency, location='B12登机口')
+        self.assertEqual(evacuate.target_zones, ['*'])
+
+        lost_item = LostItem.objects.create(
+            title='黑色钱包', category=ItemCategory.objects.create(name='证件'), description='黑色皮质钱包',
+            lost_time=timezone.now(), lost_location='B12登机口', contact_name='张三', contact_phone='13800000000',
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/items-management/broadcasts/broadcast/', {'lost_item_id': lost_item.pk})
+        self.assertEqual(response.data['target_zones'], ['F1-B'])
+        self.assertEqual(len(response.data['queued_tasks']), 1)
+        self.assertEqual(len(self.replay({'lost_item:F1-B'})), 1)
+        self.assertEqual(self.replay({'lost_item:F1-A'}), [])
+
+    def test_locate_zone_for_kiosk(self):
+        response = self.client.get('/api/broadcasting/zones/locate/', {'location_id': self.gate.pk})
+        self.assertEqual(response.data['zones'], ['F1-B'])
+        self.assertIn('announcement:F1-B', response.data['topics'])
+        # 边界上的位置同时属于相邻区域
+        response = self.client.get('/api/broadcasting/zones/locate/', {'floor': 1, 'x': 100, 'y': 10})
+        self.assertEqual(response.data['zones'], ['F1-A', 'F1-B'])
+        self.assertEqual(self.client.get('/api/broadcasting/zones/locate/', {'floor': 1}).status_code, 400)
+
+        response = self.client.post('/api/broadcasting/zones/', {
+            'code': 'F3', 'name': '三层', 'floor': 3, 'min_x': 10, 'min_y': 0, 'max_x': 0, 'max_y': 10,
+        })
+        self.assertEqual(response.status_code, 400)
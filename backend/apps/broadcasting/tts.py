@@ -0,0 +1,276 @@
+"""
+播报语音缓存
+
+播报文本由服务端合成为音频并按内容寻址保存在磁盘上，键为 sha256((文本, 音色, 语言))，
+同一段播报全天重复播放时只需读取文件。
+
+    合成器    settings.BROADCAST_TTS['SYNTHESIZER'] 指定的 BaseSynthesizer 子类，可接入云端或本地 TTS 引擎；
+              默认的 ToneSynthesizer 为离线替身，按字符生成提示音 WAV，供开发和测试使用
+    淘汰      缓存文件总大小超过 MAX_CACHE_BYTES 时按最近使用时间（命中时更新文件修改时间）删除最久未用的文件
+    合成时机  任务入队后（事务提交后）立即合成，prewarm_tts_cache 管理命令提前合成即将生效的公告、
+              近期出发航班与队列中等待播报的内容并补齐入队时合成失败的语音；终端拉取任务时只返回已缓存的语音
+
+文件先写入临时文件再原子替换，多个进程同时合成同一文本时结果一致
+"""
+import hashlib
+import io
+import json
+import logging
+import math
+import os
+import struct
+import tempfile
+import threading
+import wave
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from apps.flight_management.voice import departure_board, get_voice_texts
+from apps.informations.models import Announcement
+from .models import BroadcastTask
+
+logger = logging.getLogger('app')
+
+DEFAULT_TTS_SETTINGS = {
+    'SYNTHESIZER': 'apps.broadcasting.tts.ToneSynthesizer',
+    'CACHE_DIR': os.path.join(settings.MEDIA_ROOT, 'tts'),
+    'MAX_CACHE_BYTES': 512 * 1024 * 1024,
+    'VOICE': 'default',
+    'LANGUAGE': 'zh-CN',
+    'VOICES': ('default',),
+    'LANGUAGES': ('zh-CN',),
+    'PREWARM_HOURS': 2,
+}
+
+# 每写入多少个文件重新扫描一次缓存目录
+SCAN_EVERY_WRITES = 100
+
+
+def get_tts_settings():
+    """合并默认配置与 settings.BROADCAST_TTS"""
+    return {**DEFAULT_TTS_SETTINGS, **getattr(settings, 'BROADCAST_TTS', {})}
+
+
+class BaseSynthesizer:
+    """语音合成器接口"""
+    extension = 'wav'
+    content_type = 'audio/wav'
+
+    def synthesize(self, text, voice, language):
+        """返回音频文件内容（bytes）"""
+        raise NotImplementedError
+
+
+class ToneSynthesizer(BaseSynthesizer):
+    """离线替身：每个字符生成一段由字符编码决定音高的提示音，标点生成静音"""
+    sample_rate = 8000
+    char_seconds = 0.08
+
+    def synthesize(self, text, voice, language):
+        frames = bytearray()
+        samples = int(self.sample_rate * self.char_seconds)
+        for char in text:
+            if char.isspace() or not char.isalnum():
+                frames.extend(b'\x00\x00' * samples)
+                continue
+            frequency = 300 + ord(char) % 500
+            frames.extend(b''.join(
+                struct.pack('<h', int(8000 * math.sin(2 * math.pi * frequency * i / self.sample_rate)))
+                for i in range(samples)
+            ))
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as output:
+            output.setnchannels(1)
+            output.setsampwidth(2)
+            output.setframerate(self.sample_rate)
+            output.writeframes(bytes(frames))
+        return buffer.getvalue()
+
+
+def audio_key(text, voice, language):
+    return hashlib.sha256(json.dumps([text, voice, language], ensure_ascii=False).encode()).hexdigest()
+
+
+class AudioCache:
+    """磁盘上按内容寻址的播报音频缓存"""
+
+    def __init__(self, directory, synthesizer, max_bytes):
+        self.directory = directory
+        self.synthesizer = synthesizer
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # 本进程估算的缓存总大小，超过上限时才扫描目录；其他进程写入的文件在下次扫描时计入
+        self._estimated_size = None
+        self._writes_since_scan = 0
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], f'{key}.{self.synthesizer.extension}')
+
+    def lookup(self, key):
+        """已缓存时返回文件路径并更新最近使用时间，否则返回 None"""
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def find(self, text, voice=None, language=None):
+        """
+        只读取已缓存的播报音频，不合成
+
+        Returns:
+            (键, 文件路径)，未缓存时文件路径为 None
+        """
+        options = get_tts_settings()
+        voice = voice or options['VOICE']
+        language = language or options['LANGUAGE']
+        key = audio_key(text, voice, language)
+        return key, self.lookup(key)
+
+    def get(self, text, voice=None, language=None):
+        """
+        读取播报音频，未缓存时合成并写入缓存
+
+        Returns:
+            (键, 文件路径)
+        """
+        options = get_tts_settings()
+        voice = voice or options['VOICE']
+        language = language or options['LANGUAGE']
+        key, path = self.find(text, voice, language)
+        if path is not None:
+            return key, path
+
+        audio = self.synthesizer.synthesize(text, voice, language)
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as output:
+            output.write(audio)
+        os.replace(temp_path, path)
+        with self._lock:
+            self._writes_since_scan += 1
+            if self._estimated_size is not None:
+                self._estimated_size += len(audio)
+            scan = (
+                self._estimated_size is None or self._estimated_size > self.max_bytes
+                or self._writes_since_scan >= SCAN_EVERY_WRITES
+            )
+        if scan:
+            self.evict(keep=path)
+        return key, path
+
+    def files(self):
+        """缓存中的 (修改时间, 大小, 路径)"""
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for folder in os.scandir(self.directory):
+            if not folder.is_dir():
+                continue
+            for entry in os.scandir(folder.path):
+                if entry.name.endswith('.tmp'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def size(self):
+        return sum(size for _, size, _ in self.files())
+
+    def evict(self, keep=None):
+        """总大小超过上限时删除最久未用的文件，返回删除的文件数"""
+        with self._lock:
+            entries = self.files()
+            total = sum(size for _, size, _ in entries)
+            removed = 0
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+            self._estimated_size = total
+            self._writes_since_scan = 0
+        if removed:
+            logger.info('播报语音缓存淘汰 %s 个文件', removed)
+        return removed
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_audio_cache():
+    """按 settings.BROADCAST_TTS 创建的进程内单例"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                options = get_tts_settings()
+                synthesizer = import_string(options['SYNTHESIZER'])()
+                _cache = AudioCache(options['CACHE_DIR'], synthesizer, options['MAX_CACHE_BYTES'])
+    return _cache
+
+
+def reset_audio_cache():
+    """丢弃单例（配置变化后或测试中使用）"""
+    global _cache
+    with _cache_lock:
+        _cache = None
+
+
+def scheduled_texts(hours=None):
+    """即将播报的文本：即将生效或生效中的公告、近期出发的航班、队列中等待播报的任务"""
+    hours = hours or get_tts_settings()['PREWARM_HOURS']
+    now = timezone.now()
+    texts = []
+    announcements = Announcement.objects.select_related('type').filter(
+        Q(start_time__isnull=True) | Q(start_time__lte=now + timezone.timedelta(hours=hours)),
+        Q(end_time__isnull=True) | Q(end_time__gte=now),
+        is_active=True,
+    )
+    texts.extend(announcement.get_voice_content() for announcement in announcements)
+    flights = list(departure_board(hours))
+    texts.extend(get_voice_texts(flights).values())
+    texts.extend(BroadcastTask.objects.filter(status=BroadcastTask.STATUS_PENDING).values_list('content', flat=True))
+    return list(dict.fromkeys(texts))
+
+
+def prewarm(texts, voice=None, language=None):
+    """
+    合成尚未缓存的文本
+
+    Returns:
+        (文本数, 新合成数)
+    """
+    cache = get_audio_cache()
+    options = get_tts_settings()
+    voice = voice or options['VOICE']
+    language = language or options['LANGUAGE']
+    synthesized = 0
+    for text in texts:
+        if cache.lookup(audio_key(text, voice, language)) is None:
+            cache.get(text, voice, language)
+            synthesized += 1
+    return len(texts), synthesized
+
+
+def synthesize_queued(texts):
+    """合成新入队任务的语音（事务提交后调用），合成失败只记录日志，由 prewarm_tts_cache 补齐"""
+    try:
+        prewarm(texts)
+    except Exception:
+        logger.exception('播报语音合成失败')
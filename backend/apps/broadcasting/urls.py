@@ -0,0 +1,15 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+
+from . import views
+
+app_name = 'broadcasting'
+
+router = DefaultRouter()
+router.register('tasks', views.BroadcastTaskViewSet, basename='tasks')
+router.register('audio', views.BroadcastAudioViewSet, basename='audio')
+router.register('zones', views.BroadcastZoneViewSet, basename='zones')
+
+urlpatterns = []
+
+urlpatterns += router.urls
@@ -0,0 +1,179 @@
+import re
+
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from rest_framework import viewsets, permissions, status, filters
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from django_filters.rest_framework import DjangoFilterBackend
+
+from .models import BroadcastTask, BroadcastZone
+from .queue import complete, pull, queue_metrics
+from .serializers import (
+    BroadcastAudioSerializer, BroadcastPullSerializer, BroadcastTaskSerializer,
+    BroadcastZoneLocateSerializer, BroadcastZoneSerializer,
+)
+from .tts import get_audio_cache
+from .zones import zone_topics, zones_at
+from apps.common.pagination import StandardResultsSetPagination
+from apps.navigation_management.models import Location
+
+AUDIO_KEY_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+class IsAdminOrReadOnly(permissions.BasePermission):
+    """
+    自定义权限：仅管理员可以编辑，其他角色只读
+    """
+    def has_permission(self, request, view):
+        if request.method in permissions.SAFE_METHODS:
+            return True
+        return 'admin' in request.user.get_roles()
+
+
+class IsBroadcastTerminal(permissions.BasePermission):
+    """
+    自定义权限：仅播报终端（broadcaster 角色）和管理员可以拉取、完成播报任务
+    """
+    def has_permission(self, request, view):
+        roles = request.user.get_roles()
+        return 'broadcaster' in roles or 'admin' in roles
+
+
+def audio_payload(request, key):
+    """播报语音的键与下载地址"""
+    return {
+        'key': key,
+        'url': request.build_absolute_uri(reverse('api:broadcasting:audio-detail', args=[key])),
+        'content_type': get_audio_cache().synthesizer.content_type,
+    }
+
+
+class BroadcastTaskViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    播报任务视图集
+    播报终端通过 pull 拉取本区域的下一条任务，播报结束后调用 complete（仅播报终端和管理员）
+    """
+    queryset = BroadcastTask.objects.all()
+    serializer_class = BroadcastTaskSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['zone', 'status', 'source', 'priority']
+    ordering_fields = ['enqueued_at', 'priority']
+    pagination_class = StandardResultsSetPagination
+
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated, IsBroadcastTerminal])
+    def pull(self, request):
+        """
+        拉取播报区域的下一条任务
+
+        没有可播报的任务时返回 204，需要等待播报间隔时通过 Retry-After 返回建议的重试间隔（秒）；
+        分配紧急任务时 preempted 为被打断的任务，终端应立即停止当前播报；audio 为任务的播报语音，
+        语音在入队时或由预热命令合成，拉取时不合成，尚未合成时为 null（终端可稍后按文本重新请求）
+        """
+        serializer = BroadcastPullSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        result = pull(serializer.validated_data['zone'])
+        if result.task is None:
+            response = Response(status=status.HTTP_204_NO_CONTENT)
+            if result.retry_after is not None:
+                response['Retry-After'] = max(1, round(result.retry_after))
+            return response
+        key, path = get_audio_cache().find(result.task.content)
+        return Response({
+            'task': BroadcastTaskSerializer(result.task).data,
+            'audio': audio_payload(request, key) if path is not None else None,
+            'preempted': BroadcastTaskSerializer(result.preempted).data if result.preempted else None,
+        })
+
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated, IsBroadcastTerminal])
+    def complete(self, request, pk=None):
+        """标记任务播报结束"""
+        task = self.get_object()
+        if not complete(task):
+            return Response({"error": "任务不在播报中"}, status=status.HTTP_409_CONFLICT)
+        task.refresh_from_db()
+        return Response(BroadcastTaskSerializer(task).data)
+
+    @action(detail=False, methods=['get'])
+    def metrics(self, request):
+        """
+        各播报区域的队列深度与等待时间
+
+        参数:
+            zone: 播报区域，可重复，不填时返回全部区域
+        """
+        return Response({'results': queue_metrics(request.query_params.getlist('zone'))})
+
+
+class BroadcastAudioViewSet(viewsets.ViewSet):
+    """
+    播报语音
+    POST 合成文本（仅管理员，已缓存时直接返回），GET 按键下载音频；同一键的音频内容不变，客户端可长期缓存
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnly]
+
+    def create(self, request):
+        serializer = BroadcastAudioSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        key, _ = get_audio_cache().get(**serializer.validated_data)
+        return Response(audio_payload(request, key))
+
+    def retrieve(self, request, pk=None):
+        if not AUDIO_KEY_PATTERN.match(pk or ''):
+            raise Http404
+        cache = get_audio_cache()
+        path = cache.lookup(pk)
+        if path is None:
+            raise Http404
+        etag = f'"{pk}"'
+        if request.headers.get('If-None-Match') == etag:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            try:
+                audio = open(path, 'rb')
+            except FileNotFoundError:
+                # 查找后被其他进程淘汰
+                raise Http404
+            response = FileResponse(audio, content_type=cache.synthesizer.content_type)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, max-age=31536000, immutable'
+        return response
+
+
+class BroadcastZoneViewSet(viewsets.ModelViewSet):
+    """
+    播报区域视图集
+    管理员维护各楼层的区域范围；播报终端通过 locate 按所在位置查询区域与需要订阅的实时推送主题
+    """
+    queryset = BroadcastZone.objects.all()
+    serializer_class = BroadcastZoneSerializer
+    permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnly]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['floor', 'is_active']
+    ordering_fields = ['floor', 'code']
+
+    @action(detail=False, methods=['get'])
+    def locate(self, request):
+        """
+        查询包含某一位置的播报区域
+
+        参数:
+            location_id: 导航位置ID
+            floor, x, y: 楼层与坐标（未提供 location_id 时使用）
+        """
+        serializer = BroadcastZoneLocateSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        if 'location_id' in params:
+            location = get_object_or_404(Location, pk=params['location_id'], is_active=True)
+            point = (location.floor, location.x_coordinate, location.y_coordinate)
+        else:
+            point = (params['floor'], params['x'], params['y'])
+        zones = zones_at(*point)
+        return Response({
+            'zones': zones,
+            'topics': [topic for zone in zones for topic in zone_topics(zone)],
+        })
@@ -0,0 +1,67 @@
+"""
+播报区域定位
+
+公告相关位置（Announcement.location）与失物丢失地点（LostItem.lost_location）为自由文本，
+公告、公告播报记录与失物广播记录创建时解析一次目标播报区域并保存在 target_zones 中：
+    1. 文本与启用位置的名称相同（不区分大小写），否则取文本中包含的最长位置名称
+    2. 位置所在楼层上包含其坐标的全部启用区域（按楼层与坐标范围查询）
+    3. 紧急通知、未填写或无法解析位置、位置不在任何区域内时为 ['*']（ALL_ZONES），表示全部播报区域；
+       不保存解析时的区域列表，之后新增的区域同样能收到这些公告
+
+目标区域编码即播报队列的区域与实时推送事件的 key，播报终端只拉取、订阅所在区域
+（如 announcement:T3-A），不需要接收全部事件后自行过滤
+"""
+from django.db.models import F, Value
+from django.db.models.functions import Length
+
+from apps.navigation_management.models import Location
+from .models import BroadcastZone
+from .queue import ALL_ZONES
+
+
+def find_location(text):
+    """按名称把自由文本解析为位置，无法解析时返回 None"""
+    text = (text or '').strip()
+    if not text:
+        return None
+    locations = Location.objects.filter(is_active=True)
+    location = locations.filter(name__iexact=text).order_by('pk').first()
+    if location is None:
+        # 如 "B12登机口附近" 匹配 "B12登机口"
+        location = locations.annotate(text=Value(text)).filter(
+            text__icontains=F('name')
+        ).order_by(Length('name').desc(), 'pk').first()
+    return location
+
+
+def zones_at(floor, x, y):
+    """包含某一坐标的启用区域编码"""
+    return list(BroadcastZone.objects.filter(
+        is_active=True, floor=floor, min_x__lte=x, max_x__gte=x, min_y__lte=y, max_y__gte=y,
+    ).order_by('code').values_list('code', flat=True))
+
+
+def resolve_target_zones(location_text, emergency=False):
+    """
+    解析目标播报区域
+
+    Returns:
+        按编码排序的区域编码列表，无法定位到具体区域时为 [ALL_ZONES]
+    """
+    if not emergency:
+        location = find_location(location_text)
+        if location is not None:
+            zones = zones_at(location.floor, location.x_coordinate, location.y_coordinate)
+            if zones:
+                return zones
+    return [ALL_ZONES]
+
+
+def targets_zone(target_zones, zone):
+    """目标区域是否包含某一区域，区域功能上线前的记录（空列表）视为全部区域"""
+    return not target_zones or ALL_ZONES in target_zones or zone in target_zones
+
+
+def zone_topics(zone):
+    """播报终端订阅的实时推送主题"""
+    return [f'{topic}:{zone}' for topic in ('announcement', 'emergency', 'lost_item')]
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class CommonConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.common'
+    verbose_name = '公共组件'
+
+    def ready(self):
+        # 注册部署检查
+        from . import checks
@@ -0,0 +1,223 @@
+"""
+只追加日志表的归档
+
+把早于指定天数的记录按月份写入 ARCHIVE_ROOT/<名称>/<YYYY-MM>.jsonl.gz，
+然后从热表中删除，热表只保留近期数据。读取时可按时间范围回读归档文件。
+归档删除期间 is_archiving() 为 True，删除信号处理器据此区分归档与真正的删除（如汇总统计不扣减归档的记录）。
+"""
+import gzip
+import json
+import os
+from collections import defaultdict
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+@dataclass(frozen=True)
+class ArchiveSpec:
+    """归档配置：模型及其时间字段"""
+    model_label: str
+    time_field: str
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+
+# 可归档的只追加日志表
+ARCHIVE_SPECS = {
+    'passenger_activity': ArchiveSpec('passenger_management.PassengerActivity', 'created_at'),
+    'flight_announcement': ArchiveSpec('flight_management.FlightAnnouncement', 'created_at'),
+    'item_broadcast': ArchiveSpec('items_management.ItemBroadcast', 'broadcast_at'),
+    'announcement_broadcast': ArchiveSpec('informations.AnnouncementBroadcast', 'broadcast_at'),
+}
+
+
+_archiving = ContextVar('archiving', default=False)
+
+
+def is_archiving():
+    """当前是否在归档删除记录"""
+    return _archiving.get()
+
+
+def get_archive_root():
+    return getattr(settings, 'ARCHIVE_ROOT', os.path.join(settings.BASE_DIR, 'archive'))
+
+
+def archive_dir(name):
+    return os.path.join(get_archive_root(), name)
+
+
+def month_key(value):
+    """按本地时间取 YYYY-MM"""
+    return timezone.localtime(value).strftime('%Y-%m')
+
+
+def archive_rows(name, cutoff, chunk_size=1000, dry_run=False):
+    """
+    将 ARCHIVE_SPECS[name] 中早于 cutoff 的记录归档并删除
+
+    按时间顺序分块处理，每块先追加写入月份文件，再在事务中删除对应记录
+
+    Returns:
+        归档的记录数
+    """
+    spec = ARCHIVE_SPECS[name]
+    model = spec.model
+    fields = [field.attname for field in model._meta.concrete_fields]
+    queryset = model.objects.filter(**{f'{spec.time_field}__lt': cutoff}).order_by(spec.time_field, 'pk')
+
+    if dry_run:
+        return queryset.count()
+
+    os.makedirs(archive_dir(name), exist_ok=True)
+
+    total = 0
+    while True:
+        rows = list(queryset.values(*fields)[:chunk_size])
+        if not rows:
+            break
+
+        by_month = defaultdict(list)
+        for row in rows:
+            by_month[month_key(row[spec.time_field])].append(row)
+
+        # gzip 支持多成员追加，读取时 gzip.open 会依次读出全部成员
+        for month, month_rows in by_month.items():
+            path = os.path.join(archive_dir(name), f'{month}.jsonl.gz')
+            with gzip.open(path, 'at', encoding='utf-8', compresslevel=6) as f:
+                for row in month_rows:
+                    f.write(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n')
+
+        token = _archiving.set(True)
+        try:
+            with transaction.atomic():
+                model.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+        finally:
+            _archiving.reset(token)
+        total += len(rows)
+    return total
+
+
+def archived_months(name):
+    """返回已归档的月份列表（升序）"""
+    directory = archive_dir(name)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(filename[:7] for filename in os.listdir(directory) if filename.endswith('.jsonl.gz'))
+
+
+def iter_archived_rows(name, start=None, end=None):
+    """
+    按时间范围读取归档记录，按时间倒序逐条产生字典
+
+    从最新的月份文件开始依次读取，每次只解压、排序一个月份，调用方取够记录后停止迭代即不再读取更早的月份
+
+    Args:
+        name: ARCHIVE_SPECS 中的名称
+        start: 开始时间（含），为空表示不限
+        end: 结束时间（不含），为空表示不限
+    """
+    spec = ARCHIVE_SPECS[name]
+    start_month = month_key(start) if start else None
+    end_month = month_key(end) if end else None
+
+    for month in reversed(archived_months(name)):
+        if end_month and month > end_month:
+            continue
+        if start_month and month < start_month:
+            break
+        rows = {}
+        path = os.path.join(archive_dir(name), f'{month}.jsonl.gz')
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                row = json.loads(line)
+                row[spec.time_field] = parse_datetime(row[spec.time_field])
+                value = row[spec.time_field]
+                if (start and value < start) or (end and value >= end):
+                    continue
+                # 中断后重跑可能重复追加（同一记录总在同一月份文件中），按主键去重
+                rows[row['id']] = row
+        yield from sorted(rows.values(), key=lambda row: (row[spec.time_field], row['id']), reverse=True)
+
+
+class ArchiveBackedSequence:
+    """
+    热表查询集与归档记录的只读拼接序列，供分页器使用
+
+    归档记录都早于热表记录，按时间倒序时热表在前、归档在后。
+    archived 可以是列表，也可以是按时间倒序产生记录的迭代器（如 iter_archived_rows），
+    只在切片或计数需要时读取，已读取的记录缓存在序列中
+    """
+
+    def __init__(self, queryset, archived):
+        self.queryset = queryset
+        self._archived = []
+        self._iterator = iter(archived)
+        self._hot_count = None
+
+    def hot_count(self):
+        if self._hot_count is None:
+            self._hot_count = self.queryset.count()
+        return self._hot_count
+
+    def _fill(self, size=None):
+        """从归档迭代器中读取，直到缓存 size 条记录，size 为 None 时全部读取"""
+        while self._iterator is not None and (size is None or len(self._archived) < size):
+            try:
+                self._archived.append(next(self._iterator))
+            except StopIteration:
+                self._iterator = None
+
+    def iter_archived(self):
+        """依次产生归档记录，按需读取"""
+        index = 0
+        while True:
+            self._fill(index + 1)
+            if index >= len(self._archived):
+                return
+            yield self._archived[index]
+            index += 1
+
+    def archived_count(self, limit=None):
+        """归档记录数，指定 limit 时最多读取 limit 条"""
+        self._fill(limit)
+        return len(self._archived) if limit is None else min(len(self._archived), limit)
+
+    def bounded_count(self, limit):
+        """总数，最多统计到 limit 条（热表 COUNT 与读取归档都在达到上限时停止）"""
+        hot = self._hot_count
+        if hot is None:
+            hot = self.queryset.order_by()[:limit].count()
+        if hot >= limit:
+            return limit
+        return hot + self.archived_count(limit - hot)
+
+    def count(self):
+        return self.hot_count() + self.archived_count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+
+        start = index.start or 0
+        stop = self.count() if index.stop is None else index.stop
+        hot = self.hot_count()
+        items = []
+        if start < hot:
+            items.extend(self.queryset[start:min(stop, hot)])
+        if stop > hot:
+            self._fill(stop - hot)
+            items.extend(self._archived[max(start - hot, 0):stop - hot])
+        return items
@@ -0,0 +1,26 @@
+"""
+部署检查
+
+用户角色缓存、导航索引版本号、航班看板、登机口占用索引等依赖各进程共享的缓存，并且每个请求都会读取：
+进程内缓存（LocMemCache、DummyCache）只对当前进程可见，多进程部署时会导致数据过期甚至撤销的权限仍然有效；
+数据库缓存表的每次读取都是一次 SQL 查询，计数器递增不是原子操作，表满时还会淘汰版本号。生产环境必须使用 Redis
+"""
+from django.conf import settings
+from django.core.checks import Error, register
+
+SHARED_CACHES = (
+    'django.core.cache.backends.redis.RedisCache',
+    'django_redis.cache.RedisCache',
+)
+
+
+@register(deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend in SHARED_CACHES:
+        return []
+    return [Error(
+        f'默认缓存 {backend} 不能用于生产环境',
+        hint='请设置环境变量 REDIS_URL 使用 Redis（淘汰策略使用 noeviction 或 volatile-*），见 settings.CACHES',
+        id='common.E001',
+    )]
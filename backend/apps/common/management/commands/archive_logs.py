@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.common.archive import ARCHIVE_SPECS, archive_rows, get_archive_root
+
+
+class Command(BaseCommand):
+    help = '将早于N天的旅客活动、航班播报、物品广播、公告播报记录归档为按月压缩的 JSONL 文件'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=getattr(settings, 'ARCHIVE_AFTER_DAYS', 180),
+            help='归档早于N天的记录，默认使用 ARCHIVE_AFTER_DAYS'
+        )
+        parser.add_argument(
+            '--only', nargs='+', choices=sorted(ARCHIVE_SPECS), default=None,
+            help='只归档指定的日志表'
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000, help='每批处理的记录数')
+        parser.add_argument('--dry-run', action='store_true', help='只统计待归档记录数，不做修改')
+
+    def handle(self, *args, **options):
+        days = options['days']
+        if days < 1:
+            raise CommandError('--days 必须大于0')
+
+        cutoff = timezone.now() - timezone.timedelta(days=days)
+        names = options['only'] or sorted(ARCHIVE_SPECS)
+        self.stdout.write(f'开始归档 {timezone.localtime(cutoff):%Y-%m-%d %H:%M} 之前的记录，归档目录: {get_archive_root()}')
+
+        for name in names:
+            count = archive_rows(name, cutoff, chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+            if options['dry_run']:
+                self.stdout.write(f'{name}: 待归档 {count} 条')
+            else:
+                self.stdout.write(f'{name}: 已归档 {count} 条')
+
+        self.stdout.write(self.style.SUCCESS('归档完成！'))
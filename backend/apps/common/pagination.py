@@ -0,0 +1,274 @@
+"""
+公共分页器
+
+StandardResultsSetPagination 默认行为与原来各应用中的页码分页一致（page / page_size），
+另外支持两种按请求开启的模式：
+
+    ?pagination=cursor  键集（keyset）分页，按视图的 cursor_ordering（如 ('-created_at', '-id')）
+                        定位下一页，不使用 OFFSET，也不执行 COUNT(*)，只返回 next 链接；
+                        视图未声明 cursor_ordering 时忽略该参数
+    ?count=approx       近似计数，COUNT 只统计到 PAGINATION_APPROX_COUNT_LIMIT 条，
+                        超过上限时在 MySQL 无筛选条件下使用表统计信息估算总数
+"""
+import base64
+import json
+from collections import OrderedDict
+from datetime import datetime
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .archive import ArchiveBackedSequence
+
+DEFAULT_APPROX_COUNT_LIMIT = 10000
+
+
+def get_approx_count_limit():
+    return getattr(settings, 'PAGINATION_APPROX_COUNT_LIMIT', DEFAULT_APPROX_COUNT_LIMIT)
+
+
+def estimate_table_rows(queryset):
+    """
+    使用数据库统计信息估算无筛选条件查询集的行数，无法估算时返回 None
+
+    目前仅支持 MySQL（information_schema.TABLES.TABLE_ROWS）
+    """
+    if queryset.query.where:
+        return None
+    connection = connections[queryset.db]
+    if connection.vendor != 'mysql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT TABLE_ROWS FROM information_schema.TABLES '
+            'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s',
+            [queryset.model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    return row[0] if row and row[0] is not None else None
+
+
+class ApproximatePage(Page):
+    """近似计数模式下的页对象，是否有下一页由多取的一条记录判断"""
+
+    def __init__(self, object_list, number, paginator, has_more):
+        super().__init__(object_list, number, paginator)
+        self.has_more = has_more
+
+    def has_next(self):
+        return self.has_more
+
+
+class ApproximateCountPaginator(Paginator):
+    """只计数到上限的分页器，避免大表上的完整 COUNT(*)"""
+
+    def __init__(self, *args, count_limit=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_limit = count_limit or get_approx_count_limit()
+        self.approximate = False
+
+    @cached_property
+    def count(self):
+        if isinstance(self.object_list, ArchiveBackedSequence):
+            # 热表与归档都只统计到上限，超过上限时不再读取更早的归档
+            bounded = self.object_list.bounded_count(self.count_limit + 1)
+            if bounded <= self.count_limit:
+                return bounded
+            self.approximate = True
+            return self.count_limit
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+        bounded = self.object_list.order_by()[:self.count_limit + 1].count()
+        if bounded <= self.count_limit:
+            return bounded
+        self.approximate = True
+        estimate = estimate_table_rows(self.object_list)
+        return max(estimate or 0, self.count_limit)
+
+    def validate_number(self, number):
+        if not self.approximate:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('页码不是整数')
+        if number < 1:
+            raise EmptyPage('页码小于 1')
+        return number
+
+    def page(self, number):
+        # 先计数，确定是否进入近似模式
+        self.count
+        number = self.validate_number(number)
+        if not self.approximate:
+            return super().page(number)
+        # 总数不精确，多取一条判断是否还有下一页
+        bottom = (number - 1) * self.per_page
+        items = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not items and number > 1:
+            raise EmptyPage('该页没有数据')
+        return ApproximatePage(items[:self.per_page], number, self, len(items) > self.per_page)
+
+
+class KeysetPagination(BasePagination):
+    """
+    键集分页器
+
+    按 ordering 中的字段组合（如 ('-created_at', '-id')）定位，游标为上一页最后一条记录的字段值。
+    ordering 的各字段方向必须一致，最后一个字段必须唯一（通常为 id）
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering = ('-created_at', '-id')
+
+    def __init__(self, ordering=None, page_size=None, max_page_size=None):
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+        if page_size is not None:
+            self.page_size = page_size
+        if max_page_size is not None:
+            self.max_page_size = max_page_size
+        directions = {field.startswith('-') for field in self.ordering}
+        if len(directions) != 1:
+            raise ImproperlyConfigured('KeysetPagination 的排序字段方向必须一致')
+        self.descending = directions.pop()
+        self.fields = [field.lstrip('-') for field in self.ordering]
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, TypeError, ValueError):
+            return self.page_size
+        if size < 1:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def encode_cursor(self, position):
+        values = [value.isoformat() if isinstance(value, datetime) else value for value in position]
+        return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            if len(values) != len(self.fields):
+                raise ValueError
+            return tuple(
+                model._meta.get_field(name).to_python(value)
+                for name, value in zip(self.fields, values)
+            )
+        except (TypeError, ValueError, UnicodeError, ValidationError):
+            raise NotFound('无效的游标')
+
+    def keyset_filter(self, position):
+        """生成 (f1, f2, ...) < (v1, v2, ...) 的条件（升序时为 >）"""
+        lookup = 'lt' if self.descending else 'gt'
+        condition = Q()
+        for index, name in enumerate(self.fields):
+            equals = {field: position[i] for i, field in enumerate(self.fields[:index])}
+            condition |= Q(**equals, **{f'{name}__{lookup}': position[index]})
+        # 冗余的首字段范围条件，便于数据库直接使用首字段索引做范围扫描
+        bound = 'lte' if self.descending else 'gte'
+        return Q(**{f'{self.fields[0]}__{bound}': position[0]}) & condition
+
+    def item_position(self, item):
+        if isinstance(item, dict):
+            return tuple(item[name] for name in self.fields)
+        return tuple(getattr(item, name) for name in self.fields)
+
+    def is_after(self, item, position):
+        if self.descending:
+            return self.item_position(item) < position
+        return self.item_position(item) > position
+
+    def fetch(self, queryset, position, limit):
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(position))
+        return list(queryset[:limit])
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        size = self.get_page_size(request)
+
+        if isinstance(queryset, ArchiveBackedSequence):
+            # 热表记录都晚于归档记录，热表取不满一页时再从归档中补齐
+            position = self.decode_cursor(request, queryset.queryset.model)
+            items = self.fetch(queryset.queryset, position, size + 1)
+            if len(items) <= size:
+                # 按需读取归档，取够一页即停止
+                archived = queryset.iter_archived()
+                if position is not None:
+                    archived = (row for row in archived if self.is_after(row, position))
+                items.extend(islice(archived, size + 1 - len(items)))
+        else:
+            position = self.decode_cursor(request, queryset.model)
+            items = self.fetch(queryset, position, size + 1)
+
+        self.has_next = len(items) > size
+        self.page = items[:size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.item_position(self.page[-1])))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+
+class StandardResultsSetPagination(PageNumberPagination):
+    """
+    标准分页器
+
+    默认页码分页；?pagination=cursor 切换为键集分页（需视图声明 cursor_ordering），
+    ?count=approx 使用近似计数
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    mode_query_param = 'pagination'
+    count_query_param = 'count'
+
+    keyset = None
+    approximate = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = getattr(view, 'cursor_ordering', None)
+        if ordering and request.query_params.get(self.mode_query_param) == 'cursor':
+            self.keyset = KeysetPagination(ordering, self.page_size, self.max_page_size)
+            return self.keyset.paginate_queryset(queryset, request, view)
+
+        self.approximate = request.query_params.get(self.count_query_param) == 'approx'
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, object_list, per_page, **kwargs):
+        if self.approximate:
+            return ApproximateCountPaginator(object_list, per_page, **kwargs)
+        return Paginator(object_list, per_page, **kwargs)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        response = super().get_paginated_response(data)
+        if self.approximate:
+            response.data['count_is_approximate'] = self.page.paginator.approximate
+        return response
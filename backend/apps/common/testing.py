@@ -0,0 +1,93 @@
+"""
+测试辅助工具：检查接口执行的 SQL 是否对大表做了全表扫描
+
+用法示例:
+    class MyTests(QueryPlanTestMixin, TestCase):
+        def test_list(self):
+            with self.assertNoFullTableScan():
+                self.client.get('/api/...')
+"""
+import re
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# 随业务持续增长的大表（按模型标识），这些表上的查询必须走索引
+LARGE_TABLE_MODELS = [
+    'passenger_management.PassengerActivity',
+    'passenger_management.PassengerNote',
+    'items_management.LostItem',
+    'items_management.ItemBroadcast',
+    'informations.Announcement',
+    'informations.AnnouncementBroadcast',
+    'flight_management.Flight',
+    'flight_management.FlightAnnouncement',
+    'navigation_management.NavigationRecord',
+    'navigation_management.TimeSchedule',
+]
+
+# SQLite: "SCAN 表名" 或旧版本的 "SCAN TABLE 表名"，带 USING INDEX 的是索引扫描
+SQLITE_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(?P<table>\w+)(?P<rest>.*)$')
+
+
+def large_tables():
+    return {apps.get_model(label)._meta.db_table for label in LARGE_TABLE_MODELS}
+
+
+def explain(sql, using=connection):
+    """
+    返回查询计划中的全表扫描表名列表
+
+    目前支持 SQLite（EXPLAIN QUERY PLAN）和 MySQL（EXPLAIN 的 type=ALL）
+    """
+    scanned = []
+    with using.cursor() as cursor:
+        if using.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            for row in cursor.fetchall():
+                match = SQLITE_SCAN_RE.match(row[-1])
+                if match and 'USING' not in match.group('rest'):
+                    scanned.append(match.group('table'))
+        elif using.vendor == 'mysql':
+            cursor.execute(f'EXPLAIN {sql}')
+            columns = [column[0] for column in cursor.description]
+            for row in cursor.fetchall():
+                plan = dict(zip(columns, row))
+                if plan.get('type') == 'ALL':
+                    scanned.append(plan.get('table'))
+    return scanned
+
+
+def find_full_table_scans(queries, tables=None, using=connection):
+    """
+    检查捕获的查询，返回 [(sql, [全表扫描的表名])] 列表
+
+    Args:
+        queries: CaptureQueriesContext 捕获的查询
+        tables: 需要检查的表名集合，默认 LARGE_TABLE_MODELS 对应的表
+    """
+    tables = large_tables() if tables is None else set(tables)
+    problems = []
+    for query in queries:
+        sql = query['sql']
+        if not sql.lstrip().upper().startswith('SELECT'):
+            continue
+        scanned = [table for table in explain(sql, using) if table in tables]
+        if scanned:
+            problems.append((sql, scanned))
+    return problems
+
+
+class QueryPlanTestMixin:
+    """为 TestCase 提供 assertNoFullTableScan 断言"""
+
+    @contextmanager
+    def assertNoFullTableScan(self, tables=None, using=connection):
+        with CaptureQueriesContext(using) as context:
+            yield context
+        problems = find_full_table_scans(context.captured_queries, tables, using)
+        if problems:
+            details = '\n\n'.join(f'{", ".join(scanned)}:\n{sql}' for sql, scanned in problems)
+            self.fail(f'以下查询对大表进行了全表扫描:\n\n{details}')
@@ -0,0 +1,254 @@
+import gzip
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.passenger_management.models import PassengerActivity
+from .archive import ArchiveBackedSequence, archive_rows, archived_months, iter_archived_rows
+from .checks import check_shared_cache
+from .testing import QueryPlanTestMixin
+from .versions import bump_version, get_version
+
+User = get_user_model()
+
+
+class ArchiveTests(TestCase):
+    """日志归档测试"""
+
+    def setUp(self):
+        self.archive_root = tempfile.TemporaryDirectory()
+        self.override = override_settings(ARCHIVE_ROOT=self.archive_root.name)
+        self.override.enable()
+        self.passenger = User.objects.create_user(username='passenger', password='testpassword')
+        self.now = timezone.now()
+        for days_ago in (1, 40, 70, 100):
+            activity = PassengerActivity.objects.create(
+                passenger=self.passenger, activity_type='login', description=f'{days_ago}天前登录'
+            )
+            PassengerActivity.objects.filter(pk=activity.pk).update(
+                created_at=self.now - timezone.timedelta(days=days_ago)
+            )
+
+    def tearDown(self):
+        self.override.disable()
+        self.archive_root.cleanup()
+
+    def test_archive_and_read_back(self):
+        """归档后热表只保留近期记录，归档可按时间范围回读"""
+        cutoff = self.now - timezone.timedelta(days=30)
+        self.assertEqual(archive_rows('passenger_activity', cutoff, dry_run=True), 3)
+        self.assertEqual(archive_rows('passenger_activity', cutoff, chunk_size=2), 3)
+
+        self.assertEqual(PassengerActivity.objects.count(), 1)
+        self.assertTrue(archived_months('passenger_activity'))
+
+        rows = iter_archived_rows('passenger_activity', start=self.now - timezone.timedelta(days=80))
+        self.assertEqual([row['description'] for row in rows], ['40天前登录', '70天前登录'])
+
+    def test_archive_backed_sequence_slices(self):
+        """拼接序列的切片跨越热表与归档边界"""
+        archive_rows('passenger_activity', self.now - timezone.timedelta(days=30))
+        sequence = ArchiveBackedSequence(
+            PassengerActivity.objects.order_by('-created_at'),
+            iter_archived_rows('passenger_activity')
+        )
+        self.assertEqual(sequence.count(), 4)
+        first, second = sequence[0:2]
+        self.assertEqual(first.description, '1天前登录')
+        self.assertEqual(second['description'], '40天前登录')
+        self.assertEqual([row['description'] for row in sequence[2:4]], ['70天前登录', '100天前登录'])
+
+    def test_all_activities_reads_through_archive(self):
+        """all_activities 的日期范围覆盖归档时拼接归档记录"""
+        archive_rows('passenger_activity', self.now - timezone.timedelta(days=30))
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='admin', password='testpassword', is_staff=True))
+        url = '/api/passenger-management/activities/all/activities/'
+        start_date = timezone.localdate() - timezone.timedelta(days=200)
+
+        response = client.get(url)
+        self.assertEqual(response.data['count'], 1)
+
+        response = client.get(url, {'start_date': start_date.strftime('%Y-%m-%d')})
+        self.assertEqual(response.data['count'], 4)
+        self.assertEqual(
+            [row['description'] for row in response.data['results']],
+            ['1天前登录', '40天前登录', '70天前登录', '100天前登录']
+        )
+        self.assertEqual(response.data['results'][-1]['passenger'], self.passenger.pk)
+
+
+    def test_archive_read_stops_once_page_is_filled(self):
+        """只读取填满当前页所需的月份，从最新的月份开始"""
+        archive_rows('passenger_activity', self.now - timezone.timedelta(days=30))
+        self.assertGreater(len(archived_months('passenger_activity')), 1)
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='admin', password='testpassword', is_staff=True))
+        start_date = (timezone.localdate() - timezone.timedelta(days=200)).strftime('%Y-%m-%d')
+        params = {'start_date': start_date, 'page_size': 1}
+        with mock.patch('apps.common.archive.gzip.open', wraps=gzip.open) as opened:
+            response = client.get('/api/passenger-management/activities/all/activities/', {**params, 'pagination': 'cursor'})
+            self.assertEqual([row['description'] for row in response.data['results']], ['1天前登录'])
+            self.assertIsNotNone(response.data['next'])
+            self.assertEqual(opened.call_count, 1)
+
+            opened.reset_mock()
+            with override_settings(PAGINATION_APPROX_COUNT_LIMIT=1):
+                response = client.get('/api/passenger-management/activities/all/activities/', {**params, 'count': 'approx'})
+            self.assertEqual([row['description'] for row in response.data['results']], ['1天前登录'])
+            self.assertTrue(response.data['count_is_approximate'])
+            self.assertEqual(opened.call_count, 1)
+
+
+class ListEndpointQueryPlanTests(QueryPlanTestMixin, TestCase):
+    """列表接口在大表上的查询必须走索引"""
+
+    LIST_URLS = [
+        '/api/passenger-management/activities/all/activities/',
+        '/api/flight-management/flights/',
+        '/api/flight-management/announcements/',
+        '/api/items-management/lost-items/',
+        '/api/items-management/broadcasts/',
+        '/api/informations/announcements/',
+        '/api/informations/broadcasts/',
+        '/api/navigation-management/schedules/',
+    ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_user(username='admin', password='testpassword', is_staff=True)
+        )
+
+    def test_list_endpoints_avoid_full_table_scans(self):
+        for url in self.LIST_URLS:
+            with self.subTest(url=url), self.assertNoFullTableScan():
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_date_filters_use_ranges(self):
+        """按日期筛选时使用范围条件，而不是对列做 DATE() 运算"""
+        today = timezone.localdate().strftime('%Y-%m-%d')
+        with self.assertNoFullTableScan():
+            self.client.get('/api/passenger-management/activities/all/activities/', {'start_date': today})
+            self.client.get('/api/navigation-management/schedules/', {'date': today})
+
+
+class PaginationTests(TestCase):
+    """公共分页器测试"""
+
+    url = '/api/passenger-management/activities/all/activities/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_user(username='admin', password='testpassword', is_staff=True)
+        )
+        self.passenger = User.objects.create_user(username='passenger', password='testpassword')
+        now = timezone.now()
+        # 每 5 条共用一个时间，验证相同时间时按 id 继续定位
+        PassengerActivity.objects.bulk_create([
+            PassengerActivity(
+                passenger=self.passenger, activity_type='login', description=f'活动{i}',
+                created_at=now - timezone.timedelta(minutes=i // 5)
+            )
+            for i in range(23)
+        ])
+        self.expected = list(
+            PassengerActivity.objects.order_by('-created_at', '-id').values_list('description', flat=True)
+        )
+
+    def collect_cursor_pages(self, params):
+        descriptions, url, pages = [], self.url, 0
+        while url:
+            response = self.client.get(url, params if pages == 0 else None)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            descriptions.extend(row['description'] for row in response.data['results'])
+            url, pages = response.data['next'], pages + 1
+        return descriptions, pages
+
+    def test_cursor_pagination_walks_all_rows(self):
+        with CaptureQueriesContext(connection) as context:
+            descriptions, pages = self.collect_cursor_pages({'pagination': 'cursor', 'page_size': 10})
+        self.assertEqual(descriptions, self.expected)
+        self.assertEqual(pages, 3)
+        self.assertFalse(any('COUNT(' in query['sql'] for query in context.captured_queries))
+
+    def test_cursor_pagination_continues_into_archive(self):
+        with tempfile.TemporaryDirectory() as archive_root, override_settings(ARCHIVE_ROOT=archive_root):
+            PassengerActivity.objects.filter(description__in=self.expected[15:]).update(
+                created_at=timezone.now() - timezone.timedelta(days=100)
+            )
+            self.expected = list(
+                PassengerActivity.objects.order_by('-created_at', '-id').values_list('description', flat=True)
+            )
+            archive_rows('passenger_activity', timezone.now() - timezone.timedelta(days=30))
+            start_date = (timezone.localdate() - timezone.timedelta(days=200)).strftime('%Y-%m-%d')
+            descriptions, _ = self.collect_cursor_pages(
+                {'pagination': 'cursor', 'page_size': 7, 'start_date': start_date}
+            )
+        self.assertEqual(descriptions, self.expected)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'pagination': 'cursor', 'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_number_pagination_unchanged(self):
+        response = self.client.get(self.url, {'page': 3})
+        self.assertEqual(response.data['count'], 23)
+        self.assertIsNone(response.data['next'])
+        self.assertNotIn('count_is_approximate', response.data)
+
+    @override_settings(PAGINATION_APPROX_COUNT_LIMIT=15)
+    def test_approximate_count(self):
+        response = self.client.get(self.url, {'count': 'approx'})
+        self.assertEqual(response.data['count'], 15)
+        self.assertTrue(response.data['count_is_approximate'])
+
+        # 超出计数上限的页仍可访问，最后一页没有 next
+        response = self.client.get(self.url, {'count': 'approx', 'page': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['description'] for row in response.data['results']], self.expected[20:])
+        self.assertIsNone(response.data['next'])
+
+        response = self.client.get(self.url, {'count': 'approx', 'passenger': self.passenger.pk, 'page_size': 50})
+        self.assertEqual(response.data['count'], 15)
+        self.assertEqual(len(response.data['results']), 23)
+
+
+class DeploymentCheckTests(TestCase):
+    """部署检查测试"""
+
+    def test_requires_redis_cache(self):
+        self.assertEqual([error.id for error in check_shared_cache(None)], ['common.E001'])
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost'}}
+        with override_settings(CACHES=redis):
+            self.assertEqual(check_shared_cache(None), [])
+
+
+class VersionTests(TestCase):
+    """跨进程版本号测试"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_evicted_counter_never_repeats(self):
+        key = 'test:version'
+        first = get_version(key)
+        self.assertEqual(get_version(key), first)
+        self.assertEqual(bump_version(key), first + 1)
+        # 模拟计数器被淘汰：重新初始化的值不能与淘汰前记住的任何值相同
+        cache.delete(key)
+        self.assertGreater(get_version(key), first + 1)
+        cache.delete(key)
+        self.assertGreater(bump_version(key), first + 1)
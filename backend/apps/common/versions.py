@@ -0,0 +1,33 @@
+"""
+跨进程共享的版本号（代号）
+
+导航索引版本号、航班看板代号、登机口索引代号保存在共享缓存中，各进程对比版本号判断本地数据是否过期。
+缓存满时计数器可能被淘汰，如果淘汰后从 1 重新计数，新值可能与进程内记住的旧值相同，导致进程一直使用过期数据；
+这里在计数器不存在时用当前微秒时间戳作为初值（只增不减，不会与淘汰前的任何值重复），
+计数器被淘汰后各进程读到的都是新值，最多多重建一次
+"""
+import time
+
+from django.core.cache import cache
+
+
+def seed_version(key):
+    """计数器不存在时写入初值（不过期），返回当前值"""
+    cache.add(key, time.time_ns() // 1000, None)
+    return cache.get(key)
+
+
+def get_version(key):
+    """读取版本号，不存在时初始化"""
+    version = cache.get(key)
+    if version is None:
+        version = seed_version(key)
+    return version
+
+
+def bump_version(key):
+    """递增版本号，使所有进程的本地数据失效"""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        return seed_version(key)
@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Flight, FlightAnnouncement
+from .models import (
+    Flight, FlightAnnouncement, FlightSubscription, FlightChangeEvent, FlightNotification,
+    FlightStatusHistory, FlightPunctualityStat
+)
 
 
 @admin.register(Flight)
@@ -21,3 +24,62 @@ class FlightAnnouncementAdmin(admin.ModelAdmin):
     search_fields = ('flight__flight_number', 'content')
     date_hierarchy = 'created_at'
     readonly_fields = ('created_at',)
+
+
+@admin.register(FlightSubscription)
+class FlightSubscriptionAdmin(admin.ModelAdmin):
+    """旅客航班关注管理"""
+    list_display = ('passenger', 'flight', 'created_at')
+    search_fields = ('passenger__username', 'flight__flight_number')
+    raw_id_fields = ('passenger', 'flight')
+    readonly_fields = ('created_at',)
+
+
+@admin.register(FlightChangeEvent)
+class FlightChangeEventAdmin(admin.ModelAdmin):
+    """航班变更事件管理"""
+    list_display = ('flight', 'changes', 'created_at', 'processed_at')
+    list_filter = ('processed_at',)
+    search_fields = ('flight__flight_number',)
+    raw_id_fields = ('flight',)
+    readonly_fields = ('created_at',)
+
+
+@admin.register(FlightNotification)
+class FlightNotificationAdmin(admin.ModelAdmin):
+    """航班通知管理"""
+    list_display = ('passenger', 'flight', 'content', 'is_read', 'created_at')
+    list_filter = ('is_read', 'created_at')
+    search_fields = ('passenger__username', 'flight__flight_number', 'content')
+    raw_id_fields = ('passenger', 'flight', 'event')
+    readonly_fields = ('created_at',)
+
+
+@admin.register(FlightStatusHistory)
+class FlightStatusHistoryAdmin(admin.ModelAdmin):
+    """航班状态历史（只读）"""
+    list_display = ('flight_number', 'status', 'gate', 'terminal', 'actual_departure_time', 'recorded_at')
+    list_filter = ('status', 'recorded_at')
+    search_fields = ('flight_number',)
+    raw_id_fields = ('flight',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(FlightPunctualityStat)
+class FlightPunctualityStatAdmin(admin.ModelAdmin):
+    """航班准点统计（只读，由状态历史增量维护）"""
+    list_display = ('date', 'airline', 'departure_city', 'arrival_city', 'operated', 'on_time', 'cancelled', 'delay_minutes')
+    list_filter = ('airline', 'date')
+    search_fields = ('airline', 'departure_city', 'arrival_city')
+    date_hierarchy = 'date'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
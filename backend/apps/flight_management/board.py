@@ -0,0 +1,229 @@
+"""
+物化航班动态板
+
+按 (出发/到达, 航站楼) 在缓存中保存已序列化的航班行，覆盖 [构建时间 - LOOKBACK, 构建时间 + HORIZON]
+内的航班；请求的时间窗口（hours）在这些行中筛选，无需查询数据库。
+
+航班保存、批量更新（update_and_record）或删除后，在事务提交时只更新受影响航班所在的各个动态板，
+并递增动态板修订号；多个进程同时更新同一动态板时放弃增量更新，直接删除该动态板，下次请求时重建。
+只为有航班的航站楼（known_terminals）物化动态板，动态板和锁都在共享缓存中，各进程的增量更新互相可见。
+
+响应的 ETag 由动态板构建时间与修订号、时间窗口和窗口起点（取整到分钟）计算，同一 ETag 对应的响应内容完全相同，
+客户端携带 If-None-Match 轮询时内容未变化直接返回 304
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.common.versions import bump_version, get_version
+
+from .gates import patch_gate_indexes
+from .models import Flight
+
+KINDS = ('departures', 'arrivals')
+ALL_TERMINALS = '*'
+
+DEFAULT_BOARD_SETTINGS = {
+    'WINDOWS': (2, 6, 12, 24),
+    'LOOKBACK_MINUTES': 30,
+    'REBUILD_INTERVAL': 600,
+}
+
+# 有航班的航站楼集合，缓存 REBUILD_INTERVAL 秒
+TERMINALS_CACHE_KEY = 'flight:board:terminals'
+# 每次增量更新递增，构建期间发生变化时丢弃构建结果，避免覆盖更新
+GENERATION_CACHE_KEY = 'flight:board:generation'
+LOCK_TIMEOUT = 10
+
+
+def get_board_settings():
+    """合并默认配置与 settings.FLIGHT_BOARD"""
+    return {**DEFAULT_BOARD_SETTINGS, **getattr(settings, 'FLIGHT_BOARD', {})}
+
+
+def known_terminals():
+    """有航班的航站楼，只接受这些航站楼的动态板请求"""
+    terminals = cache.get(TERMINALS_CACHE_KEY)
+    if terminals is None:
+        terminals = set(
+            Flight.objects.exclude(terminal__isnull=True).exclude(terminal='')
+            .order_by().values_list('terminal', flat=True).distinct()
+        )
+        cache.set(TERMINALS_CACHE_KEY, terminals, get_board_settings()['REBUILD_INTERVAL'])
+    return terminals
+
+
+def board_cache_key(kind, terminal):
+    return f'flight:board:{kind}:{terminal}'
+
+
+def board_time(flight, kind):
+    """动态板排序和筛选使用的时间：实际（预计）时间优先，其次为计划时间"""
+    if kind == 'departures':
+        return flight.actual_departure_time or flight.scheduled_departure_time
+    return flight.actual_arrival_time or flight.scheduled_arrival_time
+
+
+def serialize_row(flight, kind):
+    from .serializers import FlightBoardSerializer
+    return board_time(flight, kind).timestamp(), dict(FlightBoardSerializer(flight).data)
+
+
+def horizon(built_at):
+    options = get_board_settings()
+    start = built_at - timezone.timedelta(minutes=options['LOOKBACK_MINUTES'])
+    end = built_at + timezone.timedelta(hours=max(options['WINDOWS']), seconds=options['REBUILD_INTERVAL'])
+    return start, end
+
+
+def belongs(flight, kind, terminal, start, end):
+    if terminal != ALL_TERMINALS and flight.terminal != terminal:
+        return False
+    return start <= board_time(flight, kind) < end
+
+
+def build_board(kind, terminal):
+    """从数据库构建动态板并写入缓存"""
+    generation = get_version(GENERATION_CACHE_KEY)
+    built_at = timezone.now()
+    start, end = horizon(built_at)
+    if kind == 'departures':
+        condition = (
+            Q(actual_departure_time__gte=start, actual_departure_time__lt=end)
+            | Q(actual_departure_time__isnull=True, scheduled_departure_time__gte=start, scheduled_departure_time__lt=end)
+        )
+    else:
+        condition = (
+            Q(actual_arrival_time__gte=start, actual_arrival_time__lt=end)
+            | Q(actual_arrival_time__isnull=True, scheduled_arrival_time__gte=start, scheduled_arrival_time__lt=end)
+        )
+    queryset = Flight.objects.filter(condition)
+    if terminal != ALL_TERMINALS:
+        queryset = queryset.filter(terminal=terminal)
+    board = {
+        'built_at': built_at,
+        'revision': 0,
+        'last_modified': built_at,
+        'rows': {flight.pk: serialize_row(flight, kind) for flight in queryset},
+    }
+    key = board_cache_key(kind, terminal)
+    cache.set(key, board, get_board_settings()['REBUILD_INTERVAL'])
+    if get_version(GENERATION_CACHE_KEY) != generation:
+        cache.delete(key)
+    return board
+
+
+def get_board(kind, terminal):
+    """读取动态板，不存在或已过期时重建"""
+    return cache.get(board_cache_key(kind, terminal)) or build_board(kind, terminal)
+
+
+def patch_boards(flights, deleted_ids=()):
+    """
+    把航班的最新数据写入已物化的动态板
+
+    Args:
+        flights: 新建或变更后的航班
+        deleted_ids: 已删除的航班ID
+    """
+    flights = list(flights)
+    bump_version(GENERATION_CACHE_KEY)
+    terminals = known_terminals()
+    if any(flight.terminal and flight.terminal not in terminals for flight in flights):
+        # 出现新的航站楼，下次请求时重新读取
+        cache.delete(TERMINALS_CACHE_KEY)
+    terminals = terminals | {ALL_TERMINALS}
+    for kind in KINDS:
+        rows = {flight.pk: serialize_row(flight, kind) for flight in flights}
+        for terminal in terminals:
+            key = board_cache_key(kind, terminal)
+            lock_key = f'{key}:lock'
+            if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+                cache.delete(key)
+                continue
+            try:
+                board = cache.get(key)
+                if board is None:
+                    continue
+                start, end = horizon(board['built_at'])
+                changed = False
+                for flight in flights:
+                    if belongs(flight, kind, terminal, start, end):
+                        if board['rows'].get(flight.pk) != rows[flight.pk]:
+                            board['rows'][flight.pk] = rows[flight.pk]
+                            changed = True
+                    elif board['rows'].pop(flight.pk, None) is not None:
+                        changed = True
+                for flight_id in deleted_ids:
+                    if board['rows'].pop(flight_id, None) is not None:
+                        changed = True
+                if changed:
+                    board['revision'] += 1
+                    board['last_modified'] = timezone.now()
+                    remaining = get_board_settings()['REBUILD_INTERVAL'] - (timezone.now() - board['built_at']).total_seconds()
+                    if remaining > 0:
+                        cache.set(key, board, remaining)
+                    else:
+                        cache.delete(key)
+            finally:
+                cache.delete(lock_key)
+
+
+def invalidate_boards():
+    """删除全部已物化的动态板"""
+    terminals = known_terminals() | {ALL_TERMINALS}
+    cache.delete_many([board_cache_key(kind, terminal) for kind in KINDS for terminal in terminals])
+
+
+def refresh_flights(flight_ids):
+    """事务提交后重新读取航班并更新动态板与登机口占用索引"""
+    flight_ids = list(flight_ids)
+    if not flight_ids:
+        return
+    flights = Flight.objects.in_bulk(flight_ids)
+    deleted_ids = [pk for pk in flight_ids if pk not in flights]
+    patch_boards(flights.values(), deleted_ids=deleted_ids)
+    patch_gate_indexes(flights.values(), deleted_ids=deleted_ids)
+
+
+def schedule_refresh(flight_ids):
+    flight_ids = list(flight_ids)
+    transaction.on_commit(lambda: refresh_flights(flight_ids))
+
+
+def window_start(now=None):
+    """时间窗口起点取整到分钟，保证同一分钟内相同版本的响应内容一致"""
+    return (now or timezone.now()).replace(second=0, microsecond=0)
+
+
+def render_board(kind, terminal, hours, now=None):
+    """
+    生成动态板响应数据
+
+    Returns:
+        (响应数据, ETag, Last-Modified)
+    """
+    board = get_board(kind, terminal)
+    start_at = window_start(now)
+    lookback = timezone.timedelta(minutes=get_board_settings()['LOOKBACK_MINUTES'])
+    low = (start_at - lookback).timestamp()
+    high = (start_at + timezone.timedelta(hours=hours)).timestamp()
+    rows = sorted(
+        (item for item in board['rows'].values() if low <= item[0] < high),
+        key=lambda item: (item[0], item[1]['id']),
+    )
+    data = {
+        'board': kind,
+        'terminal': None if terminal == ALL_TERMINALS else terminal,
+        'hours': hours,
+        'window_start': start_at,
+        'count': len(rows),
+        'results': [row for _, row in rows],
+    }
+    version = f"{board['built_at'].timestamp()}.{board['revision']}"
+    etag = hashlib.sha1(f'{kind}:{terminal}:{hours}:{version}:{start_at.timestamp()}'.encode()).hexdigest()
+    return data, f'"{etag}"', max(board['last_modified'], start_at)
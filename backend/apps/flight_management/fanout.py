@@ -0,0 +1,276 @@
+"""
+航班变更联动
+
+Flight 保存（或 FlightQuerySet.update_and_record 批量更新）时，跟踪字段的变化被记录为
+FlightChangeEvent。本模块按批处理未处理的事件：
+    1. 生成航班播报 FlightAnnouncement
+    2. 为关注该航班的旅客批量创建 FlightNotification
+    3. 出发时间变化时平移旅客行程中与该航班本班次相关、未完成的 TimeSchedule
+
+事件记录了变更前后全部跟踪字段的值，播报文本和行程平移量只依据事件本身计算。
+同一航班在同一批中的多个事件合并为一个事件处理（见 coalesce_events），只生成一条播报和通知，
+内容为该批结束时的状态。已处理的事件保留 RETENTION_DAYS 天后由处理进程定期清理
+
+处理方式由 settings.FLIGHT_CHANGE_FANOUT['MODE'] 决定：
+    sync    事务提交后在当前进程立即处理
+    worker  由 run_flight_fanout 管理命令在独立进程中轮询处理
+
+无论哪种方式，事务提交后都会在记录事件的进程中发送 flight_changes_recorded 信号，
+供实时推送等需要即时感知变更的模块使用
+"""
+import copy
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.dispatch import Signal
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Flight, FlightAnnouncement, FlightChangeEvent, FlightNotification, FlightSubscription
+
+logger = logging.getLogger('app')
+
+# 变更事件提交后发送，参数 events 为 FlightChangeEvent 列表
+flight_changes_recorded = Signal()
+
+DEFAULT_FANOUT_SETTINGS = {
+    'MODE': 'worker',
+    'BATCH_SIZE': 100,
+    'NOTIFY_BATCH_SIZE': 500,
+    'POLL_INTERVAL': 2,
+    'SCHEDULE_WINDOW_HOURS': 12,
+    'RETENTION_DAYS': 7,
+    'PURGE_INTERVAL': 3600,
+    'PURGE_BATCH_SIZE': 1000,
+}
+
+
+def get_fanout_settings():
+    """合并默认配置与 settings.FLIGHT_CHANGE_FANOUT"""
+    return {**DEFAULT_FANOUT_SETTINGS, **getattr(settings, 'FLIGHT_CHANGE_FANOUT', {})}
+
+
+def schedule_processing(events=()):
+    """事务提交后发送 flight_changes_recorded 信号，sync 模式下同时处理新事件"""
+    if events:
+        transaction.on_commit(lambda: flight_changes_recorded.send(sender=FlightChangeEvent, events=events))
+    if get_fanout_settings()['MODE'] == 'sync':
+        transaction.on_commit(process_pending)
+
+
+def as_datetime(value):
+    if isinstance(value, str):
+        return parse_datetime(value)
+    return value
+
+
+def format_time(value):
+    value = as_datetime(value)
+    if value is None:
+        return '待定'
+    return timezone.localtime(value).strftime('%m月%d日 %H时%M分')
+
+
+def event_flight(flight, event):
+    """
+    航班在事件发生后的状态
+
+    Args:
+        flight: 航班（只使用航班号、机场等不跟踪的字段）
+        event: FlightChangeEvent
+
+    Returns:
+        航班副本，跟踪字段取事件记录的变更后值
+    """
+    snapshot = copy.copy(flight)
+    for name, value in event.after.items():
+        setattr(snapshot, name, as_datetime(value) if name.endswith('_time') else value)
+    return snapshot
+
+
+def describe_changes(flight, event):
+    """
+    生成变更播报文本
+
+    Args:
+        flight: 航班，跟踪字段以事件记录的变更后值为准
+        event: FlightChangeEvent，changes 为 {字段: [旧值, 新值]}
+    """
+    flight = event_flight(flight, event)
+    changes = event.changes
+    parts = []
+    if 'status' in changes:
+        parts.append(flight.get_status_display_for_voice())
+    if 'terminal' in changes:
+        old, new = changes['terminal']
+        parts.append(f'航班{flight.flight_number}航站楼由{old or "待定"}变更为{new or "待定"}。')
+    if 'gate' in changes:
+        old, new = changes['gate']
+        parts.append(f'航班{flight.flight_number}登机口由{old or "待定"}变更为{new or "待定"}，请前往{new or "待定"}登机口。')
+    if 'status' not in changes:
+        for field, label in (('actual_departure_time', '预计出发时间'), ('scheduled_departure_time', '计划出发时间'),
+                             ('actual_arrival_time', '预计到达时间'), ('scheduled_arrival_time', '计划到达时间')):
+            if field in changes:
+                parts.append(f'航班{flight.flight_number}{label}调整为{format_time(changes[field][1])}。')
+    return ''.join(parts)
+
+
+def coalesce_events(events):
+    """
+    合并同一航班的多个事件
+
+    Args:
+        events: 按记录顺序排列的 FlightChangeEvent 列表
+
+    Returns:
+        每个航班一个事件（按航班首次出现的顺序）。多个事件合并时返回最后一个事件的副本（主键不变），
+        before 取第一个事件，after 取最后一个事件，changes 为 {字段: [最早的旧值, 最新的新值]}，
+        最终没有变化的字段（如 A1 -> B2 -> A1）被去掉
+    """
+    grouped = defaultdict(list)
+    for event in events:
+        grouped[event.flight_id].append(event)
+    merged = []
+    for flight_events in grouped.values():
+        event = flight_events[-1]
+        if len(flight_events) > 1:
+            changes = {}
+            for item in flight_events:
+                for name, (old, new) in item.changes.items():
+                    changes[name] = [changes[name][0] if name in changes else old, new]
+            event = copy.copy(event)
+            event.before = flight_events[0].before
+            event.changes = {name: values for name, values in changes.items() if values[0] != values[1]}
+        merged.append(event)
+    return merged
+
+
+def departure_time(values):
+    """出发时间，以实际（预计）出发时间优先，其次为计划出发时间"""
+    return as_datetime(values.get('actual_departure_time')) or as_datetime(values.get('scheduled_departure_time'))
+
+
+def departure_shift(event):
+    """
+    事件前后出发时间的平移量
+
+    Returns:
+        (变更前出发时间, timedelta)，无变化或无法确定时返回 None
+    """
+    old, new = departure_time(event.before), departure_time(event.after)
+    if old and new and old != new:
+        return old, new - old
+    return None
+
+
+def shift_schedules(flight, departure, delta):
+    """
+    平移旅客行程中与航班相关的未完成安排
+
+    航班号每天复用，只平移开始时间在原出发时间前后 SCHEDULE_WINDOW_HOURS 小时内（即本班次）的安排
+    """
+    from apps.navigation_management.models import TimeSchedule
+    window = timezone.timedelta(hours=get_fanout_settings()['SCHEDULE_WINDOW_HOURS'])
+    return TimeSchedule.objects.filter(
+        flight_code=flight.flight_number, is_completed=False,
+        start_time__range=(departure - window, departure + window),
+    ).update(
+        start_time=F('start_time') + delta,
+        end_time=F('end_time') + delta,
+    )
+
+
+def process_batch(batch_size=None, notify_batch_size=None):
+    """
+    处理一批未处理的变更事件
+
+    Returns:
+        处理的事件数
+    """
+    options = get_fanout_settings()
+    batch_size = batch_size or options['BATCH_SIZE']
+    notify_batch_size = notify_batch_size or options['NOTIFY_BATCH_SIZE']
+
+    with transaction.atomic():
+        # 多个处理进程并行时跳过已被锁定的事件
+        events = list(
+            FlightChangeEvent.objects.select_for_update(skip_locked=True)
+            .filter(processed_at__isnull=True).order_by('id')[:batch_size]
+        )
+        if not events:
+            return 0
+
+        flights = Flight.objects.in_bulk({event.flight_id for event in events})
+        subscribers = defaultdict(list)
+        for flight_id, passenger_id in FlightSubscription.objects.filter(
+            flight_id__in=flights
+        ).values_list('flight_id', 'passenger_id'):
+            subscribers[flight_id].append(passenger_id)
+
+        announcements = []
+        notifications = []
+        for event in coalesce_events(events):
+            flight = flights.get(event.flight_id)
+            if flight is None:
+                continue
+            content = describe_changes(flight, event)
+            if content:
+                announcements.append(FlightAnnouncement(flight=flight, content=content))
+                notifications.extend(
+                    FlightNotification(passenger_id=passenger_id, flight=flight, event=event, content=content)
+                    for passenger_id in subscribers[flight.pk]
+                )
+            shift = departure_shift(event)
+            if shift:
+                shift_schedules(flight, *shift)
+
+        FlightAnnouncement.objects.bulk_create(announcements)
+        FlightNotification.objects.bulk_create(notifications, batch_size=notify_batch_size)
+        FlightChangeEvent.objects.filter(pk__in=[event.pk for event in events]).update(processed_at=timezone.now())
+
+    logger.info('处理航班变更事件 %s 条，生成通知 %s 条', len(events), len(notifications))
+    return len(events)
+
+
+def process_pending(batch_size=None, notify_batch_size=None):
+    """
+    处理全部未处理的变更事件
+
+    Returns:
+        处理的事件数
+    """
+    batch_size = batch_size or get_fanout_settings()['BATCH_SIZE']
+    total = 0
+    while True:
+        count = process_batch(batch_size, notify_batch_size)
+        total += count
+        if count < batch_size:
+            return total
+
+
+def purge_processed(retention_days=None, batch_size=None):
+    """
+    分批删除处理完成超过保留期的事件
+
+    Returns:
+        删除的事件数
+    """
+    options = get_fanout_settings()
+    retention_days = options['RETENTION_DAYS'] if retention_days is None else retention_days
+    batch_size = batch_size or options['PURGE_BATCH_SIZE']
+    cutoff = timezone.now() - timezone.timedelta(days=retention_days)
+    expired = FlightChangeEvent.objects.filter(processed_at__lt=cutoff).order_by('id').values_list('pk', flat=True)
+    total = 0
+    while True:
+        pks = list(expired[:batch_size])
+        if not pks:
+            break
+        # 通知的 event 外键为 SET_NULL，删除事件不影响已发出的通知
+        FlightChangeEvent.objects.filter(pk__in=pks).delete()
+        total += len(pks)
+    if total:
+        logger.info('清理已处理的航班变更事件 %s 条', total)
+    return total
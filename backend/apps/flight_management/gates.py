@@ -0,0 +1,357 @@
+"""
+登机口占用时间线与冲突检测
+
+航班占用登机口的时间段：
+    [计划出发时间 - BEFORE_DEPARTURE_MINUTES, max(计划出发时间, 实际出发时间) + AFTER_DEPARTURE_MINUTES)
+已取消或未分配登机口的航班不占用登机口。登机口与航站楼为自由文本，去除首尾空白并转为大写后作为索引键。
+
+每个 (航站楼, 登机口) 在缓存中保存一个按开始时间排序的区间索引 GateIndex，覆盖占用结束时间不早于
+构建时间 - LOOKBACK_HOURS 的航班。区间按开始时间二分查找，并记录最长区间长度，
+查找与某一时间段重叠的区间时只需检查开始时间在 (start - 最长区间, end) 内的区间。
+
+航班变更、批量更新、导入或删除后，与航班动态板一样在事务提交时只更新受影响航班所在的登机口索引
+（航班换登机口时同时从原登机口索引中移除），新出现的冲突通过 gate_conflicts_detected 信号发出。
+多个进程同时更新同一索引时放弃增量更新，直接删除该索引，下次请求时重建。
+"""
+import bisect
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.db.models.functions import Trim, Upper
+from django.dispatch import Signal
+from django.utils import timezone
+
+from apps.common.versions import bump_version, get_version
+
+from .models import Flight
+
+logger = logging.getLogger('app')
+
+DEFAULT_GATE_SETTINGS = {
+    'BEFORE_DEPARTURE_MINUTES': 45,
+    'AFTER_DEPARTURE_MINUTES': 15,
+    'LOOKBACK_HOURS': 24,
+    'REBUILD_INTERVAL': 3600,
+}
+
+# 每次增量更新递增，构建期间发生变化时丢弃构建结果，避免覆盖更新
+GENERATION_CACHE_KEY = 'flight:gates:generation'
+LOCK_TIMEOUT = 10
+
+# 增量更新发现新的登机口冲突时发送（事务提交后），conflicts 为 GateConflict 列表
+gate_conflicts_detected = Signal()
+
+
+def get_gate_settings():
+    """合并默认配置与 settings.FLIGHT_GATES"""
+    return {**DEFAULT_GATE_SETTINGS, **getattr(settings, 'FLIGHT_GATES', {})}
+
+
+def normalize(value):
+    return (value or '').strip().upper()
+
+
+def gate_key(flight):
+    """航班所在的 (航站楼, 登机口)，未分配登机口时返回 None"""
+    gate = normalize(flight.gate)
+    if not gate:
+        return None
+    return normalize(flight.terminal), gate
+
+
+def index_cache_key(key):
+    terminal, gate = key
+    return f'flight:gates:{terminal}:{gate}'
+
+
+def location_cache_key(flight_id):
+    """航班当前所在登机口索引，换登机口时用于从原索引中移除"""
+    return f'flight:gates:location:{flight_id}'
+
+
+def to_datetime(timestamp):
+    return timezone.datetime.fromtimestamp(timestamp, tz=timezone.get_current_timezone())
+
+
+def occupancy(flight):
+    """
+    航班占用登机口的时间段
+
+    Returns:
+        (开始时间戳, 结束时间戳)，不占用登机口时返回 None
+    """
+    if flight.status == 'cancelled' or gate_key(flight) is None:
+        return None
+    options = get_gate_settings()
+    scheduled = flight.scheduled_departure_time
+    departed = max(scheduled, flight.actual_departure_time or scheduled)
+    start = scheduled - timezone.timedelta(minutes=options['BEFORE_DEPARTURE_MINUTES'])
+    end = departed + timezone.timedelta(minutes=options['AFTER_DEPARTURE_MINUTES'])
+    return start.timestamp(), end.timestamp()
+
+
+class GateConflict:
+    """同一登机口上占用时间重叠的两个航班"""
+
+    def __init__(self, key, first, second):
+        self.terminal, self.gate = key
+        self.first, self.second = sorted((first, second))
+
+    def overlap(self):
+        return max(self.first[0], self.second[0]), min(self.first[1], self.second[1])
+
+    def as_dict(self):
+        start, end = self.overlap()
+        return {
+            'terminal': self.terminal or None,
+            'gate': self.gate,
+            'flights': [self.first[3], self.second[3]],
+            'flight_ids': [self.first[2], self.second[2]],
+            'overlap_start': to_datetime(start),
+            'overlap_end': to_datetime(end),
+        }
+
+
+class GateIndex:
+    """
+    单个登机口的占用区间索引
+
+    intervals 为按 (开始时间, 结束时间, 航班ID) 排序的 (开始时间戳, 结束时间戳, 航班ID, 航班号) 列表
+    """
+
+    def __init__(self, key, built_at, intervals=()):
+        self.key = key
+        self.built_at = built_at
+        self.revision = 0
+        self.intervals = sorted(intervals)
+        self.members = {interval[2]: interval for interval in self.intervals}
+        self.max_length = max((end - start for start, end, *_ in self.intervals), default=0)
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def overlapping(self, start, end, exclude=None):
+        """与 [start, end) 重叠的区间"""
+        low = bisect.bisect_left(self.intervals, (start - self.max_length,))
+        high = bisect.bisect_left(self.intervals, (end,))
+        return [
+            interval for interval in self.intervals[low:high]
+            if interval[1] > start and interval[2] != exclude
+        ]
+
+    def add(self, interval):
+        """加入区间，返回与其冲突的区间"""
+        self.remove(interval[2])
+        bisect.insort(self.intervals, interval)
+        self.members[interval[2]] = interval
+        self.max_length = max(self.max_length, interval[1] - interval[0])
+        return self.overlapping(interval[0], interval[1], exclude=interval[2])
+
+    def remove(self, flight_id):
+        interval = self.members.pop(flight_id, None)
+        if interval is None:
+            return False
+        del self.intervals[bisect.bisect_left(self.intervals, interval)]
+        # max_length 只增不减，仅扩大查找范围，不影响结果
+        return True
+
+    def conflicts(self, start=None, end=None):
+        """时间段内的全部冲突（按开始时间扫描，与仍在占用中的区间比较）"""
+        items = self.intervals if start is None else self.overlapping(start, end)
+        conflicts, active = [], []
+        for interval in items:
+            active = [other for other in active if other[1] > interval[0]]
+            conflicts.extend(GateConflict(self.key, other, interval) for other in active)
+            active.append(interval)
+        return conflicts
+
+
+def coverage_start(built_at):
+    return built_at - timezone.timedelta(hours=get_gate_settings()['LOOKBACK_HOURS'])
+
+
+def interval_for(flight, built_at):
+    """航班在索引中的区间，不占用登机口或早于索引覆盖范围时返回 None"""
+    span = occupancy(flight)
+    if span is None or span[1] < coverage_start(built_at).timestamp():
+        return None
+    return span[0], span[1], flight.pk, flight.flight_number
+
+
+def build_indexes(keys):
+    """从数据库构建登机口索引并写入缓存（每次调用只查询一次数据库）"""
+    keys = set(keys)
+    if not keys:
+        return {}
+    generation = get_version(GENERATION_CACHE_KEY)
+    built_at = timezone.now()
+    options = get_gate_settings()
+    # 实际出发时间可能晚于计划出发时间，按计划出发时间预先筛选时保留足够的余量
+    earliest = coverage_start(built_at) - timezone.timedelta(minutes=options['AFTER_DEPARTURE_MINUTES'])
+    queryset = Flight.objects.annotate(gate_key=Upper(Trim('gate'))).filter(
+        Q(scheduled_departure_time__gte=earliest) | Q(actual_departure_time__gte=earliest),
+        gate_key__in={gate for _, gate in keys},
+    ).exclude(status='cancelled').only(
+        'id', 'flight_number', 'gate', 'terminal', 'status', 'scheduled_departure_time', 'actual_departure_time',
+    )
+
+    grouped = {key: [] for key in keys}
+    for flight in queryset:
+        key = gate_key(flight)
+        interval = interval_for(flight, built_at)
+        if key in grouped and interval is not None:
+            grouped[key].append(interval)
+    indexes = {key: GateIndex(key, built_at, intervals) for key, intervals in grouped.items()}
+
+    timeout = options['REBUILD_INTERVAL']
+    cache.set_many({index_cache_key(key): index for key, index in indexes.items()}, timeout)
+    cache.set_many({
+        location_cache_key(interval[2]): key for key, index in indexes.items() for interval in index.intervals
+    }, timeout)
+    if get_version(GENERATION_CACHE_KEY) != generation:
+        cache.delete_many([index_cache_key(key) for key in indexes])
+    return indexes
+
+
+def get_indexes(keys):
+    """读取登机口索引，不存在或已过期时重建"""
+    keys = set(keys)
+    cache_keys = {index_cache_key(key): key for key in keys}
+    found = {cache_keys[name]: index for name, index in cache.get_many(list(cache_keys)).items()}
+    found.update(build_indexes(keys - set(found)))
+    return found
+
+
+def get_index(key):
+    return get_indexes([key])[key]
+
+
+def patch_gate_indexes(flights, deleted_ids=()):
+    """
+    把航班的最新数据写入已物化的登机口索引
+
+    Args:
+        flights: 新建或变更后的航班
+        deleted_ids: 已删除的航班ID
+
+    Returns:
+        新出现的冲突列表
+    """
+    flights = list(flights)
+    flight_ids = [flight.pk for flight in flights] + list(deleted_ids)
+    if not flight_ids:
+        return []
+    bump_version(GENERATION_CACHE_KEY)
+
+    previous = cache.get_many([location_cache_key(pk) for pk in flight_ids])
+    touched = {}
+    for flight_id in flight_ids:
+        old_key = previous.get(location_cache_key(flight_id))
+        if old_key is not None:
+            touched.setdefault(old_key, [])
+    for flight in flights:
+        key = gate_key(flight)
+        if key is not None:
+            touched.setdefault(key, []).append(flight)
+
+    timeout = get_gate_settings()['REBUILD_INTERVAL']
+    conflicts = []
+    for key, gate_flights in touched.items():
+        name = index_cache_key(key)
+        lock_key = f'{name}:lock'
+        if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+            cache.delete(name)
+            continue
+        try:
+            index = cache.get(name)
+            if index is None:
+                continue
+            changed = False
+            for flight_id in flight_ids:
+                changed = index.remove(flight_id) or changed
+            for flight in gate_flights:
+                interval = interval_for(flight, index.built_at)
+                if interval is None:
+                    continue
+                conflicts.extend(GateConflict(key, other, interval) for other in index.add(interval))
+                changed = True
+            if not changed:
+                continue
+            index.revision += 1
+            remaining = timeout - (timezone.now() - index.built_at).total_seconds()
+            if remaining > 0:
+                cache.set(name, index, remaining)
+                cache.set_many({location_cache_key(flight.pk): key for flight in gate_flights}, remaining)
+            else:
+                cache.delete(name)
+        finally:
+            cache.delete(lock_key)
+
+    cache.delete_many(
+        [location_cache_key(pk) for pk in deleted_ids]
+        + [location_cache_key(flight.pk) for flight in flights if gate_key(flight) is None]
+    )
+    if conflicts:
+        logger.warning('登机口占用冲突 %s 处: %s', len(conflicts), ', '.join(
+            f"{conflict.gate}({conflict.first[3]}/{conflict.second[3]})" for conflict in conflicts
+        ))
+        gate_conflicts_detected.send(sender=Flight, conflicts=conflicts)
+    return conflicts
+
+
+def active_gate_keys(start, end, terminal=None):
+    """时间段内可能有航班占用的登机口"""
+    options = get_gate_settings()
+    earliest = start - timezone.timedelta(minutes=options['AFTER_DEPARTURE_MINUTES'])
+    latest = end + timezone.timedelta(minutes=options['BEFORE_DEPARTURE_MINUTES'])
+    queryset = Flight.objects.filter(
+        Q(scheduled_departure_time__gte=earliest) | Q(actual_departure_time__gte=earliest),
+        scheduled_departure_time__lt=latest, gate__isnull=False,
+    ).exclude(status='cancelled').values_list('terminal', 'gate').distinct()
+    keys = {(normalize(row_terminal), normalize(gate)) for row_terminal, gate in queryset if normalize(gate)}
+    if terminal is not None:
+        keys = {key for key in keys if key[0] == normalize(terminal)}
+    return keys
+
+
+def gate_timeline(terminal, gate, start, end):
+    """
+    登机口在 [start, end) 内的占用时间线
+
+    Args:
+        terminal: 航站楼，为 None 时合并各航站楼同名登机口（冲突仍按各自航站楼计算）
+
+    Returns:
+        按开始时间排序的占用列表，每项附带所在航站楼与之冲突的航班号
+    """
+    if terminal is None:
+        keys = {key for key in active_gate_keys(start, end) if key[1] == normalize(gate)}
+        indexes = get_indexes(keys)
+    else:
+        key = (normalize(terminal), normalize(gate))
+        indexes = {key: get_index(key)}
+    rows = []
+    for (terminal_key, _), index in sorted(indexes.items()):
+        for interval in index.overlapping(start.timestamp(), end.timestamp()):
+            conflicts = index.overlapping(interval[0], interval[1], exclude=interval[2])
+            rows.append({
+                'flight_id': interval[2],
+                'flight_number': interval[3],
+                'terminal': terminal_key,
+                'start': to_datetime(interval[0]),
+                'end': to_datetime(interval[1]),
+                'conflicts': [other[3] for other in conflicts],
+            })
+    rows.sort(key=lambda row: row['start'])
+    return rows
+
+
+def gate_conflicts(start, end, terminal=None):
+    """时间段内各登机口的占用冲突"""
+    indexes = get_indexes(active_gate_keys(start, end, terminal))
+    conflicts = []
+    for key in sorted(indexes):
+        conflicts.extend(indexes[key].conflicts(start.timestamp(), end.timestamp()))
+    return conflicts
@@ -0,0 +1,285 @@
+"""
+FIDS 航班计划批量导入
+
+支持 CSV（首行为列名）与 JSON（对象数组、逐行 JSON 或连续的 JSON 对象）两种格式，列名与 Flight 字段名一致：
+    flight_number, airline, departure_city, arrival_city, departure_airport, arrival_airport,
+    scheduled_departure_time, scheduled_arrival_time, actual_departure_time, actual_arrival_time,
+    gate, terminal, status
+
+文件逐块读取、逐行解析，每 chunk_size 行校验后在一个事务中按 flight_number 批量写入：
+    1. 一次查询读取已存在的航班，内容未变化的行跳过
+    2. bulk_create(update_conflicts=True) 插入新航班、更新已有航班，行中缺少的列保留原值
+    3. 整批更新搜索索引，新航班记录初始状态快照，整批记录变更事件（每批只触发一次联动处理），整批刷新航班动态板
+"""
+import codecs
+import csv
+import json
+
+from django.db import transaction
+from rest_framework import serializers
+
+from .board import schedule_refresh
+from .models import Flight, FlightChangeEvent
+from .punctuality import record_status_history
+from .search import reindex_flights
+
+FORMATS = ('csv', 'json')
+DEFAULT_CHUNK_SIZE = 1000
+# 结果中保留的错误明细条数上限
+MAX_REPORTED_ERRORS = 1000
+READ_SIZE = 64 * 1024
+
+IMPORT_FIELDS = (
+    'flight_number', 'airline', 'departure_city', 'arrival_city', 'departure_airport', 'arrival_airport',
+    'scheduled_departure_time', 'scheduled_arrival_time', 'actual_departure_time', 'actual_arrival_time',
+    'gate', 'terminal', 'status',
+)
+
+
+class FlightImportSerializer(serializers.Serializer):
+    """导入行校验，不做逐行的唯一性查询"""
+    flight_number = serializers.CharField(max_length=20)
+    airline = serializers.CharField(max_length=100)
+    departure_city = serializers.CharField(max_length=100)
+    arrival_city = serializers.CharField(max_length=100)
+    departure_airport = serializers.CharField(max_length=100)
+    arrival_airport = serializers.CharField(max_length=100)
+    scheduled_departure_time = serializers.DateTimeField()
+    scheduled_arrival_time = serializers.DateTimeField()
+    actual_departure_time = serializers.DateTimeField(required=False, allow_null=True)
+    actual_arrival_time = serializers.DateTimeField(required=False, allow_null=True)
+    gate = serializers.CharField(max_length=50, required=False, allow_null=True)
+    terminal = serializers.CharField(max_length=50, required=False, allow_null=True)
+    status = serializers.ChoiceField(choices=Flight.FLIGHT_STATUS_CHOICES, required=False)
+
+    def validate(self, attrs):
+        if attrs['scheduled_arrival_time'] <= attrs['scheduled_departure_time']:
+            raise serializers.ValidationError({'scheduled_arrival_time': '计划到达时间必须晚于计划出发时间'})
+        return attrs
+
+
+class ImportResult:
+    """导入结果统计"""
+
+    def __init__(self):
+        self.total = 0
+        self.valid = 0
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, row_number, flight_number, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row_number, 'flight_number': flight_number, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'total': self.total,
+            'valid': self.valid,
+            'created': self.created,
+            'updated': self.updated,
+            'unchanged': self.unchanged,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+
+def iter_text(stream, encoding='utf-8-sig'):
+    """把二进制或文本流按块解码为文本"""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    while True:
+        chunk = stream.read(READ_SIZE)
+        if not chunk:
+            break
+        yield decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+def iter_lines(stream):
+    buffer = ''
+    for text in iter_text(stream):
+        buffer += text
+        *lines, buffer = buffer.split('\n')
+        yield from (line + '\n' for line in lines)
+    if buffer:
+        yield buffer
+
+
+def iter_csv_rows(stream):
+    yield from csv.DictReader(iter_lines(stream))
+
+
+def iter_json_rows(stream):
+    """
+    逐个解析 JSON 对象
+
+    支持 [{...}, {...}]、每行一个对象以及连续的对象，不需要把整个文件读入内存
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    chunks = iter_text(stream)
+    exhausted = False
+    while True:
+        buffer = buffer.lstrip(' \t\r\n,[]')
+        if not buffer:
+            if exhausted:
+                return
+            try:
+                buffer = next(chunks)
+            except StopIteration:
+                exhausted = True
+            continue
+        try:
+            row, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if exhausted:
+                raise ValueError(f'JSON 格式错误: {buffer[:50]}')
+            try:
+                buffer += next(chunks)
+            except StopIteration:
+                exhausted = True
+            continue
+        buffer = buffer[end:]
+        yield row
+
+
+def iter_rows(stream, file_format):
+    if file_format == 'csv':
+        return iter_csv_rows(stream)
+    if file_format == 'json':
+        return iter_json_rows(stream)
+    raise ValueError(f'不支持的格式: {file_format}')
+
+
+def guess_format(filename):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension == 'csv':
+        return 'csv'
+    if extension in ('json', 'jsonl', 'ndjson'):
+        return 'json'
+    return None
+
+
+def clean_row(row):
+    """去除首尾空白，空字符串视为未填写"""
+    if not isinstance(row, dict):
+        return None
+    cleaned = {}
+    for key, value in row.items():
+        if key is None or key.strip() not in IMPORT_FIELDS:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+            if value == '':
+                value = None
+        cleaned[key.strip()] = value
+    # 未填写状态时新航班使用默认状态，已有航班保留原状态
+    if cleaned.get('status') is None:
+        cleaned.pop('status', None)
+    return cleaned
+
+
+def import_chunk(rows, result):
+    """
+    写入一批已校验的行
+
+    Args:
+        rows: {航班号: 校验后的字段}
+    """
+    if not rows:
+        return
+    with transaction.atomic():
+        existing = {
+            values['flight_number']: values
+            for values in Flight.objects.select_for_update().filter(
+                flight_number__in=list(rows)
+            ).values('pk', *IMPORT_FIELDS)
+        }
+        objects, changes, regrouped = [], [], {}
+        for flight_number, values in rows.items():
+            current = existing.get(flight_number)
+            if current is None:
+                objects.append(Flight(**values))
+                result.created += 1
+                continue
+            merged = {name: values.get(name, current[name]) for name in IMPORT_FIELDS}
+            diff = {name: (current[name], merged[name]) for name in IMPORT_FIELDS if current[name] != merged[name]}
+            if not diff:
+                result.unchanged += 1
+                continue
+            objects.append(Flight(**merged))
+            changes.append((current['pk'], {name: diff[name] for name in Flight.TRACKED_FIELDS if name in diff}))
+            if not changes[-1][1]:
+                # 只有航空公司、航线等非跟踪字段变化，追加快照使准点统计移到新的分组
+                regrouped[current['pk']] = {name: diff[name] for name in Flight.STATS_FIELDS if name in diff}
+            result.updated += 1
+        if not objects:
+            return
+
+        Flight.objects.bulk_create(
+            objects,
+            update_conflicts=True,
+            unique_fields=['flight_number'],
+            update_fields=[name for name in IMPORT_FIELDS if name != 'flight_number'] + ['updated_at'],
+        )
+        # 部分数据库在更新冲突时不返回主键，重新读取本批航班
+        flights = list(Flight.objects.filter(flight_number__in=[flight.flight_number for flight in objects]))
+        reindex_flights(flights)
+        record_status_history({
+            **{flight.pk: {} for flight in flights if flight.flight_number not in existing},
+            **{pk: diff for pk, diff in regrouped.items() if diff},
+        })
+        FlightChangeEvent.record_many(changes)
+        schedule_refresh([flight.pk for flight in flights])
+
+
+def import_flights(stream, file_format, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False):
+    """
+    导入航班计划
+
+    Args:
+        stream: 文件对象（二进制或文本）
+        file_format: csv 或 json
+        chunk_size: 每批校验、写入的行数
+        dry_run: 只校验不写入
+
+    Returns:
+        ImportResult
+    """
+    result = ImportResult()
+    chunk = {}
+
+    def flush():
+        if not dry_run:
+            import_chunk(chunk, result)
+        chunk.clear()
+
+    try:
+        for row_number, raw in enumerate(iter_rows(stream, file_format), start=1):
+            result.total += 1
+            row = clean_row(raw)
+            if row is None:
+                result.add_error(row_number, None, {'non_field_errors': ['每行必须是对象']})
+                continue
+            serializer = FlightImportSerializer(data=row)
+            if not serializer.is_valid():
+                result.add_error(row_number, row.get('flight_number'), serializer.errors)
+                continue
+            result.valid += 1
+            data = {name: value for name, value in serializer.validated_data.items() if name in row}
+            if data['flight_number'] in chunk:
+                # 同一航班号重复出现时先写入已有的行，保证以最后一行为准
+                flush()
+            chunk[data['flight_number']] = data
+            if len(chunk) >= chunk_size:
+                flush()
+    except (ValueError, csv.Error) as exc:
+        result.add_error(result.total + 1, None, {'non_field_errors': [str(exc)]})
+    flush()
+    return result
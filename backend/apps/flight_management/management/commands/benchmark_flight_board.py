@@ -0,0 +1,74 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.flight_management.board import invalidate_boards
+from apps.flight_management.models import Flight
+
+
+class Rollback(Exception):
+    """用于回滚基准测试产生的数据"""
+
+
+class Command(BaseCommand):
+    help = '对比航班列表接口与物化航班动态板的每秒请求数（测试数据在结束后回滚）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300, help='每种场景的请求次数')
+        parser.add_argument('--flights', type=int, default=200, help='生成的测试航班数量')
+        parser.add_argument('--terminal', default='T3', help='测试航班所在航站楼')
+
+    def handle(self, *args, **options):
+        self.stdout.write('开始航班动态板基准测试...')
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback()
+        except Rollback:
+            pass
+        finally:
+            # 动态板中含有已回滚的测试航班
+            invalidate_boards()
+        self.stdout.write(self.style.SUCCESS('基准测试完成，测试数据已回滚！'))
+
+    def run(self, options):
+        terminal = options['terminal']
+        now = timezone.now()
+        Flight.objects.bulk_create([
+            Flight(
+                flight_number=f'BM{i:05d}', airline='基准航空', departure_city='北京', arrival_city='上海',
+                departure_airport='北京首都国际机场', arrival_airport='上海虹桥国际机场',
+                scheduled_departure_time=now + timezone.timedelta(minutes=i % 120),
+                scheduled_arrival_time=now + timezone.timedelta(minutes=i % 120 + 120),
+                terminal=terminal, gate=f'A{i % 30}',
+            )
+            for i in range(options['flights'])
+        ])
+        user = get_user_model().objects.create_user(username=f'board_benchmark_{now.timestamp():.0f}', password=None)
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        board_url = f'/api/flight-management/flights/board/?terminal={terminal}&hours=2'
+
+        etag = client.get(board_url)['ETag']
+        scenarios = [
+            ('航班列表接口 /flights/', lambda: client.get('/api/flight-management/flights/?page_size=100')),
+            ('动态板（200，读取缓存）', lambda: client.get(board_url)),
+            ('动态板（304，If-None-Match）', lambda: client.get(board_url, HTTP_IF_NONE_MATCH=etag)),
+        ]
+        for name, request in scenarios:
+            rate, queries, status_code = self.measure(request, options['requests'])
+            self.stdout.write(f'{name}: {rate:.0f} 请求/秒，状态码 {status_code}，每次请求 {queries:.1f} 条SQL')
+
+    @staticmethod
+    def measure(request, count):
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            for _ in range(count):
+                response = request()
+            elapsed = time.perf_counter() - start
+        return count / elapsed, len(context.captured_queries) / count, response.status_code
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.flight_management.ingest import DEFAULT_CHUNK_SIZE, FORMATS, guess_format, import_flights
+
+
+class Command(BaseCommand):
+    help = '从 FIDS 导出的 CSV/JSON 文件批量导入航班计划（按航班号新增或更新）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV 或 JSON 文件路径')
+        parser.add_argument('--format', choices=FORMATS, help='文件格式，默认按扩展名判断')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='每批校验、写入的行数')
+        parser.add_argument('--dry-run', action='store_true', help='只校验，不写入数据库')
+        parser.add_argument('--show-errors', type=int, default=20, help='输出的错误明细条数')
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or guess_format(options['path'])
+        if file_format is None:
+            raise CommandError('无法根据扩展名判断文件格式，请使用 --format 指定')
+
+        self.stdout.write(f'开始导入航班计划: {options["path"]}')
+        with open(options['path'], 'rb') as stream:
+            result = import_flights(stream, file_format, options['chunk_size'], options['dry_run'])
+
+        for error in result.errors[:options['show_errors']]:
+            self.stdout.write(self.style.WARNING(f'第 {error["row"]} 行 {error["flight_number"] or ""}: {error["errors"]}'))
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f'校验完成：共 {result.total} 行，有效 {result.valid} 行，错误 {result.failed} 行（未写入数据库）'
+            ))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'导入完成：共 {result.total} 行，新增 {result.created}，更新 {result.updated}，'
+            f'未变化 {result.unchanged}，错误 {result.failed}！'
+        ))
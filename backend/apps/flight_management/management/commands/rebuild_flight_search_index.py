@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from apps.flight_management.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = '重建航班搜索索引'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='每批处理的航班数量')
+
+    def handle(self, *args, **options):
+        self.stdout.write('开始重建航班搜索索引...')
+
+        count = rebuild_index(batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f'航班搜索索引重建完成，共 {count} 个航班！'))
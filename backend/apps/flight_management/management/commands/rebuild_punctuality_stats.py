@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from apps.flight_management.punctuality import rebuild_stats, snapshot_missing_flights
+
+
+class Command(BaseCommand):
+    help = '按航班最新状态快照重建准点统计'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--snapshot-missing', action='store_true', help='先为没有状态历史的航班补充初始快照')
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批处理的数量')
+
+    def handle(self, *args, **options):
+        if options['snapshot_missing']:
+            self.stdout.write('开始为没有状态历史的航班补充快照...')
+            count = snapshot_missing_flights(batch_size=options['batch_size'])
+            self.stdout.write(f'已补充 {count} 个航班的初始快照')
+
+        self.stdout.write('开始重建航班准点统计...')
+        count = rebuild_stats(batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f'航班准点统计重建完成，共 {count} 条！'))
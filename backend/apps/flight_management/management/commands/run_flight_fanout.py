@@ -0,0 +1,47 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.flight_management.fanout import get_fanout_settings, process_pending, purge_processed
+
+
+class Command(BaseCommand):
+    help = '航班变更联动进程：批量处理航班变更事件，生成播报、旅客通知并调整行程'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='处理完当前事件后退出')
+        parser.add_argument('--interval', type=float, default=None, help='轮询间隔（秒），默认使用 POLL_INTERVAL')
+        parser.add_argument('--batch-size', type=int, default=None, help='每批处理的事件数，默认使用 BATCH_SIZE')
+
+    def handle(self, *args, **options):
+        fanout_settings = get_fanout_settings()
+        interval = options['interval'] or fanout_settings['POLL_INTERVAL']
+        batch_size = options['batch_size'] or fanout_settings['BATCH_SIZE']
+
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        self.stdout.write('航班变更联动进程已启动')
+        purged_at = None
+        while True:
+            close_old_connections()
+            count = process_pending(batch_size)
+            if count:
+                self.stdout.write(f'处理 {count} 条航班变更事件')
+            # 定期清理超过保留期的已处理事件
+            if purged_at is None or time.monotonic() - purged_at >= fanout_settings['PURGE_INTERVAL']:
+                purged = purge_processed()
+                if purged:
+                    self.stdout.write(f'清理 {purged} 条已处理的航班变更事件')
+                purged_at = time.monotonic()
+            if options['once'] or self.stopping:
+                break
+            time.sleep(interval)
+
+        self.stdout.write(self.style.SUCCESS('航班变更联动进程已退出'))
+
+    def stop(self, signum, frame):
+        self.stopping = True
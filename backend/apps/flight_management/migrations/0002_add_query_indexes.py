@@ -0,0 +1,29 @@
+# Generated by Django 4.2.5 on 2026-10-18 20:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight_management', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['-scheduled_departure_time'], name='flight_sched_dep_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['status', 'scheduled_departure_time'], name='flight_status_sched_dep_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flightannouncement',
+            index=models.Index(fields=['-created_at'], name='flightann_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flightannouncement',
+            index=models.Index(fields=['flight', '-created_at'], name='flightann_flight_created_idx'),
+        ),
+    ]
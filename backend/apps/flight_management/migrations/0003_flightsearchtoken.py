@@ -0,0 +1,40 @@
+# Generated by Django 4.2.5 on 2026-10-18 20:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_search_tokens(apps, schema_editor):
+    from apps.flight_management.search import FIELD_WEIGHTS, document_tokens
+    Flight = apps.get_model('flight_management', 'Flight')
+    FlightSearchToken = apps.get_model('flight_management', 'FlightSearchToken')
+    rows = [
+        FlightSearchToken(flight_id=flight.pk, token=token)
+        for flight in Flight.objects.iterator()
+        for token in document_tokens(getattr(flight, field) for field, _ in FIELD_WEIGHTS)
+    ]
+    FlightSearchToken.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight_management', '0002_add_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlightSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=20, verbose_name='词条')),
+                ('flight', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='flight_management.flight', verbose_name='航班')),
+            ],
+            options={
+                'verbose_name': '航班搜索词条',
+                'verbose_name_plural': '航班搜索词条',
+                'unique_together': {('token', 'flight')},
+            },
+        ),
+        migrations.RunPython(backfill_search_tokens, migrations.RunPython.noop),
+    ]
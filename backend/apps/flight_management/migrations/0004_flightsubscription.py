@@ -0,0 +1,32 @@
+# Generated by Django 4.2.5 on 2026-10-18 20:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('flight_management', '0003_flightsearchtoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlightSubscription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='选择时间')),
+                ('flight', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subscriptions', to='flight_management.flight', verbose_name='航班')),
+                ('passenger', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='flight_subscriptions', to=settings.AUTH_USER_MODEL, verbose_name='旅客')),
+            ],
+            options={
+                'verbose_name': '旅客航班关注',
+                'verbose_name_plural': '旅客航班关注',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['flight', 'passenger'], name='flightsub_flight_passenger_idx')],
+                'unique_together': {('passenger', 'flight')},
+            },
+        ),
+    ]
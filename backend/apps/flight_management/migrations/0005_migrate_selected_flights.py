@@ -0,0 +1,48 @@
+from django.db import migrations
+
+
+def copy_selected_flights(apps, schema_editor):
+    """把 CustomUser.selected_flights 中的航班ID迁移到 FlightSubscription"""
+    User = apps.get_model('users', 'CustomUser')
+    Flight = apps.get_model('flight_management', 'Flight')
+    FlightSubscription = apps.get_model('flight_management', 'FlightSubscription')
+
+    existing = set(Flight.objects.values_list('id', flat=True))
+    rows = []
+    for user_id, selected in User.objects.exclude(selected_flights=None).values_list('id', 'selected_flights'):
+        if not isinstance(selected, list):
+            continue
+        flight_ids = set()
+        for value in selected:
+            try:
+                flight_ids.add(int(value))
+            except (TypeError, ValueError):
+                continue
+        rows.extend(
+            FlightSubscription(passenger_id=user_id, flight_id=flight_id)
+            for flight_id in flight_ids & existing
+        )
+    FlightSubscription.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+
+def restore_selected_flights(apps, schema_editor):
+    User = apps.get_model('users', 'CustomUser')
+    FlightSubscription = apps.get_model('flight_management', 'FlightSubscription')
+
+    selected = {}
+    for user_id, flight_id in FlightSubscription.objects.order_by('created_at').values_list('passenger_id', 'flight_id'):
+        selected.setdefault(user_id, []).append(str(flight_id))
+    for user_id, flight_ids in selected.items():
+        User.objects.filter(pk=user_id).update(selected_flights=flight_ids)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_customuser_selected_flights'),
+        ('flight_management', '0004_flightsubscription'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_selected_flights, restore_selected_flights),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.5 on 2026-10-18 20:15
+
+import apps.flight_management.models
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('flight_management', '0005_migrate_selected_flights'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlightChangeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('changes', models.JSONField(encoder=apps.flight_management.models.ChangeJSONEncoder, help_text='{字段: [旧值, 新值]}', verbose_name='变更内容')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='处理时间')),
+                ('flight', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='change_events', to='flight_management.flight', verbose_name='航班')),
+            ],
+            options={
+                'verbose_name': '航班变更事件',
+                'verbose_name_plural': '航班变更事件',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='FlightNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content', models.TextField(verbose_name='通知内容')),
+                ('is_read', models.BooleanField(default=False, verbose_name='是否已读')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('event', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='notifications', to='flight_management.flightchangeevent', verbose_name='变更事件')),
+                ('flight', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='flight_management.flight', verbose_name='航班')),
+                ('passenger', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='flight_notifications', to=settings.AUTH_USER_MODEL, verbose_name='旅客')),
+            ],
+            options={
+                'verbose_name': '航班通知',
+                'verbose_name_plural': '航班通知',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['passenger', 'is_read', '-created_at'], name='flightnotice_passenger_idx')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='flightchangeevent',
+            index=models.Index(fields=['processed_at', 'id'], name='flightevent_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-18 20:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight_management', '0006_flight_change_events'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['actual_departure_time'], name='flight_actual_dep_idx'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.5 on 2026-10-18 20:31
+
+import apps.flight_management.models
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight_management', '0007_add_actual_departure_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlightPunctualityStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='计划出发日期', verbose_name='日期')),
+                ('airline', models.CharField(max_length=100, verbose_name='航空公司')),
+                ('departure_city', models.CharField(max_length=100, verbose_name='出发城市')),
+                ('arrival_city', models.CharField(max_length=100, verbose_name='到达城市')),
+                ('operated', models.IntegerField(default=0, verbose_name='执行航班数')),
+                ('on_time', models.IntegerField(default=0, verbose_name='准点航班数')),
+                ('cancelled', models.IntegerField(default=0, verbose_name='取消航班数')),
+                ('delay_minutes', models.IntegerField(default=0, verbose_name='累计延误分钟数')),
+            ],
+            options={
+                'verbose_name': '航班准点统计',
+                'verbose_name_plural': '航班准点统计',
+                'ordering': ['-date', 'airline'],
+                'indexes': [models.Index(fields=['airline', 'date'], name='punctuality_airline_date_idx'), models.Index(fields=['departure_city', 'arrival_city', 'date'], name='punctuality_route_date_idx')],
+                'unique_together': {('date', 'airline', 'departure_city', 'arrival_city')},
+            },
+        ),
+        migrations.CreateModel(
+            name='FlightStatusHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('flight_number', models.CharField(max_length=20, verbose_name='航班号')),
+                ('airline', models.CharField(max_length=100, verbose_name='航空公司')),
+                ('departure_city', models.CharField(max_length=100, verbose_name='出发城市')),
+                ('arrival_city', models.CharField(max_length=100, verbose_name='到达城市')),
+                ('status', models.CharField(choices=[('scheduled', '计划'), ('delayed', '延误'), ('boarding', '登机中'), ('departed', '已起飞'), ('arrived', '已到达'), ('cancelled', '取消')], max_length=20, verbose_name='航班状态')),
+                ('gate', models.CharField(blank=True, max_length=50, null=True, verbose_name='登机口')),
+                ('terminal', models.CharField(blank=True, max_length=50, null=True, verbose_name='航站楼')),
+                ('scheduled_departure_time', models.DateTimeField(verbose_name='计划出发时间')),
+                ('scheduled_arrival_time', models.DateTimeField(verbose_name='计划到达时间')),
+                ('actual_departure_time', models.DateTimeField(blank=True, null=True, verbose_name='实际出发时间')),
+                ('actual_arrival_time', models.DateTimeField(blank=True, null=True, verbose_name='实际到达时间')),
+                ('changes', models.JSONField(default=dict, encoder=apps.flight_management.models.ChangeJSONEncoder, help_text='{字段: [旧值, 新值]}，新建航班为空', verbose_name='变更内容')),
+                ('recorded_at', models.DateTimeField(auto_now_add=True, verbose_name='记录时间')),
+                ('flight', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_history', to='flight_management.flight', verbose_name='航班')),
+            ],
+            options={
+                'verbose_name': '航班状态历史',
+                'verbose_name_plural': '航班状态历史',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['flight', '-id'], name='flighthistory_flight_idx')],
+            },
+        ),
+    ]
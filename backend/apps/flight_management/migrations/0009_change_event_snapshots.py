@@ -0,0 +1,56 @@
+# Generated by Django 4.2.5 on 2026-10-18 21:17
+
+import apps.flight_management.models
+from django.db import migrations, models
+
+TRACKED_FIELDS = (
+    'status', 'gate', 'terminal',
+    'scheduled_departure_time', 'scheduled_arrival_time',
+    'actual_departure_time', 'actual_arrival_time',
+)
+
+
+def backfill_pending_snapshots(apps, schema_editor):
+    """
+    为未处理的事件补充变更前后的值：从航班当前值出发，按事件倒序逐个回退变更内容，
+    每个事件的变更后值即其后一个事件的变更前值
+    """
+    Flight = apps.get_model('flight_management', 'Flight')
+    FlightChangeEvent = apps.get_model('flight_management', 'FlightChangeEvent')
+
+    pending = FlightChangeEvent.objects.filter(processed_at__isnull=True)
+    flight_ids = set(pending.values_list('flight_id', flat=True))
+    current = {row['id']: row for row in Flight.objects.filter(id__in=flight_ids).values('id', *TRACKED_FIELDS)}
+    # 最后一个未处理事件之后已处理的事件也需要回退
+    events = FlightChangeEvent.objects.filter(flight_id__in=flight_ids).order_by('-id')
+    updated = []
+    for event in events.iterator():
+        row = current[event.flight_id]
+        after = {name: row[name] for name in TRACKED_FIELDS}
+        before = {**after, **{name: values[0] for name, values in event.changes.items() if name in after}}
+        current[event.flight_id] = before
+        if event.processed_at is None:
+            event.before, event.after = before, after
+            updated.append(event)
+    FlightChangeEvent.objects.bulk_update(updated, ['before', 'after'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight_management', '0008_flight_status_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flightchangeevent',
+            name='after',
+            field=models.JSONField(default=dict, encoder=apps.flight_management.models.ChangeJSONEncoder, help_text='变更后全部跟踪字段的值', verbose_name='变更后'),
+        ),
+        migrations.AddField(
+            model_name='flightchangeevent',
+            name='before',
+            field=models.JSONField(default=dict, encoder=apps.flight_management.models.ChangeJSONEncoder, help_text='变更前全部跟踪字段的值', verbose_name='变更前'),
+        ),
+        migrations.RunPython(backfill_pending_snapshots, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,106 @@
-from django.db import models
+import datetime
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
+class ChangeJSONEncoder(DjangoJSONEncoder):
+    """保留微秒的 JSON 编码器（DjangoJSONEncoder 会把时间截断到毫秒）"""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class FlightQuerySet(models.QuerySet):
+    """航班查询集"""
+
+    def update_and_record(self, **values):
+        """
+        批量更新航班，并为跟踪字段发生变化的航班记录变更事件
+
+        queryset.update() 不会触发 post_save，需要下游联动（播报、通知、行程调整）时使用本方法
+
+        Returns:
+            更新的行数
+        """
+        values.setdefault('updated_at', timezone.now())
+        tracked = [name for name in Flight.TRACKED_FIELDS if name in values]
+        grouping = [name for name in Flight.STATS_FIELDS if name in values]
+        with transaction.atomic(using=self.db):
+            before = list(self.select_for_update().values('pk', *tracked, *grouping))
+            count = self.update(**values)
+            events = FlightChangeEvent.record_many([
+                (row['pk'], {name: (row[name], values[name]) for name in tracked if row[name] != values[name]})
+                for row in before
+            ])
+            # 只有航空公司或航线变化的航班没有变更事件，单独追加快照使准点统计移到新的分组
+            recorded, regrouped = {event.flight_id for event in events}, {}
+            for row in before:
+                diff = {name: (row[name], values[name]) for name in grouping if row[name] != values[name]}
+                if diff and row['pk'] not in recorded:
+                    regrouped[row['pk']] = diff
+            from .punctuality import record_status_history
+            record_status_history(regrouped)
+            # 搜索字段变化时同步更新搜索索引
+            from .search import FIELD_WEIGHTS, reindex_flights
+            if any(field in values for field, weight in FIELD_WEIGHTS):
+                reindex_flights(Flight.objects.filter(pk__in=[row['pk'] for row in before]))
+            # 提交后更新已物化的航班动态板
+            from .board import schedule_refresh
+            schedule_refresh([row['pk'] for row in before])
+        return count
+
+    def bulk_update_and_record(self, updates, batch_size=None):
+        """
+        按航班分别更新（各航班的新值可以不同），在一个事务中用 bulk_update 写入，
+        并一次性记录全部变更事件
+
+        Args:
+            updates: {航班ID: {字段: 新值}}
+
+        Returns:
+            {航班ID: {字段: (旧值, 新值)}}，只包含实际发生变化的航班
+        """
+        now = timezone.now()
+        changed, flights = {}, []
+        with transaction.atomic(using=self.db):
+            for flight in self.select_for_update().filter(pk__in=list(updates)):
+                diff = {
+                    name: (getattr(flight, name), value)
+                    for name, value in updates[flight.pk].items()
+                    if getattr(flight, name) != value
+                }
+                if not diff:
+                    continue
+                for name, (old, new) in diff.items():
+                    setattr(flight, name, new)
+                flight.updated_at = now
+                changed[flight.pk] = diff
+                flights.append(flight)
+            if not flights:
+                return changed
+
+            fields = sorted({name for diff in changed.values() for name in diff})
+            self.bulk_update(flights, fields + ['updated_at'], batch_size=batch_size)
+            FlightChangeEvent.record_many([
+                (pk, {name: diff[name] for name in Flight.TRACKED_FIELDS if name in diff})
+                for pk, diff in changed.items()
+            ])
+            from .search import FIELD_WEIGHTS, reindex_flights
+            if any(field in fields for field, weight in FIELD_WEIGHTS):
+                reindex_flights(flights)
+            from .board import schedule_refresh
+            schedule_refresh(list(changed))
+        for flight in flights:
+            flight.snapshot_tracked_fields()
+        return changed
+
+
 class Flight(models.Model):
     """航班信息模型"""
     FLIGHT_STATUS_CHOICES = (
@@ -28,28 +127,69 @@ class Flight(models.Model):
     status = models.CharField(_('航班状态'), max_length=20, choices=FLIGHT_STATUS_CHOICES, default='scheduled')
     created_at = models.DateTimeField(_('创建时间'), auto_now_add=True)
     updated_at = models.DateTimeField(_('更新时间'), auto_now=True)
+
+    objects = FlightQuerySet.as_manager()
+
+    # 发生变化时需要联动播报、通知旅客和调整行程的字段
+    TRACKED_FIELDS = (
+        'status', 'gate', 'terminal',
+        'scheduled_departure_time', 'scheduled_arrival_time',
+        'actual_departure_time', 'actual_arrival_time',
+    )
+    # 准点统计的分组字段：变化时不产生变更事件，只追加状态快照，使统计移到新的分组
+    STATS_FIELDS = ('airline', 'departure_city', 'arrival_city')
     
     class Meta:
         verbose_name = _('航班')
         verbose_name_plural = _('航班')
         ordering = ['-scheduled_departure_time']
+        indexes = [
+            models.Index(fields=['-scheduled_departure_time'], name='flight_sched_dep_idx'),
+            models.Index(fields=['status', 'scheduled_departure_time'], name='flight_status_sched_dep_idx'),
+            models.Index(fields=['actual_departure_time'], name='flight_actual_dep_idx'),
+        ]
     
     def __str__(self):
         return f"{self.flight_number} - {self.departure_city} 至 {self.arrival_city}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.snapshot_tracked_fields()
+        return instance
+
+    def snapshot_tracked_fields(self):
+        """记录跟踪字段的当前值，用于保存时比较变化"""
+        self._tracked_values = {
+            name: getattr(self, name) for name in self.TRACKED_FIELDS + self.STATS_FIELDS if name in self.__dict__
+        }
+
+    def tracked_changes(self, fields=None):
+        """
+        与加载时相比发生变化的跟踪字段
+
+        Args:
+            fields: 比较的字段，默认 TRACKED_FIELDS
+
+        Returns:
+            {字段名: (旧值, 新值)}，新建的航班返回空字典
+        """
+        original = getattr(self, '_tracked_values', None)
+        if not original:
+            return {}
+        fields = self.TRACKED_FIELDS if fields is None else fields
+        return {
+            name: (old, getattr(self, name))
+            for name, old in original.items()
+            if name in fields and getattr(self, name) != old
+        }
     
     def get_status_display_for_voice(self):
         """
         返回适合语音播报的航班状态描述
         """
-        status_map = {
-            'scheduled': f'航班{self.flight_number}计划于{self.scheduled_departure_time.strftime("%Y年%m月%d日 %H时%M分")}从{self.departure_airport}{self.terminal}航站楼{self.gate}登机口出发。',
-            'delayed': f'航班{self.flight_number}延误，预计延误到{self.actual_departure_time.strftime("%Y年%m月%d日 %H时%M分") if self.actual_departure_time else "未知时间"}，请关注航班动态。',
-            'boarding': f'航班{self.flight_number}正在{self.terminal}航站楼{self.gate}登机口登机，请尽快前往。',
-            'departed': f'航班{self.flight_number}已于{self.actual_departure_time.strftime("%Y年%m月%d日 %H时%M分") if self.actual_departure_time else "未知时间"}起飞。',
-            'arrived': f'航班{self.flight_number}已于{self.actual_arrival_time.strftime("%Y年%m月%d日 %H时%M分") if self.actual_arrival_time else "未知时间"}到达{self.arrival_airport}。',
-            'cancelled': f'航班{self.flight_number}已取消，请联系航空公司获取更多信息。',
-        }
-        return status_map.get(self.status, f'航班{self.flight_number}状态未知')
+        from .voice import render_voice
+        return render_voice(self)
 
 
 class FlightAnnouncement(models.Model):
@@ -62,6 +202,177 @@ class FlightAnnouncement(models.Model):
         verbose_name = _('航班播报')
         verbose_name_plural = _('航班播报')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='flightann_created_idx'),
+            models.Index(fields=['flight', '-created_at'], name='flightann_flight_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.flight.flight_number} - {self.created_at.strftime('%Y-%m-%d %H:%M:%S')}"
+
+
+class FlightSubscription(models.Model):
+    """旅客关注（选择）的航班"""
+    passenger = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='flight_subscriptions', verbose_name=_('旅客'))
+    flight = models.ForeignKey(Flight, on_delete=models.CASCADE, related_name='subscriptions', verbose_name=_('航班'))
+    created_at = models.DateTimeField(_('选择时间'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('旅客航班关注')
+        verbose_name_plural = _('旅客航班关注')
+        ordering = ['-created_at']
+        unique_together = ['passenger', 'flight']
+        indexes = [
+            models.Index(fields=['flight', 'passenger'], name='flightsub_flight_passenger_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.passenger} -> {self.flight.flight_number}"
+
+    @classmethod
+    def subscriber_ids(cls, flight_id):
+        """关注指定航班的旅客ID列表"""
+        return list(cls.objects.filter(flight_id=flight_id).values_list('passenger_id', flat=True))
+
+
+class FlightChangeEvent(models.Model):
+    """航班变更事件（发件箱），由 fanout 处理进程批量联动"""
+    flight = models.ForeignKey(Flight, on_delete=models.CASCADE, related_name='change_events', verbose_name=_('航班'))
+    changes = models.JSONField(_('变更内容'), encoder=ChangeJSONEncoder, help_text=_('{字段: [旧值, 新值]}'))
+    before = models.JSONField(_('变更前'), encoder=ChangeJSONEncoder, default=dict, help_text=_('变更前全部跟踪字段的值'))
+    after = models.JSONField(_('变更后'), encoder=ChangeJSONEncoder, default=dict, help_text=_('变更后全部跟踪字段的值'))
+    created_at = models.DateTimeField(_('创建时间'), auto_now_add=True)
+    processed_at = models.DateTimeField(_('处理时间'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('航班变更事件')
+        verbose_name_plural = _('航班变更事件')
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['processed_at', 'id'], name='flightevent_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.flight_id}: {', '.join(self.changes)}"
+
+    @classmethod
+    def record_many(cls, items):
+        """
+        批量记录变更事件，并在事务提交后触发处理
+
+        航班已更新后调用：事件同时记录变更前后全部跟踪字段的值，
+        处理事件时只依据事件本身，不读取航班的当前值（同一航班的多个事件可能在同一批处理）
+
+        Args:
+            items: [(航班ID, {字段: (旧值, 新值)})]，变更为空的项会被跳过
+        """
+        items = [(flight_id, changes) for flight_id, changes in items if changes]
+        if not items:
+            return []
+        flights = Flight.objects.in_bulk({flight_id for flight_id, changes in items})
+        events = []
+        for flight_id, changes in items:
+            after = {name: getattr(flights[flight_id], name) for name in Flight.TRACKED_FIELDS}
+            before = {**after, **{name: old for name, (old, new) in changes.items()}}
+            events.append(cls(flight_id=flight_id, changes=changes, before=before, after=after))
+        events = cls.objects.bulk_create(events)
+        from .punctuality import record_status_history
+        record_status_history({event.flight_id: event.changes for event in events})
+        from .fanout import schedule_processing
+        schedule_processing(events)
+        return events
+
+
+class FlightStatusHistory(models.Model):
+    """航班状态历史（只追加），每次变更后记录航班的完整快照"""
+    flight = models.ForeignKey(Flight, on_delete=models.CASCADE, related_name='status_history', verbose_name=_('航班'))
+    flight_number = models.CharField(_('航班号'), max_length=20)
+    airline = models.CharField(_('航空公司'), max_length=100)
+    departure_city = models.CharField(_('出发城市'), max_length=100)
+    arrival_city = models.CharField(_('到达城市'), max_length=100)
+    status = models.CharField(_('航班状态'), max_length=20, choices=Flight.FLIGHT_STATUS_CHOICES)
+    gate = models.CharField(_('登机口'), max_length=50, null=True, blank=True)
+    terminal = models.CharField(_('航站楼'), max_length=50, null=True, blank=True)
+    scheduled_departure_time = models.DateTimeField(_('计划出发时间'))
+    scheduled_arrival_time = models.DateTimeField(_('计划到达时间'))
+    actual_departure_time = models.DateTimeField(_('实际出发时间'), null=True, blank=True)
+    actual_arrival_time = models.DateTimeField(_('实际到达时间'), null=True, blank=True)
+    changes = models.JSONField(_('变更内容'), encoder=ChangeJSONEncoder, default=dict, help_text=_('{字段: [旧值, 新值]}，新建航班为空'))
+    recorded_at = models.DateTimeField(_('记录时间'), auto_now_add=True)
+
+    # 快照中复制自航班的字段
+    SNAPSHOT_FIELDS = (
+        'flight_number', 'airline', 'departure_city', 'arrival_city', 'status', 'gate', 'terminal',
+        'scheduled_departure_time', 'scheduled_arrival_time', 'actual_departure_time', 'actual_arrival_time',
+    )
+
+    class Meta:
+        verbose_name = _('航班状态历史')
+        verbose_name_plural = _('航班状态历史')
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['flight', '-id'], name='flighthistory_flight_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.flight_number} - {self.get_status_display()} ({self.recorded_at:%Y-%m-%d %H:%M:%S})"
+
+
+class FlightPunctualityStat(models.Model):
+    """按 日期/航空公司/航线 汇总的准点统计，随状态历史增量维护，查询无需扫描历史"""
+    date = models.DateField(_('日期'), help_text=_('计划出发日期'))
+    airline = models.CharField(_('航空公司'), max_length=100)
+    departure_city = models.CharField(_('出发城市'), max_length=100)
+    arrival_city = models.CharField(_('到达城市'), max_length=100)
+    operated = models.IntegerField(_('执行航班数'), default=0)
+    on_time = models.IntegerField(_('准点航班数'), default=0)
+    cancelled = models.IntegerField(_('取消航班数'), default=0)
+    delay_minutes = models.IntegerField(_('累计延误分钟数'), default=0)
+
+    class Meta:
+        verbose_name = _('航班准点统计')
+        verbose_name_plural = _('航班准点统计')
+        ordering = ['-date', 'airline']
+        unique_together = ['date', 'airline', 'departure_city', 'arrival_city']
+        indexes = [
+            models.Index(fields=['airline', 'date'], name='punctuality_airline_date_idx'),
+            models.Index(fields=['departure_city', 'arrival_city', 'date'], name='punctuality_route_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.airline} {self.departure_city}-{self.arrival_city}: {self.on_time}/{self.operated}"
+
+
+class FlightNotification(models.Model):
+    """推送给关注航班旅客的通知"""
+    passenger = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='flight_notifications', verbose_name=_('旅客'))
+    flight = models.ForeignKey(Flight, on_delete=models.CASCADE, related_name='notifications', verbose_name=_('航班'))
+    event = models.ForeignKey(FlightChangeEvent, on_delete=models.SET_NULL, null=True, blank=True, related_name='notifications', verbose_name=_('变更事件'))
+    content = models.TextField(_('通知内容'))
+    is_read = models.BooleanField(_('是否已读'), default=False)
+    created_at = models.DateTimeField(_('创建时间'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('航班通知')
+        verbose_name_plural = _('航班通知')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['passenger', 'is_read', '-created_at'], name='flightnotice_passenger_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.passenger} - {self.flight.flight_number}"
+
+
+class FlightSearchToken(models.Model):
+    """航班搜索索引词条，由 apps.flight_management.search 维护"""
+    flight = models.ForeignKey(Flight, on_delete=models.CASCADE, related_name='search_tokens', verbose_name=_('航班'))
+    token = models.CharField(_('词条'), max_length=20)
+
+    class Meta:
+        verbose_name = _('航班搜索词条')
+        verbose_name_plural = _('航班搜索词条')
+        unique_together = ['token', 'flight']
+
+    def __str__(self):
+        return f"{self.token} -> {self.flight_id}"
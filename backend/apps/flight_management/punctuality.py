@@ -0,0 +1,197 @@
+"""
+航班状态历史与准点统计
+
+航班新建或跟踪字段变化时，在同一事务中：
+    1. 为航班追加一条 FlightStatusHistory 快照
+    2. 比较该航班上一条快照与新快照对准点统计的贡献，把差值累加到 FlightPunctualityStat
+
+航班对统计的贡献由快照决定：
+    已起飞/已到达  计入执行航班，出发延误不超过 FLIGHT_ON_TIME_THRESHOLD_MINUTES 分钟计为准点
+    已取消        计入取消航班
+    其他状态      不计入
+实际时间更正、取消后恢复等情况会先扣除旧贡献再计入新贡献，统计始终与最新快照一致。
+统计按计划出发日期（本地时间）、航空公司、航线分组，查询时只读取汇总行；航空公司或航线（Flight.STATS_FIELDS）
+变化时同样追加快照，旧贡献从原分组扣除、计入新分组。
+读取上一条快照前锁定航班行，同一航班的并发保存依次计算差值，不会重复累加
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max, Sum
+from django.utils import timezone
+
+from .models import Flight, FlightPunctualityStat, FlightStatusHistory
+
+DEFAULT_ON_TIME_THRESHOLD_MINUTES = 15
+OPERATED_STATUSES = ('departed', 'arrived')
+COUNTERS = ('operated', 'on_time', 'cancelled', 'delay_minutes')
+
+
+def contribution(snapshot):
+    """
+    快照对准点统计的贡献
+
+    Returns:
+        (分组键, {计数字段: 增量})，不计入统计时返回 None
+    """
+    if snapshot is None:
+        return None
+    key = (
+        timezone.localdate(snapshot.scheduled_departure_time),
+        snapshot.airline, snapshot.departure_city, snapshot.arrival_city,
+    )
+    if snapshot.status == 'cancelled':
+        return key, {'cancelled': 1}
+    if snapshot.status in OPERATED_STATUSES:
+        departed_at = snapshot.actual_departure_time or snapshot.scheduled_departure_time
+        delay = max(0, round((departed_at - snapshot.scheduled_departure_time).total_seconds() / 60))
+        threshold = getattr(settings, 'FLIGHT_ON_TIME_THRESHOLD_MINUTES', DEFAULT_ON_TIME_THRESHOLD_MINUTES)
+        return key, {'operated': 1, 'on_time': int(delay <= threshold), 'delay_minutes': delay}
+    return None
+
+
+def apply_deltas(deltas):
+    """
+    把增量累加到统计行
+
+    Args:
+        deltas: {(日期, 航空公司, 出发城市, 到达城市): {计数字段: 增量}}
+    """
+    for (date, airline, departure_city, arrival_city), values in deltas.items():
+        values = {name: value for name, value in values.items() if value}
+        if not values:
+            continue
+        lookup = {'date': date, 'airline': airline, 'departure_city': departure_city, 'arrival_city': arrival_city}
+        updates = {name: F(name) + value for name, value in values.items()}
+        if FlightPunctualityStat.objects.filter(**lookup).update(**updates):
+            continue
+        stat, created = FlightPunctualityStat.objects.get_or_create(**lookup, defaults=values)
+        if not created:
+            FlightPunctualityStat.objects.filter(pk=stat.pk).update(**updates)
+
+
+def latest_snapshots(flight_ids):
+    """各航班最近一条状态快照"""
+    latest_ids = FlightStatusHistory.objects.filter(flight_id__in=flight_ids).values('flight_id').annotate(
+        latest=Max('id')
+    ).values('latest')
+    return {row.flight_id: row for row in FlightStatusHistory.objects.filter(id__in=latest_ids)}
+
+
+def record_status_history(changes_by_flight):
+    """
+    为航班追加状态快照并增量更新准点统计
+
+    Args:
+        changes_by_flight: {航班ID: {字段: (旧值, 新值)}}，新建的航班传空字典
+    """
+    if not changes_by_flight:
+        return []
+    with transaction.atomic():
+        # 按主键顺序锁定航班并读取最新值，避免并发保存时基于同一条上一快照重复计算
+        flights = Flight.objects.select_for_update().order_by('pk').in_bulk(list(changes_by_flight))
+        previous = latest_snapshots(list(flights))
+        snapshots = FlightStatusHistory.objects.bulk_create([
+            FlightStatusHistory(
+                flight=flight,
+                changes=changes_by_flight[flight_id],
+                **{name: getattr(flight, name) for name in FlightStatusHistory.SNAPSHOT_FIELDS},
+            )
+            for flight_id, flight in flights.items()
+        ])
+
+        deltas = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+        for snapshot in snapshots:
+            old, new = contribution(previous.get(snapshot.flight_id)), contribution(snapshot)
+            if old == new:
+                continue
+            if old is not None:
+                for name, value in old[1].items():
+                    deltas[old[0]][name] -= value
+            if new is not None:
+                for name, value in new[1].items():
+                    deltas[new[0]][name] += value
+        apply_deltas(deltas)
+    return snapshots
+
+
+def snapshot_missing_flights(batch_size=1000):
+    """为还没有状态历史的航班（如上线前已存在的航班）补充初始快照，返回补充的航班数"""
+    total = 0
+    missing = Flight.objects.exclude(status_history__isnull=False).order_by('pk').values_list('pk', flat=True)
+    batch = []
+    for flight_id in missing.iterator(chunk_size=batch_size):
+        batch.append(flight_id)
+        if len(batch) >= batch_size:
+            record_status_history(dict.fromkeys(batch, {}))
+            total += len(batch)
+            batch = []
+    record_status_history(dict.fromkeys(batch, {}))
+    return total + len(batch)
+
+
+def rebuild_stats(batch_size=1000):
+    """
+    按各航班最新快照重新生成准点统计
+
+    Returns:
+        写入的统计行数
+    """
+    totals = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    latest_ids = FlightStatusHistory.objects.values('flight_id').annotate(latest=Max('id')).values('latest')
+    for snapshot in FlightStatusHistory.objects.filter(id__in=latest_ids).iterator(chunk_size=batch_size):
+        item = contribution(snapshot)
+        if item is not None:
+            for name, value in item[1].items():
+                totals[item[0]][name] += value
+
+    with transaction.atomic():
+        FlightPunctualityStat.objects.all().delete()
+        objs = FlightPunctualityStat.objects.bulk_create([
+            FlightPunctualityStat(
+                date=date, airline=airline, departure_city=departure_city, arrival_city=arrival_city, **values
+            )
+            for (date, airline, departure_city, arrival_city), values in totals.items()
+        ], batch_size=batch_size)
+    return len(objs)
+
+
+def with_rates(totals):
+    """在计数基础上计算准点率、取消率和平均延误"""
+    operated = totals['operated']
+    scheduled = operated + totals['cancelled']
+    return {
+        **totals,
+        'on_time_rate': round(totals['on_time'] / operated, 4) if operated else None,
+        'cancel_rate': round(totals['cancelled'] / scheduled, 4) if scheduled else None,
+        'average_delay_minutes': round(totals['delay_minutes'] / operated, 1) if operated else None,
+    }
+
+
+def punctuality(start_date, end_date, airline=None, departure_city=None, arrival_city=None, group_by=None):
+    """
+    查询准点统计
+
+    Args:
+        group_by: None 时返回整体汇总，airline 或 route 时按航空公司/航线分组
+
+    Returns:
+        汇总字典，或分组后的列表（按准点率从高到低）
+    """
+    queryset = FlightPunctualityStat.objects.filter(date__gte=start_date, date__lte=end_date)
+    if airline:
+        queryset = queryset.filter(airline=airline)
+    if departure_city:
+        queryset = queryset.filter(departure_city=departure_city)
+    if arrival_city:
+        queryset = queryset.filter(arrival_city=arrival_city)
+    sums = {name: Sum(name) for name in COUNTERS}
+    if group_by is None:
+        totals = queryset.aggregate(**sums)
+        return with_rates({name: totals[name] or 0 for name in COUNTERS})
+
+    fields = ['airline'] if group_by == 'airline' else ['departure_city', 'arrival_city']
+    groups = [with_rates(row) for row in queryset.values(*fields).annotate(**sums).order_by(*fields)]
+    groups.sort(key=lambda group: (group['on_time_rate'] is None, -(group['on_time_rate'] or 0)))
+    return groups
@@ -0,0 +1,187 @@
+"""
+航班搜索索引
+
+把航班号、航空公司、城市、机场名称切分为词条写入 FlightSearchToken 表：
+    英文字母/数字串   记录全部前缀（如 CA1234 -> c, ca, ca1, ...），数字部分单独记录前缀，
+                     以支持 "CA12"、"1234" 这类输入
+    中文等其他文字   记录单字和相邻两字（bigram），以支持任意位置的子串输入
+
+查询时把关键字按同样规则切分，要求命中全部词条，再对候选航班做子串校验并按字段权重排序。
+航班保存时通过信号更新索引，删除时随外键级联删除；批量导入后可调用 reindex_flights，
+或使用 rebuild_flight_search_index 管理命令重建
+"""
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Flight, FlightSearchToken
+
+MAX_TOKEN_LENGTH = 20
+DEFAULT_MAX_CANDIDATES = 200
+
+# 参与索引的字段及排序权重
+FIELD_WEIGHTS = (
+    ('flight_number', 30),
+    ('departure_city', 20),
+    ('arrival_city', 20),
+    ('airline', 10),
+    ('departure_airport', 8),
+    ('arrival_airport', 8),
+)
+
+ASCII_RUN_RE = re.compile(r'[a-z0-9]+')
+DIGIT_RUN_RE = re.compile(r'[0-9]+')
+# 非 ASCII 的文字字符（中文等）
+OTHER_RUN_RE = re.compile(r'[^\W\x00-\x7f]+')
+
+
+def normalize(text):
+    # NFKC 把全角字母数字转换为半角
+    return unicodedata.normalize('NFKC', text or '').strip().lower()
+
+
+def prefixes(word):
+    return {word[:length] for length in range(1, min(len(word), MAX_TOKEN_LENGTH) + 1)}
+
+
+def ngrams(run):
+    grams = set(run)
+    grams.update(run[i:i + 2] for i in range(len(run) - 1))
+    return grams
+
+
+def document_tokens(values):
+    """
+    生成索引词条
+
+    Args:
+        values: 需要索引的字段值列表
+    """
+    tokens = set()
+    for value in values:
+        value = normalize(value)
+        for word in ASCII_RUN_RE.findall(value):
+            tokens |= prefixes(word)
+            for digits in DIGIT_RUN_RE.findall(word):
+                tokens |= prefixes(digits)
+        for run in OTHER_RUN_RE.findall(value):
+            tokens |= ngrams(run)
+    return tokens
+
+
+def query_tokens(query):
+    """
+    把搜索关键字切分为查询词条和用于校验的关键词
+
+    Returns:
+        (词条集合, 关键词列表)
+    """
+    tokens, terms = set(), []
+    query = normalize(query)
+    for word in ASCII_RUN_RE.findall(query):
+        terms.append(word)
+        tokens.add(word[:MAX_TOKEN_LENGTH])
+    for run in OTHER_RUN_RE.findall(query):
+        terms.append(run)
+        if len(run) == 1:
+            tokens.add(run)
+        else:
+            tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens, terms
+
+
+def flight_tokens(flight):
+    return document_tokens(getattr(flight, field) for field, _ in FIELD_WEIGHTS)
+
+
+def reindex_flights(flights):
+    """
+    重建指定航班的索引词条
+
+    Args:
+        flights: Flight 对象列表或查询集
+    """
+    flights = list(flights)
+    if not flights:
+        return 0
+    rows = [
+        FlightSearchToken(flight_id=flight.pk, token=token)
+        for flight in flights
+        for token in flight_tokens(flight)
+    ]
+    with transaction.atomic():
+        FlightSearchToken.objects.filter(flight_id__in=[flight.pk for flight in flights]).delete()
+        FlightSearchToken.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def rebuild_index(batch_size=500):
+    """重建全部航班的索引，返回处理的航班数"""
+    FlightSearchToken.objects.all().delete()
+    total = 0
+    batch = []
+    for flight in Flight.objects.order_by('pk').iterator(chunk_size=batch_size):
+        batch.append(flight)
+        if len(batch) >= batch_size:
+            reindex_flights(batch)
+            total += len(batch)
+            batch = []
+    reindex_flights(batch)
+    return total + len(batch)
+
+
+def score_flight(flight, terms):
+    """
+    计算航班与关键词的相关度，任一关键词未在任何字段中出现时返回 0
+
+    完全相同 > 前缀匹配 > 子串匹配，按字段权重累加
+    """
+    score = 0
+    for term in terms:
+        term_score = 0
+        for field, weight in FIELD_WEIGHTS:
+            value = normalize(getattr(flight, field))
+            if value == term:
+                term_score += weight * 3
+            elif value.startswith(term):
+                term_score += weight * 2
+            elif term in value:
+                term_score += weight
+        if not term_score:
+            return 0
+        score += term_score
+    return score
+
+
+def search_flights(query, queryset=None, limit=None):
+    """
+    搜索航班
+
+    Args:
+        query: 搜索关键字，可包含多个以空格或标点分隔的关键词
+        queryset: 限定的航班查询集，默认全部航班
+        limit: 参与排序的候选航班数上限，默认 FLIGHT_SEARCH_MAX_CANDIDATES
+
+    Returns:
+        按相关度、计划出发时间倒序排列的航班列表
+    """
+    tokens, terms = query_tokens(query)
+    if not tokens:
+        return []
+    if queryset is None:
+        queryset = Flight.objects.all()
+    if limit is None:
+        limit = getattr(settings, 'FLIGHT_SEARCH_MAX_CANDIDATES', DEFAULT_MAX_CANDIDATES)
+
+    matched = FlightSearchToken.objects.filter(token__in=tokens).values('flight_id').annotate(
+        hits=Count('token')
+    ).filter(hits=len(tokens)).values('flight_id')
+    candidates = queryset.filter(pk__in=matched).order_by('-scheduled_departure_time')[:limit]
+
+    scored = [(score_flight(flight, terms), flight) for flight in candidates]
+    scored = [item for item in scored if item[0] > 0]
+    scored.sort(key=lambda item: (-item[0], -item[1].scheduled_departure_time.timestamp()))
+    return [flight for _, flight in scored]
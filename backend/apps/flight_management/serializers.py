@@ -1,14 +1,31 @@
 from rest_framework import serializers
-from .models import Flight, FlightAnnouncement
+from django.db import models
+
+from .models import Flight, FlightAnnouncement, FlightNotification, FlightStatusHistory
+from .voice import get_voice_text, get_voice_texts
+
+
+class FlightListVoiceSerializer(serializers.ListSerializer):
+    """批量序列化航班时一次读取全部播报文本缓存"""
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.Manager) else data)
+        self.child.voice_texts = get_voice_texts(items)
+        try:
+            return super().to_representation(items)
+        finally:
+            self.child.voice_texts = None
 
 
 class FlightSerializer(serializers.ModelSerializer):
     """航班信息序列化器"""
     status_display = serializers.CharField(source='get_status_display', read_only=True)
-    voice_status = serializers.CharField(source='get_status_display_for_voice', read_only=True)
+    voice_status = serializers.SerializerMethodField()
+    voice_texts = None
     
     class Meta:
         model = Flight
+        list_serializer_class = FlightListVoiceSerializer
         fields = [
             'id', 'flight_number', 'airline', 
             'departure_city', 'arrival_city', 
@@ -19,6 +36,11 @@ class FlightSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
 
+    def get_voice_status(self, obj):
+        if self.voice_texts and obj.pk in self.voice_texts:
+            return self.voice_texts[obj.pk]
+        return get_voice_text(obj)
+
 
 class FlightListSerializer(serializers.ModelSerializer):
     """航班列表序列化器，用于列表展示减少数据量"""
@@ -34,6 +56,21 @@ class FlightListSerializer(serializers.ModelSerializer):
         ]
 
 
+class FlightBoardSerializer(serializers.ModelSerializer):
+    """航班动态板序列化器"""
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    
+    class Meta:
+        model = Flight
+        fields = [
+            'id', 'flight_number', 'airline',
+            'departure_city', 'arrival_city',
+            'scheduled_departure_time', 'scheduled_arrival_time',
+            'actual_departure_time', 'actual_arrival_time',
+            'gate', 'terminal', 'status', 'status_display'
+        ]
+
+
 class FlightAnnouncementSerializer(serializers.ModelSerializer):
     """航班播报序列化器"""
     flight_number = serializers.CharField(source='flight.flight_number', read_only=True)
@@ -63,4 +100,55 @@ class FlightAnnouncementCreateSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         flight_number = validated_data.pop('flight_number')
         flight = Flight.objects.get(flight_number=flight_number)
-        return FlightAnnouncement.objects.create(flight=flight, **validated_data) 
\ No newline at end of file
+        return FlightAnnouncement.objects.create(flight=flight, **validated_data) 
+
+
+class FlightNotificationSerializer(serializers.ModelSerializer):
+    """航班通知序列化器"""
+    flight_number = serializers.CharField(source='flight.flight_number', read_only=True)
+    
+    class Meta:
+        model = FlightNotification
+        fields = ['id', 'flight', 'flight_number', 'content', 'is_read', 'created_at']
+        read_only_fields = fields
+
+
+class FlightBulkUpdateItemSerializer(serializers.Serializer):
+    """批量更新中的单个航班，按 id 或 flight_number 定位"""
+    UPDATE_FIELDS = (
+        'status', 'gate', 'terminal',
+        'scheduled_departure_time', 'scheduled_arrival_time',
+        'actual_departure_time', 'actual_arrival_time',
+    )
+
+    id = serializers.IntegerField(required=False)
+    flight_number = serializers.CharField(max_length=20, required=False)
+    status = serializers.ChoiceField(choices=Flight.FLIGHT_STATUS_CHOICES, required=False)
+    gate = serializers.CharField(max_length=50, required=False, allow_null=True, allow_blank=True)
+    terminal = serializers.CharField(max_length=50, required=False, allow_null=True, allow_blank=True)
+    scheduled_departure_time = serializers.DateTimeField(required=False)
+    scheduled_arrival_time = serializers.DateTimeField(required=False)
+    actual_departure_time = serializers.DateTimeField(required=False, allow_null=True)
+    actual_arrival_time = serializers.DateTimeField(required=False, allow_null=True)
+
+    def validate(self, attrs):
+        if 'id' not in attrs and 'flight_number' not in attrs:
+            raise serializers.ValidationError('请提供航班 id 或 flight_number')
+        if not any(name in attrs for name in self.UPDATE_FIELDS):
+            raise serializers.ValidationError(f'至少需要更新以下字段之一: {", ".join(self.UPDATE_FIELDS)}')
+        return attrs
+
+
+class FlightStatusHistorySerializer(serializers.ModelSerializer):
+    """航班状态历史序列化器"""
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+
+    class Meta:
+        model = FlightStatusHistory
+        fields = [
+            'id', 'flight', 'flight_number', 'status', 'status_display', 'gate', 'terminal',
+            'scheduled_departure_time', 'scheduled_arrival_time',
+            'actual_departure_time', 'actual_arrival_time',
+            'changes', 'recorded_at'
+        ]
+        read_only_fields = fields
@@ -0,0 +1,42 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .board import schedule_refresh
+from .models import Flight, FlightChangeEvent
+from .punctuality import record_status_history
+from .search import reindex_flights
+from .voice import invalidate_voice_text
+
+
+@receiver(post_save, sender=Flight)
+def update_search_index(sender, instance, **kwargs):
+    """航班保存后更新搜索索引（删除时词条随外键级联删除）"""
+    reindex_flights([instance])
+
+
+@receiver(post_save, sender=Flight)
+def record_flight_changes(sender, instance, created, **kwargs):
+    """航班状态、登机口、航站楼或时间变化时记录变更事件"""
+    if created:
+        # 新建航班记录初始状态快照
+        record_status_history({instance.pk: {}})
+    else:
+        events = FlightChangeEvent.record_many([(instance.pk, instance.tracked_changes())])
+        grouping = instance.tracked_changes(Flight.STATS_FIELDS)
+        if grouping and not events:
+            # 只有航空公司或航线变化，追加快照使准点统计移到新的分组
+            record_status_history({instance.pk: grouping})
+    instance.snapshot_tracked_fields()
+
+
+@receiver(post_save, sender=Flight)
+def clear_voice_cache(sender, instance, **kwargs):
+    """航班保存后删除播报文本缓存"""
+    invalidate_voice_text(instance)
+
+
+@receiver(post_save, sender=Flight)
+@receiver(post_delete, sender=Flight)
+def refresh_flight_boards(sender, instance, **kwargs):
+    """航班保存或删除后更新航班动态板与登机口占用索引"""
+    schedule_refresh([instance.pk])
@@ -1,3 +1,733 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.navigation_management.models import TimeSchedule
+from .models import (
+    Flight, FlightAnnouncement, FlightChangeEvent, FlightNotification, FlightPunctualityStat, FlightSearchToken,
+    FlightStatusHistory, FlightSubscription
+)
+from .fanout import purge_processed
+from .gates import gate_conflicts_detected
+from .ingest import import_flights
+from .search import search_flights
+from .voice import get_voice_text, voice_cache_key
+
+User = get_user_model()
+
+
+def create_flight(flight_number, departure_city='北京', arrival_city='上海', hours=2, **kwargs):
+    now = timezone.now()
+    defaults = {
+        'airline': '中国国际航空',
+        'departure_airport': f'{departure_city}首都国际机场',
+        'arrival_airport': f'{arrival_city}虹桥国际机场',
+        'scheduled_departure_time': now + timezone.timedelta(hours=hours),
+        'scheduled_arrival_time': now + timezone.timedelta(hours=hours + 2),
+    }
+    defaults.update(kwargs)
+    return Flight.objects.create(
+        flight_number=flight_number, departure_city=departure_city, arrival_city=arrival_city, **defaults
+    )
+
+
+class FlightSearchTests(TestCase):
+    """航班搜索索引测试"""
+
+    def setUp(self):
+        # 相关度相同时按计划出发时间倒序
+        self.ca1234 = create_flight('CA1234', hours=3)
+        self.ca1288 = create_flight('CA1288', '广州', '成都', hours=2, airline='Air China')
+        self.mu5101 = create_flight('MU5101', '上海', '北京', hours=1, airline='东方航空')
+
+    def numbers(self, query):
+        return [flight.flight_number for flight in search_flights(query)]
+
+    def test_flight_number_prefix(self):
+        self.assertEqual(self.numbers('CA12'), ['CA1234', 'CA1288'])
+        self.assertEqual(self.numbers('ca123'), ['CA1234'])
+        self.assertEqual(self.numbers('5101'), ['MU5101'])
+        self.assertEqual(self.numbers('ＣＡ１２３４'), ['CA1234'])
+
+    def test_chinese_substring_and_ranking(self):
+        # 城市完全匹配排在航空公司名称前缀匹配之前，即使后者出发时间更晚
+        create_flight('ZH9001', '厦门', '上海', hours=5, airline='广州航空服务')
+        self.assertEqual(self.numbers('广州'), ['CA1288', 'ZH9001'])
+        self.assertEqual(self.numbers('上海'), ['ZH9001', 'CA1234', 'MU5101'])
+        self.assertEqual(self.numbers('成'), ['CA1288'])
+        self.assertEqual(self.numbers('东方 北京'), ['MU5101'])
+        self.assertEqual(self.numbers('china'), ['CA1288'])
+        self.assertEqual(self.numbers('深圳'), [])
+
+    def test_index_follows_save_and_delete(self):
+        self.ca1234.arrival_city = '深圳'
+        self.ca1234.save()
+        self.assertEqual(self.numbers('深圳'), ['CA1234'])
+        self.ca1234.delete()
+        self.assertEqual(self.numbers('深圳'), [])
+        self.assertFalse(FlightSearchToken.objects.filter(flight_id=self.ca1234.pk).exists())
+
+    def test_rebuild_command(self):
+        FlightSearchToken.objects.all().delete()
+        self.assertEqual(self.numbers('CA12'), [])
+        call_command('rebuild_flight_search_index', stdout=open('/dev/null', 'w'))
+        self.assertEqual(self.numbers('CA12'), ['CA1234', 'CA1288'])
+
+    def test_search_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='passenger', password='testpassword'))
+        response = client.get('/api/flight-management/flights/search/', {'q': 'CA12'})
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(response.data['results'][0]['flight_number'], 'CA1234')
+        self.assertEqual(client.get('/api/flight-management/flights/search/').status_code, 400)
+
+
+class FlightSubscriptionTests(TestCase):
+    """旅客航班关注测试"""
+
+    def setUp(self):
+        self.passenger = User.objects.create_user(username='passenger', password='testpassword')
+        self.other = User.objects.create_user(username='other', password='testpassword')
+        self.flight = create_flight('CA1234', hours=3)
+        self.later = create_flight('MU5101', hours=5)
+        self.client = APIClient()
+        self.client.force_authenticate(self.passenger)
+
+    def url(self, action, flight=None):
+        if flight:
+            return f'/api/flight-management/passenger/{flight.pk}/{action}/'
+        return f'/api/flight-management/passenger/{action}/'
+
+    def test_select_unselect_and_my_flights(self):
+        for flight in (self.flight, self.later, self.flight):
+            self.assertEqual(self.client.post(self.url('select', flight)).status_code, 200)
+        self.assertEqual(FlightSubscription.objects.filter(passenger=self.passenger).count(), 2)
+        FlightSubscription.objects.create(passenger=self.other, flight=self.flight)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url('my_flights'))
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual([row['flight_number'] for row in response.data['results']], ['MU5101', 'CA1234'])
+
+        self.client.post(self.url('unselect', self.flight))
+        self.client.post(self.url('unselect', self.flight))
+        response = self.client.get(self.url('my_flights'))
+        self.assertEqual([row['flight_number'] for row in response.data['results']], ['MU5101'])
+        self.assertEqual(FlightSubscription.subscriber_ids(self.flight.pk), [self.other.pk])
+
+    def test_select_missing_flight(self):
+        self.assertEqual(self.client.post('/api/flight-management/passenger/999999/select/').status_code, 404)
+
+
+@override_settings(FLIGHT_CHANGE_FANOUT={'MODE': 'sync'})
+class FlightChangeFanoutTests(TestCase):
+    """航班变更联动测试"""
+
+    def setUp(self):
+        self.flight = create_flight('CA1234', hours=3, gate='A1', terminal='T3')
+        self.passengers = [
+            User.objects.create_user(username=f'passenger{i}', password='testpassword') for i in range(3)
+        ]
+        for passenger in self.passengers[:2]:
+            FlightSubscription.objects.create(passenger=passenger, flight=self.flight)
+        self.boarding = TimeSchedule.objects.create(
+            passenger=self.passengers[0], flight_code='CA1234', event_name='登机', event_type='boarding',
+            start_time=self.flight.scheduled_departure_time - timezone.timedelta(minutes=40),
+            end_time=self.flight.scheduled_departure_time - timezone.timedelta(minutes=10),
+        )
+        self.done = TimeSchedule.objects.create(
+            passenger=self.passengers[0], flight_code='CA1234', event_name='值机', event_type='check_in',
+            start_time=self.flight.scheduled_departure_time - timezone.timedelta(hours=2), is_completed=True,
+        )
+
+    def test_status_change_fans_out(self):
+        flight = Flight.objects.get(pk=self.flight.pk)
+        flight.status = 'delayed'
+        flight.gate = 'B2'
+        flight.actual_departure_time = flight.scheduled_departure_time + timezone.timedelta(hours=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            flight.save()
+
+        event = FlightChangeEvent.objects.get()
+        self.assertIsNotNone(event.processed_at)
+        self.assertEqual(set(event.changes), {'status', 'gate', 'actual_departure_time'})
+
+        announcement = FlightAnnouncement.objects.get(flight=flight)
+        self.assertIn('航班CA1234延误', announcement.content)
+        self.assertIn('登机口由A1变更为B2', announcement.content)
+        self.assertEqual(
+            set(FlightNotification.objects.values_list('passenger_id', flat=True)),
+            {passenger.pk for passenger in self.passengers[:2]}
+        )
+
+        boarding_start = self.boarding.start_time
+        self.boarding.refresh_from_db()
+        self.assertEqual(self.boarding.start_time - boarding_start, timezone.timedelta(hours=1))
+        done_start = self.done.start_time
+        self.done.refresh_from_db()
+        self.assertEqual(self.done.start_time, done_start)
+
+        # 未修改跟踪字段时不产生事件
+        flight.airline = '国航'
+        with self.captureOnCommitCallbacks(execute=True):
+            flight.save()
+        self.assertEqual(FlightChangeEvent.objects.count(), 1)
+
+    def test_bulk_update_records_events(self):
+        other = create_flight('MU5101', hours=4, gate='C1')
+        with self.captureOnCommitCallbacks(execute=True):
+            count = Flight.objects.filter(pk__in=[self.flight.pk, other.pk]).update_and_record(gate='C1')
+        self.assertEqual(count, 2)
+        # MU5101 登机口未变化，只为 CA1234 记录事件
+        self.assertEqual(list(FlightChangeEvent.objects.values_list('flight_id', flat=True)), [self.flight.pk])
+        self.assertEqual(FlightNotification.objects.count(), 2)
+
+    @override_settings(FLIGHT_CHANGE_FANOUT={'MODE': 'worker', 'BATCH_SIZE': 2})
+    def test_worker_processes_in_batches(self):
+        for gate in ('B1', 'B2', 'B3'):
+            self.flight.gate = gate
+            with self.captureOnCommitCallbacks(execute=True):
+                self.flight.save()
+        self.assertEqual(FlightChangeEvent.objects.filter(processed_at__isnull=True).count(), 3)
+
+        call_command('run_flight_fanout', '--once', stdout=open('/dev/null', 'w'))
+        self.assertFalse(FlightChangeEvent.objects.filter(processed_at__isnull=True).exists())
+        # 同一批中同一航班的事件合并处理：第一批（B1、B2）一条播报，第二批（B3）一条播报
+        self.assertEqual(FlightAnnouncement.objects.count(), 2)
+        self.assertEqual(FlightNotification.objects.count(), 4)
+
+    @override_settings(FLIGHT_CHANGE_FANOUT={'MODE': 'worker'})
+    def test_batch_coalesces_events_per_flight(self):
+        # 同一批处理的多个事件合并为一个：按最早的旧值和最新的新值生成播报、平移行程
+        departure = self.flight.scheduled_departure_time
+        tomorrow = TimeSchedule.objects.create(
+            passenger=self.passengers[0], flight_code='CA1234', event_name='次日登机', event_type='boarding',
+            start_time=departure + timezone.timedelta(days=1, minutes=-40),
+        )
+        self.flight.actual_departure_time = departure + timezone.timedelta(hours=1)
+        self.flight.save()
+        self.flight.status = 'delayed'
+        self.flight.save()
+        self.flight.actual_departure_time = departure + timezone.timedelta(hours=3)
+        self.flight.gate = 'B2'
+        self.flight.save()
+        self.flight.terminal, terminal = 'T9', self.flight.terminal
+        self.flight.save()
+        self.flight.terminal = terminal
+        self.flight.save()
+
+        first, second = FlightChangeEvent.objects.order_by('id')[:2]
+        self.assertIsNone(first.before['actual_departure_time'])
+        self.assertEqual(second.after['status'], 'delayed')
+        call_command('run_flight_fanout', '--once', stdout=open('/dev/null', 'w'))
+
+        [content] = FlightAnnouncement.objects.values_list('content', flat=True)
+        self.assertIn('登机口由A1变更为B2', content)
+        # 航站楼改回原值，不再播报
+        self.assertNotIn('航站楼', content)
+        self.assertEqual(FlightNotification.objects.count(), 2)
+        self.assertEqual(set(FlightNotification.objects.values_list('event', flat=True)), {
+            FlightChangeEvent.objects.latest('id').pk
+        })
+
+        boarding_start = self.boarding.start_time
+        self.boarding.refresh_from_db()
+        self.assertEqual(self.boarding.start_time - boarding_start, timezone.timedelta(hours=3))
+        tomorrow_start = tomorrow.start_time
+        tomorrow.refresh_from_db()
+        self.assertEqual(tomorrow.start_time, tomorrow_start)
+
+    def test_purge_processed_events(self):
+        self.flight.gate = 'B1'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.flight.save()
+        self.assertEqual(purge_processed(), 0)
+        FlightChangeEvent.objects.update(processed_at=timezone.now() - timezone.timedelta(days=8))
+        self.assertEqual(purge_processed(), 1)
+        self.assertFalse(FlightChangeEvent.objects.exists())
+        self.assertEqual(FlightNotification.objects.filter(event__isnull=True).count(), 2)
+
+    def test_notification_endpoints(self):
+        self.flight.status = 'boarding'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.flight.save()
+        client = APIClient()
+        client.force_authenticate(self.passengers[0])
+        url = '/api/flight-management/passenger/notifications/'
+        response = client.get(url, {'unread': 'true'})
+        self.assertEqual(response.data['count'], 1)
+        self.assertIn('正在T3航站楼A1登机口登机', response.data['results'][0]['content'])
+
+        response = client.post('/api/flight-management/passenger/mark_notifications_read/')
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(client.get(url, {'unread': 'true'}).data['count'], 0)
+
+
+class FlightVoiceTests(TestCase):
+    """航班语音播报文本测试"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='kiosk', password='testpassword')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_templates_match_strftime(self):
+        flight = create_flight('CA1234', gate='A1', terminal='T3')
+        flight.actual_departure_time = flight.scheduled_departure_time + timezone.timedelta(minutes=45)
+        flight.actual_arrival_time = flight.scheduled_arrival_time
+        fmt = '%Y年%m月%d日 %H时%M分'
+        expected = {
+            'scheduled': f'航班CA1234计划于{flight.scheduled_departure_time.strftime(fmt)}从北京首都国际机场T3航站楼A1登机口出发。',
+            'delayed': f'航班CA1234延误，预计延误到{flight.actual_departure_time.strftime(fmt)}，请关注航班动态。',
+            'boarding': '航班CA1234正在T3航站楼A1登机口登机，请尽快前往。',
+            'departed': f'航班CA1234已于{flight.actual_departure_time.strftime(fmt)}起飞。',
+            'arrived': f'航班CA1234已于{flight.actual_arrival_time.strftime(fmt)}到达上海虹桥国际机场。',
+            'cancelled': '航班CA1234已取消，请联系航空公司获取更多信息。',
+        }
+        for flight_status, text in expected.items():
+            flight.status = flight_status
+            self.assertEqual(flight.get_status_display_for_voice(), text)
+        flight.actual_departure_time = None
+        flight.status = 'departed'
+        self.assertEqual(flight.get_status_display_for_voice(), '航班CA1234已于未知时间起飞。')
+
+    def test_cache_invalidated_on_save(self):
+        flight = create_flight('CA1234', gate='A1', terminal='T3')
+        self.assertIn('计划于', get_voice_text(flight))
+        self.assertIsNotNone(cache.get(voice_cache_key(flight)))
+
+        flight.status = 'boarding'
+        flight.save(update_fields=['status'])
+        self.assertIn('正在T3航站楼A1登机口登机', get_voice_text(Flight.objects.get(pk=flight.pk)))
+
+        Flight.objects.filter(pk=flight.pk).update_and_record(status='cancelled')
+        self.assertIn('已取消', get_voice_text(Flight.objects.get(pk=flight.pk)))
+
+    def test_voice_board(self):
+        create_flight('CA1234', hours=1, gate='A1', terminal='T3')
+        create_flight('MU5101', hours=0.5, gate='B2', terminal='T2')
+        create_flight('CZ3001', hours=5, terminal='T3')
+        create_flight('HU7001', hours=-1, terminal='T3', status='delayed',
+                      actual_departure_time=timezone.now() + timezone.timedelta(minutes=30))
+        url = '/api/flight-management/flights/voice_board/'
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'hours': 2})
+        self.assertEqual([item['flight_number'] for item in response.data['results']], ['HU7001', 'MU5101', 'CA1234'])
+        self.assertEqual(response.data['voice_content'], ''.join(item['voice_content'] for item in response.data['results']))
+
+        response = self.client.get(url, {'hours': 2, 'terminal': 'T3'})
+        self.assertEqual([item['flight_number'] for item in response.data['results']], ['HU7001', 'CA1234'])
+        self.assertIn('延误', response.data['results'][0]['voice_content'])
+
+        self.assertEqual(self.client.get(url, {'hours': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'hours': 100}).status_code, 400)
+
+
+class FlightBoardTests(TestCase):
+    """物化航班动态板测试"""
+
+    url = '/api/flight-management/flights/board/'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='kiosk', password='testpassword')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        self.ca1234 = create_flight('CA1234', hours=1, gate='A1', terminal='T3')
+        self.mu5101 = create_flight('MU5101', hours=0.5, gate='B2', terminal='T3')
+        create_flight('CZ3001', hours=1, terminal='T2')
+        create_flight('HU7001', hours=5, terminal='T3')
+
+    def board(self, **params):
+        return self.client.get(self.url, {'terminal': 'T3', 'hours': 2, **params})
+
+    def numbers(self, response):
+        return [item['flight_number'] for item in response.data['results']]
+
+    def test_board_served_from_cache_with_etag(self):
+        response = self.board()
+        self.assertEqual(self.numbers(response), ['MU5101', 'CA1234'])
+        self.assertEqual(self.numbers(self.board(hours=6)), ['MU5101', 'CA1234', 'HU7001'])
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.board()['ETag'], etag)
+            not_modified = self.client.get(self.url, {'terminal': 'T3', 'hours': 2}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], etag)
+
+    def test_board_patched_on_flight_change(self):
+        etag = self.board()['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ca1234.gate = 'C9'
+            self.ca1234.save()
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {'terminal': 'T3', 'hours': 2}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['results'][1]['gate'], 'C9')
+
+        # 航站楼变更后从原动态板移除，进入新航站楼动态板
+        self.board(terminal='T2')
+        with self.captureOnCommitCallbacks(execute=True):
+            Flight.objects.filter(pk=self.ca1234.pk).update_and_record(terminal='T2')
+        self.assertEqual(self.numbers(self.board()), ['MU5101'])
+        self.assertEqual(self.numbers(self.board(terminal='T2')), ['CA1234', 'CZ3001'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mu5101.delete()
+        self.assertEqual(self.numbers(self.board()), [])
+        self.assertEqual(self.numbers(self.client.get(self.url, {'hours': 2})), ['CA1234', 'CZ3001'])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.board(hours=3).status_code, 400)
+        self.assertEqual(self.board(type='weekly').status_code, 400)
+        self.assertEqual(APIClient().get(self.url).status_code, 401)
+
+        # 只接受有航班的航站楼，新航站楼出现航班后即可查询
+        self.assertEqual(self.board(terminal='T9').status_code, 400)
+        with self.captureOnCommitCallbacks(execute=True):
+            create_flight('MU9999', hours=1, terminal='T9')
+        self.assertEqual(self.numbers(self.board(terminal='T9')), ['MU9999'])
+
+
+@override_settings(FLIGHT_CHANGE_FANOUT={'MODE': 'sync'})
+class FlightImportTests(TestCase):
+    """FIDS 航班计划导入测试"""
+
+    header = 'flight_number,airline,departure_city,arrival_city,departure_airport,arrival_airport,' \
+             'scheduled_departure_time,scheduled_arrival_time,gate,terminal,status\n'
+
+    def csv_row(self, flight_number, departure='2030-01-01T08:00:00+08:00', arrival='2030-01-01T10:00:00+08:00',
+                gate='A1', terminal='T3', status='scheduled'):
+        return f'{flight_number},中国国际航空,北京,上海,首都国际机场,虹桥国际机场,{departure},{arrival},{gate},{terminal},{status}\n'
+
+    def test_csv_upsert_with_row_errors(self):
+        existing = create_flight('CA1234', gate='A1', terminal='T3')
+        subscriber = User.objects.create_user(username='passenger', password='testpassword')
+        FlightSubscription.objects.create(passenger=subscriber, flight=existing)
+        content = (
+            self.header
+            + self.csv_row('CA1234', existing.scheduled_departure_time.isoformat(),
+                           existing.scheduled_arrival_time.isoformat(), gate='B7')
+            + self.csv_row('MU5101')
+            + self.csv_row('CZ3001', arrival='2029-12-31T10:00:00+08:00')
+            + self.csv_row('HU7001', status='unknown')
+            + self.csv_row('MU5101', gate='C3')
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            result = import_flights(io.BytesIO(('\ufeff' + content).encode('utf-8')), 'csv', chunk_size=2)
+
+        # MU5101 在第一批中新增，最后一行在下一批中更新
+        self.assertEqual((result.total, result.created, result.updated, result.failed), (5, 1, 2, 2))
+        self.assertEqual([error['row'] for error in result.errors], [3, 4])
+        self.assertIn('scheduled_arrival_time', result.errors[0]['errors'])
+        self.assertIn('status', result.errors[1]['errors'])
+
+        existing.refresh_from_db()
+        self.assertEqual(existing.gate, 'B7')
+        self.assertEqual(existing.airline, '中国国际航空')
+        self.assertEqual(Flight.objects.get(flight_number='MU5101').gate, 'C3')
+        self.assertEqual([flight.flight_number for flight in search_flights('MU51')], ['MU5101'])
+        # 变更事件只记录跟踪字段，联动生成通知
+        event = FlightChangeEvent.objects.get(flight=existing)
+        self.assertEqual(list(event.changes), ['gate'])
+        self.assertTrue(FlightNotification.objects.filter(passenger=subscriber, flight=existing).exists())
+
+        # 再次导入相同内容不产生更新
+        with self.captureOnCommitCallbacks(execute=True):
+            result = import_flights(io.BytesIO((self.header + self.csv_row('MU5101', gate='C3')).encode()), 'csv')
+        self.assertEqual((result.created, result.updated, result.unchanged), (0, 0, 1))
+
+    def test_json_formats_and_partial_columns(self):
+        create_flight('CA1234', gate='A1', terminal='T3', status='boarding')
+        rows = [
+            {'flight_number': 'CA1234', 'airline': '中国国际航空', 'departure_city': '北京', 'arrival_city': '上海',
+             'departure_airport': '首都国际机场', 'arrival_airport': '虹桥国际机场',
+             'scheduled_departure_time': '2030-01-01 08:00', 'scheduled_arrival_time': '2030-01-01 10:00'},
+            {'flight_number': 'MU5101', 'airline': '东方航空', 'departure_city': '上海', 'arrival_city': '北京',
+             'departure_airport': '虹桥国际机场', 'arrival_airport': '首都国际机场',
+             'scheduled_departure_time': '2030-01-01 09:00', 'scheduled_arrival_time': '2030-01-01 11:00'},
+        ]
+        for payload in (json.dumps(rows, ensure_ascii=False), '\n'.join(json.dumps(row) for row in rows)):
+            result = import_flights(io.StringIO(payload), 'json', chunk_size=1, dry_run=True)
+            self.assertEqual((result.total, result.valid, result.failed), (2, 2, 0))
+
+        result = import_flights(io.StringIO(json.dumps(rows)), 'json')
+        self.assertEqual((result.created, result.updated), (1, 1))
+        # 文件中没有的列保留原值
+        flight = Flight.objects.get(flight_number='CA1234')
+        self.assertEqual((flight.gate, flight.status), ('A1', 'boarding'))
+        self.assertEqual(Flight.objects.get(flight_number='MU5101').status, 'scheduled')
+
+        result = import_flights(io.StringIO('[{"flight_number": "X"}, {"broken": '), 'json')
+        self.assertEqual(result.failed, 2)
+
+    def test_import_command_and_api(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as handle:
+            handle.write(self.header + self.csv_row('CA1234'))
+        self.addCleanup(os.remove, handle.name)
+        output = io.StringIO()
+        call_command('import_flights', handle.name, stdout=output)
+        self.assertIn('新增 1', output.getvalue())
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='passenger', password='testpassword'))
+        upload = SimpleUploadedFile('schedule.csv', (self.header + self.csv_row('MU5101')).encode())
+        self.assertEqual(client.post('/api/flight-management/flights/import/', {'file': upload}).status_code, 403)
+
+        client.force_authenticate(User.objects.create_user(username='admin', password='testpassword', is_staff=True))
+        upload = SimpleUploadedFile('schedule.csv', (self.header + self.csv_row('MU5101')).encode())
+        response = client.post('/api/flight-management/flights/import/', {'file': upload})
+        self.assertEqual(response.data['created'], 1)
+        self.assertTrue(Flight.objects.filter(flight_number='MU5101').exists())
+        upload = SimpleUploadedFile('schedule.txt', b'')
+        self.assertEqual(client.post('/api/flight-management/flights/import/', {'file': upload}).status_code, 400)
+
+
+@override_settings(FLIGHT_CHANGE_FANOUT={'MODE': 'sync'})
+class FlightBulkUpdateTests(TestCase):
+    """航班批量更新测试"""
+
+    url = '/api/flight-management/flights/bulk_update/'
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='admin', password='testpassword', is_staff=True))
+        self.flights = [create_flight(f'CA{1000 + i}', hours=2 + i, gate='A1', terminal='T3') for i in range(30)]
+
+    def post(self, updates):
+        return self.client.post(self.url, {'updates': updates}, format='json')
+
+    def test_bulk_update_results(self):
+        passenger = User.objects.create_user(username='passenger', password='testpassword')
+        FlightSubscription.objects.create(passenger=passenger, flight=self.flights[0])
+        delayed_to = self.flights[0].scheduled_departure_time + timezone.timedelta(hours=1)
+        updates = [
+            {'flight_number': 'CA1000', 'status': 'delayed', 'actual_departure_time': delayed_to.isoformat()},
+            {'id': self.flights[1].pk, 'gate': 'B5'},
+            {'flight_number': 'CA1002', 'gate': 'A1'},
+            {'flight_number': 'ZZ0000', 'status': 'cancelled'},
+            {'flight_number': 'CA1003', 'status': 'grounded'},
+            {'flight_number': 'CA1004'},
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post(updates)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(response.data['failed'], 3)
+        self.assertEqual(
+            [result['result'] for result in response.data['results']],
+            ['updated', 'updated', 'unchanged', 'not_found', 'invalid', 'invalid'],
+        )
+        self.assertEqual(response.data['results'][1]['changes'], {'gate': 'B5'})
+
+        self.flights[0].refresh_from_db()
+        self.assertEqual((self.flights[0].status, self.flights[0].actual_departure_time), ('delayed', delayed_to))
+        self.assertEqual(FlightChangeEvent.objects.count(), 2)
+        self.assertFalse(FlightChangeEvent.objects.filter(processed_at__isnull=True).exists())
+        self.assertEqual(FlightNotification.objects.filter(passenger=passenger).count(), 1)
+
+    def test_query_count_independent_of_batch_size(self):
+        def run(flights, gate):
+            with CaptureQueriesContext(connection) as context:
+                response = self.post([{'flight_number': flight.flight_number, 'gate': gate} for flight in flights])
+            self.assertEqual(response.data['updated'], len(flights))
+            return len(context.captured_queries)
+
+        # 首次请求会加载并缓存用户角色
+        run(self.flights[:1], 'B1')
+        self.assertEqual(run(self.flights[:3], 'C1'), run(self.flights, 'D1'))
+
+    def test_requires_admin_and_valid_payload(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='passenger', password='testpassword'))
+        self.assertEqual(client.post(self.url, {'updates': [{'id': 1, 'gate': 'A'}]}, format='json').status_code, 403)
+        self.assertEqual(self.post([]).status_code, 400)
+        with override_settings(FLIGHT_BULK_UPDATE_MAX_ITEMS=2):
+            self.assertEqual(self.post([{'id': 1, 'gate': 'A'}] * 3).status_code, 400)
+
+
+class FlightPunctualityTests(TestCase):
+    """航班状态历史与准点统计测试"""
+
+    url = '/api/flight-management/flights/punctuality/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='analyst', password='testpassword'))
+        self.ca1 = create_flight('CA1001', hours=1)
+        self.ca2 = create_flight('CA1002', hours=1)
+        self.mu = create_flight('MU5101', '上海', '北京', hours=1, airline='东方航空')
+
+    def depart(self, flight, minutes_late):
+        flight.status = 'departed'
+        flight.actual_departure_time = flight.scheduled_departure_time + timezone.timedelta(minutes=minutes_late)
+        flight.save()
+
+    def stats(self, **params):
+        return self.client.get(self.url, params).data
+
+    def test_history_appended_on_every_change(self):
+        self.ca1.gate = 'A1'
+        self.ca1.save()
+        Flight.objects.filter(pk=self.ca1.pk).update_and_record(status='boarding')
+        Flight.objects.bulk_update_and_record({self.ca1.pk: {'gate': 'B2'}})
+
+        history = list(FlightStatusHistory.objects.filter(flight=self.ca1).order_by('id'))
+        self.assertEqual([item.status for item in history], ['scheduled', 'scheduled', 'boarding', 'boarding'])
+        self.assertEqual(history[0].changes, {})
+        self.assertEqual(history[-1].changes, {'gate': ['A1', 'B2']})
+
+        response = self.client.get(f'/api/flight-management/flights/{self.ca1.pk}/status_history/')
+        self.assertEqual(response.data['count'], 4)
+        self.assertEqual(response.data['results'][0]['gate'], 'B2')
+
+    def test_incremental_stats_follow_latest_state(self):
+        self.depart(self.ca1, 5)
+        self.depart(self.ca2, 40)
+        self.mu.status = 'cancelled'
+        self.mu.save()
+
+        data = self.stats()
+        self.assertEqual((data['operated'], data['on_time'], data['cancelled'], data['delay_minutes']), (2, 1, 1, 45))
+        self.assertEqual(data['on_time_rate'], 0.5)
+
+        # 更正实际出发时间、取消后恢复执行，旧贡献被扣除
+        self.depart(self.ca2, 10)
+        self.depart(self.mu, 0)
+        data = self.stats(airline='中国国际航空')
+        self.assertEqual((data['operated'], data['on_time'], data['delay_minutes']), (2, 2, 15))
+        self.assertEqual(self.stats(departure_city='上海', arrival_city='北京')['cancelled'], 0)
+
+        groups = self.stats(group_by='airline')['results']
+        self.assertEqual([group['airline'] for group in groups], ['东方航空', '中国国际航空'])
+
+        incremental = sorted(FlightPunctualityStat.objects.values_list('airline', 'operated', 'on_time', 'cancelled', 'delay_minutes'))
+        call_command('rebuild_punctuality_stats', stdout=io.StringIO())
+        rebuilt = sorted(FlightPunctualityStat.objects.values_list('airline', 'operated', 'on_time', 'cancelled', 'delay_minutes'))
+        self.assertEqual(incremental, rebuilt)
+
+    def test_stats_follow_airline_and_route_changes(self):
+        self.depart(self.ca1, 5)
+        self.depart(self.mu, 30)
+        self.ca1.airline = '东方航空'
+        self.ca1.save()
+        Flight.objects.filter(pk=self.mu.pk).update_and_record(arrival_city='广州')
+
+        self.assertEqual(self.stats(airline='中国国际航空')['operated'], 0)
+        self.assertEqual(self.stats(airline='东方航空')['operated'], 2)
+        self.assertEqual(self.stats(departure_city='上海', arrival_city='广州')['operated'], 1)
+        self.assertEqual(self.stats(departure_city='上海', arrival_city='北京')['operated'], 0)
+        self.assertEqual(FlightStatusHistory.objects.filter(flight=self.ca1).latest('id').changes, {'airline': ['中国国际航空', '东方航空']})
+
+        incremental = sorted(FlightPunctualityStat.objects.filter(operated__gt=0).values_list('airline', 'arrival_city', 'operated', 'delay_minutes'))
+        call_command('rebuild_punctuality_stats', stdout=io.StringIO())
+        rebuilt = sorted(FlightPunctualityStat.objects.values_list('airline', 'arrival_city', 'operated', 'delay_minutes'))
+        self.assertEqual(incremental, rebuilt)
+
+    def test_status_history_of_unknown_flight(self):
+        response = self.client.get('/api/flight-management/flights/999999/status_history/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_query_reads_only_aggregates(self):
+        self.depart(self.ca1, 0)
+        with self.assertNumQueries(1):
+            self.client.get(self.url, {'airline': '中国国际航空'})
+        self.assertEqual(self.client.get(self.url, {'group_by': 'week'}).status_code, 400)
+
+
+class FlightGateTests(TestCase):
+    """登机口占用索引与冲突检测测试"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='ops', password='testpassword'))
+        # 默认占用时间为计划出发前 45 分钟至出发后 15 分钟
+        self.ca1 = create_flight('CA1001', hours=1, gate='A1', terminal='T3')
+        self.ca2 = create_flight('CA1002', hours=3, gate='a1 ', terminal='t3')
+        self.mu = create_flight('MU5101', hours=1.5, gate='B2', terminal='T3')
+
+    def timeline(self, gate='A1', **params):
+        return self.client.get('/api/flight-management/flights/gate_timeline/', {'terminal': 'T3', 'gate': gate, **params})
+
+    def conflicts(self, **params):
+        return self.client.get('/api/flight-management/flights/gate_conflicts/', params).data
+
+    def test_timeline_normalizes_free_text_gates(self):
+        response = self.timeline()
+        self.assertEqual([row['flight_number'] for row in response.data['results']], ['CA1001', 'CA1002'])
+        self.assertEqual(response.data['conflict_count'], 0)
+        self.assertEqual(self.conflicts()['count'], 0)
+        self.assertEqual(self.timeline(gate='').status_code, 400)
+        self.assertEqual(self.timeline(start='2000-01-01T00:00:00').status_code, 400)
+
+    def test_timeline_without_terminal_covers_all_terminals(self):
+        create_flight('HU7001', hours=1.2, gate='A1', terminal='T2')
+        response = self.client.get('/api/flight-management/flights/gate_timeline/', {'gate': 'a1'})
+        self.assertEqual(
+            [(row['flight_number'], row['terminal'], row['conflicts']) for row in response.data['results']],
+            [('CA1001', 'T3', []), ('HU7001', 'T2', []), ('CA1002', 'T3', [])],
+        )
+        self.assertIsNone(response.data['terminal'])
+
+    def test_index_patched_incrementally_on_changes(self):
+        self.assertEqual(self.conflicts()['count'], 0)
+        received = []
+
+        def receiver(sender, conflicts, **kwargs):
+            received.extend(conflicts)
+
+        gate_conflicts_detected.connect(receiver)
+        try:
+            # 换到 A1 后与 CA1001 的占用时间重叠
+            with self.captureOnCommitCallbacks(execute=True):
+                Flight.objects.filter(pk=self.mu.pk).update_and_record(gate='A1')
+        finally:
+            gate_conflicts_detected.disconnect(receiver)
+        self.assertEqual([conflict.as_dict()['flights'] for conflict in received], [['CA1001', 'MU5101']])
+
+        with self.assertNumQueries(0):
+            timeline = self.timeline().data
+        self.assertEqual(
+            [(row['flight_number'], row['conflicts']) for row in timeline['results']],
+            [('CA1001', ['MU5101']), ('MU5101', ['CA1001']), ('CA1002', [])],
+        )
+        self.assertEqual(self.timeline(gate='B2').data['count'], 0)
+
+        # CA1001 延误出发后占用延长到与 CA1002 重叠
+        with self.captureOnCommitCallbacks(execute=True):
+            Flight.objects.bulk_update_and_record({
+                self.ca1.pk: {'actual_departure_time': self.ca1.scheduled_departure_time + timezone.timedelta(hours=1.5)},
+            })
+        self.assertEqual(
+            [item['flights'] for item in self.conflicts(terminal='T3')['results']],
+            [['CA1001', 'MU5101'], ['CA1001', 'CA1002']],
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ca1.delete()
+        self.assertEqual(self.conflicts()['count'], 0)
+        self.assertEqual([row['flight_number'] for row in self.timeline().data['results']], ['MU5101', 'CA1002'])
+
+        # 重建后的索引与增量更新结果一致
+        cache.clear()
+        self.assertEqual([row['flight_number'] for row in self.timeline().data['results']], ['MU5101', 'CA1002'])
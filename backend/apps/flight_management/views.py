@@ -1,25 +1,35 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.db.models import Q
+from django.shortcuts import get_object_or_404, render
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import http_date
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
-from rest_framework.pagination import PageNumberPagination
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
 
-from .models import Flight, FlightAnnouncement
+from .models import Flight, FlightAnnouncement, FlightSubscription, FlightNotification, FlightStatusHistory
 from .serializers import (
     FlightSerializer, 
     FlightListSerializer, 
     FlightAnnouncementSerializer,
-    FlightAnnouncementCreateSerializer
+    FlightAnnouncementCreateSerializer,
+    FlightNotificationSerializer,
+    FlightBulkUpdateItemSerializer,
+    FlightStatusHistorySerializer
 )
-
-
-class StandardResultsSetPagination(PageNumberPagination):
-    """标准分页器"""
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
+from .punctuality import punctuality
+from .board import ALL_TERMINALS, KINDS, get_board_settings, known_terminals, render_board
+from .gates import gate_conflicts, gate_timeline, get_gate_settings
+from .ingest import DEFAULT_CHUNK_SIZE, FORMATS, guess_format, import_flights
+from .search import search_flights
+from .voice import departure_board, get_voice_text, get_voice_texts
+from apps.broadcasting.queue import enqueue
+from apps.common.pagination import StandardResultsSetPagination
 
 
 class IsAdminOrReadOnly(permissions.BasePermission):
@@ -34,6 +44,29 @@ class IsAdminOrReadOnly(permissions.BasePermission):
         return 'admin' in request.user.get_roles()
 
 
+def parse_gate_window(params):
+    """
+    解析登机口查询的时间段：start（默认当前时间）与 hours（默认 24，最多 48）
+    
+    Raises:
+        ValueError: 参数格式错误或开始时间早于登机口索引保留范围
+    """
+    now = timezone.now()
+    try:
+        start = parse_datetime(params['start']) if params.get('start') else now
+        hours = float(params.get('hours', 24))
+    except ValueError:
+        start = hours = None
+    if start is None or hours is None or not 0 < hours <= 48:
+        raise ValueError('start 应为 ISO 8601 时间，hours 应在 (0, 48] 范围内')
+    if timezone.is_naive(start):
+        start = timezone.make_aware(start)
+    lookback = get_gate_settings()['LOOKBACK_HOURS']
+    if start < now - timezone.timedelta(hours=lookback):
+        raise ValueError(f'start 不能早于 {lookback} 小时前')
+    return start, start + timezone.timedelta(hours=hours)
+
+
 class FlightViewSet(viewsets.ModelViewSet):
     """
     航班信息视图集，提供航班信息的CRUD操作
@@ -61,7 +94,281 @@ class FlightViewSet(viewsets.ModelViewSet):
         flight = self.get_object()
         return Response({
             'flight_number': flight.flight_number,
-            'voice_content': flight.get_status_display_for_voice()
+            'voice_content': get_voice_text(flight)
+        })
+    
+    @action(
+        detail=False, methods=['get'],
+        # 使用令牌中的用户信息，轮询时不查询用户表
+        authentication_classes=[JWTStatelessUserAuthentication],
+        permission_classes=[permissions.IsAuthenticated],
+    )
+    def board(self, request):
+        """
+        航班动态板，数据来自缓存中物化的动态板，支持 ETag / Last-Modified 条件请求
+        
+        参数:
+            type: departures（默认）或 arrivals
+            terminal: 航站楼，可选
+            hours: 时间窗口（小时），取值见 FLIGHT_BOARD['WINDOWS']
+        """
+        kind = request.query_params.get('type', 'departures')
+        if kind not in KINDS:
+            return Response({"error": f"type 参数可选值: {', '.join(KINDS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        windows = get_board_settings()['WINDOWS']
+        try:
+            hours = int(request.query_params.get('hours', windows[0]))
+        except ValueError:
+            hours = None
+        if hours not in windows:
+            return Response(
+                {"error": f"hours 参数可选值: {', '.join(str(window) for window in windows)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        terminal = request.query_params.get('terminal') or ALL_TERMINALS
+        if terminal != ALL_TERMINALS and terminal not in known_terminals():
+            return Response({"error": f"未知的航站楼: {terminal}"}, status=status.HTTP_400_BAD_REQUEST)
+        data, etag, last_modified = render_board(kind, terminal, hours)
+        response = get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()))
+        if response is None:
+            response = Response(data)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+        response['Cache-Control'] = 'no-cache'
+        return response
+    
+    @action(detail=False, methods=['get'])
+    def voice_board(self, request):
+        """
+        出发航班语音播报板，一次返回未来 hours 小时内出发的全部航班播报文本
+        
+        参数:
+            hours: 时间范围（小时），默认 2
+            terminal: 航站楼，可选
+        """
+        max_hours = getattr(settings, 'FLIGHT_VOICE_BOARD_MAX_HOURS', 24)
+        try:
+            hours = float(request.query_params.get('hours', 2))
+        except ValueError:
+            return Response({"error": "hours 参数必须是数字"}, status=status.HTTP_400_BAD_REQUEST)
+        if not 0 < hours <= max_hours:
+            return Response({"error": f"hours 参数必须大于 0 且不超过 {max_hours}"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        terminal = request.query_params.get('terminal')
+        flights = list(departure_board(hours, terminal))
+        texts = get_voice_texts(flights)
+        results = [
+            {
+                'id': flight.id,
+                'flight_number': flight.flight_number,
+                'status': flight.status,
+                'gate': flight.gate,
+                'terminal': flight.terminal,
+                'scheduled_departure_time': flight.scheduled_departure_time,
+                'voice_content': texts[flight.pk],
+            }
+            for flight in flights
+        ]
+        return Response({
+            'generated_at': timezone.now(),
+            'terminal': terminal,
+            'hours': hours,
+            'count': len(results),
+            'voice_content': ''.join(item['voice_content'] for item in results),
+            'results': results,
+        })
+    
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_schedule(self, request):
+        """
+        批量导入 FIDS 航班计划（仅管理员）
+        
+        参数:
+            file: CSV 或 JSON 文件
+            format: csv 或 json，默认按文件扩展名判断
+            chunk_size: 每批校验、写入的行数
+            dry_run: true 时只校验不写入
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"error": "请上传航班计划文件"}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = request.data.get('format') or guess_format(upload.name)
+        if file_format not in FORMATS:
+            return Response({"error": f"format 参数可选值: {', '.join(FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            chunk_size = int(request.data.get('chunk_size', DEFAULT_CHUNK_SIZE))
+        except ValueError:
+            chunk_size = 0
+        if chunk_size <= 0:
+            return Response({"error": "chunk_size 参数必须是正整数"}, status=status.HTTP_400_BAD_REQUEST)
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+        
+        result = import_flights(upload, file_format, chunk_size, dry_run)
+        return Response({**result.as_dict(), 'dry_run': dry_run})
+    
+    @action(detail=False, methods=['post'])
+    def bulk_update(self, request):
+        """
+        批量更新航班状态、登机口、航站楼和时间（仅管理员），全部变更在一个事务中写入，
+        变更事件一次性记录，只触发一次下游联动
+        
+        请求体:
+            updates: [{"flight_number": "CA1234", "status": "delayed", "actual_departure_time": "..."}, ...]
+        """
+        items = request.data.get('updates')
+        max_items = getattr(settings, 'FLIGHT_BULK_UPDATE_MAX_ITEMS', 1000)
+        if not isinstance(items, list) or not items:
+            return Response({"error": "updates 必须是非空列表"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > max_items:
+            return Response({"error": f"单次最多更新 {max_items} 个航班"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        results = []
+        valid = []
+        for item in items:
+            serializer = FlightBulkUpdateItemSerializer(data=item if isinstance(item, dict) else {})
+            if serializer.is_valid():
+                results.append(None)
+                valid.append((len(results) - 1, serializer.validated_data))
+            else:
+                results.append({
+                    'id': item.get('id') if isinstance(item, dict) else None,
+                    'flight_number': item.get('flight_number') if isinstance(item, dict) else None,
+                    'result': 'invalid',
+                    'errors': serializer.errors,
+                })
+        
+        ids = [data['id'] for _, data in valid if 'id' in data]
+        numbers = [data['flight_number'] for _, data in valid if 'id' not in data]
+        flights = Flight.objects.filter(Q(pk__in=ids) | Q(flight_number__in=numbers)).only('id', 'flight_number')
+        by_id = {flight.pk: flight for flight in flights}
+        by_number = {flight.flight_number: flight for flight in by_id.values()}
+        
+        updates = {}
+        targets = []
+        for index, data in valid:
+            flight = by_id.get(data['id']) if 'id' in data else by_number.get(data['flight_number'])
+            if flight is None:
+                results[index] = {
+                    'id': data.get('id'), 'flight_number': data.get('flight_number'), 'result': 'not_found'
+                }
+                continue
+            values = {
+                name: value for name, value in data.items()
+                if name in FlightBulkUpdateItemSerializer.UPDATE_FIELDS
+            }
+            # 同一航班出现多次时依次合并，后面的值优先
+            updates.setdefault(flight.pk, {}).update(values)
+            targets.append((index, flight))
+        
+        changed = Flight.objects.bulk_update_and_record(updates) if updates else {}
+        for index, flight in targets:
+            diff = changed.get(flight.pk)
+            results[index] = {
+                'id': flight.pk,
+                'flight_number': flight.flight_number,
+                'result': 'updated' if diff else 'unchanged',
+                'changes': {name: new for name, (old, new) in (diff or {}).items()},
+            }
+        
+        return Response({
+            'updated': len(changed),
+            'failed': sum(1 for result in results if result['result'] in ('invalid', 'not_found')),
+            'results': results,
+        })
+    
+    @action(detail=True, methods=['get'])
+    def status_history(self, request, pk=None):
+        """航班状态变更历史，按时间倒序"""
+        flight = get_object_or_404(Flight.objects.only('pk'), pk=pk)
+        queryset = FlightStatusHistory.objects.filter(flight=flight)
+        page = self.paginate_queryset(queryset)
+        serializer = FlightStatusHistorySerializer(page if page is not None else queryset, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def punctuality(self, request):
+        """
+        航班准点统计，读取按日汇总的统计行
+        
+        参数:
+            start_date / end_date: 计划出发日期范围（含），默认最近 30 天
+            airline / departure_city / arrival_city: 筛选条件
+            group_by: airline 或 route，按航空公司或航线分组
+        """
+        group_by = request.query_params.get('group_by') or None
+        if group_by not in (None, 'airline', 'route'):
+            return Response({"error": "group_by 参数可选值: airline, route"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            end_date = parse_date(request.query_params.get('end_date', '')) or timezone.localdate()
+            start_date = parse_date(request.query_params.get('start_date', '')) or end_date - timezone.timedelta(days=29)
+        except ValueError:
+            return Response({"error": "日期格式应为 YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        criteria = {
+            name: request.query_params.get(name)
+            for name in ('airline', 'departure_city', 'arrival_city')
+        }
+        result = punctuality(start_date, end_date, group_by=group_by, **criteria)
+        data = {'start_date': start_date, 'end_date': end_date, **criteria}
+        if group_by:
+            data.update({'group_by': group_by, 'results': result})
+        else:
+            data.update(result)
+        return Response(data)
+    
+    @action(detail=False, methods=['get'])
+    def gate_timeline(self, request):
+        """
+        登机口占用时间线，数据来自缓存中的登机口区间索引
+        
+        参数:
+            gate: 登机口（必填）
+            terminal: 航站楼，不填时返回全部航站楼的同名登机口
+            start / hours: 时间段，默认从当前时间起 24 小时
+        """
+        gate = request.query_params.get('gate', '').strip()
+        if not gate:
+            return Response({"error": "请提供登机口"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            start, end = parse_gate_window(request.query_params)
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        terminal = request.query_params.get('terminal')
+        results = gate_timeline(terminal, gate, start, end)
+        return Response({
+            'terminal': terminal or None,
+            'gate': gate,
+            'start': start,
+            'end': end,
+            'count': len(results),
+            'conflict_count': sum(1 for row in results if row['conflicts']),
+            'results': results,
+        })
+    
+    @action(detail=False, methods=['get'])
+    def gate_conflicts(self, request):
+        """
+        各登机口占用时间重叠的航班
+        
+        参数:
+            terminal: 航站楼，不填时检查全部航站楼
+            start / hours: 时间段，默认从当前时间起 24 小时
+        """
+        try:
+            start, end = parse_gate_window(request.query_params)
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        conflicts = gate_conflicts(start, end, terminal=request.query_params.get('terminal'))
+        return Response({
+            'start': start,
+            'end': end,
+            'count': len(conflicts),
+            'results': [conflict.as_dict() for conflict in conflicts],
         })
     
     @action(detail=False, methods=['get'])
@@ -74,15 +381,8 @@ class FlightViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # 全文搜索航班信息
-        queryset = self.get_queryset().filter(
-            Q(flight_number__icontains=query) |
-            Q(airline__icontains=query) |
-            Q(departure_city__icontains=query) |
-            Q(arrival_city__icontains=query) |
-            Q(departure_airport__icontains=query) |
-            Q(arrival_airport__icontains=query)
-        )
+        # 通过搜索索引查询，结果按相关度排序
+        queryset = search_flights(query, self.get_queryset())
         
         page = self.paginate_queryset(queryset)
         if page is not None:
@@ -109,24 +409,8 @@ class PassengerFlightViewSet(viewsets.GenericViewSet):
         except Flight.DoesNotExist:
             return Response({"error": "航班不存在"}, status=status.HTTP_404_NOT_FOUND)
         
-        # 获取当前用户和关联的旅客信息
-        user = request.user
-        
-        # 将航班与用户关联 (保存到用户元数据中)
-        user_meta = []
-        if hasattr(user, 'selected_flights') and isinstance(user.selected_flights, list):
-            user_meta = user.selected_flights
-        
-        # 检查是否已经选择
-        flight_id = str(flight.id)
-        if flight_id not in user_meta:
-            user_meta.append(flight_id)
-            
-            # 更新用户元数据
-            user.selected_flights = user_meta
-            
-            # 保存更新
-            user.save()
+        # 唯一约束保证并发请求下不会重复关注
+        FlightSubscription.objects.get_or_create(passenger=request.user, flight=flight)
         
         return Response({"message": f"已成功选择航班 {flight.flight_number}"}, status=status.HTTP_200_OK)
     
@@ -138,33 +422,14 @@ class PassengerFlightViewSet(viewsets.GenericViewSet):
         except Flight.DoesNotExist:
             return Response({"error": "航班不存在"}, status=status.HTTP_404_NOT_FOUND)
         
-        # 获取当前用户
-        user = request.user
-        
-        # 从用户元数据中移除航班
-        user_meta = []
-        if hasattr(user, 'selected_flights') and isinstance(user.selected_flights, list):
-            user_meta = user.selected_flights
-            flight_id = str(flight.id)
-            
-            if flight_id in user_meta:
-                user_meta.remove(flight_id)
-                user.selected_flights = user_meta
-                user.save()
+        FlightSubscription.objects.filter(passenger=request.user, flight=flight).delete()
         
         return Response({"message": f"已取消选择航班 {flight.flight_number}"}, status=status.HTTP_200_OK)
     
     @action(detail=False, methods=['get'])
     def my_flights(self, request):
         """获取旅客选择的航班列表"""
-        user = request.user
-        
-        if not hasattr(user, 'selected_flights') or not user.selected_flights or not isinstance(user.selected_flights, list):
-            return Response([])
-        
-        # 获取已选择的航班
-        flight_ids = user.selected_flights
-        flights = Flight.objects.filter(id__in=flight_ids)
+        flights = Flight.objects.filter(subscriptions__passenger=request.user)
         
         # 分页
         page = self.paginate_queryset(flights)
@@ -174,6 +439,31 @@ class PassengerFlightViewSet(viewsets.GenericViewSet):
             
         serializer = FlightListSerializer(flights, many=True)
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def notifications(self, request):
+        """获取旅客的航班变更通知，unread=true 时只返回未读通知"""
+        notifications = FlightNotification.objects.filter(passenger=request.user).select_related('flight')
+        if request.query_params.get('unread', 'false').lower() == 'true':
+            notifications = notifications.filter(is_read=False)
+        
+        page = self.paginate_queryset(notifications)
+        if page is not None:
+            serializer = FlightNotificationSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        
+        serializer = FlightNotificationSerializer(notifications, many=True)
+        return Response(serializer.data)
+    
+    @action(detail=False, methods=['post'])
+    def mark_notifications_read(self, request):
+        """将通知标记为已读，未提供 ids 时标记全部"""
+        notifications = FlightNotification.objects.filter(passenger=request.user, is_read=False)
+        ids = request.data.get('ids')
+        if ids:
+            notifications = notifications.filter(id__in=ids)
+        count = notifications.update(is_read=True)
+        return Response({"message": f"已标记 {count} 条通知为已读", "count": count})
 
 
 class FlightAnnouncementViewSet(viewsets.ModelViewSet):
@@ -188,6 +478,8 @@ class FlightAnnouncementViewSet(viewsets.ModelViewSet):
     filterset_fields = ['flight']
     ordering_fields = ['created_at']
     pagination_class = StandardResultsSetPagination
+    # ?pagination=cursor 时使用的键集分页排序
+    cursor_ordering = ('-created_at', '-id')
     
     def get_serializer_class(self):
         """根据操作类型选择合适的序列化器"""
@@ -197,7 +489,7 @@ class FlightAnnouncementViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['post'])
     def announce(self, request):
-        """创建航班播报记录并返回播报内容"""
+        """创建航班播报记录，加入数字人播报队列并返回播报内容"""
         serializer = FlightAnnouncementCreateSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
@@ -207,16 +499,18 @@ class FlightAnnouncementViewSet(viewsets.ModelViewSet):
         # 如果未提供播报内容，则使用默认的状态播报
         content = serializer.validated_data.get('content')
         if not content:
-            content = flight.get_status_display_for_voice()
+            content = get_voice_text(flight)
         
         # 创建播报记录
         announcement = FlightAnnouncement.objects.create(
             flight=flight,
             content=content
         )
+        tasks = enqueue(content, 'flight', source_id=announcement.id)
         
         return Response({
             'flight_number': flight.flight_number,
             'content': content,
-            'id': announcement.id
+            'id': announcement.id,
+            'queued_tasks': [task.id for task in tasks]
         }, status=status.HTTP_201_CREATED)
@@ -0,0 +1,123 @@
+"""
+航班语音播报文本
+
+每种状态对应一个预先编译好的模板（绑定的 str.format），渲染时只格式化当前状态需要的模板，
+时间直接由 datetime 字段拼接，不再逐个调用 strftime。
+
+渲染结果按 航班ID + updated_at 缓存：航班通过 save 或 update_and_record 修改时 updated_at 随之变化，
+旧的缓存项自然失效；保存时信号还会删除当前键，覆盖未更新 updated_at 的保存
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+DEFAULT_VOICE_CACHE_TIMEOUT = 3600
+UNKNOWN_TIME = '未知时间'
+
+TEMPLATES = {
+    'scheduled': '航班{flight_number}计划于{scheduled_departure_time}从{departure_airport}{terminal}航站楼{gate}登机口出发。'.format,
+    'delayed': '航班{flight_number}延误，预计延误到{actual_departure_time}，请关注航班动态。'.format,
+    'boarding': '航班{flight_number}正在{terminal}航站楼{gate}登机口登机，请尽快前往。'.format,
+    'departed': '航班{flight_number}已于{actual_departure_time}起飞。'.format,
+    'arrived': '航班{flight_number}已于{actual_arrival_time}到达{arrival_airport}。'.format,
+    'cancelled': '航班{flight_number}已取消，请联系航空公司获取更多信息。'.format,
+}
+UNKNOWN_TEMPLATE = '航班{flight_number}状态未知'.format
+
+# 播报板需要读取的字段
+BOARD_FIELDS = (
+    'id', 'flight_number', 'status', 'gate', 'terminal', 'departure_airport', 'arrival_airport',
+    'scheduled_departure_time', 'actual_departure_time', 'actual_arrival_time', 'updated_at',
+)
+
+
+def format_time(value):
+    """与 strftime('%Y年%m月%d日 %H时%M分') 的结果相同"""
+    if value is None:
+        return UNKNOWN_TIME
+    return f'{value.year:04d}年{value.month:02d}月{value.day:02d}日 {value.hour:02d}时{value.minute:02d}分'
+
+
+def render_voice(flight):
+    """渲染航班当前状态的播报文本（不使用缓存）"""
+    template = TEMPLATES.get(flight.status, UNKNOWN_TEMPLATE)
+    return template(
+        flight_number=flight.flight_number,
+        departure_airport=flight.departure_airport,
+        arrival_airport=flight.arrival_airport,
+        terminal=flight.terminal,
+        gate=flight.gate,
+        scheduled_departure_time=format_time(flight.scheduled_departure_time),
+        actual_departure_time=format_time(flight.actual_departure_time),
+        actual_arrival_time=format_time(flight.actual_arrival_time),
+    )
+
+
+def voice_cache_key(flight):
+    return f'flight:voice:{flight.pk}:{flight.updated_at.timestamp() if flight.updated_at else 0}'
+
+
+def get_cache_timeout():
+    return getattr(settings, 'FLIGHT_VOICE_CACHE_TIMEOUT', DEFAULT_VOICE_CACHE_TIMEOUT)
+
+
+def get_voice_text(flight):
+    """获取航班播报文本，优先读取缓存"""
+    timeout = get_cache_timeout()
+    if not timeout or flight.pk is None:
+        return render_voice(flight)
+    key = voice_cache_key(flight)
+    text = cache.get(key)
+    if text is None:
+        text = render_voice(flight)
+        cache.set(key, text, timeout)
+    return text
+
+
+def get_voice_texts(flights):
+    """
+    批量获取播报文本，一次读取缓存，只渲染未命中的航班
+
+    Returns:
+        {航班ID: 播报文本}
+    """
+    flights = list(flights)
+    timeout = get_cache_timeout()
+    if not timeout:
+        return {flight.pk: render_voice(flight) for flight in flights}
+    keys = {flight.pk: voice_cache_key(flight) for flight in flights}
+    cached = cache.get_many(keys.values())
+    texts, missing = {}, {}
+    for flight in flights:
+        text = cached.get(keys[flight.pk])
+        if text is None:
+            text = missing[keys[flight.pk]] = render_voice(flight)
+        texts[flight.pk] = text
+    if missing:
+        cache.set_many(missing, timeout)
+    return texts
+
+
+def invalidate_voice_text(flight):
+    cache.delete(voice_cache_key(flight))
+
+
+def departure_board(hours=2, terminal=None, now=None):
+    """
+    即将出发的航班：计划或预计出发时间在未来 hours 小时内
+
+    Returns:
+        按计划出发时间排序的查询集，只读取播报所需字段
+    """
+    from .models import Flight
+
+    now = now or timezone.now()
+    end = now + timezone.timedelta(hours=hours)
+    queryset = Flight.objects.filter(
+        Q(scheduled_departure_time__gte=now, scheduled_departure_time__lt=end)
+        | Q(actual_departure_time__gte=now, actual_departure_time__lt=end)
+    )
+    if terminal:
+        queryset = queryset.filter(terminal=terminal)
+    return queryset.only(*BOARD_FIELDS).order_by('scheduled_departure_time', 'id')
@@ -0,0 +1,153 @@
+"""
+生效中公告的内存索引
+
+每个进程在内存中保存全部已激活且尚未失效的公告（含未来生效的公告）及其序列化结果，
+并记录下一个生效/失效边界：
+    公告保存或删除（含公告类型变更）   数据代号变化，各进程下次检查代号时重新加载
+    到达下一个边界                     只在内存中重新计算生效集合，不查询数据库
+其余请求直接返回内存中的快照。
+
+数据代号由公告表计算（公告数、最近更新时间、最近状态变化时间、公告类型最近更新时间），
+不依赖进程内缓存，任一进程修改公告后其他进程都能看到。每个进程最多每 CHECK_INTERVAL 秒
+查询一次代号；本进程内的修改立即生效。
+
+公告在 start_time <= 当前时间 <= end_time（未设置的一端不限）时生效。
+快照的 version 由数据代号和生效公告ID计算，同一数据、同一生效集合在各进程中的 version 相同，
+可作为 ETag 用于条件请求
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from .models import Announcement
+
+EMERGENCY_TYPE = 'emergency'
+EMERGENCY_PRIORITY = 3
+DEFAULT_CHECK_INTERVAL = 1
+
+
+def get_check_interval():
+    return getattr(settings, 'ACTIVE_ANNOUNCEMENTS_CHECK_INTERVAL', DEFAULT_CHECK_INTERVAL)
+
+
+def get_generation():
+    """由公告表计算的数据代号，公告新增、修改、删除或公告类型修改后变化"""
+    row = Announcement.objects.aggregate(
+        count=Count('id'), updated=Max('updated_at'), state_changed=Max('state_changed_at'),
+        type_updated=Max('type__updated_at'),
+    )
+    return hashlib.sha1(repr(tuple(row.values())).encode()).hexdigest()[:12]
+
+
+def invalidate_active_announcements():
+    """公告变化后本进程立即重新检查数据代号；事务提交后再次检查，避免在提交前加载到旧数据"""
+    active_announcements.invalidate()
+    transaction.on_commit(active_announcements.invalidate)
+
+
+class ActiveSnapshot:
+    """某一时刻的生效公告（只读）"""
+
+    def __init__(self, generation, active, emergency, bounds):
+        self.active = active
+        self.emergency = emergency
+        self.active_ids = [row['id'] for row in active]
+        # 生效集合在 last_start <= now < next_start 且 last_end < now <= next_end 期间保持不变
+        self.last_start, self.next_start, self.last_end, self.next_end = bounds
+        digest = hashlib.sha1(','.join(map(str, self.active_ids)).encode()).hexdigest()[:12]
+        self.version = f'{generation}-{digest}'
+
+    def valid_at(self, timestamp):
+        return self.last_start <= timestamp < self.next_start and self.last_end < timestamp <= self.next_end
+
+    @property
+    def next_boundary(self):
+        boundary = min(self.next_start, self.next_end)
+        return None if math.isinf(boundary) else timezone.datetime.fromtimestamp(
+            boundary, tz=timezone.get_current_timezone()
+        )
+
+
+class ActiveAnnouncementIndex:
+    """生效中公告的进程内索引"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = None
+        # 最近一次查询数据代号的时间（time.monotonic），None 表示下次读取时必须查询
+        self._checked_at = None
+        self._current_generation = None
+        # [(生效时间戳, 失效时间戳, 是否紧急通知, 序列化结果)]
+        self._entries = []
+        self._snapshot = None
+
+    def invalidate(self):
+        self._checked_at = None
+
+    def current_generation(self):
+        """数据库中的数据代号，CHECK_INTERVAL 秒内复用上次查询的结果"""
+        checked_at = self._checked_at
+        now = time.monotonic()
+        if checked_at is None or now - checked_at >= get_check_interval():
+            self._current_generation = get_generation()
+            self._checked_at = now
+        return self._current_generation
+
+    def load(self, now):
+        from .serializers import AnnouncementListSerializer
+        announcements = Announcement.objects.select_related('type', 'created_by').filter(
+            Q(end_time__isnull=True) | Q(end_time__gte=now), is_active=True,
+        )
+        rows = AnnouncementListSerializer(announcements, many=True).data
+        self._entries = [
+            (
+                announcement.start_time.timestamp() if announcement.start_time else -math.inf,
+                announcement.end_time.timestamp() if announcement.end_time else math.inf,
+                announcement.type.name == EMERGENCY_TYPE and announcement.priority == EMERGENCY_PRIORITY,
+                dict(row),
+            )
+            for announcement, row in zip(announcements, rows)
+        ]
+
+    def compute(self, generation, timestamp):
+        active, emergency = [], []
+        last_start = last_end = -math.inf
+        next_start = next_end = math.inf
+        for start, end, is_emergency, row in self._entries:
+            if start > timestamp:
+                next_start = min(next_start, start)
+            elif end < timestamp:
+                last_end = max(last_end, end)
+            else:
+                active.append(row)
+                if is_emergency:
+                    emergency.append(row)
+                last_start = max(last_start, start)
+                next_end = min(next_end, end)
+        return ActiveSnapshot(generation, active, emergency, (last_start, next_start, last_end, next_end))
+
+    def snapshot(self, now=None):
+        """当前生效公告的快照，数据变化或经过边界时重新计算"""
+        now = now or timezone.now()
+        timestamp = now.timestamp()
+        generation = self.current_generation()
+        snapshot = self._snapshot
+        if snapshot is not None and self._generation == generation and snapshot.valid_at(timestamp):
+            return snapshot
+        with self._lock:
+            if self._generation != generation:
+                self.load(now)
+                self._generation = generation
+            elif self._snapshot is not None and self._snapshot.valid_at(timestamp):
+                return self._snapshot
+            self._snapshot = self.compute(generation, timestamp)
+            return self._snapshot
+
+
+active_announcements = ActiveAnnouncementIndex()
@@ -0,0 +1,160 @@
+"""
+公告生命周期调度
+
+Announcement.state 为反规范化的生命周期状态（待生效 / 生效中 / 已失效 / 已停用），保存时按当时的时间计算；
+run_announcement_scheduler 管理命令运行 LifecycleScheduler，在 start_time / end_time 到达时更新状态并发送
+announcement_state_changed 信号，供实时推送、数字人播报等模块在边界时刻作出反应。
+
+调度器在内存中维护一个按触发时间排序的最小堆，每个事件入堆、出堆均为 O(log n)：
+    同步    每次检查时按 updated_at 读取上次同步以来更新过的公告（不依赖进程内缓存，任一进程的修改都能读到），
+            为其重新安排事件；公告的旧事件不从堆中删除，出堆时按版本号识别并丢弃，已删除的公告在出堆时移除
+    触发    到期事件按公告最新的激活状态与时间重新计算状态，与数据库中的状态不同时条件更新并发送信号；
+            更新与信号接收方在同一事务中，接收方失败时状态回滚并在 RETRY_DELAY 秒后重试，不影响其他公告
+    补偿    启动时加载全部未结束的公告，状态与当前时间不符的（如调度进程停止期间经过边界）立即触发
+
+调度器运行在独立进程中，信号接收方发布的实时推送经 realtime 的 OutboxBroker 写入事件表，
+由各 SSE 进程读取后推送给连接
+"""
+import heapq
+import itertools
+import logging
+
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .active import invalidate_active_announcements
+from .models import Announcement
+
+logger = logging.getLogger('app')
+
+# 公告状态在边界时刻变化后发送，参数 announcement、old_state、new_state
+announcement_state_changed = Signal()
+
+# 同步时多读取的时间范围（秒），覆盖保存与事务提交之间的延迟
+SYNC_MARGIN = 60
+
+# 状态变化处理失败（如播报入队出错）后重试的间隔（秒）
+RETRY_DELAY = 30
+
+
+class LifecycleScheduler:
+    """公告生效/失效事件的堆调度器"""
+
+    def __init__(self):
+        # [(触发时间戳, 序号, 公告ID, 版本号)]
+        self._heap = []
+        self._counter = itertools.count()
+        # {公告ID: (版本号, 是否激活, 生效时间, 失效时间)}
+        self._entries = {}
+        self.synced_at = None
+
+    def __len__(self):
+        return len(self._heap)
+
+    def schedule(self, announcement, now):
+        """按公告最新数据安排事件，替换该公告之前的事件"""
+        version = announcement.updated_at.timestamp() if announcement.updated_at else 0
+        current = self._entries.get(announcement.pk)
+        if current is not None and current[0] == version:
+            return
+        self._entries[announcement.pk] = (
+            version, announcement.is_active, announcement.start_time, announcement.end_time,
+        )
+        times = []
+        if announcement.compute_state(now) != announcement.state:
+            times.append(now)
+        if announcement.is_active:
+            times.extend(boundary for boundary in (announcement.start_time, announcement.end_time)
+                         if boundary and boundary > now)
+        for moment in times:
+            heapq.heappush(self._heap, (moment.timestamp(), next(self._counter), announcement.pk, version))
+
+    def load(self, now):
+        """加载全部待生效、生效中的公告（已失效、已停用的公告只有再次保存后才会变化）"""
+        self._heap = []
+        self._entries = {}
+        self.synced_at = now
+        queryset = Announcement.objects.filter(state__in=(Announcement.STATE_SCHEDULED, Announcement.STATE_LIVE))
+        for announcement in queryset.iterator(chunk_size=1000):
+            self.schedule(announcement, now)
+        logger.info('公告生命周期调度器加载 %s 条公告，%s 个事件', len(self._entries), len(self._heap))
+
+    def sync(self, now):
+        """为上次同步以来更新过的公告重新安排事件，返回读取的公告数"""
+        if self.synced_at is None:
+            self.load(now)
+            return len(self._entries)
+        since = self.synced_at - timezone.timedelta(seconds=SYNC_MARGIN)
+        self.synced_at = now
+        count = 0
+        for announcement in Announcement.objects.filter(updated_at__gte=since).iterator(chunk_size=1000):
+            self.schedule(announcement, now)
+            count += 1
+        return count
+
+    def next_event_at(self):
+        """最近一个有效事件的触发时间戳，没有事件时返回 None"""
+        while self._heap:
+            _, _, announcement_id, version = self._heap[0]
+            entry = self._entries.get(announcement_id)
+            if entry is not None and entry[0] == version:
+                return self._heap[0][0]
+            heapq.heappop(self._heap)
+        return None
+
+    def run_due(self, now=None):
+        """
+        触发已到期的事件
+
+        Returns:
+            状态发生变化的公告数
+        """
+        now = now or timezone.now()
+        timestamp = now.timestamp()
+        due = set()
+        while self._heap and self._heap[0][0] <= timestamp:
+            _, _, announcement_id, version = heapq.heappop(self._heap)
+            entry = self._entries.get(announcement_id)
+            if entry is not None and entry[0] == version:
+                due.add(announcement_id)
+
+        changed = 0
+        found, failed = set(), set()
+        for announcement in Announcement.objects.select_related('type').filter(pk__in=due).order_by('pk'):
+            found.add(announcement.pk)
+            new_state = announcement.compute_state(now)
+            old_state = announcement.state
+            if new_state == old_state:
+                continue
+            try:
+                # 状态更新与信号接收方（自动播报等）在同一事务中，接收方失败时状态一并回滚，稍后重试
+                with transaction.atomic():
+                    # 条件更新，公告在此期间被保存时以保存时计算的状态为准
+                    updated = Announcement.objects.filter(pk=announcement.pk, state=old_state).update(
+                        state=new_state, state_changed_at=now
+                    )
+                    if not updated:
+                        continue
+                    announcement.state = new_state
+                    announcement.state_changed_at = now
+                    announcement_state_changed.send(
+                        sender=Announcement, announcement=announcement, old_state=old_state, new_state=new_state
+                    )
+            except Exception:
+                logger.exception('公告 %s 状态 %s -> %s 处理失败，%s 秒后重试', announcement.pk, old_state, new_state, RETRY_DELAY)
+                announcement.state = old_state
+                failed.add(announcement.pk)
+                version = self._entries[announcement.pk][0]
+                heapq.heappush(self._heap, (timestamp + RETRY_DELAY, next(self._counter), announcement.pk, version))
+                continue
+            changed += 1
+            logger.info('公告 %s 状态 %s -> %s', announcement.pk, old_state, new_state)
+        # 已删除或不会再有事件的公告不再保留
+        for announcement_id in due - failed:
+            _, is_active, start_time, end_time = self._entries[announcement_id]
+            if announcement_id not in found or not is_active or not any(time and time.timestamp() > timestamp for time in (start_time, end_time)):
+                del self._entries[announcement_id]
+        if changed:
+            invalidate_active_announcements()
+        return changed
@@ -0,0 +1,43 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from apps.informations.lifecycle import LifecycleScheduler
+
+
+class Command(BaseCommand):
+    help = '公告生命周期调度进程：在公告生效、失效时刻更新公告状态并通知实时推送与数字人播报'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='处理完当前到期的事件后退出')
+        parser.add_argument('--interval', type=float, default=5, help='检查公告变化的间隔（秒），默认 5 秒')
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        scheduler = LifecycleScheduler()
+
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        self.stdout.write('公告生命周期调度进程已启动')
+        while True:
+            close_old_connections()
+            scheduler.sync(timezone.now())
+            changed = scheduler.run_due(timezone.now())
+            if changed:
+                self.stdout.write(f'{changed} 条公告状态已更新')
+            if options['once'] or self.stopping:
+                break
+            # 睡眠到下一个事件或下一次检查公告变化，取较早者
+            next_event = scheduler.next_event_at()
+            delay = interval if next_event is None else min(interval, next_event - time.time())
+            time.sleep(max(delay, 0))
+
+        self.stdout.write(self.style.SUCCESS('公告生命周期调度进程已退出'))
+
+    def stop(self, signum, frame):
+        self.stopping = True
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.5 on 2026-10-18 20:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('informations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(fields=['-priority', '-created_at'], name='announce_priority_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(fields=['is_active', 'start_time', 'end_time', '-priority'], name='announce_active_window_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(fields=['type', 'is_active', 'priority'], name='announce_type_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='announcementbroadcast',
+            index=models.Index(fields=['-broadcast_at'], name='annbc_broadcast_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='announcementbroadcast',
+            index=models.Index(fields=['announcement', '-broadcast_at'], name='annbc_announce_broadcast_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.5 on 2026-10-18 20:52
+
+from django.db import migrations, models
+from django.db.models import Q
+from django.utils import timezone
+
+
+def backfill_state(apps, schema_editor):
+    Announcement = apps.get_model('informations', 'Announcement')
+    now = timezone.now()
+    Announcement.objects.update(state='live', state_changed_at=now)
+    Announcement.objects.filter(is_active=True, start_time__gt=now).update(state='scheduled')
+    Announcement.objects.filter(Q(start_time__isnull=True) | Q(start_time__lte=now), is_active=True, end_time__lt=now).update(state='expired')
+    Announcement.objects.filter(is_active=False).update(state='disabled')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('informations', '0002_add_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='announcement',
+            name='state',
+            field=models.CharField(choices=[('scheduled', '待生效'), ('live', '生效中'), ('expired', '已失效'), ('disabled', '已停用')], default='live', editable=False, help_text='保存时按生效/失效时间计算，之后由公告生命周期调度进程在边界时刻更新', max_length=20, verbose_name='生命周期状态'),
+        ),
+        migrations.AddField(
+            model_name='announcement',
+            name='state_changed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='状态变更时间'),
+        ),
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(fields=['state', '-priority'], name='announce_state_priority_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(fields=['updated_at'], name='announce_updated_idx'),
+        ),
+        migrations.RunPython(backfill_state, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.5 on 2026-10-18 20:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('informations', '0003_announcement_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='announcement',
+            name='target_zones',
+            field=models.JSONField(default=list, editable=False, help_text='创建或修改相关位置时按位置坐标解析的播报区域编码', verbose_name='目标播报区域'),
+        ),
+        migrations.AddField(
+            model_name='announcementbroadcast',
+            name='target_zones',
+            field=models.JSONField(default=list, editable=False, help_text='创建时沿用公告的播报区域', verbose_name='目标播报区域'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+ALL_ZONES = '*'
+
+
+def backfill_target_zones(apps, schema_editor):
+    """区域功能上线前创建的公告与公告播报记录没有目标区域，视为发送到全部播报区域"""
+    for name in ('Announcement', 'AnnouncementBroadcast'):
+        model = apps.get_model('informations', name)
+        empty = [pk for pk, zones in model.objects.values_list('pk', 'target_zones').iterator() if not zones]
+        for start in range(0, len(empty), 1000):
+            model.objects.filter(pk__in=empty[start:start + 1000]).update(target_zones=[ALL_ZONES])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('informations', '0004_target_zones'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_target_zones, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
@@ -64,6 +65,17 @@ class Announcement(models.Model):
         (3, '高'),
     )
     
+    STATE_SCHEDULED = 'scheduled'
+    STATE_LIVE = 'live'
+    STATE_EXPIRED = 'expired'
+    STATE_DISABLED = 'disabled'
+    STATE_CHOICES = (
+        (STATE_SCHEDULED, '待生效'),
+        (STATE_LIVE, '生效中'),
+        (STATE_EXPIRED, '已失效'),
+        (STATE_DISABLED, '已停用'),
+    )
+    
     title = models.CharField(_('公告标题'), max_length=100)
     content = models.TextField(_('公告内容'))
     type = models.ForeignKey(
@@ -77,6 +89,15 @@ class Announcement(models.Model):
     start_time = models.DateTimeField(_('生效时间'), null=True, blank=True)
     end_time = models.DateTimeField(_('失效时间'), null=True, blank=True)
     location = models.CharField(_('相关位置'), max_length=100, blank=True, null=True)
+    target_zones = models.JSONField(
+        _('目标播报区域'), default=list, editable=False,
+        help_text=_('创建或修改相关位置时按位置坐标解析的播报区域编码')
+    )
+    state = models.CharField(
+        _('生命周期状态'), max_length=20, choices=STATE_CHOICES, default=STATE_LIVE, editable=False,
+        help_text=_('保存时按生效/失效时间计算，之后由公告生命周期调度进程在边界时刻更新')
+    )
+    state_changed_at = models.DateTimeField(_('状态变更时间'), null=True, blank=True, editable=False)
     created_by = models.ForeignKey(
         'users.CustomUser',
         on_delete=models.SET_NULL,
@@ -91,10 +112,44 @@ class Announcement(models.Model):
         verbose_name = _('公告信息')
         verbose_name_plural = _('公告信息')
         ordering = ['-priority', '-created_at']
+        indexes = [
+            models.Index(fields=['-priority', '-created_at'], name='announce_priority_created_idx'),
+            models.Index(fields=['is_active', 'start_time', 'end_time', '-priority'], name='announce_active_window_idx'),
+            models.Index(fields=['type', 'is_active', 'priority'], name='announce_type_active_idx'),
+            models.Index(fields=['state', '-priority'], name='announce_state_priority_idx'),
+            models.Index(fields=['updated_at'], name='announce_updated_idx'),
+        ]
     
     def __str__(self):
         return self.title
     
+    def compute_state(self, now=None):
+        """按是否激活与生效/失效时间计算生命周期状态"""
+        now = now or timezone.now()
+        if not self.is_active:
+            return self.STATE_DISABLED
+        if self.start_time and self.start_time > now:
+            return self.STATE_SCHEDULED
+        if self.end_time and self.end_time < now:
+            return self.STATE_EXPIRED
+        return self.STATE_LIVE
+    
+    def broadcast(self, content=None, broadcast_by=None):
+        """
+        记录一次播报并加入目标区域的数字人播报队列（紧急通知优先播报）
+        
+        Returns:
+            (AnnouncementBroadcast, 播报任务列表)
+        """
+        from apps.broadcasting.models import BroadcastTask
+        from apps.broadcasting.queue import enqueue
+        content = content or self.get_voice_content()
+        broadcast = AnnouncementBroadcast.objects.create(announcement=self, content=content, broadcast_by=broadcast_by)
+        priority = BroadcastTask.PRIORITY_EMERGENCY if self.type.name == 'emergency' else self.priority
+        return broadcast, enqueue(
+            content, 'announcement', source_id=broadcast.id, priority=priority, zones=broadcast.target_zones
+        )
+    
     def get_voice_content(self):
         """获取语音播报内容"""
         type_name = self.type.description if self.type else "通知"
@@ -119,12 +174,19 @@ class AnnouncementBroadcast(models.Model):
         related_name='broadcasted_announcements',
         verbose_name=_('播报者')
     )
+    target_zones = models.JSONField(
+        _('目标播报区域'), default=list, editable=False, help_text=_('创建时沿用公告的播报区域')
+    )
     broadcast_at = models.DateTimeField(_('播报时间'), auto_now_add=True)
     
     class Meta:
         verbose_name = _('公告播报记录')
         verbose_name_plural = _('公告播报记录')
         ordering = ['-broadcast_at']
+        indexes = [
+            models.Index(fields=['-broadcast_at'], name='annbc_broadcast_at_idx'),
+            models.Index(fields=['announcement', '-broadcast_at'], name='annbc_announce_broadcast_idx'),
+        ]
     
     def __str__(self):
         return f"{self.announcement.title} - {self.broadcast_at.strftime('%Y-%m-%d %H:%M:%S')}"
@@ -22,10 +22,13 @@ class AnnouncementListSerializer(serializers.ModelSerializer):
         model = Announcement
         fields = [
             'id', 'title', 'content', 'type', 'type_name', 'type_color', 'type_icon',
-            'priority', 'priority_display', 'is_active', 'start_time', 'end_time',
-            'location', 'created_by', 'created_by_username', 'created_at', 'updated_at'
+            'priority', 'priority_display', 'is_active', 'start_time', 'end_time', 'state', 'state_changed_at',
+            'location', 'target_zones', 'created_by', 'created_by_username', 'created_at', 'updated_at'
+        ]
+        read_only_fields = [
+            'created_at', 'updated_at', 'created_by_username', 'type_name', 'type_color', 'type_icon',
+            'state', 'state_changed_at', 'target_zones',
         ]
-        read_only_fields = ['created_at', 'updated_at', 'created_by_username', 'type_name', 'type_color', 'type_icon']
 
 
 class AnnouncementDetailSerializer(serializers.ModelSerializer):
@@ -38,10 +41,12 @@ class AnnouncementDetailSerializer(serializers.ModelSerializer):
         model = Announcement
         fields = [
             'id', 'title', 'content', 'type', 'type_data', 'priority', 'priority_display',
-            'is_active', 'start_time', 'end_time', 'location',
+            'is_active', 'start_time', 'end_time', 'state', 'state_changed_at', 'location', 'target_zones',
             'created_by', 'created_by_username', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['created_at', 'updated_at', 'created_by_username', 'type_data']
+        read_only_fields = [
+            'created_at', 'updated_at', 'created_by_username', 'type_data', 'state', 'state_changed_at', 'target_zones',
+        ]
 
 
 class AnnouncementCreateUpdateSerializer(serializers.ModelSerializer):
@@ -69,9 +74,11 @@ class AnnouncementBroadcastSerializer(serializers.ModelSerializer):
         model = AnnouncementBroadcast
         fields = [
             'id', 'announcement', 'announcement_title', 'announcement_type',
-            'content', 'broadcast_by', 'broadcast_by_username', 'broadcast_at'
+            'content', 'target_zones', 'broadcast_by', 'broadcast_by_username', 'broadcast_at'
+        ]
+        read_only_fields = [
+            'broadcast_at', 'broadcast_by_username', 'announcement_title', 'announcement_type', 'target_zones',
         ]
-        read_only_fields = ['broadcast_at', 'broadcast_by_username', 'announcement_title', 'announcement_type']
 
 
 class AnnouncementBroadcastCreateSerializer(serializers.Serializer):
@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .active import invalidate_active_announcements
+from .lifecycle import announcement_state_changed
+from .models import Announcement, AnnouncementType
+
+
+@receiver(pre_save, sender=Announcement)
+def update_announcement_state(sender, instance, **kwargs):
+    """保存时按当前时间计算生命周期状态，之后的边界由生命周期调度进程处理"""
+    state = instance.compute_state()
+    if state != instance.state or instance.state_changed_at is None:
+        instance.state = state
+        instance.state_changed_at = timezone.now()
+
+
+@receiver(post_save, sender=Announcement)
+@receiver(post_delete, sender=Announcement)
+@receiver(post_save, sender=AnnouncementType)
+@receiver(post_delete, sender=AnnouncementType)
+def refresh_active_announcements(sender, **kwargs):
+    """公告或公告类型变化后重新加载生效公告索引"""
+    invalidate_active_announcements()
+
+
+@receiver(announcement_state_changed)
+def broadcast_started_announcement(sender, announcement, old_state, new_state, **kwargs):
+    """定时公告到达生效时间时自动播报，在调度器更新状态的事务中执行，入队失败时状态一并回滚"""
+    if old_state == Announcement.STATE_SCHEDULED and new_state == Announcement.STATE_LIVE:
+        announcement.broadcast()
@@ -1,3 +1,235 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.broadcasting.models import BroadcastTask
+from apps.broadcasting.tts import reset_audio_cache
+from apps.realtime.broker import reset_broker
+from apps.realtime.models import RealtimeEvent
+from .active import active_announcements
+from .lifecycle import RETRY_DELAY, LifecycleScheduler, announcement_state_changed
+from .models import Announcement, AnnouncementBroadcast, AnnouncementType
+
+User = get_user_model()
+
+
+class ActiveAnnouncementTests(TestCase):
+    """生效公告内存索引测试"""
+
+    url = '/api/informations/announcements/'
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='passenger', password='testpassword'))
+        now = timezone.now()
+        regular = AnnouncementType.objects.create(name='regular', description='常规通知')
+        self.emergency_type = AnnouncementType.objects.create(name='emergency', description='紧急通知')
+        self.current = Announcement.objects.create(title='安检提示', content='请提前安检', type=regular)
+        self.ending = Announcement.objects.create(
+            title='施工', content='B区施工', type=regular, priority=1, end_time=now + timezone.timedelta(hours=1),
+        )
+        self.upcoming = Announcement.objects.create(
+            title='登机口调整', content='C区登机口调整', type=regular, priority=1, start_time=now + timezone.timedelta(hours=2),
+        )
+        self.evacuate = Announcement.objects.create(
+            title='疏散', content='请立即疏散', type=self.emergency_type, priority=3,
+        )
+        Announcement.objects.create(title='已停用', content='已停用', type=regular, is_active=False)
+        Announcement.objects.create(
+            title='已过期', content='已过期', type=regular, end_time=now - timezone.timedelta(minutes=1),
+        )
+
+    def ids(self, response):
+        data = response.data
+        return [row['id'] for row in (data['results'] if isinstance(data, dict) else data)]
+
+    def test_feeds_served_from_memory_with_etag(self):
+        response = self.client.get(f'{self.url}active/')
+        self.assertEqual(self.ids(response), [self.evacuate.pk, self.current.pk, self.ending.pk])
+        self.assertEqual(self.ids(self.client.get(f'{self.url}emergency/')), [self.evacuate.pk])
+        self.assertEqual(sorted(self.ids(self.client.get(self.url))), sorted(self.ids(response)))
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(f'{self.url}active/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+        # 带筛选参数时查询数据库
+        self.assertEqual(self.ids(self.client.get(f'{self.url}active/', {'priority': 1})), [self.ending.pk])
+
+        # 公告保存后重新加载
+        self.evacuate.title = '紧急疏散'
+        self.evacuate.save()
+        response = self.client.get(f'{self.url}emergency/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['title'], '紧急疏散')
+
+    def test_changes_from_other_processes(self):
+        # 其他进程的修改不会使本进程的索引失效，检查间隔到期后由数据代号发现
+        with override_settings(ACTIVE_ANNOUNCEMENTS_CHECK_INTERVAL=60):
+            etag = self.client.get(f'{self.url}active/')['ETag']
+            Announcement.objects.filter(pk=self.current.pk).update(title='已更新', updated_at=timezone.now())
+            self.assertEqual(self.client.get(f'{self.url}active/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with override_settings(ACTIVE_ANNOUNCEMENTS_CHECK_INTERVAL=0):
+            response = self.client.get(f'{self.url}active/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('已更新', [row['title'] for row in response.data['results']])
+
+        # 删除公告同样改变数据代号
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {Announcement._meta.db_table} WHERE id = %s', [self.ending.pk])
+        with override_settings(ACTIVE_ANNOUNCEMENTS_CHECK_INTERVAL=0):
+            self.assertNotIn(self.ending.pk, self.ids(self.client.get(f'{self.url}active/')))
+
+    def test_boundaries_recomputed_in_memory(self):
+        now = timezone.now()
+        snapshot = active_announcements.snapshot(now)
+        self.assertEqual(snapshot.next_boundary, self.ending.end_time)
+
+        with self.assertNumQueries(0):
+            later = active_announcements.snapshot(now + timezone.timedelta(hours=3))
+        self.assertEqual(later.active_ids, [self.evacuate.pk, self.current.pk, self.upcoming.pk])
+        self.assertNotEqual(later.version, snapshot.version)
+        self.assertIsNone(later.next_boundary)
+        self.assertEqual(active_announcements.snapshot(now).version, snapshot.version)
+
+
+class LifecycleSchedulerTests(TestCase):
+    """公告生命周期调度测试"""
+
+    def setUp(self):
+        cache.clear()
+        # 播报任务入队时合成的语音写入临时目录
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        override = override_settings(BROADCAST_TTS={'CACHE_DIR': directory})
+        override.enable()
+        self.addCleanup(override.disable)
+        reset_audio_cache()
+        self.addCleanup(reset_audio_cache)
+        self.now = timezone.now()
+        self.type = AnnouncementType.objects.create(name='regular', description='常规通知')
+        self.events = []
+        announcement_state_changed.connect(self.record)
+        self.addCleanup(announcement_state_changed.disconnect, self.record)
+
+    def record(self, sender, announcement, old_state, new_state, **kwargs):
+        self.events.append((announcement.pk, old_state, new_state))
+
+    def create(self, title, **fields):
+        return Announcement.objects.create(title=title, content=title, type=self.type, **fields)
+
+    def test_state_computed_on_save(self):
+        hour = timezone.timedelta(hours=1)
+        self.assertEqual(self.create('生效中').state, Announcement.STATE_LIVE)
+        self.assertEqual(self.create('待生效', start_time=self.now + hour).state, Announcement.STATE_SCHEDULED)
+        self.assertEqual(self.create('已失效', end_time=self.now - hour).state, Announcement.STATE_EXPIRED)
+        announcement = self.create('已停用', is_active=False)
+        self.assertEqual(announcement.state, Announcement.STATE_DISABLED)
+        announcement.is_active = True
+        announcement.save()
+        self.assertEqual(Announcement.objects.get(pk=announcement.pk).state, Announcement.STATE_LIVE)
+
+    def test_events_fire_at_boundaries(self):
+        minute = timezone.timedelta(minutes=1)
+        later = self.create('施工', start_time=self.now + minute, end_time=self.now + 3 * minute)
+        ending = self.create('安检提示', end_time=self.now + 2 * minute)
+        self.create('长期公告')
+        scheduler = LifecycleScheduler()
+        scheduler.sync(self.now)
+        self.assertEqual(scheduler.next_event_at(), later.start_time.timestamp())
+        self.assertEqual(scheduler.run_due(self.now), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(scheduler.run_due(self.now + minute), 1)
+        self.assertEqual(self.events, [(later.pk, Announcement.STATE_SCHEDULED, Announcement.STATE_LIVE)])
+        self.assertEqual(Announcement.objects.get(pk=later.pk).state, Announcement.STATE_LIVE)
+        # 定时公告生效时自动播报
+        self.assertTrue(AnnouncementBroadcast.objects.filter(announcement=later).exists())
+        self.assertEqual(BroadcastTask.objects.filter(content=later.get_voice_content()).count(), 1)
+        self.assertEqual(active_announcements.snapshot(self.now + minute).active_ids[-1], later.pk)
+
+        # 修改后按新的失效时间调度，旧事件被丢弃
+        ending.end_time = self.now + 5 * minute
+        ending.save()
+        scheduler.sync(self.now + minute)
+        self.assertEqual(scheduler.run_due(self.now + 4 * minute), 1)
+        self.assertEqual(scheduler.run_due(self.now + 5 * minute + timezone.timedelta(seconds=1)), 1)
+        self.assertEqual(
+            [event[1:] for event in self.events[1:]],
+            [(Announcement.STATE_LIVE, Announcement.STATE_EXPIRED)] * 2,
+        )
+        self.assertIsNone(scheduler.next_event_at())
+        self.assertEqual(AnnouncementBroadcast.objects.count(), 1)
+
+    def test_failed_broadcast_rolls_back_and_retries(self):
+        minute = timezone.timedelta(minutes=1)
+        failing = self.create('施工', start_time=self.now + minute)
+        other = self.create('安检提示', start_time=self.now + minute)
+        scheduler = LifecycleScheduler()
+        scheduler.sync(self.now)
+
+        original = Announcement.broadcast
+
+        def broadcast(announcement, *args, **kwargs):
+            if announcement.pk == failing.pk:
+                raise RuntimeError('播报入队失败')
+            return original(announcement, *args, **kwargs)
+
+        with mock.patch.object(Announcement, 'broadcast', broadcast), self.assertLogs('app', 'ERROR'):
+            self.assertEqual(scheduler.run_due(self.now + minute), 1)
+        # 播报失败的公告状态回滚，不影响其他公告
+        self.assertEqual(Announcement.objects.get(pk=failing.pk).state, Announcement.STATE_SCHEDULED)
+        self.assertEqual(Announcement.objects.get(pk=other.pk).state, Announcement.STATE_LIVE)
+        self.assertFalse(AnnouncementBroadcast.objects.filter(announcement=failing).exists())
+
+        retry_at = self.now + minute + timezone.timedelta(seconds=RETRY_DELAY)
+        self.assertEqual(scheduler.next_event_at(), retry_at.timestamp())
+        self.assertEqual(scheduler.run_due(retry_at), 1)
+        self.assertEqual(Announcement.objects.get(pk=failing.pk).state, Announcement.STATE_LIVE)
+        self.assertEqual(AnnouncementBroadcast.objects.filter(announcement=failing).count(), 1)
+
+    def test_sync_reads_changes_from_other_processes(self):
+        minute = timezone.timedelta(minutes=1)
+        announcement = self.create('施工', end_time=self.now + 10 * minute)
+        removed = self.create('临时公告', end_time=self.now + 2 * minute)
+        scheduler = LifecycleScheduler()
+        scheduler.sync(self.now)
+
+        # 不经过本进程信号的修改（如其他进程保存）按 updated_at 读取
+        Announcement.objects.filter(pk=announcement.pk).update(
+            end_time=self.now + minute, updated_at=timezone.now()
+        )
+        scheduler.sync(self.now)
+        self.assertEqual(scheduler.next_event_at(), (self.now + minute).timestamp())
+
+        # 状态变化经发件箱推送给其他进程中的 SSE 连接
+        reset_broker()
+        self.addCleanup(reset_broker)
+        removed.delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(scheduler.run_due(self.now + 3 * minute), 1)
+        self.assertEqual(
+            list(RealtimeEvent.objects.filter(data__id=announcement.pk).values_list('data__action', flat=True)),
+            ['ended'],
+        )
+        self.assertIsNone(scheduler.next_event_at())
+        self.assertNotIn(removed.pk, scheduler._entries)
+
+    def test_command_catches_up_missed_boundaries(self):
+        announcement = self.create('临时公告', end_time=self.now + timezone.timedelta(minutes=1))
+        Announcement.objects.filter(pk=announcement.pk).update(end_time=self.now - timezone.timedelta(minutes=1))
+
+        output = io.StringIO()
+        call_command('run_announcement_scheduler', once=True, stdout=output)
+        self.assertIn('1 条公告状态已更新', output.getvalue())
+        self.assertEqual(Announcement.objects.get(pk=announcement.pk).state, Announcement.STATE_EXPIRED)
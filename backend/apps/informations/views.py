@@ -3,10 +3,9 @@ from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
-from django.utils import timezone
-from rest_framework.pagination import PageNumberPagination
+from django.utils.cache import get_conditional_response
 
+from .active import active_announcements
 from .models import AnnouncementType, Announcement, AnnouncementBroadcast
 from .serializers import (
     AnnouncementTypeSerializer,
@@ -16,13 +15,12 @@ from .serializers import (
     AnnouncementBroadcastSerializer,
     AnnouncementBroadcastCreateSerializer
 )
+from apps.broadcasting.zones import targets_zone
+from apps.common.pagination import StandardResultsSetPagination
 
 
-class StandardResultsSetPagination(PageNumberPagination):
-    """标准分页器"""
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
+# 生效公告列表从内存索引返回时允许的查询参数（分页、播报区域），其他参数（筛选、搜索、排序）改为查询数据库
+FEED_QUERY_PARAMS = {'page', 'page_size', 'count', 'zone'}
 
 
 class IsAdminOrReadOnly(permissions.BasePermission):
@@ -77,7 +75,7 @@ class AnnouncementViewSet(viewsets.ModelViewSet):
         """
         根据用户角色和查询参数，返回不同的queryset
         管理员可以看到所有公告
-        旅客只能看到激活状态且在有效期内的公告
+        旅客只能看到激活状态且在有效期内的公告（由生效公告索引提供）
         """
         queryset = super().get_queryset()
         
@@ -86,14 +84,7 @@ class AnnouncementViewSet(viewsets.ModelViewSet):
             return queryset
         
         # 旅客只能看到激活且在有效期内的公告
-        now = timezone.now()
-        return queryset.filter(
-            is_active=True
-        ).filter(
-            Q(start_time__isnull=True) | Q(start_time__lte=now)
-        ).filter(
-            Q(end_time__isnull=True) | Q(end_time__gte=now)
-        )
+        return queryset.filter(pk__in=active_announcements.snapshot().active_ids)
     
     @action(detail=True, methods=['get'])
     def voice_content(self, request, pk=None):
@@ -105,60 +96,44 @@ class AnnouncementViewSet(viewsets.ModelViewSet):
             'voice_content': announcement.get_voice_content()
         })
     
-    @action(detail=False, methods=['get'])
-    def active(self, request):
-        """获取当前有效的公告"""
-        now = timezone.now()
-        queryset = self.get_queryset().filter(
-            is_active=True
-        ).filter(
-            Q(start_time__isnull=True) | Q(start_time__lte=now)
-        ).filter(
-            Q(end_time__isnull=True) | Q(end_time__gte=now)
-        )
-        
-        # 应用筛选和排序
-        queryset = self.filter_queryset(queryset)
-        
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = AnnouncementListSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-            
-        serializer = AnnouncementListSerializer(queryset, many=True)
-        return Response(serializer.data)
-    
-    @action(detail=False, methods=['get'])
-    def emergency(self, request):
-        """获取当前紧急通知"""
-        now = timezone.now()
-        
-        # 获取紧急类型ID
-        try:
-            emergency_type = AnnouncementType.objects.get(name='emergency')
-            
-            queryset = self.get_queryset().filter(
-                type=emergency_type,
-                is_active=True,
-                priority=3  # 高优先级
-            ).filter(
-                Q(start_time__isnull=True) | Q(start_time__lte=now)
-            ).filter(
-                Q(end_time__isnull=True) | Q(end_time__gte=now)
-            )
-            
-            # 应用排序
-            queryset = self.filter_queryset(queryset)
-            
+    def feed_response(self, feed):
+        """
+        从生效公告索引返回公告列表（feed 为 active 或 emergency），支持 ETag 条件请求
+        zone 参数只返回目标区域包含该区域的公告（播报终端使用）；
+        带筛选、搜索或排序参数时按索引中的公告ID查询数据库
+        """
+        snapshot = active_announcements.snapshot()
+        rows = getattr(snapshot, feed)
+        zone = self.request.query_params.get('zone')
+        if zone:
+            rows = [row for row in rows if targets_zone(row['target_zones'], zone)]
+        if set(self.request.query_params) - FEED_QUERY_PARAMS:
+            queryset = self.filter_queryset(self.get_queryset().filter(pk__in=[row['id'] for row in rows]))
             page = self.paginate_queryset(queryset)
             if page is not None:
                 serializer = AnnouncementListSerializer(page, many=True)
                 return self.get_paginated_response(serializer.data)
-                
             serializer = AnnouncementListSerializer(queryset, many=True)
             return Response(serializer.data)
-        except AnnouncementType.DoesNotExist:
-            return Response([])
+        
+        etag = f'"{snapshot.version}-{zone}"' if zone else f'"{snapshot.version}"'
+        response = get_conditional_response(self.request, etag=etag)
+        if response is None:
+            page = self.paginate_queryset(rows)
+            response = self.get_paginated_response(page) if page is not None else Response(rows)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        return response
+    
+    @action(detail=False, methods=['get'])
+    def active(self, request):
+        """获取当前有效的公告"""
+        return self.feed_response('active')
+    
+    @action(detail=False, methods=['get'])
+    def emergency(self, request):
+        """获取当前紧急通知（紧急类型、高优先级）"""
+        return self.feed_response('emergency')
 
 
 class AnnouncementBroadcastViewSet(viewsets.ModelViewSet):
@@ -173,30 +148,27 @@ class AnnouncementBroadcastViewSet(viewsets.ModelViewSet):
     filterset_fields = ['announcement']
     ordering_fields = ['broadcast_at']
     pagination_class = StandardResultsSetPagination
+    # ?pagination=cursor 时使用的键集分页排序
+    cursor_ordering = ('-broadcast_at', '-id')
     
     @action(detail=False, methods=['post'])
     def broadcast(self, request):
-        """创建公告播报记录并返回播报内容"""
+        """创建公告播报记录，加入数字人播报队列并返回播报内容（紧急通知优先播报）"""
         serializer = AnnouncementBroadcastCreateSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
         announcement_id = serializer.validated_data.get('announcement_id')
         announcement = Announcement.objects.get(pk=announcement_id)
         
-        # 如果未提供播报内容，则使用公告默认内容
-        content = serializer.validated_data.get('content')
-        if not content:
-            content = announcement.get_voice_content()
-        
-        # 创建播报记录
-        broadcast = AnnouncementBroadcast.objects.create(
-            announcement=announcement,
-            content=content,
-            broadcast_by=request.user
+        # 未提供播报内容时使用公告默认内容
+        broadcast, tasks = announcement.broadcast(
+            serializer.validated_data.get('content'), broadcast_by=request.user
         )
         
         return Response({
             'id': broadcast.id,
             'announcement_title': announcement.title,
-            'content': content
+            'content': broadcast.content,
+            'target_zones': broadcast.target_zones,
+            'queued_tasks': [task.id for task in tasks]
         }, status=status.HTTP_201_CREATED)
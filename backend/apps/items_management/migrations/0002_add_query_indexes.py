@@ -0,0 +1,33 @@
+# Generated by Django 4.2.5 on 2026-10-18 20:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items_management', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='itembroadcast',
+            index=models.Index(fields=['-broadcast_at'], name='itembc_broadcast_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itembroadcast',
+            index=models.Index(fields=['lost_item', '-broadcast_at'], name='itembc_item_broadcast_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lostitem',
+            index=models.Index(fields=['-created_at'], name='lostitem_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lostitem',
+            index=models.Index(fields=['reported_by', 'status', 'is_broadcasted', '-created_at'], name='lostitem_reporter_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lostitem',
+            index=models.Index(fields=['status', 'is_broadcasted', '-created_at'], name='lostitem_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.5 on 2026-10-18 20:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items_management', '0002_add_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itembroadcast',
+            name='target_zones',
+            field=models.JSONField(default=list, editable=False, help_text='创建时按丢失地点解析的播报区域编码', verbose_name='目标播报区域'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+ALL_ZONES = '*'
+
+
+def backfill_target_zones(apps, schema_editor):
+    """区域功能上线前创建的失物广播记录没有目标区域，视为发送到全部播报区域"""
+    ItemBroadcast = apps.get_model('items_management', 'ItemBroadcast')
+    empty = [pk for pk, zones in ItemBroadcast.objects.values_list('pk', 'target_zones').iterator() if not zones]
+    for start in range(0, len(empty), 1000):
+        ItemBroadcast.objects.filter(pk__in=empty[start:start + 1000]).update(target_zones=[ALL_ZONES])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items_management', '0003_itembroadcast_target_zones'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_target_zones, migrations.RunPython.noop),
+    ]
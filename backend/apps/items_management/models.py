@@ -99,6 +99,11 @@ class LostItem(models.Model):
         verbose_name = _('失物信息')
         verbose_name_plural = _('失物信息')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='lostitem_created_idx'),
+            models.Index(fields=['reported_by', 'status', 'is_broadcasted', '-created_at'], name='lostitem_reporter_status_idx'),
+            models.Index(fields=['status', 'is_broadcasted', '-created_at'], name='lostitem_status_created_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -128,12 +133,19 @@ class ItemBroadcast(models.Model):
         related_name='item_broadcasts',
         verbose_name=_('广播者')
     )
+    target_zones = models.JSONField(
+        _('目标播报区域'), default=list, editable=False, help_text=_('创建时按丢失地点解析的播报区域编码')
+    )
     broadcast_at = models.DateTimeField(_('广播时间'), auto_now_add=True)
     
     class Meta:
         verbose_name = _('物品广播记录')
         verbose_name_plural = _('物品广播记录')
         ordering = ['-broadcast_at']
+        indexes = [
+            models.Index(fields=['-broadcast_at'], name='itembc_broadcast_at_idx'),
+            models.Index(fields=['lost_item', '-broadcast_at'], name='itembc_item_broadcast_at_idx'),
+        ]
     
     def __str__(self):
         return f"{self.lost_item.title} - {self.broadcast_at.strftime('%Y-%m-%d %H:%M:%S')}"
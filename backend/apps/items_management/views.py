@@ -5,7 +5,6 @@ from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q
 from django.utils import timezone
-from rest_framework.pagination import PageNumberPagination
 
 from .models import ItemCategory, LostItem, ItemBroadcast
 from .serializers import (
@@ -16,13 +15,9 @@ from .serializers import (
     ItemBroadcastSerializer,
     ItemBroadcastCreateSerializer
 )
-
-
-class StandardResultsSetPagination(PageNumberPagination):
-    """标准分页器"""
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
+from apps.broadcasting.models import BroadcastTask
+from apps.broadcasting.queue import enqueue
+from apps.common.pagination import StandardResultsSetPagination
 
 
 class IsAdminOrReadOnly(permissions.BasePermission):
@@ -64,6 +59,8 @@ class LostItemViewSet(viewsets.ModelViewSet):
     search_fields = ['title', 'description', 'lost_location', 'contact_name']
     ordering_fields = ['lost_time', 'created_at', 'updated_at']
     pagination_class = StandardResultsSetPagination
+    # ?pagination=cursor 时使用的键集分页排序
+    cursor_ordering = ('-created_at', '-id')
     
     def get_serializer_class(self):
         """根据操作类型选择合适的序列化器"""
@@ -149,10 +146,12 @@ class ItemBroadcastViewSet(viewsets.ModelViewSet):
     filterset_fields = ['lost_item']
     ordering_fields = ['broadcast_at']
     pagination_class = StandardResultsSetPagination
+    # ?pagination=cursor 时使用的键集分页排序
+    cursor_ordering = ('-broadcast_at', '-id')
     
     @action(detail=False, methods=['post'])
     def broadcast(self, request):
-        """创建广播记录并返回广播内容"""
+        """创建广播记录，加入丢失地点所在区域的数字人播报队列并返回广播内容"""
         # 仅管理员可以广播
         if 'admin' not in request.user.get_roles():
             return Response({"error": "权限不足，仅管理员可广播"}, status=status.HTTP_403_FORBIDDEN)
@@ -178,9 +177,15 @@ class ItemBroadcastViewSet(viewsets.ModelViewSet):
         # 更新失物信息为已广播
         lost_item.is_broadcasted = True
         lost_item.save()
+        tasks = enqueue(
+            content, 'lost_item', source_id=broadcast.id, priority=BroadcastTask.PRIORITY_LOW,
+            zones=broadcast.target_zones
+        )
         
         return Response({
             'id': broadcast.id,
             'lost_item_title': lost_item.title,
-            'content': content
+            'content': content,
+            'target_zones': broadcast.target_zones,
+            'queued_tasks': [task.id for task in tasks]
         }, status=status.HTTP_201_CREATED)
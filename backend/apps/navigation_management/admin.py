@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Location, NavigationRecord, TimeSchedule
+from .models import Location, WalkwayEdge, NavigationRecord, TimeSchedule
 
 @admin.register(Location)
 class LocationAdmin(admin.ModelAdmin):
@@ -8,6 +8,14 @@ class LocationAdmin(admin.ModelAdmin):
     search_fields = ['name', 'description']
 
 
+@admin.register(WalkwayEdge)
+class WalkwayEdgeAdmin(admin.ModelAdmin):
+    list_display = ['id', 'from_location', 'to_location', 'edge_type', 'length', 'is_bidirectional', 'is_active']
+    list_filter = ['edge_type', 'is_bidirectional', 'is_active']
+    search_fields = ['from_location__name', 'to_location__name']
+    raw_id_fields = ['from_location', 'to_location']
+
+
 @admin.register(NavigationRecord)
 class NavigationRecordAdmin(admin.ModelAdmin):
     list_display = ['id', 'passenger', 'start_location', 'end_location', 
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.5 on 2026-10-18 20:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('navigation_management', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['is_active', 'floor', 'type'], name='location_active_floor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='navigationrecord',
+            index=models.Index(fields=['passenger', '-created_at'], name='navrecord_passenger_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeschedule',
+            index=models.Index(fields=['passenger', 'is_completed', 'start_time'], name='schedule_passenger_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeschedule',
+            index=models.Index(fields=['flight_code', 'is_completed', 'start_time'], name='schedule_flight_start_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.5 on 2026-10-18 20:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('navigation_management', '0002_add_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalkwayEdge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('edge_type', models.CharField(choices=[('corridor', '走廊'), ('moving_walkway', '自动步道'), ('escalator', '扶梯'), ('elevator', '电梯'), ('stairs', '楼梯')], default='corridor', max_length=20, verbose_name='通道类型')),
+                ('length', models.FloatField(blank=True, help_text='为空时按两端坐标计算', null=True, verbose_name='长度(米)')),
+                ('is_bidirectional', models.BooleanField(default=True, verbose_name='是否双向')),
+                ('is_active', models.BooleanField(default=True, verbose_name='是否启用')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('from_location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='walkways_out', to='navigation_management.location', verbose_name='起点')),
+                ('to_location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='walkways_in', to='navigation_management.location', verbose_name='终点')),
+            ],
+            options={
+                'verbose_name': '步行通道',
+                'verbose_name_plural': '步行通道',
+                'ordering': ['from_location', 'to_location'],
+                'unique_together': {('from_location', 'to_location')},
+            },
+        ),
+    ]
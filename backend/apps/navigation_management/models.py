@@ -31,11 +31,42 @@ class Location(models.Model):
         verbose_name = "位置信息"
         verbose_name_plural = verbose_name
         ordering = ['floor', 'name']
+        indexes = [
+            models.Index(fields=['is_active', 'floor', 'type'], name='location_active_floor_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} (楼层:{self.floor})"
 
 
+class WalkwayEdge(models.Model):
+    """步行通道模型，连接两个位置，构成室内导航图"""
+    from_location = models.ForeignKey(Location, on_delete=models.CASCADE, verbose_name="起点", related_name="walkways_out")
+    to_location = models.ForeignKey(Location, on_delete=models.CASCADE, verbose_name="终点", related_name="walkways_in")
+    edge_type = models.CharField("通道类型", max_length=20, default='corridor', choices=[
+        ('corridor', '走廊'),
+        ('moving_walkway', '自动步道'),
+        ('escalator', '扶梯'),
+        ('elevator', '电梯'),
+        ('stairs', '楼梯'),
+    ])
+    length = models.FloatField("长度(米)", null=True, blank=True, help_text="为空时按两端坐标计算")
+    is_bidirectional = models.BooleanField("是否双向", default=True)
+    is_active = models.BooleanField("是否启用", default=True)
+    created_at = models.DateTimeField("创建时间", auto_now_add=True)
+    updated_at = models.DateTimeField("更新时间", auto_now=True)
+
+    class Meta:
+        verbose_name = "步行通道"
+        verbose_name_plural = verbose_name
+        ordering = ['from_location', 'to_location']
+        unique_together = ['from_location', 'to_location']
+
+    def __str__(self):
+        arrow = '<->' if self.is_bidirectional else '->'
+        return f"{self.from_location.name} {arrow} {self.to_location.name} ({self.get_edge_type_display()})"
+
+
 class NavigationRecord(models.Model):
     """导航记录模型"""
     passenger = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="旅客", related_name="navigation_records")
@@ -51,6 +82,9 @@ class NavigationRecord(models.Model):
         verbose_name = "导航记录"
         verbose_name_plural = verbose_name
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['passenger', '-created_at'], name='navrecord_passenger_idx'),
+        ]
 
     def __str__(self):
         return f"{self.passenger.username}: {self.start_location.name} -> {self.end_location.name}"
@@ -82,6 +116,10 @@ class TimeSchedule(models.Model):
         verbose_name = "时间安排"
         verbose_name_plural = verbose_name
         ordering = ['start_time']
+        indexes = [
+            models.Index(fields=['passenger', 'is_completed', 'start_time'], name='schedule_passenger_start_idx'),
+            models.Index(fields=['flight_code', 'is_completed', 'start_time'], name='schedule_flight_start_idx'),
+        ]
 
     def __str__(self):
         return f"{self.passenger.username}: {self.event_name} ({self.start_time.strftime('%Y-%m-%d %H:%M')})"
@@ -0,0 +1,342 @@
+"""
+室内路径规划
+
+以启用的 Location 为节点、WalkwayEdge 为边构建导航图，边权为通行时间（秒）。
+登机口、安检口、出口等枢纽节点（NAVIGATION_ROUTING_HUB_TYPES）在建图时预先计算
+到达/出发的最短路径树，涉及枢纽的查询只需沿树回溯；其余查询使用 A* 搜索。
+
+导航图在进程内懒加载，Location 或 WalkwayEdge 变化时通过信号递增缓存中的版本号，
+各进程在下次查询时重建。没有通道数据时退回直线距离估算。
+
+坐标约定：x 轴向东，y 轴向南
+"""
+import heapq
+import math
+import threading
+from collections import namedtuple
+from itertools import count
+
+from django.conf import settings
+
+from apps.common.versions import bump_version, get_version
+
+from .models import Location, WalkwayEdge
+
+VERSION_CACHE_KEY = 'navigation:routing:version'
+
+# 各类通道的通行参数：speed 为速度（米/秒），fixed 为固定耗时（秒，如候梯时间）
+EDGE_PROFILES = {
+    'corridor': {'speed': 1.0, 'fixed': 0},
+    'moving_walkway': {'speed': 1.5, 'fixed': 0},
+    'escalator': {'speed': 0.5, 'fixed': 10},
+    'elevator': {'speed': 1.0, 'fixed': 45},
+    'stairs': {'speed': 0.4, 'fixed': 0},
+}
+
+# 跨楼层通道未填写长度时，每层计入的长度（米）
+FLOOR_CHANGE_LENGTH = 10
+
+# 没有通道数据时的直线估算：每层楼额外增加 50 米，步行 1 米/秒
+DIRECT_FLOOR_PENALTY = 50
+WALK_SPEED = 1.0
+
+DEFAULT_HUB_TYPES = ('gate', 'security', 'exit')
+
+VERTICAL_NAMES = {'elevator': '电梯', 'escalator': '扶梯', 'stairs': '楼梯'}
+
+Node = namedtuple('Node', 'id name floor x y type')
+Leg = namedtuple('Leg', 'start end edge_type length seconds')
+
+
+def horizontal_distance(a, b):
+    return math.hypot(a.x - b.x, a.y - b.y)
+
+
+def node_from_location(location):
+    return Node(location.id, location.name, location.floor,
+                location.x_coordinate, location.y_coordinate, location.type)
+
+
+class Route:
+    """路径规划结果"""
+
+    def __init__(self, start, end, legs, distance=None, seconds=None):
+        self.start = start
+        self.end = end
+        self.legs = legs
+        self.distance = sum(leg.length for leg in legs) if distance is None else distance
+        self.seconds = sum(leg.seconds for leg in legs) if seconds is None else seconds
+
+    @property
+    def is_routed(self):
+        """是否为按通道规划的路径（否则为直线估算）"""
+        return bool(self.legs)
+
+    @property
+    def distance_meters(self):
+        return round(self.distance)
+
+    @property
+    def estimated_minutes(self):
+        # 最少 1 分钟
+        return max(1, round(self.seconds / 60))
+
+    @classmethod
+    def direct(cls, start, end):
+        """按直线距离估算，跨楼层每层增加固定距离"""
+        distance = horizontal_distance(start, end) + abs(start.floor - end.floor) * DIRECT_FLOOR_PENALTY
+        return cls(start, end, [], distance, distance / WALK_SPEED)
+
+
+class RoutingGraph:
+    """导航图及枢纽节点的最短路径树"""
+
+    def __init__(self, nodes, edges, hub_types=DEFAULT_HUB_TYPES):
+        """
+        Args:
+            nodes: Node 列表
+            edges: (起点id, 终点id, 通道类型, 长度或None, 是否双向) 列表
+            hub_types: 预计算最短路径树的节点类型
+        """
+        self.nodes = {node.id: node for node in nodes}
+        self.adjacency = {node_id: [] for node_id in self.nodes}
+        self.reverse = {node_id: [] for node_id in self.nodes}
+        self.edges = {}
+
+        for start_id, end_id, edge_type, length, bidirectional in edges:
+            if start_id not in self.nodes or end_id not in self.nodes:
+                continue
+            self.add_edge(start_id, end_id, edge_type, length)
+            if bidirectional:
+                self.add_edge(end_id, start_id, edge_type, length)
+
+        for (start_id, end_id), leg in self.edges.items():
+            self.adjacency[start_id].append((end_id, leg.seconds))
+            self.reverse[end_id].append((start_id, leg.seconds))
+
+        # A* 启发函数系数：所有边的 耗时/水平距离 最小值，保证启发值不超过真实耗时
+        ratios = [
+            leg.seconds / horizontal_distance(self.nodes[a], self.nodes[b])
+            for (a, b), leg in self.edges.items()
+            if horizontal_distance(self.nodes[a], self.nodes[b]) > 0
+        ]
+        self.heuristic_scale = min(ratios) if ratios else 0
+
+        self.hubs = {node_id for node_id, node in self.nodes.items() if node.type in hub_types}
+        # to_hub[枢纽][节点] = 下一跳，from_hub[枢纽][节点] = 上一跳
+        self.to_hub = {hub: self.shortest_path_tree(hub, self.reverse) for hub in self.hubs}
+        self.from_hub = {hub: self.shortest_path_tree(hub, self.adjacency) for hub in self.hubs}
+
+    def add_edge(self, start_id, end_id, edge_type, length):
+        start, end = self.nodes[start_id], self.nodes[end_id]
+        if length is None:
+            length = horizontal_distance(start, end) + abs(start.floor - end.floor) * FLOOR_CHANGE_LENGTH
+        profile = EDGE_PROFILES.get(edge_type, EDGE_PROFILES['corridor'])
+        seconds = profile['fixed'] + length / profile['speed']
+        current = self.edges.get((start_id, end_id))
+        # 同一对节点有多条通道时保留最快的
+        if current is None or seconds < current.seconds:
+            self.edges[(start_id, end_id)] = Leg(start, end, edge_type, length, seconds)
+
+    def shortest_path_tree(self, source, adjacency):
+        """Dijkstra，返回 {节点: 父节点}"""
+        parents = {source: None}
+        costs = {source: 0}
+        heap = [(0, source)]
+        while heap:
+            cost, node_id = heapq.heappop(heap)
+            if cost > costs[node_id]:
+                continue
+            for neighbor, seconds in adjacency[node_id]:
+                new_cost = cost + seconds
+                if new_cost < costs.get(neighbor, math.inf):
+                    costs[neighbor] = new_cost
+                    parents[neighbor] = node_id
+                    heapq.heappush(heap, (new_cost, neighbor))
+        return parents
+
+    def astar(self, start_id, end_id):
+        """A* 搜索，返回节点id列表，不可达时返回 None"""
+        goal = self.nodes[end_id]
+        scale = self.heuristic_scale
+
+        def heuristic(node_id):
+            return scale * horizontal_distance(self.nodes[node_id], goal)
+
+        tie = count()
+        costs = {start_id: 0}
+        parents = {start_id: None}
+        heap = [(heuristic(start_id), next(tie), start_id)]
+        closed = set()
+        while heap:
+            _, _, node_id = heapq.heappop(heap)
+            if node_id == end_id:
+                return self.walk_back(parents, end_id)
+            if node_id in closed:
+                continue
+            closed.add(node_id)
+            for neighbor, seconds in self.adjacency[node_id]:
+                new_cost = costs[node_id] + seconds
+                if new_cost < costs.get(neighbor, math.inf):
+                    costs[neighbor] = new_cost
+                    parents[neighbor] = node_id
+                    heapq.heappush(heap, (new_cost + heuristic(neighbor), next(tie), neighbor))
+        return None
+
+    @staticmethod
+    def walk_back(parents, node_id):
+        path = []
+        while node_id is not None:
+            path.append(node_id)
+            node_id = parents[node_id]
+        path.reverse()
+        return path
+
+    def path(self, start_id, end_id):
+        """最短路径节点id列表，不可达时返回 None"""
+        if start_id not in self.nodes or end_id not in self.nodes:
+            return None
+        if start_id == end_id:
+            return [start_id]
+        if end_id in self.to_hub:
+            next_hops = self.to_hub[end_id]
+            if start_id not in next_hops:
+                return None
+            # 反向树中的父节点即朝向枢纽的下一跳
+            return list(reversed(self.walk_back(next_hops, start_id)))
+        if start_id in self.from_hub:
+            previous = self.from_hub[start_id]
+            if end_id not in previous:
+                return None
+            return self.walk_back(previous, end_id)
+        return self.astar(start_id, end_id)
+
+    def route(self, start_id, end_id):
+        path = self.path(start_id, end_id)
+        if path is None or len(path) < 2:
+            return None
+        legs = [self.edges[(a, b)] for a, b in zip(path, path[1:])]
+        return Route(legs[0].start, legs[-1].end, legs)
+
+
+class RoutingEngine:
+    """进程内懒加载的导航图"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._graph = None
+        self._version = None
+
+    def build(self):
+        locations = Location.objects.filter(is_active=True)
+        nodes = [node_from_location(location) for location in locations]
+        edges = WalkwayEdge.objects.filter(
+            is_active=True, from_location__is_active=True, to_location__is_active=True
+        ).values_list('from_location_id', 'to_location_id', 'edge_type', 'length', 'is_bidirectional')
+        hub_types = getattr(settings, 'NAVIGATION_ROUTING_HUB_TYPES', DEFAULT_HUB_TYPES)
+        return RoutingGraph(nodes, list(edges), hub_types)
+
+    @property
+    def graph(self):
+        version = get_version(VERSION_CACHE_KEY)
+        if self._graph is not None and version == self._version:
+            return self._graph
+        with self._lock:
+            if self._graph is None or version != self._version:
+                self._graph = self.build()
+                self._version = version
+        return self._graph
+
+    def route(self, start, end):
+        """
+        规划两个位置之间的路径
+
+        Args:
+            start: 起点 Location
+            end: 终点 Location
+
+        Returns:
+            Route 对象，没有可用通道时为直线估算结果
+        """
+        route = self.graph.route(start.id, end.id)
+        if route is None:
+            return Route.direct(node_from_location(start), node_from_location(end))
+        return route
+
+    def invalidate(self):
+        """使所有进程的导航图失效"""
+        bump_version(VERSION_CACHE_KEY)
+        with self._lock:
+            self._graph = None
+            self._version = None
+
+
+routing_engine = RoutingEngine()
+
+
+def plan_route(start, end):
+    """规划路径，参见 RoutingEngine.route"""
+    return routing_engine.route(start, end)
+
+
+def compass_direction(dx, dy):
+    """根据位移返回八方位（y 轴向南）"""
+    angle = math.degrees(math.atan2(-dy, dx)) % 360
+    names = ['东', '东北', '北', '西北', '西', '西南', '南', '东南']
+    return names[int((angle + 22.5) // 45) % 8]
+
+
+def turn_direction(previous, current):
+    """根据前后两段的方向返回转向提示（y 轴向南，叉积为正即顺时针，为右转）"""
+    cross = previous[0] * current[1] - previous[1] * current[0]
+    dot = previous[0] * current[0] + previous[1] * current[1]
+    angle = math.degrees(math.atan2(abs(cross), dot))
+    if angle < 30:
+        return '继续直行'
+    if angle > 150:
+        return '掉头'
+    return '右转' if cross > 0 else '左转'
+
+
+def describe_route(route):
+    """
+    生成逐段导航指令
+
+    同一楼层方向变化小于 30 度的相邻路段合并为一段
+
+    Returns:
+        指令文本列表
+    """
+    segments = []
+    for leg in route.legs:
+        vector = (leg.end.x - leg.start.x, leg.end.y - leg.start.y)
+        if leg.start.floor != leg.end.floor:
+            segments.append({'vertical': True, 'leg': leg})
+            continue
+        last = segments[-1] if segments else None
+        if (last and not last['vertical'] and last['vector'] != (0, 0) and vector != (0, 0)
+                and turn_direction(last['vector'], vector) == '继续直行'):
+            last['length'] += leg.length
+            last['vector'] = vector
+            continue
+        segments.append({'vertical': False, 'leg': leg, 'vector': vector, 'length': leg.length})
+
+    steps = []
+    previous = None
+    for segment in segments:
+        leg = segment['leg']
+        if segment['vertical']:
+            name = VERTICAL_NAMES.get(leg.edge_type, VERTICAL_NAMES['stairs'])
+            way = '上行' if leg.end.floor > leg.start.floor else '下行'
+            steps.append(f"在{leg.start.name}乘坐{name}{way}至{leg.end.floor}楼")
+        else:
+            length = round(segment['length'])
+            vector = segment['vector']
+            if previous is None or previous['vertical'] or vector == (0, 0) or previous['vector'] == (0, 0):
+                prefix = '' if previous is None else f"到达{leg.start.floor}楼后，"
+                steps.append(f"{prefix}向{compass_direction(*vector)}方向步行约{length}米")
+            else:
+                steps.append(f"在{leg.start.name}{turn_direction(previous['vector'], vector)}，步行约{length}米")
+        previous = segment
+    steps.append(f"到达{route.end.name}")
+    return steps
@@ -1,5 +1,9 @@
+import math
+
+from django.conf import settings
 from rest_framework import serializers
 from .models import Location, NavigationRecord, TimeSchedule
+from .routing import plan_route
 
 
 class LocationSerializer(serializers.ModelSerializer):
@@ -47,34 +51,10 @@ class NavigationRecordSerializer(serializers.ModelSerializer):
         return obj.passenger.username
     
     def create(self, validated_data):
-        # 计算距离和预计时间（简化版）
-        start = validated_data['start_location']
-        end = validated_data['end_location']
-        
-        # 简单距离计算 - 实际项目中可能使用更复杂的算法
-        import math
-        if start.floor == end.floor:
-            distance = math.sqrt((start.x_coordinate - end.x_coordinate) ** 2 + 
-                                 (start.y_coordinate - end.y_coordinate) ** 2)
-        else:
-            # 不同楼层额外增加距离
-            floor_diff = abs(start.floor - end.floor) * 50  # 每层楼增加50米
-            direct_distance = math.sqrt((start.x_coordinate - end.x_coordinate) ** 2 + 
-                                        (start.y_coordinate - end.y_coordinate) ** 2)
-            distance = direct_distance + floor_diff
-        
-        # 四舍五入到整数米
-        distance_meters = round(distance)
-        
-        # 假设平均行走速度为1米/秒，计算分钟数
-        time_minutes = round(distance_meters / 60)  # 60米/分钟
-        
-        # 设置最小时间为1分钟
-        if time_minutes < 1:
-            time_minutes = 1
-        
-        validated_data['distance'] = distance_meters
-        validated_data['estimated_time'] = time_minutes
+        # 按步行通道规划路径，计算距离和预计时间
+        route = plan_route(validated_data['start_location'], validated_data['end_location'])
+        validated_data['distance'] = route.distance_meters
+        validated_data['estimated_time'] = route.estimated_minutes
         
         return super().create(validated_data)
 
@@ -111,6 +91,29 @@ class NavigationQuerySerializer(serializers.Serializer):
     destination_id = serializers.IntegerField(required=True)
 
 
+class NearbyQuerySerializer(serializers.Serializer):
+    """附近设施查询序列化器"""
+    x = serializers.FloatField(default=0)
+    y = serializers.FloatField(default=0)
+    floor = serializers.IntegerField(default=1)
+    radius = serializers.FloatField(default=100)  # 默认100米半径
+
+    def validate_x(self, value):
+        if not math.isfinite(value):
+            raise serializers.ValidationError('坐标必须是有限数值')
+        return value
+
+    validate_y = validate_x
+
+    def validate_radius(self, value):
+        max_radius = getattr(settings, 'NAVIGATION_NEARBY_MAX_RADIUS', 5000)
+        if not math.isfinite(value) or value <= 0:
+            raise serializers.ValidationError('搜索半径必须是大于0的有限数值')
+        if value > max_radius:
+            raise serializers.ValidationError(f'搜索半径不能超过{max_radius}')
+        return value
+
+
 class VoiceNavigationSerializer(serializers.Serializer):
     """语音导航序列化器"""
     navigation_id = serializers.IntegerField(required=False)
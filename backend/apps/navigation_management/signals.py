@@ -0,0 +1,22 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Location, WalkwayEdge
+from .routing import routing_engine
+from .spatial import spatial_index
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def invalidate_spatial_index(sender, instance, **kwargs):
+    """位置新增、修改或删除时重建空间索引"""
+    spatial_index.invalidate()
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+@receiver(post_save, sender=WalkwayEdge)
+@receiver(post_delete, sender=WalkwayEdge)
+def invalidate_routing_graph(sender, instance, **kwargs):
+    """位置或步行通道变化时重建导航图"""
+    routing_engine.invalidate()
@@ -0,0 +1,187 @@
+"""
+位置空间索引
+
+按楼层把启用的位置放入固定大小的网格桶中，用于附近设施查询（半径查询、最近 K 个查询），
+避免每次请求都读取整层位置并逐个计算距离。
+
+索引在进程内懒加载，Location 保存或删除时通过信号递增缓存中的版本号，
+各进程在下次查询时发现版本变化后重建索引
+"""
+import heapq
+import math
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+
+from apps.common.versions import bump_version, get_version
+
+from .models import Location
+
+VERSION_CACHE_KEY = 'navigation:spatial:version'
+DEFAULT_CELL_SIZE = 50
+
+
+class FloorGrid:
+    """单个楼层的网格索引"""
+
+    def __init__(self, locations, cell_size):
+        self.cell_size = cell_size
+        self.buckets = defaultdict(list)
+        for location in locations:
+            self.buckets[self.cell(location.x_coordinate, location.y_coordinate)].append(location)
+        if self.buckets:
+            xs = [key[0] for key in self.buckets]
+            ys = [key[1] for key in self.buckets]
+            self.bounds = (min(xs), min(ys), max(xs), max(ys))
+        else:
+            self.bounds = None
+
+    def cell(self, x, y):
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def ring(self, cx, cy, r):
+        """返回与中心格子切比雪夫距离恰好为 r 的格子"""
+        if r == 0:
+            yield cx, cy
+            return
+        for dx in range(-r, r + 1):
+            yield cx + dx, cy - r
+            yield cx + dx, cy + r
+        for dy in range(-r + 1, r):
+            yield cx - r, cy + dy
+            yield cx + r, cy + dy
+
+    def max_ring(self, cx, cy):
+        """覆盖全部非空格子所需的最大环数"""
+        min_x, min_y, max_x, max_y = self.bounds
+        return max(abs(cx - min_x), abs(cx - max_x), abs(cy - min_y), abs(cy - max_y))
+
+    def min_ring(self, cx, cy):
+        """到最近的非空格子可能所在环数（中心格子到非空格子外接矩形的切比雪夫距离）"""
+        min_x, min_y, max_x, max_y = self.bounds
+        return max(min_x - cx, cx - max_x, min_y - cy, cy - max_y, 0)
+
+    def cells_in(self, x0, y0, x1, y1):
+        """矩形范围内的非空格子；范围比非空格子数大时直接遍历非空格子，不逐个枚举空格子"""
+        min_x, min_y, max_x, max_y = self.bounds
+        x0, y0, x1, y1 = max(x0, min_x), max(y0, min_y), min(x1, max_x), min(y1, max_y)
+        if x0 > x1 or y0 > y1:
+            return []
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self.buckets):
+            return [key for key in self.buckets if x0 <= key[0] <= x1 and y0 <= key[1] <= y1]
+        return [(gx, gy) for gx in range(x0, x1 + 1) for gy in range(y0, y1 + 1) if (gx, gy) in self.buckets]
+
+    def within(self, x, y, radius, types=None, exclude_ids=None):
+        """
+        半径查询
+
+        Returns:
+            按距离排序的 [(距离, 位置)] 列表
+        """
+        if self.bounds is None or not radius >= 0:
+            return []
+        cx, cy = self.cell(x, y)
+        if math.isinf(radius):
+            keys = self.buckets.keys()
+        else:
+            reach = math.ceil(radius / self.cell_size)
+            keys = self.cells_in(cx - reach, cy - reach, cx + reach, cy + reach)
+        radius_sq = radius * radius
+        results = []
+        for key in keys:
+            for location in self.buckets[key]:
+                if not self.accept(location, types, exclude_ids):
+                    continue
+                dist_sq = (location.x_coordinate - x) ** 2 + (location.y_coordinate - y) ** 2
+                if dist_sq <= radius_sq:
+                    results.append((math.sqrt(dist_sq), location))
+        results.sort(key=lambda item: (item[0], item[1].pk))
+        return results
+
+    def nearest(self, x, y, k, types=None, exclude_ids=None):
+        """
+        最近 K 个查询，从最近的非空格子所在环开始由内向外逐环扩展格子；
+        单个环的格子数超过非空格子总数时，改为直接遍历剩余的非空格子
+
+        Returns:
+            按距离排序的 [(距离, 位置)] 列表
+        """
+        if self.bounds is None or k <= 0:
+            return []
+        cx, cy = self.cell(x, y)
+        candidates = []
+
+        def collect(key):
+            for location in self.buckets.get(key, ()):
+                if self.accept(location, types, exclude_ids):
+                    dist = math.hypot(location.x_coordinate - x, location.y_coordinate - y)
+                    candidates.append((dist, location.pk, location))
+
+        for r in range(self.min_ring(cx, cy), self.max_ring(cx, cy) + 1):
+            if 8 * r > len(self.buckets):
+                for key in self.buckets:
+                    if max(abs(key[0] - cx), abs(key[1] - cy)) >= r:
+                        collect(key)
+                break
+            for key in self.ring(cx, cy, r):
+                collect(key)
+            # 第 r 环之外的点距离至少为 r * cell_size，已找到的第 K 近距离更小时即可停止
+            if len(candidates) >= k:
+                kth = heapq.nsmallest(k, candidates)[-1][0]
+                if kth <= r * self.cell_size:
+                    break
+        return [(dist, location) for dist, _, location in heapq.nsmallest(k, candidates)]
+
+    @staticmethod
+    def accept(location, types, exclude_ids):
+        if types and location.type not in types:
+            return False
+        if exclude_ids and location.pk in exclude_ids:
+            return False
+        return True
+
+
+class SpatialIndex:
+    """按楼层懒加载的进程内空间索引"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._floors = {}
+        self._version = None
+
+    @property
+    def cell_size(self):
+        return getattr(settings, 'NAVIGATION_GRID_CELL_SIZE', DEFAULT_CELL_SIZE)
+
+    def floor(self, floor):
+        """获取楼层网格，版本变化时丢弃已加载的全部楼层"""
+        version = get_version(VERSION_CACHE_KEY)
+        grid = self._floors.get(floor) if version == self._version else None
+        if grid is not None:
+            return grid
+        with self._lock:
+            if version != self._version:
+                self._floors = {}
+                self._version = version
+            grid = self._floors.get(floor)
+            if grid is None:
+                locations = list(Location.objects.filter(is_active=True, floor=floor))
+                grid = self._floors[floor] = FloorGrid(locations, self.cell_size)
+        return grid
+
+    def within(self, floor, x, y, radius, types=None, exclude_ids=None):
+        return self.floor(floor).within(x, y, radius, types, exclude_ids)
+
+    def nearest(self, floor, x, y, k, types=None, exclude_ids=None):
+        return self.floor(floor).nearest(x, y, k, types, exclude_ids)
+
+    def invalidate(self):
+        """使所有进程的索引失效"""
+        bump_version(VERSION_CACHE_KEY)
+        with self._lock:
+            self._floors = {}
+            self._version = None
+
+
+spatial_index = SpatialIndex()
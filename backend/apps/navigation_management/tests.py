@@ -1,3 +1,186 @@
+import math
+import random
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .models import Location, NavigationRecord, WalkwayEdge
+from .routing import Node, RoutingGraph, describe_route, plan_route, routing_engine
+from .spatial import FloorGrid, spatial_index
+
+User = get_user_model()
+
+
+class SpatialIndexTests(TestCase):
+    """位置空间索引测试"""
+
+    def setUp(self):
+        cache.clear()
+        spatial_index.invalidate()
+        rng = random.Random(7)
+        types = ['gate', 'shop', 'toilet', 'restaurant']
+        Location.objects.bulk_create([
+            Location(
+                name=f'位置{i}', floor=1 + i % 2, type=types[i % len(types)],
+                x_coordinate=rng.uniform(-300, 700), y_coordinate=rng.uniform(-200, 500)
+            )
+            for i in range(200)
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='passenger', password='testpassword'))
+
+    def brute_force(self, floor, x, y):
+        return sorted(
+            (math.hypot(loc.x_coordinate - x, loc.y_coordinate - y), loc.pk)
+            for loc in Location.objects.filter(floor=floor, is_active=True)
+        )
+
+    def test_queries_match_brute_force(self):
+        rng = random.Random(11)
+        for _ in range(30):
+            x, y = rng.uniform(-400, 800), rng.uniform(-300, 600)
+            radius = rng.uniform(10, 300)
+            expected = self.brute_force(1, x, y)
+            within = spatial_index.within(1, x, y, radius)
+            self.assertEqual([loc.pk for _, loc in within], [pk for dist, pk in expected if dist <= radius])
+            nearest = spatial_index.nearest(1, x, y, 5)
+            self.assertEqual([loc.pk for _, loc in nearest], [pk for _, pk in expected[:5]])
+
+    def test_empty_floor_and_filters(self):
+        self.assertEqual(spatial_index.within(9, 0, 0, 1000), [])
+        self.assertEqual(spatial_index.nearest(9, 0, 0, 3), [])
+        grid = FloorGrid(Location.objects.filter(floor=1), cell_size=50)
+        results = grid.nearest(0, 0, 3, types={'gate'})
+        self.assertTrue(all(loc.type == 'gate' for _, loc in results))
+
+    def test_far_queries_skip_empty_cells(self):
+        # 查询点远离所有位置时只遍历非空格子，结果仍与暴力计算一致
+        x, y = 5_000_000, -3_000_000
+        expected = self.brute_force(1, x, y)
+        nearest = spatial_index.nearest(1, x, y, 3)
+        self.assertEqual([loc.pk for _, loc in nearest], [pk for _, pk in expected[:3]])
+        within = spatial_index.within(1, 0, 0, 10_000_000)
+        self.assertEqual(len(within), len(expected))
+        self.assertEqual(len(spatial_index.within(1, 0, 0, float('inf'))), len(expected))
+        self.assertEqual(spatial_index.within(1, 0, 0, float('nan')), [])
+
+    def test_index_rebuilt_after_location_change(self):
+        self.assertEqual(spatial_index.within(3, 0, 0, 10), [])
+        location = Location.objects.create(name='新登机口', floor=3, type='gate', x_coordinate=1, y_coordinate=1)
+        self.assertEqual([loc.pk for _, loc in spatial_index.within(3, 0, 0, 10)], [location.pk])
+        location.delete()
+        self.assertEqual(spatial_index.within(3, 0, 0, 10), [])
+
+    def test_nearby_endpoint(self):
+        url = '/api/navigation-management/locations/nearby/'
+        response = self.client.get(url, {'x': 100, 'y': 100, 'floor': 1, 'radius': 150, 'types': ['gate', 'shop']})
+        self.assertEqual(response.status_code, 200)
+        distances = [row['distance'] for row in response.data]
+        self.assertEqual(distances, sorted(distances))
+        self.assertTrue(all(row['type'] in ('gate', 'shop') and row['distance'] <= 150 for row in response.data))
+
+        # 索引已加载后，查询不再访问数据库
+        with self.assertNumQueries(0):
+            self.client.get(url, {'x': 100, 'y': 100, 'floor': 1, 'radius': 150})
+
+
+class RoutingTests(TestCase):
+    """室内路径规划测试"""
+
+    def setUp(self):
+        cache.clear()
+        routing_engine.invalidate()
+
+        def location(name, floor, x, y, location_type='other'):
+            return Location.objects.create(name=name, floor=floor, x_coordinate=x, y_coordinate=y, type=location_type)
+
+        self.entrance = location('入口', 1, 0, 0, 'entrance')
+        self.corner = location('走廊转角', 1, 100, 0)
+        self.security = location('安检口', 1, 100, 100, 'security')
+        self.lift_1 = location('电梯厅', 1, 100, 200)
+        self.lift_2 = location('二层电梯厅', 2, 100, 200)
+        self.gate = location('登机口', 2, 200, 200, 'gate')
+        self.shop = location('商店', 1, 0, 100, 'shop')
+        for start, end, edge_type in [
+            (self.entrance, self.corner, 'corridor'),
+            (self.corner, self.security, 'corridor'),
+            (self.security, self.lift_1, 'corridor'),
+            (self.lift_1, self.lift_2, 'elevator'),
+            (self.lift_2, self.gate, 'corridor'),
+            (self.security, self.shop, 'corridor'),
+        ]:
+            WalkwayEdge.objects.create(from_location=start, to_location=end, edge_type=edge_type)
+
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='passenger', password='testpassword'))
+
+    def test_route_across_floors(self):
+        route = plan_route(self.entrance, self.gate)
+        self.assertTrue(route.is_routed)
+        # 走廊 400 米 + 电梯默认 10 米；耗时 400 秒步行 + 电梯 45 秒候梯 10 秒运行
+        self.assertEqual(route.distance_meters, 410)
+        self.assertEqual(route.seconds, 455)
+        self.assertEqual(route.estimated_minutes, 8)
+        self.assertEqual(describe_route(route), [
+            '向东方向步行约100米',
+            '在走廊转角右转，步行约200米',
+            '在电梯厅乘坐电梯上行至2楼',
+            '到达2楼后，向东方向步行约100米',
+            '到达登机口',
+        ])
+        self.assertEqual(describe_route(plan_route(self.shop, self.entrance))[:2], ['向东方向步行约100米', '在安检口左转，步行约100米'])
+
+    def test_fallback_without_walkways(self):
+        kiosk = Location.objects.create(name='问询台', floor=3, x_coordinate=0, y_coordinate=0, type='other')
+        lounge = Location.objects.create(name='休息室', floor=3, x_coordinate=300, y_coordinate=0, type='lounge')
+        route = plan_route(kiosk, lounge)
+        self.assertFalse(route.is_routed)
+        self.assertEqual((route.distance_meters, route.estimated_minutes), (300, 5))
+
+    def test_graph_rebuilt_after_walkway_change(self):
+        self.assertEqual(plan_route(self.entrance, self.security).distance_meters, 200)
+        WalkwayEdge.objects.create(from_location=self.entrance, to_location=self.security, length=120)
+        self.assertEqual(plan_route(self.entrance, self.security).distance_meters, 120)
+
+    def test_hub_tables_match_astar(self):
+        rng = random.Random(3)
+        nodes = [Node(i, f'节点{i}', 1, (i % 8) * 30, (i // 8) * 30, rng.choice(['gate', 'other', 'shop'])) for i in range(64)]
+        edges = []
+        for i in range(64):
+            if i % 8 < 7:
+                edges.append((i, i + 1, 'corridor', rng.uniform(30, 60), rng.random() < 0.8))
+            if i < 56:
+                edges.append((i, i + 8, rng.choice(['corridor', 'moving_walkway']), None, True))
+        graph = RoutingGraph(nodes, edges)
+
+        def cost(path):
+            return None if path is None else sum(graph.edges[(a, b)].seconds for a, b in zip(path, path[1:]))
+
+        for start in range(0, 64, 5):
+            for end in range(64):
+                astar = graph.astar(start, end)
+                self.assertAlmostEqual(cost(graph.path(start, end)), cost(astar))
+
+    def test_navigate_and_voice_direction(self):
+        response = self.client.post('/api/navigation-management/navigations/navigate/', {
+            'current_location_id': self.entrance.id, 'destination_id': self.gate.id
+        })
+        record = NavigationRecord.objects.get(pk=response.data['id'])
+        self.assertEqual((record.distance, record.estimated_time), (410, 8))
+
+        response = self.client.post('/api/navigation-management/navigations/voice_query/', {
+            'navigation_id': record.id, 'query_type': 'direction'
+        })
+        self.assertIn('2. 在走廊转角右转，步行约200米。', response.data['voice_text'])
+        self.assertIn('全程约410米，预计需要8分钟到达。', response.data['voice_text'])
 
-# Create your tests here.
+    def test_nearby_rejects_invalid_radius(self):
+        url = '/api/navigation-management/locations/nearby/'
+        for radius in ('inf', 'nan', '-1', '0', '100000', 'abc'):
+            response = self.client.get(url, {'x': 0, 'y': 0, 'floor': 1, 'radius': radius})
+            self.assertEqual(response.status_code, 400, radius)
+            self.assertIn('radius', response.data)
+        response = self.client.get(url, {'x': 'inf', 'y': 0, 'floor': 1})
+        self.assertEqual(response.status_code, 400)
@@ -3,7 +3,6 @@ from django.utils import timezone
 from django.db.models import Q
 from datetime import datetime, timedelta
 import random
-import math
 
 from rest_framework import viewsets, status, generics
 from rest_framework.views import APIView
@@ -14,9 +13,11 @@ from rest_framework.decorators import action
 from .models import Location, NavigationRecord, TimeSchedule
 from .serializers import (
     LocationSerializer, LocationListSerializer, NavigationRecordSerializer,
-    TimeScheduleSerializer, NavigationQuerySerializer, VoiceNavigationSerializer,
-    ScheduleQuerySerializer
+    TimeScheduleSerializer, NavigationQuerySerializer, NearbyQuerySerializer,
+    VoiceNavigationSerializer, ScheduleQuerySerializer
 )
+from .routing import plan_route, describe_route
+from .spatial import spatial_index
 
 class LocationViewSet(viewsets.ReadOnlyModelViewSet):
     """位置信息视图集"""
@@ -48,32 +49,21 @@ class LocationViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['get'])
     def nearby(self, request):
         """获取附近设施"""
-        current_x = float(request.query_params.get('x', 0))
-        current_y = float(request.query_params.get('y', 0))
-        floor = int(request.query_params.get('floor', 1))
-        radius = float(request.query_params.get('radius', 100))  # 默认100米半径
+        query = NearbyQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        current_x = query.validated_data['x']
+        current_y = query.validated_data['y']
+        floor = query.validated_data['floor']
+        radius = query.validated_data['radius']
         types = request.query_params.getlist('types', [])  # 设施类型列表
         
-        # 基于当前楼层过滤
-        queryset = self.get_queryset().filter(floor=floor)
+        # 通过空间索引查询半径内的设施，结果已按距离排序
+        results = spatial_index.within(floor, current_x, current_y, radius, types=set(types))
         
-        # 如果指定了类型，进一步过滤
-        if types:
-            queryset = queryset.filter(type__in=types)
-        
-        # 计算与当前位置的距离
-        nearby_locations = []
-        for location in queryset:
-            distance = math.sqrt((location.x_coordinate - current_x) ** 2 + 
-                                (location.y_coordinate - current_y) ** 2)
-            
-            if distance <= radius:
-                location_data = LocationSerializer(location).data
-                location_data['distance'] = round(distance)
-                nearby_locations.append(location_data)
-        
-        # 按距离排序
-        nearby_locations.sort(key=lambda x: x['distance'])
+        # 一次性序列化全部结果
+        nearby_locations = LocationSerializer([location for _, location in results], many=True).data
+        for location_data, (distance, _) in zip(nearby_locations, results):
+            location_data['distance'] = round(distance)
         
         return Response(nearby_locations)
 
@@ -116,10 +106,13 @@ class NavigationRecordViewSet(viewsets.ModelViewSet):
         )
         
         # 创建导航记录
+        route = plan_route(current_location, destination)
         navigation_record = NavigationRecord.objects.create(
             passenger=request.user,
             start_location=current_location,
-            end_location=destination
+            end_location=destination,
+            distance=route.distance_meters,
+            estimated_time=route.estimated_minutes
         )
         
         response_serializer = self.get_serializer(navigation_record)
@@ -150,10 +143,13 @@ class NavigationRecordViewSet(viewsets.ModelViewSet):
             current_location = get_object_or_404(Location, id=current_location_id, is_active=True)
             destination = get_object_or_404(Location, id=destination_id, is_active=True)
             
+            route = plan_route(current_location, destination)
             navigation = NavigationRecord.objects.create(
                 passenger=request.user,
                 start_location=current_location,
-                end_location=destination
+                end_location=destination,
+                distance=route.distance_meters,
+                estimated_time=route.estimated_minutes
             )
         else:
             return Response(
@@ -187,11 +183,16 @@ class NavigationRecordViewSet(viewsets.ModelViewSet):
         start = navigation.start_location
         end = navigation.end_location
         
-        # 简单的方向文本生成
         text = f"从{start.name}前往{end.name}的导航已开始。"
         
+        # 有步行通道数据时生成逐段导航指令
+        route = plan_route(start, end)
+        if route.is_routed:
+            for i, step in enumerate(describe_route(route), 1):
+                text += f"\n{i}. {step}。"
+            text += f"\n全程约{route.distance_meters}米，"
         # 同一楼层
-        if start.floor == end.floor:
+        elif start.floor == end.floor:
             text += f"请在{start.floor}楼层，"
             
             # 根据坐标判断大致方向
@@ -257,31 +258,17 @@ class NavigationRecordViewSet(viewsets.ModelViewSet):
     
     def _generate_nearby_text(self, location):
         """生成附近设施文本"""
-        # 获取当前位置附近的设施
-        nearby_facilities = Location.objects.filter(
-            floor=location.floor,
-            is_active=True
-        ).exclude(id=location.id)
-        
-        # 计算距离并筛选最近的5个设施
-        facilities_with_distance = []
-        for facility in nearby_facilities:
-            distance = math.sqrt(
-                (facility.x_coordinate - location.x_coordinate) ** 2 + 
-                (facility.y_coordinate - location.y_coordinate) ** 2
-            )
-            facilities_with_distance.append((facility, distance))
-        
-        # 按距离排序并取前5个
-        facilities_with_distance.sort(key=lambda x: x[1])
-        nearest_facilities = facilities_with_distance[:5]
+        # 通过空间索引获取最近的5个设施
+        nearest_facilities = spatial_index.nearest(
+            location.floor, location.x_coordinate, location.y_coordinate, 5, exclude_ids={location.id}
+        )
         
         if not nearest_facilities:
             return f"在{location.floor}楼层没有找到其他设施。"
         
         text = f"在{location.name}附近的设施有："
         
-        for i, (facility, distance) in enumerate(nearest_facilities, 1):
+        for i, (distance, facility) in enumerate(nearest_facilities, 1):
             text += f"\n{i}. {facility.name}，距离约{round(distance)}米，{facility.get_type_display()}。"
         
         return text
@@ -313,13 +300,15 @@ class TimeScheduleViewSet(viewsets.ModelViewSet):
         if flight_code:
             queryset = queryset.filter(flight_code=flight_code)
         
-        # 如果指定了日期，添加过滤
+        # 如果指定了日期，添加过滤（转换为时间范围以便使用索引）
         if date_str:
             try:
                 filter_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+                day_start = timezone.make_aware(datetime.combine(filter_date, datetime.min.time()))
+                day_end = day_start + timedelta(days=1)
                 queryset = queryset.filter(
-                    Q(start_time__date=filter_date) | 
-                    Q(end_time__date=filter_date)
+                    Q(start_time__gte=day_start, start_time__lt=day_end) |
+                    Q(end_time__gte=day_start, end_time__lt=day_end)
                 )
             except ValueError:
                 # 如果日期格式不正确，忽略此过滤器
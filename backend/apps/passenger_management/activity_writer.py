@@ -0,0 +1,291 @@
+"""
+旅客活动写入器
+
+根据 settings.PASSENGER_ACTIVITY_WRITER['MODE'] 选择写入方式：
+    sync      在请求内直接写入数据库（测试环境默认使用）
+    buffered  放入进程内缓冲区，达到数量或时间阈值后由后台线程 bulk_create 批量写入
+    spool     追加到本地队列文件，由 run_activity_writer 管理命令批量入库
+
+buffered 模式在进程退出时（atexit）会把缓冲区中剩余的记录全部写入；批量写入失败时记录放回缓冲区重试，
+连续失败 MAX_RETRIES 次后转存到 SPOOL_DIR 队列文件，由 run_activity_writer 在数据库恢复后入库
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import DataError, IntegrityError, close_old_connections, transaction
+from django.utils.dateparse import parse_datetime
+
+from .models import PassengerActivity
+from .signals import activities_recorded
+
+logger = logging.getLogger('app')
+
+DEFAULT_WRITER_SETTINGS = {
+    'MODE': 'buffered',
+    'BATCH_SIZE': 200,
+    'FLUSH_INTERVAL': 2,
+    'MAX_RETRIES': 3,
+    'SPOOL_DIR': os.path.join(settings.BASE_DIR, 'spool', 'activities'),
+}
+
+# 队列文件写入中的后缀，管理命令只处理已轮转（改名）的文件
+SPOOL_SUFFIX = '.jsonl'
+PROCESSING_SUFFIX = '.processing'
+# 无法解析或无法写入的记录转入队列目录下的隔离目录
+QUARANTINE_DIR = 'quarantine'
+
+
+def get_writer_settings():
+    """合并默认配置与 settings.PASSENGER_ACTIVITY_WRITER"""
+    return {**DEFAULT_WRITER_SETTINGS, **getattr(settings, 'PASSENGER_ACTIVITY_WRITER', {})}
+
+
+def write_batch(activities):
+    """
+    批量写入一组活动记录，并通知统计、缓存等订阅方
+
+    Args:
+        activities: 未保存的 PassengerActivity 对象列表
+
+    Returns:
+        已保存的活动记录列表
+    """
+    if not activities:
+        return []
+    # 记录与统计在同一事务中写入，失败重试时不会重复累加
+    with transaction.atomic():
+        created = PassengerActivity.objects.bulk_create(activities)
+        activities_recorded.send(sender=PassengerActivity, activities=created)
+    return created
+
+
+class ActivityBuffer:
+    """进程内活动缓冲区，由后台线程按数量或时间阈值批量写入"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._items = []
+        # 缓冲区中的记录连续写入失败的次数
+        self._failures = 0
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        atexit.register(self.flush)
+
+    def add(self, activity):
+        options = get_writer_settings()
+        with self._lock:
+            self._items.append(activity)
+            full = len(self._items) >= options['BATCH_SIZE']
+        self._ensure_thread()
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        """立即写入缓冲区中的全部记录，失败时放回缓冲区，连续失败 MAX_RETRIES 次后转存到队列文件"""
+        with self._lock:
+            batch, self._items = self._items, []
+            failures, self._failures = self._failures, 0
+        if not batch:
+            return 0
+        try:
+            write_batch(batch)
+        except Exception:
+            failures += 1
+            for activity in batch:
+                activity.pk = None
+            if failures < get_writer_settings()['MAX_RETRIES']:
+                logger.exception('旅客活动批量写入失败（第 %s 次），%s 条记录放回缓冲区重试', failures, len(batch))
+                with self._lock:
+                    self._items[:0] = batch
+                    self._failures = failures
+            else:
+                logger.exception('旅客活动批量写入连续失败 %s 次，%s 条记录转存到队列文件', failures, len(batch))
+                spill(batch)
+            return 0
+        return len(batch)
+
+    def __len__(self):
+        return len(self._items)
+
+    def _ensure_thread(self):
+        # 进程 fork 之后后台线程不会被继承，需要按进程重新启动
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='activity-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(get_writer_settings()['FLUSH_INTERVAL'])
+            self._wakeup.clear()
+            close_old_connections()
+            self.flush()
+
+
+activity_buffer = ActivityBuffer()
+
+
+def serialize_activity(activity):
+    """将活动记录转换为可写入队列文件的字典"""
+    return {
+        'passenger_id': activity.passenger_id,
+        'activity_type': activity.activity_type,
+        'description': activity.description,
+        'ip_address': activity.ip_address,
+        'user_agent': activity.user_agent,
+        'created_at': activity.created_at.isoformat(),
+    }
+
+
+def deserialize_activity(data):
+    """从队列文件中的字典恢复活动记录对象"""
+    data = dict(data)
+    data['created_at'] = parse_datetime(data['created_at'])
+    return PassengerActivity(**data)
+
+
+def spool_activity(activity):
+    """把活动记录追加到本进程的队列文件"""
+    spool_dir = get_writer_settings()['SPOOL_DIR']
+    os.makedirs(spool_dir, exist_ok=True)
+    path = os.path.join(spool_dir, f'{os.getpid()}{SPOOL_SUFFIX}')
+    line = json.dumps(serialize_activity(activity), ensure_ascii=False) + '\n'
+    # 每次写入都重新打开文件，管理命令轮转（改名）后会自动写入新文件
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(line)
+
+
+def spill(activities):
+    """把写入失败的记录转存到队列文件，队列文件也无法写入时才丢弃"""
+    try:
+        for activity in activities:
+            spool_activity(activity)
+    except OSError:
+        logger.exception('旅客活动转存队列文件失败，丢弃 %s 条记录', len(activities))
+
+
+def write_activity(activity):
+    """
+    按配置的方式写入一条活动记录
+
+    Args:
+        activity: 未保存的 PassengerActivity 对象
+
+    Returns:
+        活动记录对象，仅 sync 模式下已保存到数据库
+    """
+    mode = get_writer_settings()['MODE']
+    if mode == 'sync':
+        activity.save()
+    elif mode == 'spool':
+        spool_activity(activity)
+    else:
+        activity_buffer.add(activity)
+    return activity
+
+
+def read_spool_file(path):
+    """
+    读取队列文件
+
+    Returns:
+        ([(原始行, 活动记录)], [无法解析的原始行])
+    """
+    rows, rejected = [], []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rows.append((line, deserialize_activity(json.loads(line))))
+            except (ValueError, TypeError):
+                logger.warning('无法解析的旅客活动记录转入隔离文件: %s', line[:200])
+                rejected.append(line)
+    return rows, rejected
+
+
+def write_spool_rows(rows, batch_size):
+    """
+    写入队列文件中的记录
+
+    先在一个事务内按 batch_size 分批写入；因个别记录违反约束或数据无效而失败时，
+    改为逐条写入（每条一个事务），跳过无法写入的记录。数据库不可用等其他错误向上抛出，文件保留待下次重试
+
+    Returns:
+        (写入的记录数, 无法写入的原始行)
+    """
+    activities = [activity for _, activity in rows]
+    try:
+        with transaction.atomic():
+            for start in range(0, len(activities), batch_size):
+                write_batch(activities[start:start + batch_size])
+        return len(activities), []
+    except (IntegrityError, DataError, ValueError) as exc:
+        logger.warning('旅客活动批量写入失败，改为逐条写入: %s', exc)
+
+    total, rejected = 0, []
+    for line, activity in rows:
+        activity.pk = None
+        try:
+            total += len(write_batch([activity]))
+        except (IntegrityError, DataError, ValueError):
+            logger.warning('旅客活动记录无法写入，转入隔离文件: %s', line[:200])
+            rejected.append(line)
+    return total, rejected
+
+
+def quarantine(spool_dir, name, lines):
+    """把无法写入的原始行追加到 QUARANTINE_DIR 下的同名文件，供人工检查"""
+    if not lines:
+        return
+    directory = os.path.join(spool_dir, QUARANTINE_DIR)
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f'{name}{SPOOL_SUFFIX}'), 'a', encoding='utf-8') as f:
+        f.writelines(f'{line}\n' for line in lines)
+
+
+def drain_spool(spool_dir, batch_size, grace_seconds=1):
+    """
+    将队列目录中的记录批量写入数据库
+
+    先把正在写入的文件改名轮转，等待 grace_seconds 让写入方完成最后一次追加，
+    再按 batch_size 分批 bulk_create。无法解析或无法写入的记录转入 QUARANTINE_DIR 隔离文件，
+    不阻塞其余记录；文件处理完成后删除
+
+    Returns:
+        写入的记录数
+    """
+    if not os.path.isdir(spool_dir):
+        return 0
+
+    for name in os.listdir(spool_dir):
+        if name.endswith(SPOOL_SUFFIX):
+            path = os.path.join(spool_dir, name)
+            os.replace(path, f'{path}.{int(time.time() * 1000)}{PROCESSING_SUFFIX}')
+
+    pending = sorted(name for name in os.listdir(spool_dir) if name.endswith(PROCESSING_SUFFIX))
+    if not pending:
+        return 0
+    time.sleep(grace_seconds)
+
+    total = 0
+    for name in pending:
+        path = os.path.join(spool_dir, name)
+        rows, rejected = read_spool_file(path)
+        # 单个文件整体成功或逐条处理完成后才删除，数据库不可用时文件保留，下次重试不会重复写入
+        written, failed = write_spool_rows(rows, batch_size)
+        quarantine(spool_dir, name, rejected + failed)
+        os.remove(path)
+        total += written
+    return total
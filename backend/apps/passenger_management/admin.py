@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import PassengerNote, PassengerActivity, PassengerTag, PassengerProfile
+from .models import PassengerNote, PassengerActivity, PassengerTag, PassengerProfile, PassengerActivityDailyStat
 
 
 @admin.register(PassengerTag)
@@ -48,3 +48,16 @@ class PassengerProfileAdmin(admin.ModelAdmin):
     raw_id_fields = ('passenger',)
     filter_horizontal = ('tags',)
     date_hierarchy = 'created_at'
+
+
+@admin.register(PassengerActivityDailyStat)
+class PassengerActivityDailyStatAdmin(admin.ModelAdmin):
+    """旅客活动日统计管理界面"""
+    list_display = ('date', 'activity_type', 'count')
+    list_filter = ('activity_type',)
+    date_hierarchy = 'date'
+    readonly_fields = ('date', 'activity_type', 'count')
+
+    def has_add_permission(self, request):
+        """日统计由系统维护，禁止手动添加"""
+        return False
@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from apps.items_management.models import LostItem
+from .models import PassengerNote, PassengerActivity
+
+# 旅客详情中各"最近记录"的条数
+RECENT_NOTES_LIMIT = 5
+RECENT_ACTIVITIES_LIMIT = 10
+RECENT_LOST_ITEMS_LIMIT = 5
+
+
+def setup_detail_loading(queryset):
+    """
+    为旅客详情批量预取全部关联数据
+
+    资料与角色、标签各一次查询，最近备注/活动/失物通过切片的 Prefetch
+    （窗口函数）各一次查询，查询次数与记录数量无关
+    """
+    return queryset.select_related('passenger_profile').prefetch_related(
+        'roles',
+        'passenger_profile__tags',
+        Prefetch(
+            'notes',
+            queryset=PassengerNote.objects.select_related('created_by')[:RECENT_NOTES_LIMIT],
+            to_attr='prefetched_recent_notes'
+        ),
+        Prefetch(
+            'activities',
+            queryset=PassengerActivity.objects.all()[:RECENT_ACTIVITIES_LIMIT],
+            to_attr='prefetched_recent_activities'
+        ),
+        Prefetch(
+            'reported_lost_items',
+            queryset=LostItem.objects.select_related('category', 'reported_by')[:RECENT_LOST_ITEMS_LIMIT],
+            to_attr='prefetched_recent_lost_items'
+        ),
+    )
+
+
+def detail_cache_key(passenger_id):
+    return f'passenger_management:detail:{passenger_id}'
+
+
+def get_cached_detail(passenger_id):
+    """读取缓存的旅客详情数据，未启用缓存时返回None"""
+    if not getattr(settings, 'PASSENGER_DETAIL_CACHE_TIMEOUT', 0):
+        return None
+    return cache.get(detail_cache_key(passenger_id))
+
+
+def set_cached_detail(passenger_id, data):
+    """缓存旅客详情序列化结果"""
+    timeout = getattr(settings, 'PASSENGER_DETAIL_CACHE_TIMEOUT', 0)
+    if timeout:
+        cache.set(detail_cache_key(passenger_id), data, timeout)
+
+
+def invalidate_detail(passenger_ids):
+    """清除指定旅客的详情缓存"""
+    keys = [detail_cache_key(passenger_id) for passenger_id in passenger_ids if passenger_id is not None]
+    if keys:
+        cache.delete_many(keys)
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.passenger_management.models import PassengerActivityDailyStat
+
+
+class Command(BaseCommand):
+    help = '从旅客活动日志重建活动日统计'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='只重建最近N天的统计，默认全部重建')
+
+    def handle(self, *args, **options):
+        days = options['days']
+        start_date = None
+        if days:
+            start_date = timezone.localdate() - timezone.timedelta(days=days - 1)
+            self.stdout.write(f'开始重建 {start_date} 以来的活动日统计...')
+        else:
+            self.stdout.write('开始重建全部活动日统计...')
+
+        count = PassengerActivityDailyStat.rebuild(start_date=start_date)
+
+        self.stdout.write(self.style.SUCCESS(f'活动日统计重建完成，共 {count} 条！'))
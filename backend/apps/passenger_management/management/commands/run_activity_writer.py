@@ -0,0 +1,50 @@
+import logging
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.passenger_management.activity_writer import get_writer_settings, drain_spool
+
+logger = logging.getLogger('app')
+
+
+class Command(BaseCommand):
+    help = '旅客活动写入进程：批量将 spool 模式下的活动队列文件写入数据库'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='处理完当前队列后退出')
+        parser.add_argument('--interval', type=float, default=None, help='轮询间隔（秒），默认使用 FLUSH_INTERVAL')
+
+    def handle(self, *args, **options):
+        writer_settings = get_writer_settings()
+        spool_dir = writer_settings['SPOOL_DIR']
+        batch_size = writer_settings['BATCH_SIZE']
+        interval = options['interval'] or writer_settings['FLUSH_INTERVAL']
+
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        self.stdout.write(f'旅客活动写入进程已启动，队列目录: {spool_dir}')
+        while True:
+            close_old_connections()
+            try:
+                count = drain_spool(spool_dir, batch_size)
+            except Exception:
+                # 数据库暂时不可用等错误：队列文件保留，下个周期重试，进程不退出
+                logger.exception('旅客活动队列写入失败')
+                self.stderr.write('旅客活动队列写入失败，稍后重试')
+                count = 0
+            if count:
+                self.stdout.write(f'写入 {count} 条旅客活动')
+            # 收到退出信号时也要先把当前队列处理完
+            if options['once'] or self.stopping:
+                break
+            time.sleep(interval)
+
+        self.stdout.write(self.style.SUCCESS('旅客活动写入进程已退出'))
+
+    def stop(self, signum, frame):
+        self.stopping = True
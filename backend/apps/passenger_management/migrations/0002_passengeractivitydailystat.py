@@ -0,0 +1,43 @@
+# Generated by Django 4.2.5 on 2026-10-18 19:54
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily_stats(apps, schema_editor):
+    PassengerActivity = apps.get_model('passenger_management', 'PassengerActivity')
+    PassengerActivityDailyStat = apps.get_model('passenger_management', 'PassengerActivityDailyStat')
+    rows = PassengerActivity.objects.annotate(
+        date=TruncDate('created_at')
+    ).values('date', 'activity_type').annotate(total=Count('id')).order_by()
+    PassengerActivityDailyStat.objects.bulk_create([
+        PassengerActivityDailyStat(date=row['date'], activity_type=row['activity_type'], count=row['total'])
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('passenger_management', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PassengerActivityDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='日期')),
+                ('activity_type', models.CharField(choices=[('login', '登录'), ('logout', '登出'), ('profile_update', '更新个人信息'), ('flight_booking', '航班预订'), ('flight_checkin', '航班值机'), ('lost_item_report', '物品报失'), ('other', '其他')], max_length=50, verbose_name='活动类型')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='活动数量')),
+            ],
+            options={
+                'verbose_name': '旅客活动日统计',
+                'verbose_name_plural': '旅客活动日统计',
+                'ordering': ['-date', 'activity_type'],
+                'unique_together': {('date', 'activity_type')},
+            },
+        ),
+        migrations.RunPython(backfill_daily_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.5 on 2026-10-18 19:55
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('passenger_management', '0002_passengeractivitydailystat'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='passengeractivity',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='创建时间'),
+        ),
+    ]
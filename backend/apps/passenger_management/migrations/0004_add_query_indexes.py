@@ -0,0 +1,29 @@
+# Generated by Django 4.2.5 on 2026-10-18 20:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('passenger_management', '0003_alter_passengeractivity_created_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='passengeractivity',
+            index=models.Index(fields=['-created_at'], name='pact_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='passengeractivity',
+            index=models.Index(fields=['passenger', '-created_at'], name='pact_passenger_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='passengeractivity',
+            index=models.Index(fields=['activity_type', '-created_at'], name='pact_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='passengernote',
+            index=models.Index(fields=['passenger', '-created_at'], name='pnote_passenger_created_idx'),
+        ),
+    ]
@@ -1,4 +1,10 @@
-from django.db import models
+from collections import Counter
+from datetime import datetime, time
+
+from django.db import models, transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest, TruncDate
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth import get_user_model
 
@@ -28,6 +34,9 @@ class PassengerNote(models.Model):
         verbose_name = _('旅客备注')
         verbose_name_plural = _('旅客备注')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['passenger', '-created_at'], name='pnote_passenger_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.passenger.username} - {self.note[:20]}"
@@ -59,17 +68,118 @@ class PassengerActivity(models.Model):
     description = models.TextField(_('活动描述'))
     ip_address = models.GenericIPAddressField(_('IP地址'), null=True, blank=True)
     user_agent = models.TextField(_('用户代理'), null=True, blank=True)
-    created_at = models.DateTimeField(_('创建时间'), auto_now_add=True)
+    # 使用默认值而非 auto_now_add，批量延迟写入时保留活动实际发生的时间
+    created_at = models.DateTimeField(_('创建时间'), default=timezone.now)
 
     class Meta:
         verbose_name = _('旅客活动')
         verbose_name_plural = _('旅客活动')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='pact_created_idx'),
+            models.Index(fields=['passenger', '-created_at'], name='pact_passenger_created_idx'),
+            models.Index(fields=['activity_type', '-created_at'], name='pact_type_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.passenger.username} - {self.get_activity_type_display()}"
 
 
+class PassengerActivityDailyStat(models.Model):
+    """旅客活动按日汇总，随活动写入、删除增量更新（归档的活动仍计入），统计接口无需扫描活动日志"""
+    date = models.DateField(_('日期'))
+    activity_type = models.CharField(
+        _('活动类型'),
+        max_length=50,
+        choices=PassengerActivity.ACTIVITY_TYPES
+    )
+    count = models.PositiveIntegerField(_('活动数量'), default=0)
+
+    class Meta:
+        verbose_name = _('旅客活动日统计')
+        verbose_name_plural = _('旅客活动日统计')
+        ordering = ['-date', 'activity_type']
+        unique_together = ['date', 'activity_type']
+
+    def __str__(self):
+        return f"{self.date} - {self.get_activity_type_display()}: {self.count}"
+
+    @classmethod
+    def record(cls, activities):
+        """
+        将一批新写入的活动累加到日统计中
+
+        Args:
+            activities: 已保存的 PassengerActivity 对象列表
+        """
+        counter = Counter(
+            (timezone.localdate(activity.created_at), activity.activity_type)
+            for activity in activities
+        )
+        with transaction.atomic():
+            for (date, activity_type), count in counter.items():
+                updated = cls.objects.filter(
+                    date=date, activity_type=activity_type
+                ).update(count=F('count') + count)
+                if updated:
+                    continue
+                stat, created = cls.objects.get_or_create(
+                    date=date, activity_type=activity_type, defaults={'count': count}
+                )
+                if not created:
+                    cls.objects.filter(pk=stat.pk).update(count=F('count') + count)
+
+    @classmethod
+    def discard(cls, activities):
+        """
+        从日统计中扣减一批被删除的活动
+
+        Args:
+            activities: 已删除的 PassengerActivity 对象列表
+        """
+        counter = Counter(
+            (timezone.localdate(activity.created_at), activity.activity_type)
+            for activity in activities
+        )
+        with transaction.atomic():
+            for (date, activity_type), count in counter.items():
+                cls.objects.filter(date=date, activity_type=activity_type).update(
+                    count=Greatest(F('count') - count, 0)
+                )
+
+    @classmethod
+    def rebuild(cls, start_date=None):
+        """
+        从活动日志重新生成日统计（TruncDate + Count 分组聚合）
+
+        Args:
+            start_date: 只重建该日期（含）之后的统计，为空时全部重建
+
+        Returns:
+            写入的统计行数
+        """
+        activities = PassengerActivity.objects.all()
+        stats = cls.objects.all()
+        if start_date:
+            start = timezone.make_aware(datetime.combine(start_date, time.min))
+            activities = activities.filter(created_at__gte=start)
+            stats = stats.filter(date__gte=start_date)
+
+        rows = activities.annotate(
+            date=TruncDate('created_at')
+        ).values('date', 'activity_type').annotate(
+            total=Count('id')
+        ).order_by()
+
+        with transaction.atomic():
+            stats.delete()
+            objs = cls.objects.bulk_create([
+                cls(date=row['date'], activity_type=row['activity_type'], count=row['total'])
+                for row in rows
+            ])
+        return len(objs)
+
+
 class PassengerTag(models.Model):
     """旅客标签模型，用于给旅客添加标签进行分类管理"""
     name = models.CharField(_('标签名称'), max_length=50, unique=True)
@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db.models import Count
 from .models import PassengerNote, PassengerActivity, PassengerTag, PassengerProfile
+from .loaders import RECENT_NOTES_LIMIT, RECENT_ACTIVITIES_LIMIT, RECENT_LOST_ITEMS_LIMIT
 from apps.items_management.models import LostItem
 from apps.items_management.serializers import LostItemListSerializer
 from apps.users.serializers import CustomUserSimpleSerializer
@@ -103,16 +105,23 @@ class PassengerDetailSerializer(serializers.ModelSerializer):
     def get_roles(self, obj):
         return obj.get_roles()
     
+    # 以下方法优先使用 loaders.setup_detail_loading 预取的数据
     def get_recent_notes(self, obj):
-        notes = obj.notes.all()[:5]
+        notes = getattr(obj, 'prefetched_recent_notes', None)
+        if notes is None:
+            notes = obj.notes.all()[:RECENT_NOTES_LIMIT]
         return PassengerNoteSerializer(notes, many=True).data
     
     def get_recent_activities(self, obj):
-        activities = obj.activities.all()[:10]
+        activities = getattr(obj, 'prefetched_recent_activities', None)
+        if activities is None:
+            activities = obj.activities.all()[:RECENT_ACTIVITIES_LIMIT]
         return PassengerActivitySerializer(activities, many=True).data
     
     def get_recent_lost_items(self, obj):
-        lost_items = LostItem.objects.filter(reported_by=obj)[:5]
+        lost_items = getattr(obj, 'prefetched_recent_lost_items', None)
+        if lost_items is None:
+            lost_items = LostItem.objects.filter(reported_by=obj)[:RECENT_LOST_ITEMS_LIMIT]
         return LostItemListSerializer(lost_items, many=True).data
 
 
@@ -129,6 +138,15 @@ class PassengerListSerializer(serializers.ModelSerializer):
                  'avatar', 'is_active', 'date_joined', 'last_login', 
                  'roles', 'tags', 'lost_items_count', 'vip_level']
     
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """预加载列表所需的角色、资料、标签和失物数量，避免逐行查询"""
+        return queryset.select_related('passenger_profile').prefetch_related(
+            'roles', 'passenger_profile__tags'
+        ).annotate(
+            lost_items_count=Count('reported_lost_items', distinct=True)
+        )
+    
     def get_roles(self, obj):
         return obj.get_roles()
     
@@ -140,6 +158,9 @@ class PassengerListSerializer(serializers.ModelSerializer):
             return []
     
     def get_lost_items_count(self, obj):
+        # 优先使用 setup_eager_loading 注解的数量
+        if hasattr(obj, 'lost_items_count'):
+            return obj.lost_items_count
         return LostItem.objects.filter(reported_by=obj).count()
     
     def get_vip_level(self, obj):
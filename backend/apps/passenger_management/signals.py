@@ -0,0 +1,109 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver, Signal
+
+from apps.common.archive import is_archiving
+from apps.items_management.models import LostItem
+from .loaders import invalidate_detail
+from .models import PassengerNote, PassengerActivity, PassengerProfile, PassengerTag, PassengerActivityDailyStat
+
+User = get_user_model()
+
+# 批量写入活动记录后发送（bulk_create 不会触发 post_save），参数 activities 为已保存的记录列表
+activities_recorded = Signal()
+
+
+@receiver(post_save, sender=PassengerNote)
+@receiver(post_delete, sender=PassengerNote)
+@receiver(post_save, sender=PassengerActivity)
+@receiver(post_delete, sender=PassengerActivity)
+@receiver(post_save, sender=PassengerProfile)
+@receiver(post_delete, sender=PassengerProfile)
+def invalidate_detail_on_passenger_data(sender, instance, **kwargs):
+    """旅客备注、活动或资料变化时清除详情缓存"""
+    invalidate_detail([instance.passenger_id])
+
+
+@receiver(post_save, sender=PassengerActivity)
+def update_daily_stats(sender, instance, created, **kwargs):
+    """新活动写入时累加日统计"""
+    if created:
+        PassengerActivityDailyStat.record([instance])
+
+
+@receiver(post_delete, sender=PassengerActivity)
+def discard_daily_stats(sender, instance, **kwargs):
+    """删除活动时扣减日统计，归档移出热表的活动仍计入统计"""
+    if not is_archiving():
+        PassengerActivityDailyStat.discard([instance])
+
+
+@receiver(activities_recorded)
+def handle_activities_recorded(sender, activities, **kwargs):
+    """批量写入活动后累加日统计并清除相关旅客的详情缓存"""
+    PassengerActivityDailyStat.record(activities)
+    invalidate_detail({activity.passenger_id for activity in activities})
+
+
+@receiver(post_save, sender=LostItem)
+@receiver(post_delete, sender=LostItem)
+def invalidate_detail_on_lost_item(sender, instance, **kwargs):
+    """失物信息变化时清除报失人的详情缓存"""
+    invalidate_detail([instance.reported_by_id])
+
+
+@receiver(post_save, sender=User)
+def invalidate_detail_on_user(sender, instance, **kwargs):
+    """用户基本信息变化时清除详情缓存"""
+    invalidate_detail([instance.pk])
+
+
+@receiver(m2m_changed, sender=User.roles.through)
+def invalidate_detail_on_roles(sender, instance, action, reverse, pk_set, **kwargs):
+    """用户角色变化时清除详情缓存"""
+    if action not in ('post_add', 'post_remove', 'pre_clear', 'post_clear'):
+        return
+    if not reverse:
+        # user.roles.add/remove/clear(...)
+        if action != 'pre_clear':
+            invalidate_detail([instance.pk])
+        return
+
+    # role.customuser_set.add/remove/clear(...)，post_clear 的 pk_set 为 None，清空前先记下受影响的用户
+    if action == 'pre_clear':
+        instance._detail_cleared_user_ids = list(instance.customuser_set.values_list('pk', flat=True))
+        return
+    if action == 'post_clear':
+        invalidate_detail(instance.__dict__.pop('_detail_cleared_user_ids', []))
+    else:
+        invalidate_detail(pk_set or [])
+
+
+@receiver(m2m_changed, sender=PassengerProfile.tags.through)
+def invalidate_detail_on_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    """旅客标签变化时清除详情缓存"""
+    if action not in ('post_add', 'post_remove', 'pre_clear', 'post_clear'):
+        return
+    if not reverse:
+        # profile.tags.add/remove/clear(...)
+        if action != 'pre_clear':
+            invalidate_detail([instance.passenger_id])
+        return
+
+    # tag.passengers.add/remove/clear(...)，post_clear 的 pk_set 为 None，清空前先记下受影响的旅客
+    if action == 'pre_clear':
+        instance._detail_cleared_passenger_ids = list(instance.passengers.values_list('passenger_id', flat=True))
+        return
+    if action == 'post_clear':
+        invalidate_detail(instance.__dict__.pop('_detail_cleared_passenger_ids', []))
+    else:
+        profiles = PassengerProfile.objects.filter(pk__in=pk_set or [])
+        invalidate_detail(list(profiles.values_list('passenger_id', flat=True)))
+
+
+@receiver(post_save, sender=PassengerTag)
+def invalidate_detail_on_tag_update(sender, instance, created, **kwargs):
+    """标签名称或颜色修改后，清除使用该标签的旅客详情缓存"""
+    if created:
+        return
+    invalidate_detail(list(instance.passengers.values_list('passenger_id', flat=True)))
@@ -1,3 +1,352 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from apps.common.archive import archive_rows
+from apps.users.models import Role
+from apps.items_management.models import ItemCategory, LostItem
+from .models import PassengerTag, PassengerProfile, PassengerNote, PassengerActivity, PassengerActivityDailyStat
+from .activity_writer import QUARANTINE_DIR, activity_buffer, drain_spool
+from .utils import record_passenger_activity
+
+User = get_user_model()
+
+
+class PassengerListQueryTests(TestCase):
+    """旅客列表查询次数测试"""
+
+    url = '/api/passenger-management/passengers/'
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin = User.objects.create_user(username='admin', password='testpassword', is_staff=True)
+        self.client.force_authenticate(self.admin)
+        self.passenger_role, _ = Role.objects.get_or_create(name='passenger')
+        self.category = ItemCategory.objects.create(name='other')
+        self.tags = [
+            PassengerTag.objects.create(name='vip'),
+            PassengerTag.objects.create(name='business'),
+        ]
+        self.created = 0
+
+    def create_passengers(self, count):
+        for _ in range(count):
+            self.created += 1
+            user = User.objects.create_user(username=f'passenger{self.created}', password='testpassword')
+            user.roles.add(self.passenger_role)
+            profile = PassengerProfile.objects.create(passenger=user, vip_level=1)
+            profile.tags.set(self.tags)
+            for i in range(2):
+                LostItem.objects.create(
+                    title=f'物品{i}', category=self.category, description='描述',
+                    lost_time=timezone.now(), lost_location='T2', contact_name='张三',
+                    contact_phone='13800138000', reported_by=user
+                )
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, {'page_size': 100})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(context), response
+
+    def test_query_count_independent_of_page_size(self):
+        """列表查询次数不随每页行数增长"""
+        self.create_passengers(3)
+        self.count_list_queries()  # 预热管理员的角色缓存
+        small, _ = self.count_list_queries()
+
+        self.create_passengers(20)
+        large, response = self.count_list_queries()
+
+        self.assertEqual(response.data['count'], 23)
+        self.assertEqual(small, large)
+
+    def test_list_data_from_prefetch(self):
+        """预取数据与逐行查询结果一致"""
+        self.create_passengers(2)
+        user = User.objects.create_user(username='noprofile', password='testpassword')
+        user.roles.add(self.passenger_role)
+
+        _, response = self.count_list_queries()
+        rows = {row['username']: row for row in response.data['results']}
+
+        self.assertEqual(rows['passenger1']['lost_items_count'], 2)
+        self.assertEqual(rows['passenger1']['vip_level'], 1)
+        self.assertEqual(rows['passenger1']['roles'], ['passenger'])
+        self.assertCountEqual([tag['name'] for tag in rows['passenger1']['tags']], ['vip', 'business'])
+        self.assertEqual(rows['noprofile']['lost_items_count'], 0)
+        self.assertEqual(rows['noprofile']['tags'], [])
+        self.assertEqual(rows['noprofile']['vip_level'], 0)
+
+
+class PassengerDetailTests(TestCase):
+    """旅客详情批量加载与缓存测试"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin = User.objects.create_user(username='admin', password='testpassword', is_staff=True)
+        self.client.force_authenticate(self.admin)
+        passenger_role, _ = Role.objects.get_or_create(name='passenger')
+        self.category = ItemCategory.objects.create(name='other')
+        self.passenger = User.objects.create_user(username='passenger', password='testpassword')
+        self.passenger.roles.add(passenger_role)
+        profile = PassengerProfile.objects.create(passenger=self.passenger)
+        profile.tags.add(PassengerTag.objects.create(name='vip'))
+        self.url = f'/api/passenger-management/passengers/{self.passenger.pk}/'
+
+    def add_records(self, count):
+        for i in range(count):
+            PassengerNote.objects.create(passenger=self.passenger, note=f'备注{i}', created_by=self.admin)
+            PassengerActivity.objects.create(passenger=self.passenger, activity_type='login', description='登录')
+            LostItem.objects.create(
+                title=f'物品{i}', category=self.category, description='描述',
+                lost_time=timezone.now(), lost_location='T2', contact_name='张三',
+                contact_phone='13800138000', reported_by=self.passenger
+            )
+
+    def get_detail(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(context), response
+
+    @override_settings(PASSENGER_DETAIL_CACHE_TIMEOUT=0)
+    def test_query_count_independent_of_records(self):
+        """详情查询次数不随记录数量增长"""
+        self.add_records(1)
+        self.get_detail()  # 预热管理员的角色缓存
+        few, _ = self.get_detail()
+
+        self.add_records(12)
+        many, response = self.get_detail()
+
+        self.assertEqual(few, many)
+        self.assertEqual(len(response.data['recent_notes']), 5)
+        self.assertEqual(len(response.data['recent_activities']), 10)
+        self.assertEqual(len(response.data['recent_lost_items']), 5)
+        self.assertEqual(response.data['recent_lost_items'][0]['title'], '物品11')
+
+    def test_cache_hit_and_invalidation(self):
+        """缓存命中不访问数据库，新增备注后缓存失效"""
+        self.add_records(1)
+        self.get_detail()
+
+        queries, _ = self.get_detail()
+        self.assertEqual(queries, 0)
+
+        PassengerNote.objects.create(passenger=self.passenger, note='新备注', created_by=self.admin)
+        _, response = self.get_detail()
+        self.assertEqual(response.data['recent_notes'][0]['note'], '新备注')
+
+    def test_reverse_clear_invalidates_cache(self):
+        """从角色、标签一侧清空关联时清除相关旅客的缓存"""
+        _, response = self.get_detail()
+        self.assertEqual([tag['name'] for tag in response.data['profile']['tags']], ['vip'])
+
+        PassengerTag.objects.get(name='vip').passengers.clear()
+        _, response = self.get_detail()
+        self.assertEqual(response.data['profile']['tags'], [])
+
+        # 失去旅客角色后不再按旧缓存返回详情
+        Role.objects.get(name='passenger').customuser_set.clear()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class PassengerActivityStatsTests(TestCase):
+    """旅客活动统计测试"""
+
+    url = '/api/passenger-management/activities/stats/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(username='admin', password='testpassword', is_staff=True)
+        self.client.force_authenticate(self.admin)
+        self.passenger = User.objects.create_user(username='passenger', password='testpassword')
+
+    def add_activity(self, activity_type, days_ago=0):
+        activity = PassengerActivity.objects.create(
+            passenger=self.passenger, activity_type=activity_type, description='测试'
+        )
+        if days_ago:
+            # 模拟历史数据：直接改写时间后重建统计
+            PassengerActivity.objects.filter(pk=activity.pk).update(
+                created_at=activity.created_at - timezone.timedelta(days=days_ago)
+            )
+
+    def test_rollup_updated_incrementally(self):
+        """新增活动时日统计同步累加"""
+        self.add_activity('login')
+        self.add_activity('login')
+        self.add_activity('logout')
+
+        today = timezone.localdate()
+        stats = dict(PassengerActivityDailyStat.objects.filter(date=today).values_list('activity_type', 'count'))
+        self.assertEqual(stats, {'login': 2, 'logout': 1})
+
+    def test_rollup_decremented_on_delete(self):
+        """删除活动时扣减日统计，归档不扣减"""
+        self.add_activity('login')
+        self.add_activity('login')
+        self.add_activity('logout')
+        PassengerActivity.objects.filter(activity_type='logout').delete()
+        PassengerActivity.objects.filter(activity_type='login').first().delete()
+
+        today = timezone.localdate()
+        stats = dict(PassengerActivityDailyStat.objects.filter(date=today).values_list('activity_type', 'count'))
+        self.assertEqual(stats, {'login': 1, 'logout': 0})
+
+        with tempfile.TemporaryDirectory() as archive_root, override_settings(ARCHIVE_ROOT=archive_root):
+            archive_rows('passenger_activity', timezone.now() + timezone.timedelta(minutes=1))
+        self.assertFalse(PassengerActivity.objects.exists())
+        self.assertEqual(PassengerActivityDailyStat.objects.get(date=today, activity_type='login').count, 1)
+
+    def test_stats_window_and_breakdown(self):
+        """按窗口返回每日及分类型统计"""
+        self.add_activity('login')
+        self.add_activity('logout')
+        self.add_activity('login', days_ago=3)
+        self.add_activity('login', days_ago=20)
+        PassengerActivityDailyStat.rebuild()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        today = timezone.localdate()
+        three_days_ago = (today - timezone.timedelta(days=3)).strftime('%Y-%m-%d')
+        self.assertEqual(len(response.data['date_stats']), 7)
+        self.assertEqual(response.data['date_stats'][today.strftime('%Y-%m-%d')], 2)
+        self.assertEqual(response.data['date_stats'][three_days_ago], 1)
+        self.assertEqual(response.data['type_date_stats']['login'][three_days_ago], 1)
+        self.assertEqual(sum(response.data['date_stats'].values()), 3)
+
+        response = self.client.get(self.url, {'days': 30})
+        self.assertEqual(len(response.data['date_stats']), 30)
+        self.assertEqual(sum(response.data['date_stats'].values()), 4)
+        self.assertEqual(response.data['type_stats'][0], {'activity_type': 'login', 'count': 3})
+
+        response = self.client.get(self.url, {'days': 10})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ActivityWriterTests(TestCase):
+    """旅客活动写入器测试"""
+
+    def setUp(self):
+        cache.clear()
+        passenger_role, _ = Role.objects.get_or_create(name='passenger')
+        self.passenger = User.objects.create_user(username='passenger', password='testpassword')
+        self.passenger.roles.add(passenger_role)
+
+    @override_settings(PASSENGER_ACTIVITY_WRITER={'MODE': 'sync'})
+    def test_sync_mode(self):
+        """同步写入"""
+        activity = record_passenger_activity(self.passenger, 'login', '登录')
+        self.assertIsNotNone(activity.pk)
+        self.assertEqual(PassengerActivityDailyStat.objects.get(activity_type='login').count, 1)
+
+    def test_non_passenger_ignored(self):
+        """非旅客用户不记录活动"""
+        user = User.objects.create_user(username='staff', password='testpassword')
+        self.assertIsNone(record_passenger_activity(user, 'login', '登录'))
+
+    @override_settings(PASSENGER_ACTIVITY_WRITER={'MODE': 'buffered', 'BATCH_SIZE': 100, 'FLUSH_INTERVAL': 60})
+    def test_buffered_mode(self):
+        """缓冲模式下批量写入并保留活动发生时间"""
+        with mock.patch.object(activity_buffer, '_ensure_thread'):
+            first = record_passenger_activity(self.passenger, 'login', '登录')
+            record_passenger_activity(self.passenger, 'logout', '登出')
+        self.assertFalse(PassengerActivity.objects.exists())
+
+        self.assertEqual(activity_buffer.flush(), 2)
+        self.assertEqual(PassengerActivity.objects.count(), 2)
+        self.assertEqual(PassengerActivity.objects.get(activity_type='login').created_at, first.created_at)
+        self.assertEqual(PassengerActivityDailyStat.objects.get(activity_type='logout').count, 1)
+
+    def test_buffered_mode_retries_then_spills(self):
+        """缓冲模式写入失败时重试，连续失败后转存到队列文件"""
+        with tempfile.TemporaryDirectory() as spool_dir:
+            writer_settings = {'MODE': 'buffered', 'BATCH_SIZE': 100, 'MAX_RETRIES': 2, 'SPOOL_DIR': spool_dir}
+            with override_settings(PASSENGER_ACTIVITY_WRITER=writer_settings), \
+                    mock.patch.object(activity_buffer, '_ensure_thread'):
+                record_passenger_activity(self.passenger, 'login', '登录')
+                with mock.patch('apps.passenger_management.activity_writer.PassengerActivity.objects.bulk_create',
+                                side_effect=RuntimeError('数据库不可用')):
+                    self.assertEqual(activity_buffer.flush(), 0)
+                    self.assertEqual(len(activity_buffer), 1)
+                    record_passenger_activity(self.passenger, 'logout', '登出')
+                    self.assertEqual(activity_buffer.flush(), 0)
+                self.assertEqual(len(activity_buffer), 0)
+            self.assertFalse(PassengerActivity.objects.exists())
+
+            self.assertEqual(drain_spool(spool_dir, batch_size=10, grace_seconds=0), 2)
+        self.assertEqual(
+            sorted(PassengerActivity.objects.values_list('activity_type', flat=True)), ['login', 'logout']
+        )
+
+    def test_spool_mode(self):
+        """队列文件模式由写入进程批量入库"""
+        with tempfile.TemporaryDirectory() as spool_dir:
+            writer_settings = {'MODE': 'spool', 'BATCH_SIZE': 2, 'SPOOL_DIR': spool_dir}
+            with override_settings(PASSENGER_ACTIVITY_WRITER=writer_settings):
+                for _ in range(3):
+                    record_passenger_activity(self.passenger, 'login', '登录')
+            self.assertFalse(PassengerActivity.objects.exists())
+
+            self.assertEqual(drain_spool(spool_dir, batch_size=2, grace_seconds=0), 3)
+            self.assertEqual(drain_spool(spool_dir, batch_size=2, grace_seconds=0), 0)
+        self.assertEqual(PassengerActivity.objects.count(), 3)
+        self.assertEqual(PassengerActivityDailyStat.objects.get(activity_type='login').count, 3)
+
+    def test_spool_quarantines_bad_rows(self):
+        """无法解析或违反约束的记录转入隔离文件，同一文件中的其他记录正常入库"""
+        with tempfile.TemporaryDirectory() as spool_dir:
+            writer_settings = {'MODE': 'spool', 'SPOOL_DIR': spool_dir}
+            with override_settings(PASSENGER_ACTIVITY_WRITER=writer_settings):
+                record_passenger_activity(self.passenger, 'login', '登录')
+            bad = json.dumps({
+                'passenger_id': self.passenger.pk, 'activity_type': 'login', 'description': None,
+                'ip_address': None, 'user_agent': None, 'created_at': timezone.now().isoformat(),
+            })
+            with open(os.path.join(spool_dir, '1.jsonl'), 'a', encoding='utf-8') as f:
+                f.write(f'{bad}\nnot json\n')
+            with override_settings(PASSENGER_ACTIVITY_WRITER=writer_settings):
+                record_passenger_activity(self.passenger, 'logout', '登出')
+
+            self.assertEqual(drain_spool(spool_dir, batch_size=10, grace_seconds=0), 2)
+            quarantined = os.listdir(os.path.join(spool_dir, QUARANTINE_DIR))
+            self.assertEqual(len(quarantined), 1)
+            with open(os.path.join(spool_dir, QUARANTINE_DIR, quarantined[0]), encoding='utf-8') as f:
+                self.assertCountEqual(f.read().splitlines(), [bad, 'not json'])
+            self.assertFalse([name for name in os.listdir(spool_dir) if name != QUARANTINE_DIR])
+        self.assertEqual(
+            sorted(PassengerActivity.objects.values_list('activity_type', flat=True)), ['login', 'logout']
+        )
+        self.assertEqual(PassengerActivityDailyStat.objects.get(activity_type='login').count, 1)
+
+    def test_writer_command_survives_database_errors(self):
+        """数据库不可用时写入进程记录错误并继续运行，队列文件保留"""
+        with tempfile.TemporaryDirectory() as spool_dir:
+            writer_settings = {'MODE': 'spool', 'SPOOL_DIR': spool_dir, 'FLUSH_INTERVAL': 0}
+            with override_settings(PASSENGER_ACTIVITY_WRITER=writer_settings):
+                record_passenger_activity(self.passenger, 'login', '登录')
+                with mock.patch('apps.passenger_management.activity_writer.PassengerActivity.objects.bulk_create',
+                                side_effect=OperationalError('数据库不可用')):
+                    stderr = io.StringIO()
+                    call_command('run_activity_writer', '--once', stdout=io.StringIO(), stderr=stderr)
+                self.assertIn('稍后重试', stderr.getvalue())
+                self.assertFalse(PassengerActivity.objects.exists())
+                call_command('run_activity_writer', '--once', stdout=io.StringIO())
+        self.assertEqual(PassengerActivity.objects.count(), 1)
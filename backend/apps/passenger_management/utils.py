@@ -1,4 +1,5 @@
 from .models import PassengerActivity
+from .activity_writer import write_activity
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -15,7 +16,7 @@ def record_passenger_activity(passenger, activity_type, description='', request=
         request: HTTP请求对象，用于获取IP地址和用户代理
     
     Returns:
-        创建的活动记录对象
+        活动记录对象，是否已入库取决于 PASSENGER_ACTIVITY_WRITER 的写入方式
     """
     # 验证用户是旅客
     if not isinstance(passenger, User) or 'passenger' not in passenger.get_roles():
@@ -33,8 +34,8 @@ def record_passenger_activity(passenger, activity_type, description='', request=
         activity_data['ip_address'] = get_client_ip(request)
         activity_data['user_agent'] = request.META.get('HTTP_USER_AGENT', '')
     
-    # 创建并返回活动记录
-    return PassengerActivity.objects.create(**activity_data)
+    # 交给活动写入器，默认在请求之外批量入库
+    return write_activity(PassengerActivity(**activity_data))
 
 
 def get_client_ip(request):
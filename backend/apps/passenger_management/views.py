@@ -4,11 +4,12 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from django.contrib.auth import get_user_model
-from django.db.models import Q, Count
+from django.db.models import Q, Count, Sum
 from django.utils import timezone
-from rest_framework.pagination import PageNumberPagination
+from django.utils.dateparse import parse_date
+from datetime import datetime, time
 
-from .models import PassengerNote, PassengerActivity, PassengerTag, PassengerProfile
+from .models import PassengerNote, PassengerActivity, PassengerTag, PassengerProfile, PassengerActivityDailyStat
 from .serializers import (
     PassengerListSerializer,
     PassengerDetailSerializer,
@@ -19,6 +20,10 @@ from .serializers import (
     PassengerProfileSerializer,
     PassengerProfileUpdateSerializer
 )
+from .activity_writer import write_activity
+from .loaders import setup_detail_loading, get_cached_detail, set_cached_detail
+from apps.common.archive import ArchiveBackedSequence, archived_months, iter_archived_rows
+from apps.common.pagination import StandardResultsSetPagination
 from apps.items_management.models import LostItem
 from apps.items_management.serializers import LostItemListSerializer
 
@@ -26,13 +31,6 @@ from apps.items_management.serializers import LostItemListSerializer
 User = get_user_model()
 
 
-class StandardResultsSetPagination(PageNumberPagination):
-    """标准分页器"""
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
-
-
 class IsAdminUser(permissions.BasePermission):
     """仅管理员可访问"""
     def has_permission(self, request, view):
@@ -53,6 +51,10 @@ class PassengerViewSet(viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         """根据查询参数筛选旅客"""
         queryset = User.objects.filter(roles__name='passenger').distinct()
+        if self.action == 'list':
+            queryset = PassengerListSerializer.setup_eager_loading(queryset)
+        elif self.action == 'retrieve':
+            queryset = setup_detail_loading(queryset)
         
         # 根据标签筛选
         tag_id = self.request.query_params.get('tag', None)
@@ -88,6 +90,20 @@ class PassengerViewSet(viewsets.ReadOnlyModelViewSet):
             return PassengerDetailSerializer
         return PassengerListSerializer
 
+    def retrieve(self, request, *args, **kwargs):
+        """获取旅客详情，优先使用短期缓存"""
+        try:
+            passenger_id = int(kwargs[self.lookup_field])
+        except (TypeError, ValueError):
+            passenger_id = None
+
+        data = get_cached_detail(passenger_id) if passenger_id else None
+        if data is None:
+            instance = self.get_object()
+            data = self.get_serializer(instance).data
+            set_cached_detail(instance.pk, data)
+        return Response(data)
+
     @action(detail=True, methods=['get'])
     def lost_items(self, request, pk=None):
         """获取旅客的失物列表"""
@@ -181,12 +197,12 @@ class PassengerViewSet(viewsets.ReadOnlyModelViewSet):
             serializer.save()
             
             # 记录活动
-            PassengerActivity.objects.create(
+            write_activity(PassengerActivity(
                 passenger=passenger,
                 activity_type='profile_update',
                 description='管理员更新了旅客资料',
                 ip_address=self.get_client_ip(request)
-            )
+            ))
             
             # 返回完整的资料信息
             return Response(PassengerProfileSerializer(profile).data)
@@ -214,7 +230,9 @@ class PassengerTagViewSet(viewsets.ModelViewSet):
     def passengers(self, request, pk=None):
         """获取使用此标签的旅客列表"""
         tag = self.get_object()
-        passengers = User.objects.filter(passenger_profile__tags=tag)
+        passengers = PassengerListSerializer.setup_eager_loading(
+            User.objects.filter(passenger_profile__tags=tag)
+        ).order_by('-date_joined')
         
         # 分页
         page = self.paginate_queryset(passengers)
@@ -254,28 +272,57 @@ class PassengerActivityViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ['passenger', 'activity_type']
     search_fields = ['description']
+    pagination_class = StandardResultsSetPagination
+    # ?pagination=cursor 时使用的键集分页排序
+    cursor_ordering = ('-created_at', '-id')
+
+    # 统计接口允许的时间窗口（天）
+    STATS_WINDOWS = (7, 30, 90)
 
     @action(detail=False, methods=['get'])
     def stats(self, request):
-        """获取活动统计信息"""
+        """
+        获取活动统计信息
+
+        数据来自按日汇总表，参数 days 可选 7/30/90，默认 7 天
+        """
+        try:
+            days = int(request.query_params.get('days', 7))
+        except (TypeError, ValueError):
+            days = None
+        if days not in self.STATS_WINDOWS:
+            return Response(
+                {'error': f"days 只能是 {'/'.join(str(d) for d in self.STATS_WINDOWS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         # 按类型统计活动数量
-        type_stats = PassengerActivity.objects.values('activity_type').annotate(
-            count=Count('id')
+        type_stats = PassengerActivityDailyStat.objects.values('activity_type').annotate(
+            count=Sum('count')
         ).order_by('-count')
-        
-        # 按日期统计活动数量
-        today = timezone.now().date()
-        date_stats = {}
-        for i in range(7):
-            date = today - timezone.timedelta(days=i)
-            count = PassengerActivity.objects.filter(
-                created_at__date=date
-            ).count()
-            date_stats[date.strftime('%Y-%m-%d')] = count
+
+        # 按日期及类型统计活动数量（一次查询取出整个窗口）
+        today = timezone.localdate()
+        start_date = today - timezone.timedelta(days=days - 1)
+        dates = [(today - timezone.timedelta(days=i)).strftime('%Y-%m-%d') for i in range(days)]
+        date_stats = dict.fromkeys(dates, 0)
+        type_date_stats = {}
+
+        rows = PassengerActivityDailyStat.objects.filter(
+            date__gte=start_date, date__lte=today
+        ).values_list('date', 'activity_type', 'count')
+        for date, activity_type, count in rows:
+            key = date.strftime('%Y-%m-%d')
+            date_stats[key] += count
+            if activity_type not in type_date_stats:
+                type_date_stats[activity_type] = dict.fromkeys(dates, 0)
+            type_date_stats[activity_type][key] = count
         
         return Response({
+            'days': days,
             'type_stats': type_stats,
-            'date_stats': date_stats
+            'date_stats': date_stats,
+            'type_date_stats': type_date_stats
         })
         
     @action(detail=False, methods=['get'], url_path='all/activities')
@@ -296,16 +343,20 @@ class PassengerActivityViewSet(viewsets.ReadOnlyModelViewSet):
         if search:
             queryset = queryset.filter(description__icontains=search)
             
-        start_date = request.query_params.get('start_date', None)
-        if start_date:
-            queryset = queryset.filter(created_at__date__gte=start_date)
-            
-        end_date = request.query_params.get('end_date', None)
-        if end_date:
-            queryset = queryset.filter(created_at__date__lte=end_date)
+        # 日期转换为时间范围，以便使用 created_at 索引
+        start, end = self.get_date_range(request)
+        if start:
+            queryset = queryset.filter(created_at__gte=start)
+        if end:
+            queryset = queryset.filter(created_at__lt=end)
         
-        # 排序
-        queryset = queryset.order_by('-created_at')
+        # 排序（id 保证同一时间的记录顺序稳定）
+        queryset = queryset.order_by('-created_at', '-id')
+
+        # 查询范围早于热表保留期时，拼接归档记录
+        archived = self.get_archived_activities(request, start, end)
+        if archived is not None:
+            queryset = ArchiveBackedSequence(queryset, archived)
         
         # 分页
         page = self.paginate_queryset(queryset)
@@ -315,3 +366,47 @@ class PassengerActivityViewSet(viewsets.ReadOnlyModelViewSet):
         
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
+
+    def get_date_range(self, request):
+        """将 start_date/end_date（含）转换为 [start, end) 时间范围，无效日期忽略"""
+        def start_of_day(value, days=0):
+            try:
+                date = parse_date(value or '')
+            except ValueError:
+                date = None
+            if not date:
+                return None
+            return timezone.make_aware(datetime.combine(date + timezone.timedelta(days=days), time.min))
+
+        return (
+            start_of_day(request.query_params.get('start_date')),
+            start_of_day(request.query_params.get('end_date'), days=1),
+        )
+
+    def get_archived_activities(self, request, start, end):
+        """
+        按 all_activities 的筛选条件读取归档中的活动记录，需提供 start_date，不涉及归档时返回 None
+
+        返回按时间倒序逐条读取的生成器，分页取够一页即停止读取更早的月份；
+        页码分页需要总数，会读取范围内的全部归档，?pagination=cursor 或 ?count=approx 时不需要
+        """
+        if not start:
+            return None
+        months = archived_months('passenger_activity')
+        if not months or timezone.localtime(start).strftime('%Y-%m') > months[-1]:
+            return None
+
+        passenger_id = request.query_params.get('passenger')
+        activity_type = request.query_params.get('activity_type')
+        search = (request.query_params.get('search') or '').lower()
+
+        def activities():
+            for row in iter_archived_rows('passenger_activity', start, end):
+                if passenger_id and str(row['passenger_id']) != passenger_id:
+                    continue
+                if activity_type and row['activity_type'] != activity_type:
+                    continue
+                if search and search not in (row['description'] or '').lower():
+                    continue
+                yield PassengerActivity(**row)
+        return activities()
@@ -0,0 +1,372 @@
+"""
+实时推送消息代理
+
+发布方（信号处理器、管理命令等同步代码）调用 publish 发布事件，SSE 连接通过 subscribe
+（协程，不阻塞事件循环）在事件循环中订阅主题。事件按主题分类：
+    flight        航班状态、登机口、时间变更及登机口占用冲突，一次提交的全部变更合并为一个事件，key 为航班号列表
+    announcement  公告发布、更新与播报
+    emergency     紧急通知
+    lost_item     失物招领广播
+
+订阅主题可以是分类（flight，接收全部航班事件），也可以是 分类:key（flight:CA1234，只接收该航班）。
+公告、紧急通知与失物招领事件的 key 为目标播报区域编码列表（见 broadcasting/zones.py），
+一个事件可匹配多个 key，播报终端只订阅所在区域（announcement:T3-A,emergency:T3-A,lost_item:T3-A）；
+key 包含 ALL_KEYS（'*'）的事件推送给该分类的全部订阅（含任意 分类:key）。
+
+InMemoryBroker 在进程内保存最近 REPLAY_SIZE 条事件，客户端断线重连时携带 Last-Event-ID 补发错过的事件；
+每个订阅者有长度为 QUEUE_SIZE 的队列，队列写满说明客户端消费过慢，此时断开该订阅，
+由客户端带上 Last-Event-ID 重连补发，不让单个慢连接占用无限内存。
+
+进程内代理只能把事件推送给同一进程中的连接。事件的发布方分布在多个进程中（Web 进程、航班变更联动进程、
+导入命令、公告调度进程），因此默认使用 OutboxBroker：publish 把事件写入 RealtimeEvent 表，
+每个 SSE 进程由一个后台线程按编号顺序读取新事件，再交给进程内代理推送。事件编号即表的主键，
+各进程一致，Last-Event-ID 在进程重启或切换到其他进程后仍然有效。
+
+也可以通过 settings.REALTIME['BROKER'] 替换为基于 Redis 等外部服务的实现，只需继承 BaseBroker
+并实现 publish/subscribe/unsubscribe；InMemoryBroker 只适用于单进程部署
+"""
+import asyncio
+import itertools
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger('app')
+
+TOPICS = ('flight', 'announcement', 'emergency', 'lost_item')
+# 匹配分类下任意 key 的通配 key（与 broadcasting 的 ALL_ZONES 相同）
+ALL_KEYS = '*'
+
+DEFAULT_REALTIME_SETTINGS = {
+    'BROKER': 'apps.realtime.broker.OutboxBroker',
+    'REPLAY_SIZE': 1000,
+    'QUEUE_SIZE': 100,
+    'HEARTBEAT_INTERVAL': 15,
+    'MAX_STREAM_SECONDS': 300,
+    'RETRY_MS': 3000,
+    'POLL_INTERVAL': 0.5,
+    'RETENTION_SECONDS': 3600,
+}
+
+
+def get_realtime_settings():
+    """合并默认配置与 settings.REALTIME"""
+    return {**DEFAULT_REALTIME_SETTINGS, **getattr(settings, 'REALTIME', {})}
+
+
+class SubscriptionOverflow(Exception):
+    """订阅队列已满，事件被丢弃"""
+
+
+class Event:
+    """推送事件"""
+    __slots__ = ('id', 'topic', 'key', 'data')
+
+    def __init__(self, id, topic, data, key=None):
+        self.id = id
+        self.topic = topic
+        self.key = key
+        self.data = data
+
+    def channels(self):
+        """可匹配该事件的订阅主题，key 可以是单个值或列表"""
+        if self.key is None:
+            return (self.topic,)
+        if isinstance(self.key, (list, tuple)):
+            return (self.topic, *(f'{self.topic}:{key}' for key in self.key))
+        return self.topic, f'{self.topic}:{self.key}'
+
+    @property
+    def all_keys(self):
+        keys = self.key if isinstance(self.key, (list, tuple)) else (self.key,)
+        return ALL_KEYS in keys
+
+    def matches(self, topics):
+        """是否推送给订阅了 topics 的连接"""
+        if self.all_keys:
+            prefix = f'{self.topic}:'
+            return any(topic == self.topic or topic.startswith(prefix) for topic in topics)
+        return not set(self.channels()).isdisjoint(topics)
+
+    def encode(self):
+        """编码为 SSE 消息"""
+        data = json.dumps(self.data, cls=DjangoJSONEncoder, ensure_ascii=False)
+        return f'id: {self.id}\nevent: {self.topic}\ndata: {data}\n\n'.encode('utf-8')
+
+
+class Subscription:
+    """单个连接的订阅，队列只在所属事件循环中读写"""
+
+    def __init__(self, broker, topics, loop, queue_size):
+        self.broker = broker
+        self.topics = frozenset(topics)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+        self.backlog = []
+        # Last-Event-ID 早于缓冲区中最早的事件，补发不完整，客户端需要重新拉取全量数据
+        self.gap = False
+
+    def deliver(self, event):
+        """由发布线程调用，把事件转交给订阅所在的事件循环"""
+        self.loop.call_soon_threadsafe(self.offer, event)
+
+    def offer(self, event):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout):
+        """
+        等待下一个事件
+
+        Returns:
+            Event，超时返回 None
+
+        Raises:
+            SubscriptionOverflow: 队列曾经写满
+        """
+        if self.overflowed:
+            raise SubscriptionOverflow()
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            if self.overflowed:
+                raise SubscriptionOverflow()
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class BaseBroker:
+    """消息代理接口"""
+
+    def publish(self, topic, data, key=None):
+        """发布事件，返回 Event"""
+        raise NotImplementedError
+
+    async def subscribe(self, topics, last_event_id=None):
+        """在当前事件循环中订阅主题，返回 Subscription（含需要补发的 backlog），实现中不能有阻塞调用"""
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        raise NotImplementedError
+
+
+class InMemoryBroker(BaseBroker):
+    """进程内消息代理"""
+
+    def __init__(self, replay_size=None, queue_size=None):
+        options = get_realtime_settings()
+        self.queue_size = queue_size or options['QUEUE_SIZE']
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._last_id = 0
+        self._buffer = deque(maxlen=replay_size or options['REPLAY_SIZE'])
+        self._subscribers = defaultdict(set)
+
+    def publish(self, topic, data, key=None):
+        with self._lock:
+            event = Event(next(self._ids), topic, data, key)
+            self._dispatch(event)
+        return event
+
+    def _dispatch(self, event):
+        """缓存并投递事件，调用方需持有锁"""
+        self._last_id = event.id
+        self._buffer.append(event)
+        targets = set()
+        if event.all_keys:
+            for channel, subscribers in self._subscribers.items():
+                if event.matches((channel,)):
+                    targets.update(subscribers)
+        else:
+            for channel in event.channels():
+                targets.update(self._subscribers.get(channel, ()))
+        # 在锁内投递，保证各订阅者收到的事件顺序与编号一致
+        for subscription in targets:
+            try:
+                subscription.deliver(event)
+            except RuntimeError:
+                # 事件循环已关闭
+                self._remove(subscription)
+
+    async def subscribe(self, topics, last_event_id=None):
+        subscription = Subscription(self, topics, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            if last_event_id is not None:
+                oldest = self._buffer[0].id if self._buffer else self._last_id + 1
+                # 编号大于当前最新编号说明进程已重启，编号重新开始
+                subscription.gap = last_event_id + 1 < oldest or last_event_id > self._last_id
+                subscription.backlog = [
+                    event for event in self._buffer
+                    if event.id > last_event_id and event.matches(subscription.topics)
+                ]
+            for topic in subscription.topics:
+                self._subscribers[topic].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._remove(subscription)
+
+    def _remove(self, subscription):
+        for topic in subscription.topics:
+            subscribers = self._subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[topic]
+
+    @property
+    def subscription_count(self):
+        with self._lock:
+            return len(set().union(*self._subscribers.values())) if self._subscribers else 0
+
+
+class OutboxBroker(InMemoryBroker):
+    """
+    基于数据库发件箱的跨进程消息代理
+
+    publish 只写入 RealtimeEvent，不直接投递；第一次订阅时启动后台线程，每 POLL_INTERVAL 秒
+    按编号读取新事件并在本进程内投递。并发事务可能不按编号顺序提交，读取时回看最近 LOOKBACK 个编号，
+    补上晚提交的事件。超过 RETENTION_SECONDS 的事件由读取线程定期删除
+    """
+
+    LOOKBACK = 100
+
+    def __init__(self, replay_size=None, queue_size=None, poll_interval=None, autostart=True):
+        super().__init__(replay_size, queue_size)
+        options = get_realtime_settings()
+        self.poll_interval = poll_interval or options['POLL_INTERVAL']
+        self.retention = timezone.timedelta(seconds=options['RETENTION_SECONDS'])
+        self.autostart = autostart
+        self._seen = set()
+        self._ready = threading.Event()
+        self._thread = None
+        self._purged_at = None
+
+    def publish(self, topic, data, key=None):
+        from .models import RealtimeEvent
+        row = RealtimeEvent.objects.create(topic=topic, key=key, data=data)
+        return Event(row.pk, topic, data, key)
+
+    async def subscribe(self, topics, last_event_id=None):
+        if self.autostart:
+            self.start()
+        if not self._ready.is_set():
+            # 读取线程载入最近的事件后再计算补发，最多等待一个轮询周期；在线程池中等待，不阻塞事件循环
+            await sync_to_async(self._ready.wait, thread_sensitive=False)(self.poll_interval * 2)
+        return await super().subscribe(topics, last_event_id)
+
+    def start(self):
+        """启动读取线程（只启动一次）"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='realtime-outbox', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.poll()
+                self.purge()
+            except Exception:
+                logger.exception('读取实时推送事件失败')
+            finally:
+                close_old_connections()
+            time.sleep(self.poll_interval)
+
+    def poll(self):
+        """
+        读取新事件并在本进程内投递
+
+        Returns:
+            投递的事件数
+        """
+        from .models import RealtimeEvent
+        events = RealtimeEvent.objects.order_by('id')
+        if not self._ready.is_set():
+            # 首次读取：载入最近 REPLAY_SIZE 个事件供 Last-Event-ID 补发，不再投递
+            rows = list(events.order_by('-id')[:self._buffer.maxlen])[::-1]
+            with self._lock:
+                for row in rows:
+                    self._buffer.append(Event(row.pk, row.topic, row.data, row.key))
+                    self._seen.add(row.pk)
+                if rows:
+                    self._last_id = rows[-1].pk
+            self._ready.set()
+            return 0
+
+        rows = [row for row in events.filter(id__gt=self._last_id - self.LOOKBACK) if row.pk not in self._seen]
+        with self._lock:
+            for row in rows:
+                self._dispatch(Event(row.pk, row.topic, row.data, row.key))
+                self._seen.add(row.pk)
+            self._seen = {pk for pk in self._seen if pk > self._last_id - self.LOOKBACK}
+        return len(rows)
+
+    def _dispatch(self, event):
+        last_id = self._last_id
+        super()._dispatch(event)
+        # 晚提交的事件编号可能小于已投递的事件
+        self._last_id = max(last_id, event.id)
+
+    def purge(self):
+        """删除超过保留期的事件，每个保留期的十分之一执行一次"""
+        from .models import RealtimeEvent
+        now = time.monotonic()
+        if self._purged_at is not None and now - self._purged_at < self.retention.total_seconds() / 10:
+            return 0
+        self._purged_at = now
+        count, _ = RealtimeEvent.objects.filter(created_at__lt=timezone.now() - self.retention).delete()
+        return count
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """按 settings.REALTIME['BROKER'] 创建进程内单例"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(get_realtime_settings()['BROKER'])()
+    return _broker
+
+
+def reset_broker():
+    """丢弃当前代理实例，下次调用 get_broker 时重新创建"""
+    global _broker
+    with _broker_lock:
+        _broker = None
+
+
+def publish(topic, data, key=None):
+    """发布事件，推送失败只记录日志，不影响调用方"""
+    try:
+        return get_broker().publish(topic, data, key)
+    except Exception:
+        logger.exception('实时推送事件发布失败: %s', topic)
+        return None
+
+
+def publish_on_commit(topic, data, key=None):
+    """在当前事务提交后发布事件"""
+    transaction.on_commit(lambda: publish(topic, data, key))
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.5 on 2026-10-18 21:21
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RealtimeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(max_length=50, verbose_name='分类')),
+                ('key', models.JSONField(blank=True, help_text='单个值或列表，如航班号、播报区域编码', null=True, verbose_name='键')),
+                ('data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='内容')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+            ],
+            options={
+                'verbose_name': '实时推送事件',
+                'verbose_name_plural': '实时推送事件',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['created_at'], name='realtimeevent_created_idx')],
+            },
+        ),
+    ]
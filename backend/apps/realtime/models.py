@@ -0,0 +1,22 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class RealtimeEvent(models.Model):
+    """实时推送事件（发件箱），各进程发布的事件写入本表，SSE 进程按编号顺序读取后推送"""
+    topic = models.CharField(_('分类'), max_length=50)
+    key = models.JSONField(_('键'), null=True, blank=True, help_text=_('单个值或列表，如航班号、播报区域编码'))
+    data = models.JSONField(_('内容'), encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(_('创建时间'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('实时推送事件')
+        verbose_name_plural = _('实时推送事件')
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['created_at'], name='realtimeevent_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.pk}: {self.topic}'
@@ -0,0 +1,125 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from apps.flight_management.fanout import coalesce_events, describe_changes, event_flight, flight_changes_recorded
+from apps.flight_management.gates import gate_conflicts_detected
+from apps.flight_management.models import Flight
+from apps.informations.lifecycle import announcement_state_changed
+from apps.informations.models import Announcement, AnnouncementBroadcast
+from apps.items_management.models import ItemBroadcast
+
+from .broker import ALL_KEYS, publish, publish_on_commit
+
+
+def announcement_topic(announcement):
+    return 'emergency' if announcement.type.name == 'emergency' else 'announcement'
+
+
+def zone_key(target_zones):
+    """按目标播报区域推送，ALL_KEYS 与区域功能上线前的记录（没有目标区域）推送给该分类下的全部区域"""
+    return list(target_zones) or [ALL_KEYS]
+
+
+def announcement_payload(announcement, action):
+    return {
+        'action': action,
+        'id': announcement.pk,
+        'title': announcement.title,
+        'content': announcement.content,
+        'type': announcement.type.name,
+        'priority': announcement.priority,
+        'is_active': announcement.is_active,
+        'state': announcement.state,
+        'location': announcement.location,
+        'target_zones': announcement.target_zones,
+        'start_time': announcement.start_time,
+        'end_time': announcement.end_time,
+        'voice_content': announcement.get_voice_content(),
+    }
+
+
+@receiver(flight_changes_recorded)
+def push_flight_changes(sender, events, **kwargs):
+    """
+    推送航班变更（事务提交后调用）
+
+    一次提交的全部变更（如批量更新、导入）合并为一个事件，flights 为变更后的航班列表，
+    同一航班的多次变更合并为一项，key 为全部航班号，订阅单个航班的客户端按航班号取用
+    """
+    events = coalesce_events(events)
+    flights = Flight.objects.in_bulk({event.flight_id for event in events})
+    items = []
+    for event in events:
+        flight = flights.get(event.flight_id)
+        if flight is None or not event.changes:
+            continue
+        flight = event_flight(flight, event)
+        items.append({
+            'id': flight.pk,
+            'flight_number': flight.flight_number,
+            'status': flight.status,
+            'gate': flight.gate,
+            'terminal': flight.terminal,
+            'scheduled_departure_time': flight.scheduled_departure_time,
+            'actual_departure_time': flight.actual_departure_time,
+            'scheduled_arrival_time': flight.scheduled_arrival_time,
+            'actual_arrival_time': flight.actual_arrival_time,
+            'changes': event.changes,
+            'content': describe_changes(flight, event),
+        })
+    if items:
+        publish('flight', {'action': 'changed', 'flights': items}, key=[item['flight_number'] for item in items])
+
+
+@receiver(gate_conflicts_detected)
+def push_gate_conflicts(sender, conflicts, **kwargs):
+    """推送新出现的登机口占用冲突（事务提交后调用），同一次变更检测到的冲突合并为一个事件"""
+    conflicts = [conflict.as_dict() for conflict in conflicts]
+    flight_numbers = list(dict.fromkeys(number for conflict in conflicts for number in conflict['flights']))
+    if flight_numbers:
+        publish('flight', {'action': 'gate_conflict', 'conflicts': conflicts}, key=flight_numbers)
+
+
+@receiver(post_save, sender=Announcement)
+def push_announcement(sender, instance, created, **kwargs):
+    """推送公告发布与更新"""
+    publish_on_commit(
+        announcement_topic(instance), announcement_payload(instance, 'created' if created else 'updated'),
+        key=zone_key(instance.target_zones),
+    )
+
+
+@receiver(announcement_state_changed)
+def push_announcement_state(sender, announcement, old_state, new_state, **kwargs):
+    """推送定时公告的生效与失效"""
+    if new_state in (Announcement.STATE_LIVE, Announcement.STATE_EXPIRED):
+        action = 'started' if new_state == Announcement.STATE_LIVE else 'ended'
+        publish_on_commit(
+            announcement_topic(announcement), announcement_payload(announcement, action),
+            key=zone_key(announcement.target_zones),
+        )
+
+
+@receiver(post_save, sender=AnnouncementBroadcast)
+def push_announcement_broadcast(sender, instance, created, **kwargs):
+    """推送公告播报"""
+    if created:
+        payload = announcement_payload(instance.announcement, 'broadcast')
+        payload['broadcast_id'] = instance.pk
+        payload['voice_content'] = instance.content
+        payload['target_zones'] = instance.target_zones
+        publish_on_commit(announcement_topic(instance.announcement), payload, key=zone_key(instance.target_zones))
+
+
+@receiver(post_save, sender=ItemBroadcast)
+def push_item_broadcast(sender, instance, created, **kwargs):
+    """推送失物招领广播"""
+    if created:
+        publish_on_commit('lost_item', {
+            'id': instance.pk,
+            'lost_item_id': instance.lost_item_id,
+            'title': instance.lost_item.title,
+            'content': instance.content,
+            'target_zones': instance.target_zones,
+            'broadcast_at': instance.broadcast_at,
+        }, key=zone_key(instance.target_zones))
@@ -0,0 +1,261 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.flight_management.models import Flight
+from apps.informations.models import Announcement, AnnouncementType
+from .broker import InMemoryBroker, OutboxBroker, SubscriptionOverflow, get_broker, reset_broker
+from .models import RealtimeEvent
+
+User = get_user_model()
+
+
+class BrokerTests(TestCase):
+    """进程内消息代理测试"""
+
+    async def test_topic_and_key_subscription(self):
+        broker = InMemoryBroker(replay_size=10, queue_size=10)
+        all_flights = await broker.subscribe({'flight'})
+        one_flight = await broker.subscribe({'flight:CA1234', 'emergency'})
+
+        broker.publish('flight', {'n': 1}, key='MU5101')
+        broker.publish('flight', {'n': 2}, key='CA1234')
+        broker.publish('emergency', {'n': 3})
+
+        self.assertEqual([(await all_flights.get(1)).data['n'] for _ in range(2)], [1, 2])
+        self.assertEqual([(await one_flight.get(1)).data['n'] for _ in range(2)], [2, 3])
+        self.assertIsNone(await all_flights.get(0.01))
+
+        all_flights.close()
+        one_flight.close()
+        self.assertEqual(broker.subscription_count, 0)
+
+    async def test_all_keys_event_reaches_every_key(self):
+        broker = InMemoryBroker(replay_size=10, queue_size=10)
+        zone = await broker.subscribe({'announcement:T3-A'})
+        other = await broker.subscribe({'emergency:T3-A'})
+        broker.publish('announcement', {'n': 1}, key=['*'])
+        broker.publish('announcement', {'n': 2}, key=['T3-B'])
+        self.assertEqual((await zone.get(1)).data['n'], 1)
+        self.assertIsNone(await zone.get(0.01))
+        self.assertIsNone(await other.get(0.01))
+        zone.close()
+        other.close()
+
+    async def test_publish_from_worker_thread(self):
+        broker = InMemoryBroker(replay_size=10, queue_size=10)
+        subscription = await broker.subscribe({'lost_item'})
+        await sync_to_async(broker.publish, thread_sensitive=False)('lost_item', {'title': '钱包'})
+        event = await subscription.get(1)
+        self.assertEqual(event.data['title'], '钱包')
+        self.assertEqual(event.encode().decode().splitlines()[:2], [f'id: {event.id}', 'event: lost_item'])
+        subscription.close()
+
+    async def test_replay_from_last_event_id(self):
+        broker = InMemoryBroker(replay_size=3, queue_size=10)
+        for n in range(1, 5):
+            broker.publish('announcement', {'n': n})
+
+        subscription = await broker.subscribe({'announcement'}, last_event_id=2)
+        self.assertFalse(subscription.gap)
+        self.assertEqual([event.id for event in subscription.backlog], [3, 4])
+        subscription.close()
+
+        # 事件 1 已被挤出缓冲区
+        subscription = await broker.subscribe({'announcement'}, last_event_id=0)
+        self.assertTrue(subscription.gap)
+        self.assertEqual([event.id for event in subscription.backlog], [2, 3, 4])
+        subscription.close()
+
+        # 编号大于最新编号（进程已重启）
+        subscription = await broker.subscribe({'announcement'}, last_event_id=99)
+        self.assertTrue(subscription.gap)
+        subscription.close()
+
+    async def test_slow_subscriber_overflows(self):
+        broker = InMemoryBroker(replay_size=10, queue_size=2)
+        subscription = await broker.subscribe({'flight'})
+        for n in range(3):
+            broker.publish('flight', {'n': n})
+        await asyncio.sleep(0)
+        with self.assertRaises(SubscriptionOverflow):
+            await subscription.get(1)
+        subscription.close()
+
+
+class OutboxBrokerTests(TestCase):
+    """数据库发件箱消息代理测试"""
+
+    def replay(self, broker, topics, last_event_id):
+        async def backlog():
+            subscription = await broker.subscribe(topics, last_event_id)
+            subscription.close()
+            return subscription
+        return asyncio.run(backlog())
+
+    async def test_subscribe_does_not_block_event_loop(self):
+        # 读取线程尚未载入事件时，订阅等待期间事件循环仍能处理其他连接
+        broker = OutboxBroker(replay_size=10, queue_size=10, poll_interval=0.2, autostart=False)
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(tick())
+        subscription = await broker.subscribe({'flight'})
+        task.cancel()
+        subscription.close()
+        self.assertGreater(ticks, 5)
+
+    def test_events_from_other_processes(self):
+        # 发布方（如航班变更联动进程）与 SSE 进程各自持有代理实例
+        publisher = OutboxBroker(autostart=False)
+        reader = OutboxBroker(replay_size=10, queue_size=10, autostart=False)
+        first = publisher.publish('flight', {'n': 1}, key='CA1234')
+        self.assertEqual(reader.poll(), 0)
+        second = publisher.publish('announcement', {'n': 2}, key=['F1-A', 'F1-B'])
+        self.assertEqual(reader.poll(), 1)
+
+        subscription = self.replay(reader, {'flight', 'announcement:F1-B'}, first.id - 1)
+        self.assertFalse(subscription.gap)
+        self.assertEqual([(event.id, event.data['n']) for event in subscription.backlog], [(first.id, 1), (second.id, 2)])
+        self.assertTrue(self.replay(reader, {'flight'}, second.id + 10).gap)
+
+        # 晚提交的事件编号小于已读取的事件，仍然会被投递
+        late = RealtimeEvent.objects.create(id=second.id + 2, topic='emergency', data={'n': 4})
+        self.assertEqual(reader.poll(), 1)
+        RealtimeEvent.objects.create(id=second.id + 1, topic='emergency', data={'n': 3})
+        self.assertEqual(reader.poll(), 1)
+        self.assertEqual(reader.poll(), 0)
+        subscription = self.replay(reader, {'emergency'}, late.pk - 2)
+        self.assertEqual([event.data['n'] for event in subscription.backlog], [4, 3])
+
+    def test_purge_expired_events(self):
+        broker = OutboxBroker(autostart=False)
+        broker.publish('flight', {'n': 1})
+        broker.publish('flight', {'n': 2})
+        RealtimeEvent.objects.filter(data__n=1).update(created_at=timezone.now() - timezone.timedelta(hours=2))
+        self.assertEqual(broker.purge(), 1)
+        self.assertEqual(list(RealtimeEvent.objects.values_list('data__n', flat=True)), [2])
+
+
+@override_settings(REALTIME={'BROKER': 'apps.realtime.broker.InMemoryBroker', 'REPLAY_SIZE': 10, 'QUEUE_SIZE': 10, 'HEARTBEAT_INTERVAL': 0.05, 'MAX_STREAM_SECONDS': 0.2})
+class RealtimeStreamTests(TestCase):
+    """SSE 推送测试"""
+
+    def setUp(self):
+        reset_broker()
+        self.user = User.objects.create_user(username='kiosk', password='password123')
+        self.token = str(AccessToken.for_user(self.user))
+        AnnouncementType.get_or_create_default_types()
+
+    def tearDown(self):
+        reset_broker()
+
+    def replay(self, topics, last_event_id=0):
+        async def backlog():
+            subscription = await get_broker().subscribe(topics, last_event_id)
+            subscription.close()
+            return subscription.backlog
+        return asyncio.run(backlog())
+
+    def test_announcement_events(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Announcement.objects.create(title='通知', content='请保管好随身物品', type=AnnouncementType.objects.get(name='regular'))
+            Announcement.objects.create(title='紧急', content='请立即疏散', type=AnnouncementType.objects.get(name='emergency'))
+
+        self.assertEqual([event.data['title'] for event in self.replay({'announcement'})], ['通知'])
+        emergency = self.replay({'emergency'})
+        self.assertEqual(emergency[0].data['action'], 'created')
+        self.assertIn('请立即疏散', emergency[0].data['voice_content'])
+
+    def test_flight_change_events(self):
+        now = timezone.now()
+        flight = Flight.objects.create(
+            flight_number='CA1234', airline='中国国际航空', departure_city='北京', arrival_city='上海',
+            departure_airport='首都国际机场', arrival_airport='虹桥国际机场', gate='A1',
+            scheduled_departure_time=now + timezone.timedelta(hours=2),
+            scheduled_arrival_time=now + timezone.timedelta(hours=4),
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            flight.gate = 'B2'
+            flight.save()
+
+        events = self.replay({'flight:CA1234'})
+        self.assertEqual(len(events), 1)
+        [item] = events[0].data['flights']
+        self.assertEqual(item['gate'], 'B2')
+        self.assertEqual(list(item['changes']['gate']), ['A1', 'B2'])
+        self.assertIn('B2', item['content'])
+        self.assertEqual(self.replay({'flight:MU5101'}), [])
+
+        # 批量更新的全部航班合并为一个事件
+        other = Flight.objects.create(
+            flight_number='MU5101', airline='东方航空', departure_city='上海', arrival_city='广州',
+            departure_airport='虹桥国际机场', arrival_airport='白云国际机场', gate='C1',
+            scheduled_departure_time=now + timezone.timedelta(hours=3),
+            scheduled_arrival_time=now + timezone.timedelta(hours=5),
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            Flight.objects.bulk_update_and_record({flight.pk: {'status': 'delayed'}, other.pk: {'status': 'delayed'}})
+        events = [event for event in self.replay({'flight:MU5101'}) if event.data['action'] == 'changed']
+        self.assertEqual(len(events), 1)
+        self.assertEqual(
+            sorted(item['flight_number'] for item in events[0].data['flights']), ['CA1234', 'MU5101'],
+        )
+        self.assertEqual(sorted(events[0].key), ['CA1234', 'MU5101'])
+
+    async def read_stream(self, path, **extra):
+        response = await self.async_client.get(path, **extra)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream; charset=utf-8')
+        return b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+    async def test_stream_requires_token(self):
+        response = await self.async_client.get('/api/realtime/stream/')
+        self.assertEqual(response.status_code, 401)
+        # 不接受查询参数中的 token
+        response = await self.async_client.get('/api/realtime/stream/', {'token': self.token})
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get(
+            '/api/realtime/stream/', {'topics': 'weather'}, headers={'Authorization': f'Bearer {self.token}'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    async def test_stream_replays_and_heartbeats(self):
+        broker = get_broker()
+        broker.publish('flight', {'flight_number': 'CA1234'}, key='CA1234')
+        second = broker.publish('flight', {'flight_number': 'MU5101'}, key='MU5101')
+
+        body = await self.read_stream(
+            '/api/realtime/stream/', data={'topics': 'flight:MU5101'},
+            headers={'Authorization': f'Bearer {self.token}', 'Last-Event-ID': '0'},
+        )
+        self.assertTrue(body.startswith('retry: 3000\n\n'))
+        self.assertNotIn('CA1234', body)
+        self.assertIn(f'id: {second.id}\nevent: flight\n', body)
+        self.assertIn(': ping', body)
+        self.assertEqual(broker.subscription_count, 0)
+
+    async def test_stream_receives_live_events(self):
+        broker = get_broker()
+
+        async def publish_later():
+            while not broker.subscription_count:
+                await asyncio.sleep(0.01)
+            await sync_to_async(broker.publish, thread_sensitive=False)('lost_item', {'title': '黑色钱包'})
+
+        publisher = asyncio.ensure_future(publish_later())
+        body = await self.read_stream(
+            '/api/realtime/stream/', data={'topics': 'lost_item'}, headers={'Authorization': f'Bearer {self.token}'}
+        )
+        await publisher
+        self.assertIn('event: lost_item', body)
+        self.assertIn('黑色钱包', body)
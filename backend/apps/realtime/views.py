@@ -0,0 +1,111 @@
+"""
+SSE 推送接口
+
+GET /api/realtime/stream/?topics=flight:CA1234,announcement,emergency
+
+只接受 Authorization 头中的 JWT，不接受查询参数中的 token（会随 URL 写入访问日志和代理日志）；
+浏览器端需要使用支持自定义请求头的 EventSource 实现（如 fetch 流式读取）。
+断线重连时浏览器会自动携带 Last-Event-ID 请求头，也可以通过 last_event_id 参数指定。
+
+连接需要部署在 ASGI 服务器上（如 uvicorn config.asgi:application），空闲连接只占用一个协程和一个队列；
+每个连接最多保持 MAX_STREAM_SECONDS 秒后由服务端关闭，客户端按 retry 间隔自动重连，
+以便回收客户端已断开但服务端未感知的连接
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from .broker import TOPICS, SubscriptionOverflow, get_broker, get_realtime_settings
+
+
+@sync_to_async
+def authenticate(request):
+    """校验 JWT，返回用户或 None"""
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else None
+    if not raw_token:
+        return None
+    try:
+        user = authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    return user if user.is_active else None
+
+
+def parse_topics(value):
+    """
+    解析订阅主题
+
+    Returns:
+        主题集合，包含未知分类时返回 None
+    """
+    topics = set()
+    for topic in (value or '').split(','):
+        topic = topic.strip()
+        if not topic:
+            continue
+        if topic.split(':', 1)[0] not in TOPICS:
+            return None
+        topics.add(topic)
+    return topics
+
+
+def parse_event_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+async def event_stream(topics, last_event_id, options):
+    # 在开始输出时才订阅，保证订阅总能在 finally 中取消
+    subscription = await get_broker().subscribe(topics, last_event_id)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + options['MAX_STREAM_SECONDS']
+    try:
+        yield f"retry: {options['RETRY_MS']}\n\n".encode()
+        if subscription.gap:
+            # 错过的事件已不在缓冲区中，客户端需要重新拉取全量数据
+            yield b'event: reset\ndata: {}\n\n'
+        for event in subscription.backlog:
+            yield event.encode()
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                event = await subscription.get(min(options['HEARTBEAT_INTERVAL'], remaining))
+            except SubscriptionOverflow:
+                # 客户端消费过慢，断开后由客户端带上 Last-Event-ID 重连补发
+                yield b'event: overflow\ndata: {}\n\n'
+                break
+            yield event.encode() if event is not None else b': ping\n\n'
+    finally:
+        subscription.close()
+
+
+async def stream(request):
+    """订阅实时事件"""
+    if request.method != 'GET':
+        return JsonResponse({'detail': f'方法 "{request.method}" 不被允许。'}, status=405)
+    user = await authenticate(request)
+    if user is None:
+        return JsonResponse({'detail': '身份认证信息未提供或无效'}, status=401)
+
+    topics = parse_topics(request.GET.get('topics', ','.join(TOPICS)))
+    if not topics:
+        return JsonResponse({'detail': f'无效的订阅主题，可选值: {", ".join(TOPICS)}'}, status=400)
+
+    last_event_id = parse_event_id(request.headers.get('Last-Event-ID') or request.GET.get('last_event_id'))
+    response = StreamingHttpResponse(
+        event_stream(topics, last_event_id, get_realtime_settings()),
+        content_type='text/event-stream; charset=utf-8',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # 关闭 nginx 代理缓冲
+    response['X-Accel-Buffering'] = 'no'
+    return response
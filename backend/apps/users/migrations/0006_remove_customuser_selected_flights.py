@@ -0,0 +1,19 @@
+# Generated by Django 4.2.5 on 2026-10-18 20:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_customuser_selected_flights'),
+        # 先把已选航班迁移到 FlightSubscription 再删除字段
+        ('flight_management', '0005_migrate_selected_flights'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='customuser',
+            name='selected_flights',
+        ),
+    ]
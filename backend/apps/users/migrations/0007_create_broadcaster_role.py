@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def create_broadcaster_role(apps, schema_editor):
+    Role = apps.get_model('users', 'Role')
+    # 播报终端使用的账号，只能拉取和完成播报任务
+    Role.objects.get_or_create(name='broadcaster', defaults={'description': '播报终端'})
+
+
+def remove_broadcaster_role(apps, schema_editor):
+    Role = apps.get_model('users', 'Role')
+    Role.objects.filter(name='broadcaster').delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('users', '0006_remove_customuser_selected_flights'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_broadcaster_role, remove_broadcaster_role),
+    ]
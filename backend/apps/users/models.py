@@ -1,4 +1,6 @@
-from django.db import models
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
 from django.utils.translation import gettext_lazy as _
 
@@ -26,6 +28,7 @@ class Role(models.Model):
         default_roles = [
             {'name': 'passenger', 'description': '旅客'},
             {'name': 'admin', 'description': '管理员'},
+            {'name': 'broadcaster', 'description': '播报终端'},
         ]
         for role_data in default_roles:
             cls.objects.get_or_create(name=role_data['name'], defaults=role_data)
@@ -41,7 +44,6 @@ class CustomUser(AbstractUser):
     bio = models.TextField(_('个人简介'), blank=True, null=True)
     birth_date = models.DateField(_('出生日期'), blank=True, null=True)
     roles = models.ManyToManyField(Role, verbose_name=_('角色'), blank=True)
-    selected_flights = models.JSONField(_('已选航班'), default=list, blank=True, null=True, help_text=_('存储用户选择的航班ID列表'))
     
     class Meta:
         verbose_name = _('用户')
@@ -50,10 +52,54 @@ class CustomUser(AbstractUser):
     def __str__(self):
         return self.username
 
+    # 实例级角色缓存，同一个请求内的 request.user 只查询一次角色
+    _role_names = None
+
     def get_roles(self):
-        """获取用户的所有角色名称列表"""
-        roles = list(self.roles.values_list('name', flat=True))
+        """
+        获取用户的所有角色名称列表
+
+        角色名称在实例上只加载一次，并可按 USER_ROLES_CACHE_TIMEOUT 跨请求缓存（缓存必须为各进程共享的后端，
+        见 settings.CACHES，否则撤销的角色在其他进程中仍然有效）；
+        管理员身份由当前实例的 is_staff 实时判断，不进入缓存
+        """
+        if self._role_names is None:
+            self._role_names = self._load_role_names()
+        roles = list(self._role_names)
         if self.is_staff:
             if 'admin' not in roles:
                 roles.append('admin')
         return roles
+
+    def _load_role_names(self):
+        """加载角色名称：优先使用 prefetch_related('roles') 的结果，其次是跨请求缓存"""
+        prefetched = getattr(self, '_prefetched_objects_cache', {})
+        if 'roles' in prefetched:
+            return [role.name for role in prefetched['roles']]
+
+        timeout = getattr(settings, 'USER_ROLES_CACHE_TIMEOUT', 0)
+        if not timeout or self.pk is None:
+            return list(self.roles.values_list('name', flat=True))
+
+        key = self.roles_cache_key(self.pk)
+        names = cache.get(key)
+        if names is None:
+            names = list(self.roles.values_list('name', flat=True))
+            cache.set(key, names, timeout)
+        return names
+
+    def refresh_from_db(self, *args, **kwargs):
+        self._role_names = None
+        super().refresh_from_db(*args, **kwargs)
+
+    @staticmethod
+    def roles_cache_key(user_id):
+        return f'users:roles:{user_id}'
+
+    @classmethod
+    def invalidate_roles_cache(cls, user_ids):
+        """清除指定用户的跨请求角色缓存；事务提交后再次清除，避免其他进程在提交前缓存旧角色"""
+        keys = [cls.roles_cache_key(user_id) for user_id in user_ids if user_id is not None]
+        if keys:
+            cache.delete_many(keys)
+            transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,47 @@
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import CustomUser, Role
+
+
+@receiver(m2m_changed, sender=CustomUser.roles.through)
+def invalidate_roles_on_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """用户与角色的关联变化时清除角色缓存"""
+    if action not in ('post_add', 'post_remove', 'pre_clear', 'post_clear'):
+        return
+
+    if not reverse:
+        # user.roles.add/remove/clear(...)
+        if action == 'pre_clear':
+            return
+        instance._role_names = None
+        CustomUser.invalidate_roles_cache([instance.pk])
+        return
+
+    # role.customuser_set.add/remove/clear(...)，清空前先记下受影响的用户
+    if action == 'pre_clear':
+        instance._cleared_user_ids = list(instance.customuser_set.values_list('pk', flat=True))
+        return
+    if action == 'post_clear':
+        user_ids = getattr(instance, '_cleared_user_ids', [])
+        del instance._cleared_user_ids
+    else:
+        user_ids = pk_set or []
+    CustomUser.invalidate_roles_cache(user_ids)
+
+
+@receiver(post_save, sender=Role)
+@receiver(pre_delete, sender=Role)
+def invalidate_roles_on_role_change(sender, instance, **kwargs):
+    """角色改名或删除后，清除持有该角色的用户缓存"""
+    if instance.pk is None:
+        return
+    user_ids = instance.customuser_set.values_list('pk', flat=True)
+    CustomUser.invalidate_roles_cache(list(user_ids))
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_roles_on_user_created(sender, instance, created, **kwargs):
+    """新用户不应继承同一主键遗留的缓存（如测试库中复用的自增ID）"""
+    if created:
+        CustomUser.invalidate_roles_cache([instance.pk])
@@ -3,6 +3,9 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from .models import Role
 
 User = get_user_model()
 
@@ -88,3 +91,58 @@ class UserAuthTests(TestCase):
         }
         response = self.client.post(login_url, login_data, format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class RoleCacheTests(TestCase):
+    """用户角色缓存测试"""
+
+    def setUp(self):
+        cache.clear()
+        self.passenger_role, _ = Role.objects.get_or_create(name='passenger')
+        self.admin_role, _ = Role.objects.get_or_create(name='admin')
+        self.user = User.objects.create_user(username='cacheuser', password='testpassword')
+        self.user.roles.add(self.passenger_role)
+
+    def test_roles_loaded_once_per_instance(self):
+        """同一实例多次获取角色只查询一次"""
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.get_roles(), ['passenger'])
+            user.get_roles()
+            user.get_roles()
+
+    def test_roles_cached_across_instances(self):
+        """跨请求（新实例）命中缓存，不再查询"""
+        User.objects.get(pk=self.user.pk).get_roles()
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(user.get_roles(), ['passenger'])
+
+    def test_cache_invalidated_on_role_change(self):
+        """角色关联变化后缓存失效"""
+        User.objects.get(pk=self.user.pk).get_roles()
+
+        self.user.roles.add(self.admin_role)
+        self.assertCountEqual(self.user.get_roles(), ['passenger', 'admin'])
+        self.assertCountEqual(User.objects.get(pk=self.user.pk).get_roles(), ['passenger', 'admin'])
+
+        self.admin_role.customuser_set.remove(self.user)
+        self.assertEqual(User.objects.get(pk=self.user.pk).get_roles(), ['passenger'])
+
+        self.passenger_role.customuser_set.clear()
+        self.assertEqual(User.objects.get(pk=self.user.pk).get_roles(), [])
+
+    def test_is_staff_applies_without_query(self):
+        """is_staff 变化实时生效"""
+        user = User.objects.get(pk=self.user.pk)
+        user.get_roles()
+        user.is_staff = True
+        with self.assertNumQueries(0):
+            self.assertCountEqual(user.get_roles(), ['passenger', 'admin'])
+
+    def test_prefetched_roles_are_used(self):
+        """使用 prefetch_related 预取的角色时不再单独查询"""
+        users = list(User.objects.prefetch_related('roles'))
+        with self.assertNumQueries(0):
+            for user in users:
+                user.get_roles()
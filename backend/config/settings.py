@@ -32,6 +32,83 @@ ALLOWED_HOSTS = ['*']
 # 权限管理开关
 ENABLE_RBAC = False
 
+# 缓存（多个进程共享）
+# 用户角色、导航空间索引与导航图版本号、航班看板、登机口占用索引等通过缓存在进程间同步，并且每个请求都会读取，
+# 必须使用内存型的共享缓存（数据库缓存表的每次读取都是一次 SQL 查询，计数器递增也不是原子操作）：
+#   生产环境设置环境变量 REDIS_URL 使用 Redis（需安装 redis），淘汰策略使用 noeviction 或 volatile-*，
+#   避免不过期的版本号被淘汰（被淘汰后按时间戳重新初始化，不会与旧值重复，但会触发一次重建）
+#   未设置时使用进程内缓存，只适用于单进程的开发和测试环境，check --deploy 会报错
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# 用户角色跨请求缓存时间（秒），0 表示只在单个请求内缓存；角色变更通过共享缓存（见 CACHES）在各进程立即生效
+USER_ROLES_CACHE_TIMEOUT = 300
+
+# 旅客详情缓存时间（秒），0 表示不缓存
+PASSENGER_DETAIL_CACHE_TIMEOUT = 30
+
+# 旅客活动写入方式：
+#   sync      请求内同步写入（测试中通过 override_settings 使用）
+#   buffered  进程内缓冲，按 BATCH_SIZE 或 FLUSH_INTERVAL（秒）批量写入
+#   spool     写入 SPOOL_DIR 队列文件，由 python manage.py run_activity_writer 批量入库
+PASSENGER_ACTIVITY_WRITER = {
+    'MODE': 'buffered',
+    'BATCH_SIZE': 200,
+    'FLUSH_INTERVAL': 2,
+    'SPOOL_DIR': os.path.join(BASE_DIR, 'spool', 'activities'),
+}
+
+# 航班变更联动（播报、旅客通知、行程调整）的处理方式：
+#   sync    事务提交后在当前进程处理（测试中通过 override_settings 使用）
+#   worker  由 python manage.py run_flight_fanout 在独立进程中按 BATCH_SIZE 批量处理
+# SCHEDULE_WINDOW_HOURS  只平移开始时间在原出发时间前后该小时数内的旅客行程（航班号每天复用）
+# RETENTION_DAYS         已处理事件的保留天数，处理进程每 PURGE_INTERVAL 秒清理一次
+FLIGHT_CHANGE_FANOUT = {
+    'MODE': 'worker',
+    'BATCH_SIZE': 100,
+    'NOTIFY_BATCH_SIZE': 500,
+    'POLL_INTERVAL': 2,
+    'SCHEDULE_WINDOW_HOURS': 12,
+    'RETENTION_DAYS': 7,
+    'PURGE_INTERVAL': 3600,
+}
+
+# 实时推送（/api/realtime/stream/，需在 ASGI 服务器上运行）
+#   BROKER              消息代理类：OutboxBroker 经 RealtimeEvent 表在进程间传递事件（发布方与 SSE 连接
+#                       可以在不同进程中）；InMemoryBroker 只能推送同一进程中发布的事件，仅适用于单进程部署
+#   REPLAY_SIZE         保留用于 Last-Event-ID 补发的最近事件数
+#   QUEUE_SIZE          单个连接的待发送事件上限，超过后断开该连接
+#   HEARTBEAT_INTERVAL  心跳间隔（秒）
+#   MAX_STREAM_SECONDS  单个连接的最长保持时间（秒），到期后客户端自动重连
+#   RETRY_MS            客户端重连间隔（毫秒）
+#   POLL_INTERVAL       OutboxBroker 读取新事件的间隔（秒）
+#   RETENTION_SECONDS   OutboxBroker 保留事件的时长（秒），超过后删除
+REALTIME = {
+    'BROKER': 'apps.realtime.broker.OutboxBroker',
+    'REPLAY_SIZE': 1000,
+    'QUEUE_SIZE': 100,
+    'HEARTBEAT_INTERVAL': 15,
+    'MAX_STREAM_SECONDS': 300,
+    'RETRY_MS': 3000,
+    'POLL_INTERVAL': 0.5,
+    'RETENTION_SECONDS': 3600,
+}
+
+# 日志表归档：python manage.py archive_logs 将早于 ARCHIVE_AFTER_DAYS 天的记录写入 ARCHIVE_ROOT
+ARCHIVE_ROOT = os.path.join(BASE_DIR, 'archive')
+ARCHIVE_AFTER_DAYS = 180
+
 
 # Application definition
 
@@ -56,7 +133,10 @@ INSTALLED_APPS = [
     'apps.informations.apps.InformationsConfig', # 添加informations应用
     'apps.items_management.apps.ItemsManagementConfig', # 添加items_management应用
     'apps.flight_management.apps.FlightManagementConfig', # 添加flight_management应用
-    'apps.navigation_management.apps.NavigationManagementConfig' # 添加navigation_management应用
+    'apps.navigation_management.apps.NavigationManagementConfig', # 添加navigation_management应用
+    'apps.common.apps.CommonConfig', # 公共组件（归档等）
+    'apps.realtime.apps.RealtimeConfig', # 实时推送（SSE）
+    'apps.broadcasting.apps.BroadcastingConfig', # 数字人播报队列
 ]
 
 # 如果启用RBAC，则添加权限管理应用
@@ -211,12 +291,98 @@ REST_FRAMEWORK = {
         'rest_framework.renderers.JSONRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'apps.common.pagination.StandardResultsSetPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_SCHEMA_CLASS': 'rest_framework.schemas.coreapi.AutoSchema',
     'EXCEPTION_HANDLER': 'rest_framework.views.exception_handler',
 }
 
+# 分页近似计数（?count=approx）时 COUNT 统计的上限
+PAGINATION_APPROX_COUNT_LIMIT = 10000
+
+# 导航位置空间索引的网格边长（与位置坐标单位相同）
+NAVIGATION_GRID_CELL_SIZE = 50
+
+# 附近设施查询（nearby）允许的最大搜索半径
+NAVIGATION_NEARBY_MAX_RADIUS = 5000
+
+# 导航图中预计算最短路径树的枢纽位置类型
+NAVIGATION_ROUTING_HUB_TYPES = ('gate', 'security', 'exit')
+
+# 航班搜索参与相关度排序的候选航班数上限
+FLIGHT_SEARCH_MAX_CANDIDATES = 200
+
+# 航班批量更新接口（/flights/bulk_update/）单次请求的航班数上限
+FLIGHT_BULK_UPDATE_MAX_ITEMS = 1000
+
+# 生效公告内存索引检查数据代号（由公告表计算）的间隔（秒），其他进程修改公告后最多延迟该时间可见
+ACTIVE_ANNOUNCEMENTS_CHECK_INTERVAL = 1
+
+# 航班准点统计：实际出发时间晚于计划出发时间不超过该分钟数时计为准点
+FLIGHT_ON_TIME_THRESHOLD_MINUTES = 15
+
+# 航班语音播报文本缓存时间（秒），0 表示不缓存
+FLIGHT_VOICE_CACHE_TIMEOUT = 3600
+
+# 航班动态板（/flights/board/）：
+#   WINDOWS           可请求的时间窗口（小时）
+#   LOOKBACK_MINUTES  动态板保留已出发/已到达航班的时间（分钟）
+#   REBUILD_INTERVAL  动态板在缓存中的保存时间（秒），到期后从数据库重建，期间按航班变更增量更新
+FLIGHT_BOARD = {
+    'WINDOWS': (2, 6, 12, 24),
+    'LOOKBACK_MINUTES': 30,
+    'REBUILD_INTERVAL': 600,
+}
+
+# 登机口占用索引（/flights/gate_timeline/、/flights/gate_conflicts/）：
+#   BEFORE_DEPARTURE_MINUTES  计划出发前开始占用登机口的时间（分钟）
+#   AFTER_DEPARTURE_MINUTES   出发后释放登机口的时间（分钟），以计划与实际出发时间中较晚者为准
+#   LOOKBACK_HOURS            索引保留已结束占用的时间（小时）
+#   REBUILD_INTERVAL          索引在缓存中的保存时间（秒），到期后从数据库重建，期间按航班变更增量更新
+FLIGHT_GATES = {
+    'BEFORE_DEPARTURE_MINUTES': 45,
+    'AFTER_DEPARTURE_MINUTES': 15,
+    'LOOKBACK_HOURS': 24,
+    'REBUILD_INTERVAL': 3600,
+}
+
+# 数字人播报队列（/broadcasting/tasks/）：
+#   ZONES            播报区域，未指定目标区域的播报发送到这些区域及拉取过任务的区域
+#   COALESCE_WINDOW  同一区域相同内容的合并时间窗口（秒）
+#   MIN_INTERVAL     同一区域两条普通播报之间的最小间隔（秒），紧急播报不受限制
+#   TASK_TTL         普通播报入队后未播报的过期时间（秒）
+#   PLAYING_TIMEOUT  播报中的任务未完成的超时时间（秒），超时后视为已结束
+#   METRICS_WINDOW   队列指标中等待时间的统计范围（秒）
+BROADCAST_QUEUE = {
+    'ZONES': ('default',),
+    'COALESCE_WINDOW': 120,
+    'MIN_INTERVAL': 5,
+    'TASK_TTL': 900,
+    'PLAYING_TIMEOUT': 120,
+    'METRICS_WINDOW': 3600,
+}
+
+# 播报语音缓存（/broadcasting/audio/）：
+#   SYNTHESIZER      语音合成器类（apps.broadcasting.tts.BaseSynthesizer 子类），默认为离线提示音替身
+#   CACHE_DIR        音频缓存目录
+#   MAX_CACHE_BYTES  缓存总大小上限（字节），超过后删除最久未用的音频
+#   VOICE / LANGUAGE 默认音色与语言
+#   VOICES / LANGUAGES 合成接口允许使用的音色与语言
+#   PREWARM_HOURS    prewarm_tts_cache 默认预热的时间范围（小时）
+BROADCAST_TTS = {
+    'SYNTHESIZER': 'apps.broadcasting.tts.ToneSynthesizer',
+    'CACHE_DIR': os.path.join(MEDIA_ROOT, 'tts'),
+    'MAX_CACHE_BYTES': 512 * 1024 * 1024,
+    'VOICE': 'default',
+    'LANGUAGE': 'zh-CN',
+    'VOICES': ('default',),
+    'LANGUAGES': ('zh-CN',),
+    'PREWARM_HOURS': 2,
+}
+
+# 语音播报板（/flights/voice_board/）可查询的最长时间范围（小时）
+FLIGHT_VOICE_BOARD_MAX_HOURS = 24
+
 # JWT 配置
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
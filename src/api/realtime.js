@@ -0,0 +1,80 @@
+import { getToken } from '@/utils/auth'
+
+/**
+ * 订阅实时推送（SSE），替代轮询航班状态、公告和紧急通知
+ * 浏览器 EventSource 无法设置请求头，这里用 fetch 读取事件流并通过 Authorization 头携带 token；
+ * 断线后按服务端下发的 retry 间隔自动重连，并携带 Last-Event-ID 补发错过的事件
+ * @param {Array} topics - 订阅主题，如 ['flight:CA1234', 'announcement', 'emergency', 'lost_item']
+ * @param {Object} handlers - 事件处理函数，键为事件类型（flight/announcement/emergency/lost_item/reset）；
+ *   flight 事件一次携带多个航班（data.flights 或登机口冲突 data.conflicts），需按航班号筛选
+ * @returns {Object} 调用 close() 取消订阅
+ */
+export function subscribeRealtime(topics, handlers) {
+  const params = new URLSearchParams({ topics: topics.join(',') })
+  const url = `${process.env.VUE_APP_BASE_API}/api/realtime/stream/?${params}`
+  let controller = null
+  let closed = false
+  let lastEventId = null
+  let retry = 3000
+
+  function dispatch(block) {
+    let type = 'message'
+    let id = null
+    const data = []
+    block.split('\n').forEach(line => {
+      const index = line.indexOf(':')
+      if (index === 0) return // 注释（心跳）
+      const field = index < 0 ? line : line.slice(0, index)
+      const value = index < 0 ? '' : line.slice(index + 1).replace(/^ /, '')
+      if (field === 'event') type = value
+      else if (field === 'data') data.push(value)
+      else if (field === 'id') id = value
+      else if (field === 'retry' && /^\d+$/.test(value)) retry = Number(value)
+    })
+    if (id !== null) lastEventId = id
+    if (data.length && handlers[type]) {
+      handlers[type](JSON.parse(data.join('\n')), { type, lastEventId: id })
+    }
+  }
+
+  async function connect() {
+    controller = new AbortController()
+    const headers = { Authorization: `Bearer ${getToken()}` }
+    if (lastEventId !== null) headers['Last-Event-ID'] = lastEventId
+    const response = await fetch(url, { headers, signal: controller.signal })
+    if (!response.ok) throw new Error(`实时推送连接失败: ${response.status}`)
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+    for (;;) {
+      const { done, value } = await reader.read()
+      if (done) return
+      buffer += decoder.decode(value, { stream: true })
+      let index
+      while ((index = buffer.indexOf('\n\n')) >= 0) {
+        dispatch(buffer.slice(0, index))
+        buffer = buffer.slice(index + 2)
+      }
+    }
+  }
+
+  async function run() {
+    while (!closed) {
+      try {
+        await connect()
+      } catch (error) {
+        if (closed) return
+        console.log(error) // for debug
+      }
+      if (!closed) await new Promise(resolve => setTimeout(resolve, retry))
+    }
+  }
+
+  run()
+  return {
+    close() {
+      closed = true
+      if (controller) controller.abort()
+    }
+  }
+}